@@ -6,10 +6,20 @@ from backend.utils.openai_client import ask_gpt
 from backend.utils.scoring_utils import generate_scores_db, normalize_indicator_name
 from backend.ai_core.system_prompt_builder import build_system_prompt
 from backend.ai_core.agent_context import build_agent_context  # ✅ gedeelde context
+from backend.ai_core.context_budget import estimate_tokens, fit_context_to_budget, get_token_budget
+from backend.ai_core.reflection_diff import (
+    fetch_last_reflections,
+    split_changed_items,
+    store_reflections,
+    unwrap_reflections,
+)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Velden die een macro-reflectie inhoudelijk bepalen (naast de scoreregels)
+REFLECTION_FIELDS = ("value", "score", "trend", "interpretation", "action")
+
 
 # ======================================================
 # 🧠 Helpers
@@ -239,9 +249,20 @@ REGELS:
 
         system_prompt = build_system_prompt(agent="macro", task=macro_task)
 
+        # 🧮 Regels en losse items als eerste inkorten
+        payload = fit_context_to_budget(
+            payload,
+            priorities=["macro_avg_score", "top_contributors", "context", "macro_items", "macro_rules"],
+            budget=get_token_budget("macro"),
+            agent="macro",
+            reserved_tokens=estimate_tokens(system_prompt),
+        )
+
         raw_ai_context = ask_gpt(
             prompt=json.dumps(payload, ensure_ascii=False, indent=2),
-            system_role=system_prompt
+            system_role=system_prompt,
+            agent="macro",
+            user_id=user_id,
         )
 
         if not isinstance(raw_ai_context, dict):
@@ -250,9 +271,20 @@ REGELS:
         ai_context = normalize_ai_context(raw_ai_context, macro_items)
 
         # =========================================================
-        # 6️⃣ AI REFLECTIES (✅ MET CONTEXT)
+        # 6️⃣ AI REFLECTIES (✅ MET CONTEXT, ALLEEN GEWIJZIGDE INDICATOREN)
         # =========================================================
-        reflections_task = """
+        previous_reflections = fetch_last_reflections(conn, user_id, "macro")
+        changed_items, carried_reflections, input_hashes = split_changed_items(
+            macro_items,
+            previous_reflections,
+            fields=REFLECTION_FIELDS,
+            rules=rules_by_indicator,
+        )
+
+        ai_reflections = []
+
+        if changed_items:
+            reflections_task = """
 Maak per macro-indicator een reflectie.
 
 Gebruik expliciet:
@@ -260,29 +292,40 @@ Gebruik expliciet:
 - rol van deze indicator in het macrobeeld
 
 Per item:
+- indicator (exacte naam uit de input)
 - ai_score (0–100)
 - compliance (0–100)
 - korte comment
 - concrete aanbeveling
 
-Antwoord uitsluitend als JSON-lijst.
-"""
-
-        reflections_prompt = build_system_prompt(
-            agent="macro",
-            task=reflections_task
-        )
+OUTPUT — ALLEEN GELDIGE JSON:
 
-        ai_reflections = ask_gpt(
-            prompt=json.dumps({
-                "context": agent_context,
-                "items": macro_items
-            }, ensure_ascii=False, indent=2),
-            system_role=reflections_prompt
-        )
+{
+  "reflections": []
+}
+"""
 
-        if not isinstance(ai_reflections, list):
-            ai_reflections = []
+            reflections_prompt = build_system_prompt(
+                agent="macro",
+                task=reflections_task
+            )
+
+            reflections_payload = fit_context_to_budget(
+                {"items": changed_items, "context": agent_context},
+                priorities=["items", "context"],
+                budget=get_token_budget("macro"),
+                agent="macro",
+                reserved_tokens=estimate_tokens(reflections_prompt),
+            )
+
+            ai_reflections = unwrap_reflections(ask_gpt(
+                prompt=json.dumps(reflections_payload, ensure_ascii=False, indent=2),
+                system_role=reflections_prompt,
+                agent="macro",
+                user_id=user_id,
+            ))
+        else:
+            logger.info("⏭️ [Macro-Agent] Geen gewijzigde indicatoren → reflecties doorgeschoven")
 
         # =========================================================
         # 7️⃣ Opslaan ai_category_insights
@@ -312,34 +355,19 @@ Antwoord uitsluitend als JSON-lijst.
             ))
 
         # =========================================================
-        # 8️⃣ Opslaan ai_reflections
+        # 8️⃣ Opslaan ai_reflections (nieuw + doorgeschoven)
         # =========================================================
         for r in ai_reflections:
-            if not r.get("indicator"):
-                continue
-
-            indicator = normalize_indicator_name(r.get("indicator"))
-
-            with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO ai_reflections
-                        (category, user_id, indicator, raw_score, ai_score, compliance, comment, recommendation)
-                    VALUES ('macro', %s, %s, NULL, %s, %s, %s, %s)
-                    ON CONFLICT (category, user_id, indicator, date)
-                    DO UPDATE SET
-                        ai_score = EXCLUDED.ai_score,
-                        compliance = EXCLUDED.compliance,
-                        comment = EXCLUDED.comment,
-                        recommendation = EXCLUDED.recommendation,
-                        timestamp = NOW();
-                """, (
-                    user_id,
-                    indicator,
-                    r.get("ai_score", 50),
-                    r.get("compliance", 50),
-                    r.get("comment", ""),
-                    r.get("recommendation", ""),
-                ))
+            if r.get("indicator"):
+                r["indicator"] = normalize_indicator_name(r["indicator"])
+
+        store_reflections(
+            conn,
+            user_id,
+            "macro",
+            carried_reflections + ai_reflections,
+            input_hashes,
+        )
 
         conn.commit()
         logger.info(f"✅ [Macro-Agent] Voltooid voor user_id={user_id}")
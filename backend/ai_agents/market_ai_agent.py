@@ -7,6 +7,7 @@ from celery import shared_task
 
 from backend.utils.db import get_db_connection
 from backend.utils.openai_client import ask_gpt
+from backend.ai_core.context_budget import estimate_tokens, fit_context_to_budget, get_token_budget
 from backend.ai_core.system_prompt_builder import build_system_prompt
 from backend.ai_core.agent_context import build_agent_context  # ✅ NIEUW
 
@@ -250,9 +251,20 @@ REGELS:
 
         system_prompt = build_system_prompt(agent="market", task=MARKET_TASK)
 
+        # 🧮 Prijsreeks en history als eerste inkorten
+        payload = fit_context_to_budget(
+            payload,
+            priorities=["symbol", "market_avg_score", "top_contributors", "market_indicators", "context", "price_7d"],
+            budget=get_token_budget("market"),
+            agent="market",
+            reserved_tokens=estimate_tokens(system_prompt),
+        )
+
         raw_ai_context = ask_gpt(
             prompt=json.dumps(payload, ensure_ascii=False, indent=2),
-            system_role=system_prompt
+            system_role=system_prompt,
+            agent="market",
+            user_id=user_id,
         )
 
         ai_context = normalize_ai_context(raw_ai_context, market_indicators)
@@ -275,14 +287,24 @@ Antwoord uitsluitend als JSON-lijst.
 
         reflections_prompt = build_system_prompt(agent="market", task=reflections_task)
 
-        ai_reflections = ask_gpt(
-            prompt=json.dumps({
+        reflections_payload = fit_context_to_budget(
+            {
                 "context": agent_context,
                 "market_indicators": market_indicators,
                 "top_contributors": top_contributors,
                 "market_avg_score": market_avg,
-            }, ensure_ascii=False, indent=2),
-            system_role=reflections_prompt
+            },
+            priorities=["market_avg_score", "market_indicators", "top_contributors", "context"],
+            budget=get_token_budget("market"),
+            agent="market",
+            reserved_tokens=estimate_tokens(reflections_prompt),
+        )
+
+        ai_reflections = ask_gpt(
+            prompt=json.dumps(reflections_payload, ensure_ascii=False, indent=2),
+            system_role=reflections_prompt,
+            agent="market",
+            user_id=user_id,
         )
 
         if not isinstance(ai_reflections, list):
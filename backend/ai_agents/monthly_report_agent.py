@@ -2,12 +2,17 @@ import logging
 import json
 import re
 from difflib import SequenceMatcher
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from datetime import date, timedelta
 
 from backend.utils.db import get_db_connection
 from backend.utils.openai_client import ask_gpt_text
 from backend.ai_core.system_prompt_builder import build_system_prompt
+from backend.ai_core.context_budget import (
+    estimate_tokens,
+    get_token_budget,
+    shrink_to_tokens,
+)
 
 # =====================================================
 # Logging
@@ -15,6 +20,9 @@ from backend.ai_core.system_prompt_builder import build_system_prompt
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Ruimte voor de langste p_*() sectie-instructie
+SECTION_PROMPT_TOKENS = 300
+
 # =====================================================
 # 🧠 MONTHLY REPORT ROLE (CANONICAL)
 # =====================================================
@@ -80,9 +88,14 @@ def reduce_repetition(text: str, seen: list[str]) -> str:
     return " ".join(output)
 
 
-def generate_text(prompt: str, fallback: str, seen: list[str]) -> str:
+def generate_text(prompt: str, fallback: str, seen: list[str], user_id: Optional[int] = None) -> str:
     system_prompt = build_system_prompt(agent="report", task=REPORT_TASK)
-    raw = ask_gpt_text(prompt, system_role=system_prompt)
+    raw = ask_gpt_text(
+        prompt=prompt,
+        system_role=system_prompt,
+        agent="monthly_report",
+        user_id=user_id,
+    )
 
     if not raw or len(raw.strip()) < 10:
         return fallback
@@ -256,6 +269,11 @@ def generate_monthly_report_sections(user_id: int) -> Dict[str, Any]:
 
     seen: List[str] = []
 
+    # 🧮 Elk rapport krijgt een gelijk deel van het budget (langste velden eerst ingekort)
+    system_tokens = estimate_tokens(build_system_prompt(agent="report", task=REPORT_TASK))
+    per_report = max(1, (get_token_budget("monthly_report") - system_tokens - SECTION_PROMPT_TOKENS) // len(weekly_reports))
+    weekly_reports = [shrink_to_tokens(r, per_report) for r in weekly_reports]
+
     context_blob = f"""
 Je schrijft het maandrapport.
 Gebruik UITSLUITEND onderstaande weekrapporten.
@@ -270,28 +288,28 @@ BELANGRIJK:
 """.strip()
 
     executive_summary = generate_text(context_blob + "\n\n" + p_exec(),
-                                      "De maand kende geen eenduidig marktbeeld.", seen)
+                                      "De maand kende geen eenduidig marktbeeld.", seen, user_id=user_id)
 
     market_overview = generate_text(context_blob + "\n\n" + p_market(),
-                                    "Het marktregime bleef wisselend.", seen)
+                                    "Het marktregime bleef wisselend.", seen, user_id=user_id)
 
     macro_trends = generate_text(context_blob + "\n\n" + p_macro(),
-                                 "Macro-invloeden waren gemengd.", seen)
+                                 "Macro-invloeden waren gemengd.", seen, user_id=user_id)
 
     technical_structure = generate_text(context_blob + "\n\n" + p_technical(),
-                                        "De technische structuur bleef fragiel.", seen)
+                                        "De technische structuur bleef fragiel.", seen, user_id=user_id)
 
     setup_performance = generate_text(context_blob + "\n\n" + p_setups(),
-                                      "Setups vroegen om verhoogde selectiviteit.", seen)
+                                      "Setups vroegen om verhoogde selectiviteit.", seen, user_id=user_id)
 
     bot_performance = generate_text(context_blob + "\n\n" + p_bot(),
-                                    "De bot handelde vooral disciplinair.", seen)
+                                    "De bot handelde vooral disciplinair.", seen, user_id=user_id)
 
     strategic_lessons = generate_text(context_blob + "\n\n" + p_lessons(),
-                                      "De maand onderstreepte het belang van geduld.", seen)
+                                      "De maand onderstreepte het belang van geduld.", seen, user_id=user_id)
 
     outlook = generate_text(context_blob + "\n\n" + p_outlook(),
-                            "Vooruitblik: focus op bevestiging voordat exposure toeneemt.", seen)
+                            "Vooruitblik: focus op bevestiging voordat exposure toeneemt.", seen, user_id=user_id)
 
     result = {
         "executive_summary": executive_summary,
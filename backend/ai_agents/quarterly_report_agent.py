@@ -2,11 +2,16 @@ import logging
 import json
 import re
 from difflib import SequenceMatcher
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 
 from backend.utils.db import get_db_connection
 from backend.utils.openai_client import ask_gpt_text
 from backend.ai_core.system_prompt_builder import build_system_prompt
+from backend.ai_core.context_budget import (
+    estimate_tokens,
+    get_token_budget,
+    shrink_to_tokens,
+)
 
 # =====================================================
 # Logging
@@ -14,6 +19,9 @@ from backend.ai_core.system_prompt_builder import build_system_prompt
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Ruimte voor de langste p_*() sectie-instructie
+SECTION_PROMPT_TOKENS = 300
+
 # =====================================================
 # 🧠 QUARTERLY REPORT ROLE (CANONICAL)
 # =====================================================
@@ -79,9 +87,14 @@ def reduce_repetition(text: str, seen: list[str]) -> str:
     return " ".join(output)
 
 
-def generate_text(prompt: str, fallback: str, seen: list[str]) -> str:
+def generate_text(prompt: str, fallback: str, seen: list[str], user_id: Optional[int] = None) -> str:
     system_prompt = build_system_prompt(agent="report", task=REPORT_TASK)
-    raw = ask_gpt_text(prompt, system_role=system_prompt)
+    raw = ask_gpt_text(
+        prompt=prompt,
+        system_role=system_prompt,
+        agent="quarterly_report",
+        user_id=user_id,
+    )
 
     if not raw or len(raw.strip()) < 10:
         return fallback
@@ -255,6 +268,11 @@ def generate_quarterly_report_sections(user_id: int) -> Dict[str, Any]:
 
     seen: List[str] = []
 
+    # 🧮 Elk rapport krijgt een gelijk deel van het budget (langste velden eerst ingekort)
+    system_tokens = estimate_tokens(build_system_prompt(agent="report", task=REPORT_TASK))
+    per_report = max(1, (get_token_budget("quarterly_report") - system_tokens - SECTION_PROMPT_TOKENS) // len(monthly_reports))
+    monthly_reports = [shrink_to_tokens(r, per_report) for r in monthly_reports]
+
     context_blob = f"""
 Je schrijft het kwartaalrapport.
 Gebruik UITSLUITEND onderstaande maandrapporten.
@@ -269,28 +287,28 @@ BELANGRIJK:
 """.strip()
 
     executive_summary = generate_text(context_blob + "\n\n" + p_exec(),
-                                      "Het kwartaal kende geen eenduidig marktbeeld.", seen)
+                                      "Het kwartaal kende geen eenduidig marktbeeld.", seen, user_id=user_id)
 
     market_overview = generate_text(context_blob + "\n\n" + p_market(),
-                                    "Het marktregime bleef wisselend.", seen)
+                                    "Het marktregime bleef wisselend.", seen, user_id=user_id)
 
     macro_trends = generate_text(context_blob + "\n\n" + p_macro(),
-                                 "Macro-invloeden waren gemengd.", seen)
+                                 "Macro-invloeden waren gemengd.", seen, user_id=user_id)
 
     technical_structure = generate_text(context_blob + "\n\n" + p_technical(),
-                                        "De technische structuur bleef fragiel.", seen)
+                                        "De technische structuur bleef fragiel.", seen, user_id=user_id)
 
     setup_performance = generate_text(context_blob + "\n\n" + p_setups(),
-                                      "Setups vroegen om verhoogde selectiviteit.", seen)
+                                      "Setups vroegen om verhoogde selectiviteit.", seen, user_id=user_id)
 
     bot_performance = generate_text(context_blob + "\n\n" + p_bot(),
-                                    "De bot handelde vooral disciplinair.", seen)
+                                    "De bot handelde vooral disciplinair.", seen, user_id=user_id)
 
     strategic_lessons = generate_text(context_blob + "\n\n" + p_lessons(),
-                                      "Het kwartaal onderstreepte het belang van robuuste aannames.", seen)
+                                      "Het kwartaal onderstreepte het belang van robuuste aannames.", seen, user_id=user_id)
 
     outlook = generate_text(context_blob + "\n\n" + p_outlook(),
-                            "Vooruitblik: focus op bevestiging en risicobeheersing.", seen)
+                            "Vooruitblik: focus op bevestiging en risicobeheersing.", seen, user_id=user_id)
 
     result = {
         "executive_summary": executive_summary,
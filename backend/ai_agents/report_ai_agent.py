@@ -1,13 +1,29 @@
 import logging
 import json
+import os
 import re
+import time
 from difflib import SequenceMatcher
 from decimal import Decimal
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 
 from backend.utils.db import get_db_connection
-from backend.utils.openai_client import ask_gpt_text
+from backend.utils.json_utils import json_default
+from backend.utils.openai_client import (
+    AI_ERROR_TEXT,
+    TIMEOUT,
+    LLMStreamError,
+    ask_gpt_text,
+    llm_available,
+    stream_gpt_text,
+)
 from backend.ai_core.system_prompt_builder import build_system_prompt
+from backend.ai_core.context_budget import (
+    estimate_tokens,
+    fit_context_to_budget,
+    get_token_budget,
+)
+from backend.engine.report_template_engine import render_section
 
 
 # =====================================================
@@ -69,6 +85,12 @@ SYSTEM_PROMPT = build_system_prompt(
     task=REPORT_TASK,
 )
 
+# Maximale AI-tijd per rapport; daarna rendert de template engine de rest
+REPORT_LATENCY_BUDGET = float(os.getenv("REPORT_LATENCY_BUDGET", "180"))
+
+# Eén poging per sectie: bij een fout direct template i.p.v. retries × timeout
+REPORT_AI_RETRIES = 1
+
 
 def to_float(v):
     if v is None:
@@ -135,25 +157,6 @@ def get_regime_memory(user_id: int):
         conn.close()
 
 
-def _safe_json(obj):
-    """
-    JSON-safe serialization (Decimal/date/datetime-safe).
-    """
-    from datetime import date, datetime
-
-    if obj is None:
-        return None
-    if isinstance(obj, Decimal):
-        return float(obj)
-    if isinstance(obj, (date, datetime)):
-        return obj.isoformat()
-    if isinstance(obj, dict):
-        return {k: _safe_json(v) for k, v in obj.items()}
-    if isinstance(obj, (list, tuple)):
-        return [_safe_json(v) for v in obj]
-    return obj
-
-
 # =====================================================
 # Delta helpers (today vs previous report_date)
 # =====================================================
@@ -414,7 +417,13 @@ def get_bot_daily_snapshot(user_id: int) -> Dict[str, Any]:
 # =====================================================
 # Text generation (AI) + defensive parsing
 # =====================================================
-def generate_text(prompt: str, fallback: str) -> str:
+def generate_text(
+    prompt: str,
+    fallback: str,
+    user_id: Optional[int] = None,
+    timeout: Optional[float] = None,
+    retries: int = 2,
+) -> str:
     """
     Verantwoordelijk voor:
     - AI-call
@@ -432,13 +441,25 @@ def generate_text(prompt: str, fallback: str) -> str:
         raw = ask_gpt_text(
             prompt=prompt,
             system_role=SYSTEM_PROMPT,
+            agent="report",
+            user_id=user_id,
+            timeout=timeout,
+            retries=retries,
         )
     except Exception as e:
         logger.exception("❌ AI call failed")
         return fallback
 
-    # lege response → fallback
-    if not raw:
+    return clean_ai_text(raw, fallback)
+
+
+def clean_ai_text(raw: str, fallback: str) -> str:
+    """
+    Output-opschoning voor zowel gewone als gestreamde AI-tekst.
+    """
+
+    # lege response / mislukte call → fallback
+    if not raw or raw == AI_ERROR_TEXT:
         logger.warning("⚠️ AI gaf lege response — fallback gebruikt.")
         return fallback
 
@@ -905,7 +926,23 @@ Verplicht:
 Geen opsommingen, één doorlopend stuk tekst.
 """.strip()
 
-def build_compact_context(
+# Volgorde = belangrijkheid; onderaan wordt als eerste ingekort
+CONTEXT_PRIORITIES = [
+    "transition",
+    "regime",
+    "scores",
+    "deltas",
+    "market",
+    "positioning",
+    "indicators",
+    "memory",
+]
+
+# Ruimte voor de langste p_*() sectie-instructie
+SECTION_PROMPT_TOKENS = 250
+
+
+def build_compact_context_dict(
     regime,
     transition,
     prev_report,
@@ -920,9 +957,10 @@ def build_compact_context(
     bot_snapshot,
     ai_insights,
     ai_reflections,
-) -> str:
+) -> Dict[str, Any]:
     """
-    Compacte context builder.
+    Compacte context builder (dict).
+    Zelfde context voedt de AI-prompts én de template engine.
 
     Vermindert tokens drastisch terwijl:
     - regime context behouden blijft
@@ -942,7 +980,7 @@ def build_compact_context(
             })
         return output
 
-    context = {
+    blocks = {
         "regime": {
             "label": regime.get("label") if regime else None,
             "confidence": regime.get("confidence") if regime else None,
@@ -992,7 +1030,23 @@ def build_compact_context(
         }
     }
 
-    return json.dumps(context, ensure_ascii=False)
+    # -------------------------------------------------
+    # 🧮 Budget: system prompt + langste sectie-prompt liggen vast
+    # -------------------------------------------------
+    return fit_context_to_budget(
+        blocks,
+        priorities=CONTEXT_PRIORITIES,
+        budget=get_token_budget("report"),
+        agent="report",
+        reserved_tokens=estimate_tokens(SYSTEM_PROMPT) + SECTION_PROMPT_TOKENS,
+    )
+
+
+def build_compact_context(*args) -> str:
+    """
+    Compacte context als JSON-string (prompt-vorm).
+    """
+    return json.dumps(build_compact_context_dict(*args), ensure_ascii=False, default=json_default)
 
 
 
@@ -1002,7 +1056,11 @@ def build_compact_context(
 from backend.ai_core.regime_memory import get_regime_memory
 from backend.engine.transition_detector import compute_transition_detector
 
-def generate_daily_report_sections(user_id: int) -> Dict[str, Any]:
+def load_daily_report_inputs(user_id: int) -> Dict[str, Any]:
+    """
+    Verzamelt alle data + compacte context voor het daily report.
+    Eén keer per rapport; alle secties delen dezelfde base_context.
+    """
 
     # -------------------------------------------------
     # 1) Basis data
@@ -1083,7 +1141,7 @@ def generate_daily_report_sections(user_id: int) -> Dict[str, Any]:
     # -------------------------------------------------
     # COMPACT CONTEXT (🔥 NIEUW)
     # -------------------------------------------------
-    context_blob = build_compact_context(
+    context = build_compact_context_dict(
         regime,
         transition,
         prev_report,
@@ -1100,66 +1158,53 @@ def generate_daily_report_sections(user_id: int) -> Dict[str, Any]:
         ai_reflections,
     )
 
-    base_context = "CONTEXT:\n" + context_blob + "\n\n"
-
-    # -------------------------------------------------
-    # Generate sections
-    # -------------------------------------------------
-    seen_sentences: List[str] = []
-
-    executive_summary = reduce_repetition(
-        generate_text(base_context + p_exec(), "Regime intact."),
-        seen_sentences,
-    )
-
-    market_analysis = reduce_repetition(
-        generate_text(base_context + p_market(), "Market steady."),
-        seen_sentences,
-    )
-
-    macro_context = reduce_repetition(
-        generate_text(base_context + p_macro(), "Macro unchanged."),
-        seen_sentences,
-    )
-
-    technical_analysis = reduce_repetition(
-        generate_text(base_context + p_technical(), "Technicals neutral."),
-        seen_sentences,
-    )
-
-    setup_validation = reduce_repetition(
-        generate_text(base_context + p_setup(best_setup), "Setups selective."),
-        seen_sentences,
-    )
+    return {
+        "context": context,
+        "base_context": "CONTEXT:\n" + json.dumps(context, ensure_ascii=False, default=json_default) + "\n\n",
+        "scores": scores,
+        "market": market,
+        "market_ind": market_ind,
+        "macro_ind": macro_ind,
+        "tech_ind": tech_ind,
+        "setup_snapshot": setup_snapshot,
+        "best_setup": best_setup,
+        "active_strategy": active_strategy,
+        "bot_snapshot": bot_snapshot,
+        "deltas": deltas,
+        "transition": transition,
+    }
 
-    strategy_implication = reduce_repetition(
-        generate_text(base_context + p_strategy(active_strategy), "Strategy stable."),
-        seen_sentences,
-    )
 
-    bot_strategy = reduce_repetition(
-        generate_text(base_context + p_bot_strategy(bot_snapshot), "Bot inactive."),
-        seen_sentences,
-    )
+def daily_section_specs(inputs: Dict[str, Any]) -> List[Tuple[str, str, str]]:
+    """
+    (key, sectie-prompt, fallback) in vaste rapportvolgorde.
+    """
+    return [
+        ("executive_summary", p_exec(), "Regime intact."),
+        ("market_analysis", p_market(), "Market steady."),
+        ("macro_context", p_macro(), "Macro unchanged."),
+        ("technical_analysis", p_technical(), "Technicals neutral."),
+        ("setup_validation", p_setup(inputs["best_setup"]), "Setups selective."),
+        ("strategy_implication", p_strategy(inputs["active_strategy"]), "Strategy stable."),
+        ("bot_strategy", p_bot_strategy(inputs["bot_snapshot"]), "Bot inactive."),
+        ("outlook", p_outlook(), "Await confirmation."),
+    ]
 
-    outlook = reduce_repetition(
-        generate_text(base_context + p_outlook(), "Await confirmation."),
-        seen_sentences,
-    )
 
-    # -------------------------------------------------
-    # RESULT
-    # -------------------------------------------------
-    result = {
-        "executive_summary": executive_summary,
-        "market_analysis": market_analysis,
-        "macro_context": macro_context,
-        "technical_analysis": technical_analysis,
-        "setup_validation": setup_validation,
-        "strategy_implication": strategy_implication,
-        "bot_strategy": bot_strategy,
-        "bot_snapshot": bot_snapshot,
-        "outlook": outlook,
+def assemble_daily_report(inputs: Dict[str, Any], sections: Dict[str, str]) -> Dict[str, Any]:
+    market = inputs["market"]
+    scores = inputs["scores"]
+
+    return {
+        "executive_summary": sections.get("executive_summary"),
+        "market_analysis": sections.get("market_analysis"),
+        "macro_context": sections.get("macro_context"),
+        "technical_analysis": sections.get("technical_analysis"),
+        "setup_validation": sections.get("setup_validation"),
+        "strategy_implication": sections.get("strategy_implication"),
+        "bot_strategy": sections.get("bot_strategy"),
+        "bot_snapshot": inputs["bot_snapshot"],
+        "outlook": sections.get("outlook"),
         "price": market.get("price"),
         "change_24h": market.get("change_24h"),
         "volume": market.get("volume"),
@@ -1167,15 +1212,110 @@ def generate_daily_report_sections(user_id: int) -> Dict[str, Any]:
         "technical_score": scores.get("technical_score"),
         "market_score": scores.get("market_score"),
         "setup_score": scores.get("setup_score"),
-        "market_indicator_highlights": market_ind,
-        "macro_indicator_highlights": macro_ind,
-        "technical_indicator_highlights": tech_ind,
-        "best_setup": best_setup,
-        "top_setups": setup_snapshot.get("top_setups", []),
-        "active_strategy": active_strategy,
-        "deltas": deltas,
-        "transition": transition,
+        "market_indicator_highlights": inputs["market_ind"],
+        "macro_indicator_highlights": inputs["macro_ind"],
+        "technical_indicator_highlights": inputs["tech_ind"],
+        "best_setup": inputs["best_setup"],
+        "top_setups": inputs["setup_snapshot"].get("top_setups", []),
+        "active_strategy": inputs["active_strategy"],
+        "deltas": inputs["deltas"],
+        "transition": inputs["transition"],
     }
 
-    logger.info("✅ Report agent (compact context) OK")
+
+def iter_daily_report_sections(user_id: int, stream: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Genereert het daily report sectie voor sectie.
+
+    Events:
+    - {"event": "delta",   "section": key, "text": chunk}                   (alleen bij stream=True)
+    - {"event": "section", "section": key, "text": tekst, "source": ...}   (definitief, opgeschoond)
+    - {"event": "report",  "report": {...}}                                 (volledig rapport, laatste event)
+
+    Let op: deltas zijn ruwe modeltekst; de 'section' tekst is na
+    opschoning + cross-section deduplicatie en vervangt de deltas.
+
+    Begrensde doorlooptijd:
+    - elke sectie heeft een rule-based template als fallback
+    - is de LLM breaker open of REPORT_LATENCY_BUDGET op → direct template
+    - AI-calls krijgen hooguit de resterende budgettijd als timeout
+    """
+    inputs = load_daily_report_inputs(user_id)
+    base_context = inputs["base_context"]
+
+    started = time.monotonic()
+
+    seen_sentences: List[str] = []
+    sections: Dict[str, str] = {}
+    sources: Dict[str, str] = {}
+
+    for key, section_prompt, fallback in daily_section_specs(inputs):
+
+        template = render_section(key, inputs["context"], fallback)
+        remaining = REPORT_LATENCY_BUDGET - (time.monotonic() - started)
+
+        if remaining <= 0 or not llm_available():
+            text = template
+
+        elif stream:
+            chunks: List[str] = []
+            try:
+                for delta in stream_gpt_text(
+                    prompt=base_context + section_prompt,
+                    system_role=SYSTEM_PROMPT,
+                    agent="report",
+                    user_id=user_id,
+                    timeout=min(TIMEOUT, remaining),
+                ):
+                    chunks.append(delta)
+                    yield {"event": "delta", "section": key, "text": delta}
+                text = clean_ai_text("".join(chunks).strip(), template)
+            except LLMStreamError:
+                # Halve sectie niet bewaren; het section-event vervangt de deltas
+                logger.warning(f"⚠️ Stream afgebroken in sectie {key} — template gebruikt.")
+                text = template
+
+        else:
+            text = generate_text(
+                base_context + section_prompt,
+                template,
+                user_id=user_id,
+                timeout=min(TIMEOUT, remaining),
+                retries=REPORT_AI_RETRIES,
+            )
+
+        sources[key] = "template" if text == template else "ai"
+        sections[key] = reduce_repetition(text, seen_sentences)
+
+        # korte template-zinnen vallen anders weg in de deduplicatie
+        if not sections[key] and sources[key] == "template":
+            sections[key] = template
+
+        yield {"event": "section", "section": key, "text": sections[key], "source": sources[key]}
+
+    templated = [k for k, v in sources.items() if v == "template"]
+    if templated:
+        logger.warning(
+            "⚠️ Report user=%s: %s/%s secties via template (%s)",
+            user_id, len(templated), len(sources), ", ".join(templated),
+        )
+
+    logger.info(
+        "✅ Report agent (compact context) OK in %.1fs", time.monotonic() - started
+    )
+
+    report = assemble_daily_report(inputs, sections)
+    report["section_sources"] = sources
+
+    yield {"event": "report", "report": report}
+
+
+def generate_daily_report_sections(user_id: int) -> Dict[str, Any]:
+
+    result: Dict[str, Any] = {}
+
+    for event in iter_daily_report_sections(user_id):
+        if event["event"] == "report":
+            result = event["report"]
+
     return result
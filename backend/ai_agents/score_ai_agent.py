@@ -1,6 +1,9 @@
+import hashlib
 import json
 import logging
-from datetime import date, timedelta
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 from decimal import Decimal
 from typing import Any, Dict, List, Optional
 
@@ -9,6 +12,7 @@ from celery import shared_task
 from backend.utils.db import get_db_connection
 from backend.utils.openai_client import ask_gpt
 from backend.ai_core.system_prompt_builder import build_system_prompt
+from backend.ai_core.context_budget import budget_text_blocks, estimate_tokens
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -23,6 +27,15 @@ MASTER_CATEGORY = "master"
 # (meestal niet nodig als macro/market/technical/setup agents dat al doen)
 WRITE_DAILY_SCORES = False
 
+# JSON-template + CRITICAL-header van build_prompt (vast deel)
+MASTER_PROMPT_OVERHEAD_TOKENS = 250
+
+# Hoeveel dagen terug een domein-insight nog als fallback telt (vandaag incl.)
+INSIGHT_LOOKBACK_DAYS = 3
+
+# Parallelle users in de master-pass (elke worker = eigen DB-verbinding + AI-call)
+MASTER_MAX_WORKERS = int(os.getenv("MASTER_MAX_WORKERS", "4"))
+
 
 # ============================================================
 # ⚙️ Helpers
@@ -105,45 +118,50 @@ def calculate_strategy_score(
 # ============================================================
 # 📥 1. Insights ophalen → ai_category_insights (lookback)
 # ============================================================
-def fetch_today_insights(conn, user_id: int) -> Dict[str, dict]:
-    insights: Dict[str, dict] = {}
-    today = date.today()
-    lookback = [today, today - timedelta(days=1), today - timedelta(days=2)]
+def fetch_recent_insights_bulk(conn, user_ids: List[int]) -> Dict[int, Dict[str, dict]]:
+    """
+    Meest recente insight per (user, categorie) binnen de lookback.
+    Eén query voor alle users i.p.v. dagen × categorieën per user.
+    """
+    insights: Dict[int, Dict[str, dict]] = {uid: {} for uid in user_ids}
+
+    if not user_ids:
+        return insights
 
     with conn.cursor() as cur:
-        for cat in DOMAIN_CATEGORIES:
-            result = None
-
-            for d in lookback:
-                cur.execute(
-                    """
-                    SELECT category, avg_score, trend, bias, risk, summary, top_signals, date
-                    FROM ai_category_insights
-                    WHERE category = %s AND user_id = %s AND date = %s
-                    LIMIT 1;
-                    """,
-                    (cat, user_id, d),
-                )
-                row = cur.fetchone()
-                if row:
-                    result = {
-                        "category": row[0],
-                        "avg_score": float(row[1]) if row[1] is not None else None,
-                        "trend": row[2] or "",
-                        "bias": row[3] or "",
-                        "risk": row[4] or "",
-                        "summary": row[5] or "",
-                        "top_signals": safe_json(row[6] or "[]", []),
-                        "date": str(row[7] or d),
-                    }
-                    break
-
-            if result:
-                insights[cat] = result
+        cur.execute(
+            """
+            SELECT DISTINCT ON (user_id, category)
+                user_id, category, avg_score, trend, bias, risk, summary, top_signals, date
+            FROM ai_category_insights
+            WHERE user_id = ANY(%s)
+              AND category = ANY(%s)
+              AND date BETWEEN CURRENT_DATE - %s AND CURRENT_DATE
+            ORDER BY user_id, category, date DESC;
+            """,
+            (list(user_ids), DOMAIN_CATEGORIES, INSIGHT_LOOKBACK_DAYS - 1),
+        )
+        rows = cur.fetchall()
+
+    for uid, cat, avg_score, trend, bias, risk, summary, top_signals, d in rows:
+        insights.setdefault(uid, {})[cat] = {
+            "category": cat,
+            "avg_score": float(avg_score) if avg_score is not None else None,
+            "trend": trend or "",
+            "bias": bias or "",
+            "risk": risk or "",
+            "summary": summary or "",
+            "top_signals": safe_json(top_signals or "[]", []),
+            "date": str(d),
+        }
 
     return insights
 
 
+def fetch_today_insights(conn, user_id: int) -> Dict[str, dict]:
+    return fetch_recent_insights_bulk(conn, [user_id]).get(user_id, {})
+
+
 # ============================================================
 # ✅ Helper: Setup-score ophalen (UIT SETUP agent insights)
 # ============================================================
@@ -160,24 +178,30 @@ def fetch_setup_score_from_insights(insights: Dict[str, dict]) -> Optional[float
 # ============================================================
 # 📊 2. Numerieke context uit daily_scores + ai_reflections
 # ============================================================
-def fetch_numeric_scores(conn, user_id: int, insights: Dict[str, dict]) -> Dict[str, Any]:
-    numeric: Dict[str, Any] = {"daily_scores": {}, "ai_reflections": {}}
+def fetch_numeric_scores_bulk(conn, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    daily_scores (vandaag) + ai_reflections aggregatie voor alle users.
+    Twee queries, ongeacht het aantal users.
+    """
+    numeric: Dict[int, Dict[str, Any]] = {
+        uid: {"daily_scores": {}, "ai_reflections": {}} for uid in user_ids
+    }
+
+    if not user_ids:
+        return numeric
 
     with conn.cursor() as cur:
         # daily_scores (macro / market / technical / setup)
         cur.execute(
             """
-            SELECT macro_score, market_score, technical_score, setup_score
+            SELECT user_id, macro_score, market_score, technical_score, setup_score
             FROM daily_scores
-            WHERE report_date = CURRENT_DATE AND user_id = %s
-            LIMIT 1;
+            WHERE report_date = CURRENT_DATE AND user_id = ANY(%s);
             """,
-            (user_id,),
+            (list(user_ids),),
         )
-        row = cur.fetchone()
 
-        if row:
-            macro, market, technical, setup_score = row
+        for uid, macro, market, technical, setup_score in cur.fetchall() or []:
 
             # ✅ STRATEGY SCORE = market + technical + setup
             strategy_score = calculate_strategy_score(
@@ -186,7 +210,7 @@ def fetch_numeric_scores(conn, user_id: int, insights: Dict[str, dict]) -> Dict[
                 setup=setup_score,
             )
 
-            numeric["daily_scores"] = {
+            numeric[uid]["daily_scores"] = {
                 "macro": float(macro) if macro is not None else None,
                 "market": float(market) if market is not None else None,
                 "technical": float(technical) if technical is not None else None,
@@ -197,31 +221,109 @@ def fetch_numeric_scores(conn, user_id: int, insights: Dict[str, dict]) -> Dict[
         # ai_reflections aggregatie (ongewijzigd)
         cur.execute(
             """
-            SELECT category,
+            SELECT user_id,
+                   category,
                    ROUND(AVG(COALESCE(ai_score, 0))::numeric, 1),
                    ROUND(AVG(COALESCE(compliance, 0))::numeric, 1)
             FROM ai_reflections
-            WHERE date = CURRENT_DATE AND user_id = %s
-            GROUP BY category;
+            WHERE date = CURRENT_DATE AND user_id = ANY(%s)
+            GROUP BY user_id, category;
             """,
-            (user_id,),
+            (list(user_ids),),
         )
 
-        for cat, ai_score, comp in cur.fetchall() or []:
-            numeric["ai_reflections"][cat] = {
+        for uid, cat, ai_score, comp in cur.fetchall() or []:
+            numeric[uid]["ai_reflections"][cat] = {
                 "avg_ai_score": float(ai_score),
                 "avg_compliance": float(comp),
             }
 
     return convert_decimal(numeric)
 
+
+def fetch_numeric_scores(conn, user_id: int, insights: Dict[str, dict]) -> Dict[str, Any]:
+    return fetch_numeric_scores_bulk(conn, [user_id])[user_id]
+
+
+# ============================================================
+# 🔁 Skip-detectie: zelfde input als vorige master?
+# ============================================================
+def compute_input_hash(insights: Dict[str, dict], numeric: Dict[str, Any]) -> str:
+    """
+    Fingerprint van de master-input.
+    'date' telt bewust niet mee: dezelfde inhoud op een nieuwe dag
+    levert geen andere master op.
+    """
+    content = {
+        cat: {k: v for k, v in i.items() if k != "date"}
+        for cat, i in insights.items()
+    }
+    raw = json.dumps(
+        {"insights": content, "numeric": numeric},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def fetch_previous_master_hashes(conn, user_ids: List[int]) -> Dict[int, Optional[str]]:
+    if not user_ids:
+        return {}
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT DISTINCT ON (user_id)
+                user_id, top_signals->>'input_hash'
+            FROM ai_category_insights
+            WHERE category = 'master'
+              AND user_id = ANY(%s)
+            ORDER BY user_id, date DESC;
+            """,
+            (list(user_ids),),
+        )
+        return {uid: h for uid, h in cur.fetchall()}
+
+
+def carry_forward_master(conn, user_ids: List[int]) -> None:
+    """
+    Kopieert de laatste master naar vandaag (zonder AI-call),
+    zodat de dagreeks compleet blijft voor ongewijzigde users.
+    """
+    if not user_ids:
+        return
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO ai_category_insights
+                (category, user_id, avg_score, trend, bias, risk, summary, top_signals)
+            SELECT DISTINCT ON (user_id)
+                'master', user_id, avg_score, trend, bias, risk, summary, top_signals
+            FROM ai_category_insights
+            WHERE category = 'master'
+              AND user_id = ANY(%s)
+              AND date < CURRENT_DATE
+            ORDER BY user_id, date DESC
+            ON CONFLICT (user_id, category, date) DO NOTHING;
+            """,
+            (list(user_ids),),
+        )
+
+
 # ============================================================
 # 🧠 3. Master prompt bouwen
 # ============================================================
-def build_prompt(insights: Dict[str, dict], numeric: Dict[str, Any]) -> str:
+def build_prompt(
+    insights: Dict[str, dict],
+    numeric: Dict[str, Any],
+    system_prompt: Optional[str] = None,
+) -> str:
     """
     Bouwt de prompt voor de Master AI.
     Extra JSON-bescherming toegevoegd om parsing fouten te voorkomen.
+    Contextblokken worden binnen het master token-budget gehouden.
     """
 
     def block(cat: str) -> str:
@@ -239,8 +341,19 @@ def build_prompt(insights: Dict[str, dict], numeric: Dict[str, Any]) -> str:
             f"signals: {sigs_str}"
         )
 
-    text = "\n\n".join(block(cat) for cat in DOMAIN_CATEGORIES)
-    numeric_json = json.dumps(numeric, indent=2, ensure_ascii=False)
+    # 🧮 Budget: numerieke context eerst, daarna domeinen in vaste volgorde
+    blocks = {cat: block(cat) for cat in DOMAIN_CATEGORIES}
+    blocks["numbers"] = json.dumps(numeric, indent=2, ensure_ascii=False)
+
+    fitted = budget_text_blocks(
+        blocks,
+        priorities=["numbers", *DOMAIN_CATEGORIES],
+        agent="master",
+        reserved_tokens=MASTER_PROMPT_OVERHEAD_TOKENS + (estimate_tokens(system_prompt) if system_prompt else 0),
+    )
+
+    text = "\n\n".join(fitted[cat] for cat in DOMAIN_CATEGORIES if fitted[cat])
+    numeric_json = fitted["numbers"]
 
     return f"""
 CRITICAL:
@@ -311,7 +424,7 @@ def to_float_or_none(v: Any) -> Optional[float]:
 # ============================================================
 # 💾 4. Opslaan → ai_category_insights (categorie: 'master')
 # ============================================================
-def store_master_result(conn, result: dict, user_id: int):
+def store_master_result(conn, result: dict, user_id: int, input_hash: Optional[str] = None):
     """
     Slaat master score robuust op.
     Beschermt tegen:
@@ -388,6 +501,7 @@ def store_master_result(conn, result: dict, user_id: int):
         "data_warnings": data_warnings,
         "domains": domains,
         "outlook": result.get("outlook", "") or "",
+        "input_hash": input_hash,
     }
 
     # =====================================================
@@ -501,7 +615,16 @@ def store_daily_scores(conn, insights: Dict[str, dict], user_id: int):
 # ============================================================
 # 🚀 Per-user runner
 # ============================================================
-def generate_master_score_for_user(user_id: int):
+def generate_master_score_for_user(
+    user_id: int,
+    insights: Optional[Dict[str, dict]] = None,
+    numeric: Optional[Dict[str, Any]] = None,
+    input_hash: Optional[str] = None,
+):
+    """
+    Master score voor één user.
+    insights/numeric kunnen vooraf (bulk) geladen zijn door generate_master_score.
+    """
     logger.info(f"🧠 MASTER Orchestrator | user_id={user_id}")
 
     conn = get_db_connection()
@@ -513,8 +636,15 @@ def generate_master_score_for_user(user_id: int):
         # ======================================================
         # 1️⃣ DATA OPHALEN
         # ======================================================
-        insights = fetch_today_insights(conn, user_id=user_id)
-        numeric = fetch_numeric_scores(conn, user_id=user_id, insights=insights)
+        if insights is None:
+            insights = fetch_today_insights(conn, user_id=user_id)
+        if numeric is None:
+            numeric = fetch_numeric_scores(conn, user_id=user_id, insights=insights)
+        if input_hash is None:
+            input_hash = compute_input_hash(insights, numeric)
+
+        # kopie: data_warnings hieronder mogen de bulk-input niet muteren
+        numeric = dict(numeric)
 
         # ======================================================
         # 2️⃣ PRE-FLIGHT DATA WARNINGS (TECHNISCH AFDWINGEN)
@@ -547,7 +677,7 @@ def generate_master_score_for_user(user_id: int):
             data_warnings.append("Geen strategy-inzicht beschikbaar")
 
         # Doorgeven aan AI (mag NIET verdwijnen)
-        numeric.setdefault("data_warnings", []).extend(data_warnings)
+        numeric["data_warnings"] = list(numeric.get("data_warnings", [])) + data_warnings
 
         # ======================================================
         # 3️⃣ MASTER TASK (JOUW DEFINITIEVE VERSIE)
@@ -628,11 +758,13 @@ RICHTLIJNEN:
         # ======================================================
         # 4️⃣ PROMPT BOUWEN + AI CALL
         # ======================================================
-        prompt = build_prompt(insights, numeric)
+        prompt = build_prompt(insights, numeric, system_prompt=system_prompt)
 
         result = ask_gpt(
             prompt=prompt,
-            system_role=system_prompt
+            system_role=system_prompt,
+            agent="master",
+            user_id=user_id,
         )
 
         if not isinstance(result, dict):
@@ -641,7 +773,7 @@ RICHTLIJNEN:
         # ======================================================
         # 5️⃣ OPSLAAN
         # ======================================================
-        store_master_result(conn, result, user_id=user_id)
+        store_master_result(conn, result, user_id=user_id, input_hash=input_hash)
 
         if WRITE_DAILY_SCORES:
             store_daily_scores(conn, insights, user_id=user_id)
@@ -669,16 +801,67 @@ def generate_master_score():
         logger.error("❌ Geen databaseverbinding.")
         return
 
+    # ------------------------------------------------------
+    # 1️⃣ Alle input in bulk (constant aantal queries)
+    # ------------------------------------------------------
     try:
         with conn.cursor() as cur:
             cur.execute("SELECT id FROM users;")
             users = [row[0] for row in cur.fetchall()]
         logger.info(f"👥 {len(users)} gebruikers gevonden.")
+
+        insights_by_user = fetch_recent_insights_bulk(conn, users)
+        numeric_by_user = fetch_numeric_scores_bulk(conn, users)
+        previous_hashes = fetch_previous_master_hashes(conn, users)
+
+        # --------------------------------------------------
+        # 2️⃣ Ongewijzigde input → geen AI-call
+        # --------------------------------------------------
+        todo = []
+        unchanged = []
+
+        for user_id in users:
+            input_hash = compute_input_hash(
+                insights_by_user[user_id],
+                numeric_by_user[user_id],
+            )
+            if previous_hashes.get(user_id) == input_hash:
+                unchanged.append(user_id)
+            else:
+                todo.append((user_id, input_hash))
+
+        carry_forward_master(conn, unchanged)
+        conn.commit()
+
     except Exception:
-        logger.error("❌ Kon users niet ophalen", exc_info=True)
+        conn.rollback()
+        logger.error("❌ Kon master-input niet ophalen", exc_info=True)
         return
     finally:
         conn.close()
 
-    for user_id in users:
-        generate_master_score_for_user(user_id)
+    logger.info(
+        f"🔁 Master: {len(todo)} users te verwerken, {len(unchanged)} ongewijzigd (overgeslagen)"
+    )
+
+    if not todo:
+        return
+
+    # ------------------------------------------------------
+    # 3️⃣ Begrensde worker pool (AI-call is I/O-bound)
+    # ------------------------------------------------------
+    def _run(item):
+        user_id, input_hash = item
+        generate_master_score_for_user(
+            user_id,
+            insights=insights_by_user[user_id],
+            numeric=numeric_by_user[user_id],
+            input_hash=input_hash,
+        )
+
+    workers = max(1, min(MASTER_MAX_WORKERS, len(todo)))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="master") as pool:
+        list(pool.map(_run, todo))
+
+    logger.info(f"✅ Master pass klaar ({len(todo)} users, {workers} workers)")
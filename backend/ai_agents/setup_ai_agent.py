@@ -202,7 +202,9 @@ Output: 2–3 zinnen.
                         "market": mk
                     }
                 }, ensure_ascii=False, indent=2),
-                system_role=system_prompt
+                system_role=system_prompt,
+                agent="setup",
+                user_id=user_id,
             )
 
             evaluations.append({
@@ -358,7 +360,9 @@ Geen educatie of voorspellingen.
                 "description": description,
                 "action": action
             }, ensure_ascii=False, indent=2),
-            system_role=system_prompt
+            system_role=system_prompt,
+            agent="setup",
+            user_id=user_id,
         )
 
     except Exception:
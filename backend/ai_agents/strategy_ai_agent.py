@@ -4,6 +4,7 @@ from datetime import date
 from typing import Dict, List, Optional, Any
 
 from backend.utils.db import get_db_connection
+from backend.utils.json_utils import json_default
 from backend.utils.openai_client import ask_gpt
 from backend.ai_core.system_prompt_builder import build_system_prompt
 from backend.ai_core.agent_context import build_agent_context
@@ -133,8 +134,10 @@ REGELS:
     }
 
     response = ask_gpt(
-        prompt=json.dumps(payload, ensure_ascii=False, indent=2),
-        system_role=system_prompt
+        prompt=json.dumps(payload, ensure_ascii=False, indent=2, default=json_default),
+        system_role=system_prompt,
+        agent="strategy",
+        user_id=user_id,
     )
 
     # ======================================================
@@ -223,8 +226,10 @@ OUTPUT JSON:
     }
 
     result = ask_gpt(
-        prompt=json.dumps(payload, ensure_ascii=False, indent=2),
+        prompt=json.dumps(payload, ensure_ascii=False, indent=2, default=json_default),
         system_role=system_prompt,
+        agent="strategy",
+        user_id=user_id,
     )
 
     if not isinstance(result, dict):
@@ -343,8 +348,10 @@ Output JSON:
     }
 
     result = ask_gpt(
-        prompt=json.dumps(payload, ensure_ascii=False, indent=2),
-        system_role=system_prompt
+        prompt=json.dumps(payload, ensure_ascii=False, indent=2, default=json_default),
+        system_role=system_prompt,
+        agent="strategy",
+        user_id=setup.get("user_id"),
     )
 
     # 🔥 HARD VALIDATIE (DIT IS WAT JE WILT)
@@ -3,6 +3,13 @@ import json
 
 from backend.utils.db import get_db_connection
 from backend.utils.openai_client import ask_gpt
+from backend.ai_core.context_budget import estimate_tokens, fit_context_to_budget, get_token_budget
+from backend.ai_core.reflection_diff import (
+    fetch_last_reflections,
+    split_changed_items,
+    store_reflections,
+    unwrap_reflections,
+)
 from backend.utils.scoring_utils import normalize_indicator_name
 from backend.ai_core.system_prompt_builder import build_system_prompt
 from backend.ai_core.agent_context import build_agent_context  # ✅ gedeelde context
@@ -10,6 +17,9 @@ from backend.ai_core.agent_context import build_agent_context  # ✅ gedeelde co
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Velden die een technische reflectie inhoudelijk bepalen (advies/uitleg = regeluitkomst)
+REFLECTION_FIELDS = ("value", "score", "advies", "uitleg")
+
 
 # ======================================================
 # 🧠 Helpers
@@ -199,9 +209,20 @@ REGELS:
             "avg_score_today": avg_score,
         }
 
+        # 🧮 History/context eerst inkorten, indicatoren zo lang mogelijk heel
+        payload = fit_context_to_budget(
+            payload,
+            priorities=["avg_score_today", "current_indicators", "context"],
+            budget=get_token_budget("technical"),
+            agent="technical",
+            reserved_tokens=estimate_tokens(system_prompt),
+        )
+
         raw_ai_context = ask_gpt(
             prompt=json.dumps(payload, ensure_ascii=False, indent=2),
-            system_role=system_prompt
+            system_role=system_prompt,
+            agent="technical",
+            user_id=user_id,
         )
 
         if not isinstance(raw_ai_context, dict):
@@ -210,9 +231,19 @@ REGELS:
         ai_context = normalize_ai_context(raw_ai_context, combined)
 
         # =====================================================
-        # 4️⃣ AI REFLECTIES (MET CONTEXT)
+        # 4️⃣ AI REFLECTIES (MET CONTEXT, ALLEEN GEWIJZIGDE INDICATOREN)
         # =====================================================
-        reflections_task = """
+        previous_reflections = fetch_last_reflections(conn, user_id, "technical")
+        changed_items, carried_reflections, input_hashes = split_changed_items(
+            combined,
+            previous_reflections,
+            fields=REFLECTION_FIELDS,
+        )
+
+        ai_reflections = []
+
+        if changed_items:
+            reflections_task = """
 Maak per technische indicator een reflectie.
 
 Gebruik:
@@ -221,29 +252,40 @@ Gebruik:
 - rol in het totaalbeeld
 
 Per item:
+- indicator (exacte naam uit de input)
 - ai_score (0–100)
 - compliance (0–100)
 - korte comment
 - concrete aanbeveling
 
-Antwoord uitsluitend als JSON-lijst.
-"""
-
-        reflections_prompt = build_system_prompt(
-            agent="technical",
-            task=reflections_task
-        )
+OUTPUT — ALLEEN GELDIGE JSON:
 
-        ai_reflections = ask_gpt(
-            prompt=json.dumps({
-                "context": agent_context,
-                "items": combined
-            }, ensure_ascii=False, indent=2),
-            system_role=reflections_prompt
-        )
+{
+  "reflections": []
+}
+"""
 
-        if not isinstance(ai_reflections, list):
-            ai_reflections = []
+            reflections_prompt = build_system_prompt(
+                agent="technical",
+                task=reflections_task
+            )
+
+            reflections_payload = fit_context_to_budget(
+                {"items": changed_items, "context": agent_context},
+                priorities=["items", "context"],
+                budget=get_token_budget("technical"),
+                agent="technical",
+                reserved_tokens=estimate_tokens(reflections_prompt),
+            )
+
+            ai_reflections = unwrap_reflections(ask_gpt(
+                prompt=json.dumps(reflections_payload, ensure_ascii=False, indent=2),
+                system_role=reflections_prompt,
+                agent="technical",
+                user_id=user_id,
+            ))
+        else:
+            logger.info("⏭️ [Technical-Agent] Geen gewijzigde indicatoren → reflecties doorgeschoven")
 
         # =====================================================
         # 5️⃣ OPSLAAN ai_category_insights
@@ -273,34 +315,19 @@ Antwoord uitsluitend als JSON-lijst.
             ))
 
         # =====================================================
-        # 6️⃣ OPSLAAN ai_reflections
+        # 6️⃣ OPSLAAN ai_reflections (nieuw + doorgeschoven)
         # =====================================================
         for r in ai_reflections:
-            if not r.get("indicator"):
-                continue
-
-            indicator = normalize_indicator_name(r["indicator"])
-
-            with conn.cursor() as cur:
-                cur.execute("""
-                    INSERT INTO ai_reflections
-                        (category, user_id, indicator, raw_score, ai_score, compliance, comment, recommendation)
-                    VALUES ('technical', %s, %s, NULL, %s, %s, %s, %s)
-                    ON CONFLICT (category, user_id, indicator, date)
-                    DO UPDATE SET
-                        ai_score = EXCLUDED.ai_score,
-                        compliance = EXCLUDED.compliance,
-                        comment = EXCLUDED.comment,
-                        recommendation = EXCLUDED.recommendation,
-                        timestamp = NOW();
-                """, (
-                    user_id,
-                    indicator,
-                    r.get("ai_score", 50),
-                    r.get("compliance", 50),
-                    r.get("comment", ""),
-                    r.get("recommendation", ""),
-                ))
+            if r.get("indicator"):
+                r["indicator"] = normalize_indicator_name(r["indicator"])
+
+        store_reflections(
+            conn,
+            user_id,
+            "technical",
+            carried_reflections + ai_reflections,
+            input_hashes,
+        )
 
         conn.commit()
         logger.info(f"✅ [Technical-Agent] Voltooid voor user_id={user_id}")
@@ -5,6 +5,12 @@ from datetime import date
 from typing import Any, Dict, List, Optional
 
 from backend.utils.db import get_db_connection
+from backend.utils.db_schema import table_exists
+from backend.services.bot_balance_service import (
+    apply_ledger_delta,
+    get_bot_day,
+    get_bot_totals,
+)
 # ✅ Engine brain (single source of truth)
 from backend.engine.bot_brain import run_bot_brain
 
@@ -22,17 +28,7 @@ CONFIDENCE_LEVELS = ("low", "medium", "high")
 # 🔧 Helpers
 # =====================================================
 def _table_exists(conn, table: str) -> bool:
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT 1
-            FROM information_schema.tables
-            WHERE table_schema='public'
-              AND table_name=%s
-            """,
-            (table,),
-        )
-        return cur.fetchone() is not None
+    return table_exists(conn, table)
 
 def _map_confidence(v: float) -> str:
     if v >= 0.7:
@@ -194,24 +190,13 @@ def get_asset_position_value(
 
     symbol = (symbol or DEFAULT_SYMBOL).upper()
 
-    with conn.cursor() as cur:
-
-        # current qty
-        cur.execute(
-            """
-            SELECT COALESCE(SUM(qty_delta), 0)
-            FROM bot_ledger
-            WHERE user_id = %s
-              AND bot_id = %s
-              AND symbol = %s
-            """,
-            (user_id, bot_id, symbol),
-        )
+    # current qty (bot_balances, O(1))
+    qty = get_bot_totals(conn, user_id, bot_id, symbol=symbol)["net_qty"]
 
-        qty = float(cur.fetchone()[0] or 0)
+    if qty <= 0:
+        return 0.0
 
-        if qty <= 0:
-            return 0.0
+    with conn.cursor() as cur:
 
         # latest market price
         cur.execute(
@@ -834,20 +819,7 @@ def get_today_spent_eur(
     bot_id: int,
     report_date: date,
 ) -> float:
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT COALESCE(SUM(ABS(cash_delta_eur)), 0)
-            FROM bot_ledger
-            WHERE user_id = %s
-              AND bot_id = %s
-              AND entry_type = 'execute'
-              AND cash_delta_eur < 0
-              AND DATE(ts) = %s
-            """,
-            (user_id, bot_id, report_date),
-        )
-        return float(cur.fetchone()[0] or 0.0)
+    return get_bot_day(conn, user_id, bot_id, report_date)["today_spent_eur"]
 
 
 # =====================================================
@@ -899,22 +871,23 @@ def record_bot_ledger_entry(
             ),
         )
 
+        # Materialised balances in dezelfde transactie
+        apply_ledger_delta(
+            cur,
+            user_id=user_id,
+            bot_id=bot_id,
+            entry_type=entry_type,
+            cash_delta_eur=cash_delta_eur,
+            qty_delta=qty_delta,
+            symbol=symbol,
+        )
+
 
 # =====================================================
 # 📸 BOT BALANCE
 # =====================================================
 def get_bot_balance(conn, user_id: int, bot_id: int) -> float:
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT COALESCE(SUM(cash_delta_eur), 0)
-            FROM bot_ledger
-            WHERE user_id = %s
-              AND bot_id = %s
-            """,
-            (user_id, bot_id),
-        )
-        return float(cur.fetchone()[0] or 0.0)
+    return get_bot_totals(conn, user_id, bot_id)["net_cash_delta_eur"]
 
 
 # =====================================================
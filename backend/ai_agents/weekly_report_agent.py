@@ -9,12 +9,24 @@ from datetime import date, timedelta
 from typing import Dict, Any, List, Optional, Tuple
 
 from backend.utils.db import get_db_connection
-from backend.utils.openai_client import ask_gpt_text
+from backend.utils.openai_client import AI_ERROR_TEXT, ask_gpt_text
 from backend.ai_core.system_prompt_builder import build_system_prompt
+from backend.ai_core.context_budget import (
+    estimate_tokens,
+    fit_context_to_budget,
+    get_token_budget,
+    shrink_to_tokens,
+)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Ruimte voor de langste p_*() sectie-instructie
+SECTION_PROMPT_TOKENS = 300
+
+# Volgorde = belangrijkheid; onderaan wordt als eerste ingekort
+CONTEXT_PRIORITIES = ["meta", "daily_extract", "bot_rows", "setup_scores"]
+
 # =====================================================
 # 🧠 WEEKLY REPORT AGENT ROLE (CANONICAL)
 # =====================================================
@@ -112,16 +124,21 @@ def _flatten_text(obj) -> List[str]:
     return out
 
 
-def generate_text(prompt: str, fallback: str) -> str:
+def generate_text(prompt: str, fallback: str, user_id: Optional[int] = None) -> str:
     """
     - AI-call
     - output opschonen
     - defensief omgaan met JSON-output (als AI tóch json teruggeeft)
     """
     system_prompt = build_system_prompt(agent="report", task=REPORT_TASK)
-    raw = ask_gpt_text(prompt, system_role=system_prompt)
+    raw = ask_gpt_text(
+        prompt=prompt,
+        system_role=system_prompt,
+        agent="weekly_report",
+        user_id=user_id,
+    )
 
-    if not raw:
+    if not raw or raw == AI_ERROR_TEXT:
         return fallback
 
     text = raw.replace("```json", "").replace("```", "").strip()
@@ -653,21 +670,45 @@ def generate_weekly_report_sections(user_id: int) -> Dict[str, Any]:
             }
         })
 
+    # -------------------------------------------------
+    # 🧮 Budget: dag-extracts krijgen elk een gelijk deel,
+    # daarna worden bot/setup lijsten als eerste ingekort
+    # -------------------------------------------------
+    budget = get_token_budget("weekly_report")
+    reserved = estimate_tokens(build_system_prompt(agent="report", task=REPORT_TASK)) + SECTION_PROMPT_TOKENS
+
+    if daily_extract:
+        per_day = max(1, (budget - reserved - estimate_tokens(meta)) // len(daily_extract))
+        daily_extract = [shrink_to_tokens(d, per_day) for d in daily_extract]
+
+    blocks = fit_context_to_budget(
+        {
+            "meta": meta,
+            "daily_extract": daily_extract,
+            "bot_rows": bot_rows,
+            "setup_scores": setup_scores[:200],
+        },
+        priorities=CONTEXT_PRIORITIES,
+        budget=budget,
+        agent="weekly_report",
+        reserved_tokens=reserved,
+    )
+
     context_blob = f"""
 Je schrijft een weekrapport voor {start.isoformat()} t/m {end.isoformat()}.
 Gebruik UITSLUITEND onderstaande data.
 
 === WEEK META ===
-{json.dumps(meta, ensure_ascii=False)}
+{json.dumps(blocks["meta"], ensure_ascii=False)}
 
 === DAG EXTRACTS (samengevat) ===
-{json.dumps(daily_extract, ensure_ascii=False)}
+{json.dumps(blocks["daily_extract"], ensure_ascii=False)}
 
 === BOT BESLISSINGEN (periode) ===
-{json.dumps(bot_rows, ensure_ascii=False)}
+{json.dumps(blocks["bot_rows"], ensure_ascii=False)}
 
 === SETUP SCORES (periode) ===
-{json.dumps(setup_scores[:200], ensure_ascii=False)}
+{json.dumps(blocks["setup_scores"], ensure_ascii=False)}
 
 Belangrijk:
 - Geen absolute prijsniveaus
@@ -678,42 +719,42 @@ Belangrijk:
     seen: List[str] = []
 
     executive_summary = reduce_repetition(
-        generate_text(context_blob + "\n\n" + p_exec(meta), "Deze week gaf geen helder regime en vroeg om selectiviteit."),
+        generate_text(context_blob + "\n\n" + p_exec(meta), "Deze week gaf geen helder regime en vroeg om selectiviteit.", user_id=user_id),
         seen
     )
 
     market_overview = reduce_repetition(
-        generate_text(context_blob + "\n\n" + p_market(meta), "Het marktbeeld bleef wisselend en vroeg om discipline."),
+        generate_text(context_blob + "\n\n" + p_market(meta), "Het marktbeeld bleef wisselend en vroeg om discipline.", user_id=user_id),
         seen
     )
 
     macro_trends = reduce_repetition(
-        generate_text(context_blob + "\n\n" + p_macro(meta, daily_reports), "Macro was gemengd en bood geen constante rugwind."),
+        generate_text(context_blob + "\n\n" + p_macro(meta, daily_reports), "Macro was gemengd en bood geen constante rugwind.", user_id=user_id),
         seen
     )
 
     technical_structure = reduce_repetition(
-        generate_text(context_blob + "\n\n" + p_technical(meta), "Technisch bleef het beeld fragiel en afhankelijk van bevestiging."),
+        generate_text(context_blob + "\n\n" + p_technical(meta), "Technisch bleef het beeld fragiel en afhankelijk van bevestiging.", user_id=user_id),
         seen
     )
 
     setup_performance = reduce_repetition(
-        generate_text(context_blob + "\n\n" + p_setups(meta), "Setups vroegen om extra filtering en timingdiscipline."),
+        generate_text(context_blob + "\n\n" + p_setups(meta), "Setups vroegen om extra filtering en timingdiscipline.", user_id=user_id),
         seen
     )
 
     bot_performance = reduce_repetition(
-        generate_text(context_blob + "\n\n" + p_bot(meta), "De bot hield discipline en wachtte op betere voorwaarden."),
+        generate_text(context_blob + "\n\n" + p_bot(meta), "De bot hield discipline en wachtte op betere voorwaarden.", user_id=user_id),
         seen
     )
 
     strategic_lessons = reduce_repetition(
-        generate_text(context_blob + "\n\n" + p_lessons(meta, daily_reports), "De belangrijkste les was selectiviteit: niet elke beweging is handelbaar."),
+        generate_text(context_blob + "\n\n" + p_lessons(meta, daily_reports), "De belangrijkste les was selectiviteit: niet elke beweging is handelbaar.", user_id=user_id),
         seen
     )
 
     outlook = reduce_repetition(
-        generate_text(context_blob + "\n\n" + p_outlook(meta), "Vooruitblik: focus op bevestiging in structuur en scoremix voordat je opschaalt."),
+        generate_text(context_blob + "\n\n" + p_outlook(meta), "Vooruitblik: focus op bevestiging in structuur en scoremix voordat je opschaalt.", user_id=user_id),
         seen
     )
 
@@ -0,0 +1,416 @@
+"""
+Context budget + token accounting voor alle AI agents.
+
+Zorgt voor:
+- Token-schatting per contextblok
+- Inkorten van laagste-prioriteit blokken tot het agent-budget past
+- Logging van prompt/completion tokens per call en per agent (ai_token_usage)
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from backend.utils.db import get_db_connection
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+# =====================================================
+# ⚙️ BUDGETS (prompt tokens per agent)
+# =====================================================
+DEFAULT_TOKEN_BUDGET = int(os.getenv("AI_DEFAULT_TOKEN_BUDGET", "4000"))
+
+AGENT_TOKEN_BUDGETS = {
+    "master": int(os.getenv("AI_BUDGET_MASTER", "3000")),
+    "macro": int(os.getenv("AI_BUDGET_MACRO", "4000")),
+    "market": int(os.getenv("AI_BUDGET_MARKET", "4000")),
+    "technical": int(os.getenv("AI_BUDGET_TECHNICAL", "4000")),
+    "setup": int(os.getenv("AI_BUDGET_SETUP", "3000")),
+    "strategy": int(os.getenv("AI_BUDGET_STRATEGY", "3000")),
+    "report": int(os.getenv("AI_BUDGET_REPORT", "2500")),
+    "weekly_report": int(os.getenv("AI_BUDGET_WEEKLY_REPORT", "6000")),
+    "monthly_report": int(os.getenv("AI_BUDGET_MONTHLY_REPORT", "6000")),
+    "quarterly_report": int(os.getenv("AI_BUDGET_QUARTERLY_REPORT", "6000")),
+}
+
+# Grove vuistregel voor OpenAI tokenizers (NL/EN tekst + JSON)
+CHARS_PER_TOKEN = 4
+
+# Onder deze lengte wordt een lijst niet verder gehalveerd
+_MIN_LIST_ITEMS = 1
+
+
+def get_token_budget(agent: str) -> int:
+    return AGENT_TOKEN_BUDGETS.get((agent or "").lower(), DEFAULT_TOKEN_BUDGET)
+
+
+# =====================================================
+# 🔢 TOKEN SCHATTING
+# =====================================================
+def _to_text(obj: Any) -> str:
+    if obj is None:
+        return ""
+    if isinstance(obj, str):
+        return obj
+    try:
+        return json.dumps(obj, ensure_ascii=False, default=str)
+    except Exception:
+        return str(obj)
+
+
+def estimate_tokens(obj: Any) -> int:
+    """
+    Schat het aantal tokens van een string of JSON-serialiseerbaar object.
+    Bewust goedkoop: geen tokenizer, alleen tekenlengte.
+    """
+    text = _to_text(obj)
+    if not text:
+        return 0
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+# =====================================================
+# ✂️ BLOKKEN INKORTEN
+# =====================================================
+def _truncate_text(text: str, max_tokens: int) -> str:
+    max_chars = max(0, max_tokens * CHARS_PER_TOKEN)
+    if len(text) <= max_chars:
+        return text
+    if max_chars <= 1:
+        return ""
+    return text[: max_chars - 1].rstrip() + "…"
+
+
+def shrink_to_tokens(value: Any, max_tokens: int) -> Any:
+    """
+    Verkleint één blok tot (ongeveer) max_tokens.
+
+    - str   → afkappen
+    - list  → halveren tot het past (minimaal 1 item, daarna items zelf inkorten);
+              zet dus het belangrijkste item vooraan
+    - dict  → langste velden eerst inkorten
+    - rest  → ongewijzigd (scalars zijn al klein)
+    """
+    if max_tokens <= 0:
+        return None
+
+    if estimate_tokens(value) <= max_tokens:
+        return value
+
+    if isinstance(value, str):
+        return _truncate_text(value, max_tokens)
+
+    if isinstance(value, (list, tuple)):
+        items = list(value)
+        while len(items) > _MIN_LIST_ITEMS and estimate_tokens(items) > max_tokens:
+            items = items[: max(_MIN_LIST_ITEMS, len(items) // 2)]
+        if estimate_tokens(items) > max_tokens:
+            per_item = max(1, max_tokens // max(1, len(items)))
+            items = [shrink_to_tokens(i, per_item) for i in items]
+        return items
+
+    if isinstance(value, dict):
+        out = dict(value)
+        keys = sorted(out.keys(), key=lambda k: estimate_tokens(out[k]), reverse=True)
+        for k in keys:
+            overflow = estimate_tokens(out) - max_tokens
+            if overflow <= 0:
+                break
+            current = estimate_tokens(out[k])
+            out[k] = shrink_to_tokens(out[k], max(0, current - overflow))
+        return out
+
+    return value
+
+
+def fit_context_to_budget(
+    blocks: Dict[str, Any],
+    priorities: List[str],
+    budget: int,
+    agent: str = "general",
+    reserved_tokens: int = 0,
+) -> Dict[str, Any]:
+    """
+    Past een set contextblokken in een tokenbudget.
+
+    Parameters:
+    - blocks: naam → inhoud (str / dict / list)
+    - priorities: bloknamen van HOOG naar LAAG; niet-genoemde blokken
+      gelden als laagste prioriteit
+    - budget: maximaal aantal prompt tokens voor de blokken
+    - reserved_tokens: tokens die al vastliggen (taak-instructies e.d.)
+
+    Laagste prioriteit wordt eerst ingekort; pas als inkorten niet genoeg
+    is valt een blok weg (waarde None). Volgorde van keys blijft gelijk.
+    """
+    available = max(0, budget - reserved_tokens)
+
+    sizes = {k: estimate_tokens(v) for k, v in blocks.items()}
+    total = sum(sizes.values())
+
+    if total <= available:
+        logger.debug("🧮 Context binnen budget | agent=%s | tokens=%s/%s", agent, total, available)
+        return blocks
+
+    ranked = [k for k in priorities if k in blocks]
+    ranked += [k for k in blocks if k not in ranked]
+
+    fitted = dict(blocks)
+
+    for name in reversed(ranked):
+        overflow = total - available
+        if overflow <= 0:
+            break
+
+        before = sizes[name]
+        fitted[name] = shrink_to_tokens(fitted[name], max(0, before - overflow))
+        sizes[name] = estimate_tokens(fitted[name])
+        total -= before - sizes[name]
+
+    logger.info(
+        "✂️ Context ingekort | agent=%s | tokens=%s/%s | blocks=%s",
+        agent,
+        total,
+        available,
+        {k: sizes[k] for k in ranked},
+    )
+
+    return fitted
+
+
+def budget_text_blocks(
+    blocks: Dict[str, str],
+    priorities: List[str],
+    agent: str,
+    reserved_tokens: int = 0,
+) -> Dict[str, str]:
+    """
+    Shortcut voor agents die hun context als losse tekstblokken opbouwen.
+    Weggevallen blokken worden een lege string.
+    """
+    fitted = fit_context_to_budget(
+        blocks,
+        priorities=priorities,
+        budget=get_token_budget(agent),
+        agent=agent,
+        reserved_tokens=reserved_tokens,
+    )
+    return {k: (v if isinstance(v, str) else _to_text(v)) for k, v in fitted.items()}
+
+
+# =====================================================
+# 📊 TOKEN ACCOUNTING → ai_token_usage
+#
+# Een AI-call schrijft niet zelf naar de DB: de rij gaat in
+# een buffer per proces en een daemon-thread schrijft die elke
+# AI_USAGE_FLUSH_INTERVAL_S in één INSERT weg (of eerder zodra
+# AI_USAGE_BATCH_MAX rijen wachten). Bij shutdown (lifespan /
+# Celery worker_process_shutdown) wordt de rest geflusht.
+# Buffer begrensd: bij DB-storing vallen de oudste rijen weg.
+# =====================================================
+AI_USAGE_FLUSH_INTERVAL_S = float(os.getenv("AI_USAGE_FLUSH_INTERVAL_S", "5"))
+AI_USAGE_BATCH_MAX = int(os.getenv("AI_USAGE_BATCH_MAX", "200"))
+AI_USAGE_BUFFER_MAX = int(os.getenv("AI_USAGE_BUFFER_MAX", "5000"))
+
+_USAGE_COLUMNS = (
+    "user_id",
+    "agent",
+    "call_type",
+    "model",
+    "prompt_tokens",
+    "completion_tokens",
+    "estimated_prompt_tokens",
+    "duration_ms",
+    "success",
+)
+
+_usage_lock = threading.Lock()
+_usage_state: Dict[str, Any] = {"pid": None, "buffer": None, "wake": None}
+
+
+def _usage_runtime():
+    """Buffer + flusher van dit proces (fork-safe: na fork opnieuw)."""
+    with _usage_lock:
+        if _usage_state["pid"] != os.getpid():
+            # Rijen uit de buffer van de parent zijn van de parent
+            wake = threading.Event()
+            _usage_state.update(
+                pid=os.getpid(),
+                buffer=deque(maxlen=AI_USAGE_BUFFER_MAX),
+                wake=wake,
+            )
+            threading.Thread(target=_flush_loop, args=(wake,), name="ai-usage-flush", daemon=True).start()
+        return _usage_state["buffer"], _usage_state["wake"]
+
+
+def _flush_loop(wake: threading.Event) -> None:
+    while True:
+        wake.wait(AI_USAGE_FLUSH_INTERVAL_S)
+        wake.clear()
+        try:
+            flush_token_usage()
+        except Exception:
+            logger.warning("⚠️ ai_token_usage flush mislukt", exc_info=True)
+
+
+def record_token_usage(
+    *,
+    agent: str,
+    call_type: str,
+    model: Optional[str],
+    prompt_tokens: Optional[int],
+    completion_tokens: Optional[int],
+    estimated_prompt_tokens: Optional[int],
+    duration_ms: int,
+    success: bool,
+    user_id: Optional[int] = None,
+) -> None:
+    """
+    Zet één AI-call in de usage-buffer (geen DB-I/O in de call).
+    Best-effort: metrics mogen een AI-call nooit laten falen.
+    """
+    logger.info(
+        "📊 AI usage | agent=%s | user=%s | type=%s | prompt=%s (est %s) | completion=%s | %sms | ok=%s",
+        agent,
+        user_id,
+        call_type,
+        prompt_tokens,
+        estimated_prompt_tokens,
+        completion_tokens,
+        duration_ms,
+        success,
+    )
+
+    buffer, wake = _usage_runtime()
+    buffer.append(
+        (
+            user_id,
+            agent,
+            call_type,
+            model,
+            prompt_tokens,
+            completion_tokens,
+            estimated_prompt_tokens,
+            duration_ms,
+            success,
+        )
+    )
+    if len(buffer) >= AI_USAGE_BATCH_MAX:
+        wake.set()
+
+
+def flush_token_usage() -> int:
+    """
+    Schrijft de gebufferde rijen van dit proces weg, in batches
+    van max AI_USAGE_BATCH_MAX per INSERT. Geeft het aantal
+    opgeslagen rijen terug.
+    """
+    if _usage_state["pid"] != os.getpid():
+        return 0
+    buffer = _usage_state["buffer"]
+
+    written = 0
+    while buffer:
+        rows = []
+        while buffer and len(rows) < AI_USAGE_BATCH_MAX:
+            rows.append(buffer.popleft())
+
+        if not _insert_usage_rows(rows):
+            # Terug vooraan; volgende flush opnieuw proberen
+            buffer.extendleft(reversed(rows))
+            break
+        written += len(rows)
+
+    return written
+
+
+def _insert_usage_rows(rows: List[tuple]) -> bool:
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    placeholders = "(" + ", ".join(["%s"] * len(_USAGE_COLUMNS)) + ")"
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                INSERT INTO ai_token_usage ({", ".join(_USAGE_COLUMNS)})
+                VALUES {", ".join([placeholders] * len(rows))};
+                """,
+                [value for row in rows for value in row],
+            )
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        logger.warning("⚠️ ai_token_usage opslaan mislukt (%s rijen)", len(rows), exc_info=True)
+        return False
+    finally:
+        conn.close()
+
+
+def install_celery_usage_flush() -> None:
+    """Celery: buffer van een worker-proces wegschrijven bij afsluiten."""
+    from celery.signals import worker_process_shutdown
+
+    @worker_process_shutdown.connect(weak=False)
+    def _flush(**kwargs):
+        try:
+            flush_token_usage()
+        except Exception:
+            logger.warning("⚠️ ai_token_usage flush bij shutdown mislukt", exc_info=True)
+
+
+def get_token_usage_summary(days: int = 7, user_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Aggregeert tokenverbruik en doorlooptijd per agent over de laatste N dagen.
+    user_id=None → alle gebruikers (alleen voor admins).
+    """
+    user_filter = "AND user_id = %s" if user_id is not None else ""
+    params = (days, user_id) if user_id is not None else (days,)
+    conn = get_db_connection()
+    if not conn:
+        return []
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"""
+                SELECT
+                    agent,
+                    COUNT(*) AS calls,
+                    COALESCE(SUM(prompt_tokens), 0),
+                    COALESCE(SUM(completion_tokens), 0),
+                    COALESCE(SUM(duration_ms), 0),
+                    COALESCE(ROUND(AVG(duration_ms)), 0),
+                    COUNT(*) FILTER (WHERE NOT success)
+                FROM ai_token_usage
+                WHERE created_at >= NOW() - (%s * INTERVAL '1 day')
+                  {user_filter}
+                GROUP BY agent
+                ORDER BY SUM(prompt_tokens) + SUM(completion_tokens) DESC NULLS LAST;
+                """,
+                params,
+            )
+            rows = cur.fetchall()
+
+        return [
+            {
+                "agent": r[0],
+                "calls": int(r[1]),
+                "prompt_tokens": int(r[2]),
+                "completion_tokens": int(r[3]),
+                "total_tokens": int(r[2]) + int(r[3]),
+                "total_duration_ms": int(r[4]),
+                "avg_duration_ms": int(r[5]),
+                "failed_calls": int(r[6]),
+            }
+            for r in rows
+        ]
+    finally:
+        conn.close()
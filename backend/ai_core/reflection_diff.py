@@ -0,0 +1,180 @@
+"""
+Reflection diffing voor indicator-agents.
+
+Zorgt voor:
+- Fingerprint per indicator-input (waarde, score, regel)
+- Vergelijking met de laatst opgeslagen ai_reflections
+- Alleen gewijzigde indicatoren naar de AI; de rest wordt doorgeschoven
+"""
+
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+# =====================================================
+# 🔑 FINGERPRINT
+# =====================================================
+def reflection_input_hash(item: Dict[str, Any], fields: Iterable[str], rule: Any = None) -> str:
+    """
+    Hash over de velden die een reflectie inhoudelijk bepalen.
+    Timestamps tellen bewust niet mee.
+    """
+    payload = {f: item.get(f) for f in fields}
+    payload["_rule"] = rule
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def latest_per_indicator(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Houdt per indicator het eerste item (items zijn nieuwste-eerst gesorteerd).
+    """
+    seen = set()
+    out = []
+    for item in items:
+        ind = item.get("indicator")
+        if not ind or ind in seen:
+            continue
+        seen.add(ind)
+        out.append(item)
+    return out
+
+
+# =====================================================
+# 📥 VORIGE REFLECTIES
+# =====================================================
+def fetch_last_reflections(conn, user_id: int, category: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Laatste reflectie per indicator (vóór vandaag), incl. input_hash.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT DISTINCT ON (indicator)
+                indicator, ai_score, compliance, comment, recommendation, input_hash
+            FROM ai_reflections
+            WHERE user_id = %s
+              AND category = %s
+              AND date < CURRENT_DATE
+            ORDER BY indicator, date DESC;
+        """, (user_id, category))
+        rows = cur.fetchall()
+
+    return {
+        ind: {
+            "indicator": ind,
+            "ai_score": ai_score,
+            "compliance": compliance,
+            "comment": comment,
+            "recommendation": recommendation,
+            "input_hash": input_hash,
+        }
+        for ind, ai_score, compliance, comment, recommendation, input_hash in rows
+    }
+
+
+# =====================================================
+# 🔀 DIFF
+# =====================================================
+def split_changed_items(
+    items: List[Dict[str, Any]],
+    previous: Dict[str, Dict[str, Any]],
+    fields: Iterable[str],
+    rules: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Dict[str, str]]:
+    """
+    Splitst indicator-items in:
+    - changed:  input anders dan bij de vorige reflectie (of geen reflectie)
+    - carried:  vorige reflecties die ongewijzigd doorgeschoven worden
+    - hashes:   indicator → input_hash (voor opslag)
+    """
+    fields = list(fields)
+    changed: List[Dict[str, Any]] = []
+    carried: List[Dict[str, Any]] = []
+    hashes: Dict[str, str] = {}
+
+    for item in latest_per_indicator(items):
+        ind = item["indicator"]
+        h = reflection_input_hash(item, fields, (rules or {}).get(ind))
+        hashes[ind] = h
+
+        prev = previous.get(ind)
+        if prev and prev.get("input_hash") == h:
+            carried.append(prev)
+        else:
+            changed.append(item)
+
+    logger.info(
+        "🔀 Reflection diff | changed=%s | carried=%s",
+        len(changed),
+        len(carried),
+    )
+
+    return changed, carried, hashes
+
+
+def unwrap_reflections(raw: Any) -> List[Dict[str, Any]]:
+    """
+    AI geeft een JSON-object terug; accepteer {reflections: [...]} en varianten.
+    """
+    if isinstance(raw, list):
+        return [r for r in raw if isinstance(r, dict)]
+    if isinstance(raw, dict):
+        for key in ("reflections", "reflecties", "items"):
+            if isinstance(raw.get(key), list):
+                return [r for r in raw[key] if isinstance(r, dict)]
+    return []
+
+
+# =====================================================
+# 💾 OPSLAAN
+# =====================================================
+def store_reflections(
+    conn,
+    user_id: int,
+    category: str,
+    reflections: List[Dict[str, Any]],
+    hashes: Dict[str, str],
+) -> int:
+    """
+    Upsert van reflecties voor vandaag (nieuw én doorgeschoven).
+    Commit is aan de caller.
+    """
+    stored = 0
+
+    with conn.cursor() as cur:
+        for r in reflections:
+            indicator = r.get("indicator")
+            if not indicator:
+                continue
+
+            cur.execute("""
+                INSERT INTO ai_reflections
+                    (category, user_id, indicator, raw_score, ai_score, compliance,
+                     comment, recommendation, input_hash)
+                VALUES (%s, %s, %s, NULL, %s, %s, %s, %s, %s)
+                ON CONFLICT (category, user_id, indicator, date)
+                DO UPDATE SET
+                    ai_score = EXCLUDED.ai_score,
+                    compliance = EXCLUDED.compliance,
+                    comment = EXCLUDED.comment,
+                    recommendation = EXCLUDED.recommendation,
+                    input_hash = EXCLUDED.input_hash,
+                    timestamp = NOW();
+            """, (
+                category,
+                user_id,
+                indicator,
+                r.get("ai_score", 50),
+                r.get("compliance", 50),
+                r.get("comment", ""),
+                r.get("recommendation", ""),
+                hashes.get(indicator),
+            ))
+            stored += 1
+
+    return stored
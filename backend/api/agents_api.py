@@ -5,6 +5,7 @@ from fastapi import APIRouter, HTTPException, Depends
 
 from backend.utils.db import get_db_connection
 from backend.utils.auth_utils import get_current_user
+from backend.utils.async_db import run_db
 
 from celery.result import AsyncResult
 from backend.celery_task.celery_app import celery_app
@@ -29,7 +30,10 @@ def get_conn_cursor():
 
 @router.get("/agents/insights/macro")
 async def get_macro_insight(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
+    return await run_db(_get_macro_insight, current_user["id"])
+
+
+def _get_macro_insight(user_id: int):
     conn, cur = get_conn_cursor()
     try:
         cur.execute("""
@@ -64,7 +68,10 @@ async def get_macro_insight(current_user: dict = Depends(get_current_user)):
 
 @router.get("/agents/reflections/macro")
 async def get_macro_reflections(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
+    return await run_db(_get_macro_reflections, current_user["id"])
+
+
+def _get_macro_reflections(user_id: int):
     conn, cur = get_conn_cursor()
 
     try:
@@ -113,7 +120,10 @@ async def get_macro_reflections(current_user: dict = Depends(get_current_user)):
 
 @router.get("/agents/insights/market")
 async def get_market_insight(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
+    return await run_db(_get_market_insight, current_user["id"])
+
+
+def _get_market_insight(user_id: int):
     conn, cur = get_conn_cursor()
     try:
         cur.execute("""
@@ -148,7 +158,10 @@ async def get_market_insight(current_user: dict = Depends(get_current_user)):
 
 @router.get("/agents/reflections/market")
 async def get_market_reflections(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
+    return await run_db(_get_market_reflections, current_user["id"])
+
+
+def _get_market_reflections(user_id: int):
     conn, cur = get_conn_cursor()
 
     try:
@@ -197,7 +210,10 @@ async def get_market_reflections(current_user: dict = Depends(get_current_user))
 
 @router.get("/agents/insights/technical")
 async def get_technical_insight(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
+    return await run_db(_get_technical_insight, current_user["id"])
+
+
+def _get_technical_insight(user_id: int):
     conn, cur = get_conn_cursor()
     try:
         cur.execute("""
@@ -232,7 +248,10 @@ async def get_technical_insight(current_user: dict = Depends(get_current_user)):
 
 @router.get("/agents/reflections/technical")
 async def get_technical_reflections(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
+    return await run_db(_get_technical_reflections, current_user["id"])
+
+
+def _get_technical_reflections(user_id: int):
     conn, cur = get_conn_cursor()
 
     try:
@@ -281,7 +300,10 @@ async def get_technical_reflections(current_user: dict = Depends(get_current_use
 
 @router.get("/agents/insights/setup")
 async def get_setup_insight(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
+    return await run_db(_get_setup_insight, current_user["id"])
+
+
+def _get_setup_insight(user_id: int):
     conn, cur = get_conn_cursor()
     try:
         cur.execute("""
@@ -316,7 +338,10 @@ async def get_setup_insight(current_user: dict = Depends(get_current_user)):
 
 @router.get("/agents/reflections/setup")
 async def get_setup_reflections(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
+    return await run_db(_get_setup_reflections, current_user["id"])
+
+
+def _get_setup_reflections(user_id: int):
     conn, cur = get_conn_cursor()
 
     try:
@@ -364,7 +389,10 @@ async def get_setup_reflections(current_user: dict = Depends(get_current_user)):
 
 @router.get("/agents/insights/strategy")
 async def get_strategy_insight(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
+    return await run_db(_get_strategy_insight, current_user["id"])
+
+
+def _get_strategy_insight(user_id: int):
     conn, cur = get_conn_cursor()
     try:
         cur.execute("""
@@ -399,7 +427,10 @@ async def get_strategy_insight(current_user: dict = Depends(get_current_user)):
 
 @router.get("/agents/reflections/strategy")
 async def get_strategy_reflections(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
+    return await run_db(_get_strategy_reflections, current_user["id"])
+
+
+def _get_strategy_reflections(user_id: int):
     conn, cur = get_conn_cursor()
 
     try:
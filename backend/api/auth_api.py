@@ -14,6 +14,9 @@ from backend.utils.auth_utils import (
     create_refresh_token,
     decode_token,
     get_current_user,
+    is_refresh_token_revoked,
+    revoke_token,
+    AUTH_ROTATION_GRACE_S,
 )
 
 # =========================================================
@@ -202,7 +205,11 @@ def login(body: LoginRequest, response: Response):
 # =========================================================
 
 @router.post("/auth/refresh")
-def refresh_token(response: Response, refresh_token: Optional[str] = Cookie(default=None)):
+def refresh_token(
+    response: Response,
+    refresh_token: Optional[str] = Cookie(default=None),
+    access_token: Optional[str] = Cookie(default=None),
+):
     if not refresh_token:
         raise HTTPException(401, "Geen refresh token")
 
@@ -214,11 +221,23 @@ def refresh_token(response: Response, refresh_token: Optional[str] = Cookie(defa
     if payload.get("type") != "refresh":
         raise HTTPException(401, "Verkeerd token type")
 
+    # Uitgelogd of al geroteerd (na de grace-periode)
+    if is_refresh_token_revoked(refresh_token):
+        raise HTTPException(401, "Refresh token ingetrokken")
+
+    # Rol + actief-status opnieuw uit de DB: deactivatie of een
+    # rolwijziging geldt uiterlijk na één access-token levensduur
     user = _get_user_by_id(int(payload["sub"]))
-    if not user:
-        raise HTTPException(404, "Gebruiker niet gevonden")
+    if not user or not user["is_active"]:
+        raise HTTPException(401, "Gebruiker niet actief")
+
+    claims = {"sub": str(user["id"]), "role": user["role"]}
+    new_access = create_access_token(claims)
+    new_refresh = create_refresh_token(claims)
 
-    new_access = create_access_token({"sub": str(user["id"]), "role": user["role"]})
+    # Rotatie: oude tokens ingetrokken (korte grace voor parallelle requests)
+    revoke_token(access_token, grace_s=AUTH_ROTATION_GRACE_S)
+    revoke_token(refresh_token, grace_s=AUTH_ROTATION_GRACE_S)
 
     resp = JSONResponse({"success": True})
     resp.set_cookie(
@@ -227,6 +246,12 @@ def refresh_token(response: Response, refresh_token: Optional[str] = Cookie(defa
         max_age=60 * 60,
         **COOKIE_SETTINGS,
     )
+    resp.set_cookie(
+        "refresh_token",
+        new_refresh,
+        max_age=60 * 60 * 24 * 7,
+        **COOKIE_SETTINGS,
+    )
     return resp
 
 
@@ -235,7 +260,15 @@ def refresh_token(response: Response, refresh_token: Optional[str] = Cookie(defa
 # =========================================================
 
 @router.post("/auth/logout")
-def logout(response: Response):
+def logout(
+    response: Response,
+    access_token: Optional[str] = Cookie(default=None),
+    refresh_token: Optional[str] = Cookie(default=None),
+):
+    # Intrekken in Redis → ook ongeldig in andere workers
+    revoke_token(access_token)
+    revoke_token(refresh_token)
+
     resp = JSONResponse({"success": True})
     resp.delete_cookie("access_token", path="/")
     resp.delete_cookie("refresh_token", path="/")
@@ -3,14 +3,20 @@ import os
 import json
 import logging
 from datetime import datetime, date, timedelta
+from typing import Optional
 
 from dotenv import load_dotenv
-from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi import APIRouter, HTTPException, Request, Depends, Query
 
 from backend.utils.db import get_db_connection
 from backend.utils.auth_utils import get_current_user
+from backend.utils.async_db import run_db
+from backend.utils.chart_format import chart_format, render_chart
+from backend.utils.db_schema import get_table_columns, table_exists
+from backend.utils.downsampling import MAX_POINTS, fetch_downsampled, resolve_bin_seconds
 from backend.ai_agents.trading_bot_agent import execute_manual_decision
 from backend.services.portfolio_snapshot_service import snapshot_all_for_user
+from backend.services.bot_balance_service import apply_ledger_delta, get_user_bot_balances
 
 # (optioneel) onboarding helper — alleen gebruiken als jij dat wil
 # from backend.api.onboarding_api import mark_step_completed
@@ -47,31 +53,12 @@ def _safe_json(v, fallback):
 
 
 def _table_exists(conn, table: str) -> bool:
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT 1
-            FROM information_schema.tables
-            WHERE table_schema='public'
-              AND table_name=%s
-            """,
-            (table,),
-        )
-        return cur.fetchone() is not None
+    return table_exists(conn, table)
 
 
 def _get_table_columns(conn, table_name: str):
-    with conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT column_name
-            FROM information_schema.columns
-            WHERE table_schema='public'
-              AND table_name=%s
-            """,
-            (table_name,),
-        )
-        return [r[0] for r in cur.fetchall()]
+    return get_table_columns(conn, table_name)
+
 
 def _get_daily_scores_row(conn, user_id: int, report_date: date):
     """
@@ -819,6 +806,16 @@ async def create_manual_order(
                 ),
             )
 
+            apply_ledger_delta(
+                cur,
+                user_id=user_id,
+                bot_id=bot_id,
+                entry_type="execute",
+                cash_delta_eur=cash_delta,
+                qty_delta=qty_delta,
+                symbol=symbol,
+            )
+
         conn.commit()
 
         # =====================================================
@@ -1179,7 +1176,10 @@ async def delete_bot_config(
 # =====================================
 @router.get("/bot/portfolios")
 async def get_bot_portfolios(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
+    return await run_db(_get_bot_portfolios, current_user["id"])
+
+
+def _get_bot_portfolios(user_id: int):
     today = date.today()
 
     conn, cur = get_db_cursor()
@@ -1213,10 +1213,36 @@ async def get_bot_portfolios(current_user: dict = Depends(get_current_user)):
         if not bots:
             return []
 
-        has_ledger = _table_exists(conn, "bot_ledger")
+        has_balances = _table_exists(conn, "bot_balances")
         has_market = _table_exists(conn, "market_data")
 
-        last_price_by_symbol = {}
+        # ----------------------------------
+        # LEDGER STATS (bot_balances, één query voor alle bots)
+        # ----------------------------------
+        ledger_by_bot = (
+            get_user_bot_balances(conn, user_id, today) if has_balances else {}
+        )
+
+        # ----------------------------------
+        # MARKET PRICE (één keer, bots delen het symbool)
+        # ----------------------------------
+        symbol = "BTC"
+        last_price = None
+
+        if has_market:
+            cur.execute(
+                """
+                SELECT price
+                FROM market_data
+                WHERE symbol=%s
+                ORDER BY timestamp DESC
+                LIMIT 1
+                """,
+                (symbol,),
+            )
+
+            prow = cur.fetchone()
+            last_price = float(prow[0]) if prow and prow[0] else None
 
         out = []
 
@@ -1233,7 +1259,6 @@ async def get_bot_portfolios(current_user: dict = Depends(get_current_user)):
         ) in bots:
 
             bot_id = int(bot_id)
-            symbol = "BTC"
 
             stats = {
                 "net_cash_delta_eur": 0.0,
@@ -1249,81 +1274,13 @@ async def get_bot_portfolios(current_user: dict = Depends(get_current_user)):
                 "remaining_daily_eur": float(budget_daily),
             }
 
-            if has_ledger:
-
-                with conn.cursor() as c2:
-
-                    # net balances
-                    c2.execute(
-                        """
-                        SELECT
-                          COALESCE(SUM(cash_delta_eur),0),
-                          COALESCE(SUM(qty_delta),0)
-                        FROM bot_ledger
-                        WHERE user_id=%s
-                        AND bot_id=%s
-                        """,
-                        (user_id, bot_id),
-                    )
-
-                    row = c2.fetchone()
-
-                    stats["net_cash_delta_eur"] = float(row[0] or 0)
-                    stats["net_qty"] = float(row[1] or 0)
-
-                    # executed cash
-                    c2.execute(
-                        """
-                        SELECT COALESCE(SUM(cash_delta_eur),0)
-                        FROM bot_ledger
-                        WHERE user_id=%s
-                        AND bot_id=%s
-                        AND entry_type='execute'
-                        """,
-                        (user_id, bot_id),
-                    )
-
-                    executed_cash = float((c2.fetchone() or [0])[0] or 0)
+            ledger = ledger_by_bot.get(bot_id)
+            if ledger:
+                stats.update({k: v for k, v in ledger.items() if k in stats})
 
-                    stats["net_executed_cash_delta_eur"] = executed_cash
-
-                    # invested = absolute cash used
-                    invested = abs(executed_cash)
-                    stats["invested_eur"] = invested
-
-                    # today spent
-                    c2.execute(
-                        """
-                        SELECT COALESCE(SUM(ABS(cash_delta_eur)),0)
-                        FROM bot_ledger
-                        WHERE user_id=%s
-                        AND bot_id=%s
-                        AND entry_type='execute'
-                        AND cash_delta_eur < 0
-                        AND DATE(ts)=%s
-                        """,
-                        (user_id, bot_id, today),
-                    )
-
-                    stats["today_spent_eur"] = float((c2.fetchone() or [0])[0] or 0)
-
-                    # reserve today
-                    c2.execute(
-                        """
-                        SELECT COALESCE(SUM(ABS(cash_delta_eur)),0)
-                        FROM bot_ledger
-                        WHERE user_id=%s
-                        AND bot_id=%s
-                        AND entry_type='reserve'
-                        AND cash_delta_eur < 0
-                        AND DATE(ts)=%s
-                        """,
-                        (user_id, bot_id, today),
-                    )
-
-                    stats["today_reserved_eur"] = float((c2.fetchone() or [0])[0] or 0)
-
-                    stats["today_executed_eur"] = stats["today_spent_eur"]
+            # invested = absolute cash used
+            stats["invested_eur"] = abs(stats["net_executed_cash_delta_eur"])
+            stats["today_executed_eur"] = stats["today_spent_eur"]
 
             # ----------------------------------
             # AVAILABLE BUDGET
@@ -1339,41 +1296,13 @@ async def get_bot_portfolios(current_user: dict = Depends(get_current_user)):
                 0,
             )
 
-            # ----------------------------------
-            # MARKET PRICE
-            # ----------------------------------
-
-            if has_market:
-
-                if symbol not in last_price_by_symbol:
-
-                    with conn.cursor() as c3:
-
-                        c3.execute(
-                            """
-                            SELECT price
-                            FROM market_data
-                            WHERE symbol=%s
-                            ORDER BY timestamp DESC
-                            LIMIT 1
-                            """,
-                            (symbol,),
-                        )
+            stats["last_price"] = last_price
 
-                        prow = c3.fetchone()
-
-                        last_price_by_symbol[symbol] = (
-                            float(prow[0]) if prow and prow[0] else None
-                        )
-
-                stats["last_price"] = last_price_by_symbol.get(symbol)
-
-                if stats["last_price"] is not None:
-
-                    stats["position_value_eur"] = round(
-                        stats["net_qty"] * stats["last_price"],
-                        2,
-                    )
+            if last_price is not None:
+                stats["position_value_eur"] = round(
+                    stats["net_qty"] * last_price,
+                    2,
+                )
 
             out.append(
                 {
@@ -1669,6 +1598,9 @@ async def get_trade_plan(
 async def get_portfolio_balance_history(
     bucket: str = "1h",
     limit: int = 500,
+    points: Optional[int] = Query(None, ge=2, le=MAX_POINTS, description="Doel-aantal punten (downsampling)"),
+    bin_seconds: Optional[int] = Query(None, ge=1, description="Vaste bucketbreedte in seconden (downsampling)"),
+    fmt: str = Depends(chart_format),
     current_user: dict = Depends(get_current_user),
 ):
     """
@@ -1681,10 +1613,17 @@ async def get_portfolio_balance_history(
       - btc_value
       - invested
       - unrealized_pnl
+
+    Met `points` of `bin_seconds` wordt de volledige historie in SQL
+    gedownsampled (date_bin): laatste waarde per bucket + equity_open/min/max.
     """
+    return render_chart(await run_db(
+        _get_portfolio_balance_history,
+        current_user["id"], bucket, limit, points, bin_seconds,
+    ), fmt)
 
-    user_id = current_user["id"]
 
+def _get_portfolio_balance_history(user_id, bucket, limit, points, bin_seconds):
     if limit < 1:
         limit = 1
     if limit > 2000:
@@ -1695,6 +1634,38 @@ async def get_portfolio_balance_history(
         if not _table_exists(conn, "portfolio_balance_snapshots"):
             return []
 
+        if points or bin_seconds:
+            where_sql = "user_id = %s AND bucket = %s"
+            params = (user_id, bucket)
+
+            width = resolve_bin_seconds(
+                cur,
+                table="portfolio_balance_snapshots",
+                where_sql=where_sql,
+                params=params,
+                points=points,
+                bin_seconds=bin_seconds,
+            )
+            if width is None:
+                return []
+
+            return fetch_downsampled(
+                cur,
+                table="portfolio_balance_snapshots",
+                columns={
+                    "equity": "equity_eur",
+                    "cash": "cash_eur",
+                    "btc_qty": "btc_qty",
+                    "btc_value": "btc_value_eur",
+                    "invested": "invested_eur",
+                    "unrealized_pnl": "unrealized_pnl_eur",
+                },
+                where_sql=where_sql,
+                params=params,
+                bin_seconds=width,
+                ohlc="equity",
+            )
+
         cur.execute(
             """
             SELECT
@@ -1747,6 +1718,9 @@ async def get_bot_balance_history(
     bot_id: int,
     bucket: str = "1h",
     limit: int = 500,
+    points: Optional[int] = Query(None, ge=2, le=MAX_POINTS, description="Doel-aantal punten (downsampling)"),
+    bin_seconds: Optional[int] = Query(None, ge=1, description="Vaste bucketbreedte in seconden (downsampling)"),
+    fmt: str = Depends(chart_format),
     current_user: dict = Depends(get_current_user),
 ):
     """
@@ -1759,10 +1733,17 @@ async def get_bot_balance_history(
       - price
       - invested
       - unrealized_pnl (live berekend)
+
+    Met `points` of `bin_seconds` wordt in SQL gedownsampled (date_bin);
+    btc_value / unrealized_pnl worden dan ook in SQL berekend.
     """
+    return render_chart(await run_db(
+        _get_bot_balance_history,
+        current_user["id"], bot_id, bucket, limit, points, bin_seconds,
+    ), fmt)
 
-    user_id = current_user["id"]
 
+def _get_bot_balance_history(user_id, bot_id, bucket, limit, points, bin_seconds):
     if limit < 1:
         limit = 1
     if limit > 2000:
@@ -1773,6 +1754,42 @@ async def get_bot_balance_history(
         if not _table_exists(conn, "bot_portfolio_snapshots"):
             return []
 
+        if points or bin_seconds:
+            where_sql = "user_id = %s AND bot_id = %s AND bucket = %s"
+            params = (user_id, bot_id, bucket)
+
+            width = resolve_bin_seconds(
+                cur,
+                table="bot_portfolio_snapshots",
+                where_sql=where_sql,
+                params=params,
+                points=points,
+                bin_seconds=bin_seconds,
+            )
+            if width is None:
+                return []
+
+            return fetch_downsampled(
+                cur,
+                table="bot_portfolio_snapshots",
+                columns={
+                    "equity": "equity_eur",
+                    "cash": "cash_eur",
+                    "btc_qty": "net_qty",
+                    "price": "price_eur",
+                    "invested": "invested_eur",
+                    "btc_value": "COALESCE(net_qty, 0) * COALESCE(price_eur, 0)",
+                    "unrealized_pnl": (
+                        "COALESCE(net_qty, 0) * COALESCE(price_eur, 0)"
+                        " - COALESCE(invested_eur, 0)"
+                    ),
+                },
+                where_sql=where_sql,
+                params=params,
+                bin_seconds=width,
+                ohlc="equity",
+            )
+
         cur.execute(
             """
             SELECT
@@ -4,7 +4,9 @@ import psycopg2.extras
 
 from backend.utils.db import get_db_connection
 from backend.utils.auth_utils import get_current_user       # 🔐 USER SUPPORT
-from backend.utils.scoring_utils import get_scores_for_symbol
+from backend.utils.async_db import run_db
+from backend.services.dashboard_read_model import get_dashboard_read_model
+from backend.utils.json_utils import FastJSONResponse
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -19,150 +21,24 @@ logging.basicConfig(
 # =========================================================
 @router.get("/dashboard")
 async def get_dashboard_data(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
+    return await run_db(_get_dashboard_data, current_user["id"])
 
-    conn = get_db_connection()
-    if not conn:
-        raise HTTPException(status_code=500, detail="DASH00: Databaseverbinding mislukt.")
 
+def _get_dashboard_data(user_id: int):
+    """
+    Leest de per-user read model snapshot (één key lookup).
+    Ontbreekt hij nog, dan wordt hij direct opgebouwd.
+    """
     try:
-        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-
-            # =====================================================
-            # 📈 MARKET DATA (laatste snapshot per user)
-            # =====================================================
-            try:
-                cur.execute("""
-                    SELECT DISTINCT ON (symbol)
-                        symbol, price, volume, change_24h, timestamp
-                    FROM market_data
-                    WHERE user_id = %s AND symbol = 'BTC'
-                    ORDER BY symbol, timestamp DESC
-                """, (user_id,))
-                market_data = [dict(row) for row in cur.fetchall()]
-                logger.info(f"📈 DASH01: Market data voor user {user_id} geladen")
-            except Exception as e:
-                logger.warning(f"⚠️ DASH01: Market data fout: {e}")
-                market_data = []
-
-            # =====================================================
-            # 🧪 TECHNICAL DATA (laatste indicator-waardes)
-            # =====================================================
-            try:
-                cur.execute("""
-                    SELECT symbol, LOWER(indicator) AS indicator, value, score, timestamp
-                    FROM technical_indicators
-                    WHERE user_id = %s
-                    ORDER BY indicator, timestamp DESC
-                """, (user_id,))
-                rows = cur.fetchall()
-
-                technical_data = {
-                    row["indicator"]: {
-                        "value": row["value"],
-                        "score": row["score"],
-                        "timestamp": row["timestamp"],
-                    }
-                    for row in rows
-                }
-                logger.info(f"🧮 DASH02: Technical data geladen ({len(technical_data)} items)")
-            except Exception as e:
-                logger.warning(f"⚠️ DASH02: Technical data fout: {e}")
-                technical_data = {}
-
-            # =====================================================
-            # 🌍 MACRO DATA (laatste per naam)
-            # =====================================================
-            try:
-                cur.execute("""
-                    SELECT DISTINCT ON (name)
-                        name, value, trend, interpretation, action, score, timestamp
-                    FROM macro_data
-                    WHERE user_id = %s
-                    ORDER BY name, timestamp DESC
-                """, (user_id,))
-                macro_data = [dict(row) for row in cur.fetchall()]
-                logger.info(f"🌍 DASH03: Macro data geladen")
-            except Exception as e:
-                logger.warning(f"⚠️ DASH03: Macro data fout: {e}")
-                macro_data = []
-
-            # =====================================================
-            # 🧾 SETUPS (laatste per naam)
-            # =====================================================
-            try:
-                cur.execute("""
-                    SELECT DISTINCT ON (name)
-                        name, created_at AS timestamp
-                    FROM setups
-                    WHERE user_id = %s
-                    ORDER BY name, created_at DESC
-                """, (user_id,))
-                setups = [dict(row) for row in cur.fetchall()]
-            except Exception as e:
-                logger.warning(f"⚠️ DASH04: Setups fout: {e}")
-                setups = []
-
-        # =====================================================
-        # 🧠 SCORES — user-specifiek
-        # =====================================================
-        try:
-            scores = get_scores_for_symbol(user_id=user_id, include_metadata=True)
-        except TypeError:
-            scores = get_scores_for_symbol(include_metadata=True)
-
-        macro_score = scores.get("macro_score", 0)
-        technical_score = scores.get("technical_score", 0)
-        market_score = scores.get("market_score", 0)
-        setup_score = scores.get("setup_score", 0)
-
-        # =====================================================
-        # 📘 UITLEGGEN
-        # =====================================================
-        macro_explanation = (
-            "📊 Gebaseerd op: " + ", ".join(d["name"] for d in macro_data)
-            if macro_data else "❌ Geen macrodata"
-        )
-
-        if technical_data:
-            technical_explanation = " | ".join(
-                f"{k.upper()}: {v['value']} (score {v['score']})"
-                for k, v in technical_data.items()
-            )
-        else:
-            technical_explanation = "❌ Geen technische data"
-
-        setup_explanation = (
-            f"🧠 {len(setups)} actieve setups" if setups else "❌ Geen setups"
-        )
-
-        # =====================================================
-        # 🎯 RESPONSE
-        # =====================================================
-        return {
-            "user_id": user_id,
-            "market_data": market_data,
-            "technical_data": technical_data,
-            "macro_data": macro_data,
-            "setups": setups,
-            "scores": {
-                "macro": macro_score,
-                "technical": technical_score,
-                "market": market_score,
-                "setup": setup_score
-            },
-            "explanation": {
-                "macro": macro_explanation,
-                "technical": technical_explanation,
-                "setup": setup_explanation
-            }
-        }
-
+        payload = get_dashboard_read_model(user_id)
     except Exception as e:
         logger.error(f"❌ DASH05: Dashboard error — {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="DASH05: Dashboard data ophalen mislukt.")
-    finally:
-        conn.close()
+
+    if payload is None:
+        raise HTTPException(status_code=500, detail="DASH00: Databaseverbinding mislukt.")
+
+    return FastJSONResponse(payload)
 
 
 # =========================================================
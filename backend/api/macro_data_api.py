@@ -1,12 +1,15 @@
 import os
 import logging
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi import APIRouter, HTTPException, Request, Depends, Response
 
 from dotenv import load_dotenv
 
 from backend.utils.db import get_db_connection
 from backend.utils.auth_utils import get_current_user
+from backend.utils.async_db import run_db
+from backend.utils.chart_format import chart_format, render_chart
+from backend.utils.pagination import history_filter, page_limit, page_params, paginate, recent_buckets_sql
 
 # ⭐ Onboarding helper importeren
 from backend.api.onboarding_api import mark_step_completed
@@ -331,101 +334,42 @@ async def get_latest_macro_day_data(current_user: dict = Depends(get_current_use
 
 
 # =====================================
-# 📅 Weekdata ophalen (user_id)
+# 📅 Week / maand / kwartaal (user_id)
+# - laatste N dagen/weken met data
+# - buckets via loose index scan, range-predicaat op timestamp
+# - keyset-paginatie (opt-in) via limit / cursor / X-Next-Cursor
 # ✅ GEEN onboarding hier
 # =====================================
-@router.get("/macro_data/week")
-async def get_macro_week_data(current_user: dict = Depends(get_current_user)):
+def _get_macro_history(user_id: int, bucket_sql: str, periods: int, page: dict, response: Response):
     conn = get_db_connection()
     if not conn:
         raise HTTPException(500, "❌ Geen databaseverbinding.")
 
     try:
         with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT DISTINCT DATE(timestamp)
-                FROM macro_data
-                WHERE user_id = %s
-                ORDER BY DATE(timestamp) DESC
-                LIMIT 7;
-                """,
-                (current_user["id"],),
-            )
+            cur.execute(recent_buckets_sql("macro_data", bucket_sql), (user_id, user_id, periods))
 
-            dagen = [r[0] for r in cur.fetchall()]
-            if not dagen:
+            buckets = [r[0] for r in cur.fetchall()]
+            if not buckets:
+                paginate([], page, response, ts_index=6, id_index=7)
                 return []
 
-            cur.execute(
-                """
-                SELECT name, value, trend, interpretation, action, score, timestamp
-                FROM macro_data
-                WHERE user_id = %s
-                  AND DATE(timestamp) = ANY(%s)
-                ORDER BY timestamp DESC;
-                """,
-                (current_user["id"], dagen),
-            )
-
-            rows = cur.fetchall()
-
-        return [
-            {
-                "indicator": r[0],
-                "waarde": r[1],
-                "trend": r[2],
-                "interpretation": r[3],
-                "action": r[4],
-                "score": r[5],
-                "timestamp": r[6].isoformat() if r[6] else None,
-            }
-            for r in rows
-        ]
-
-    finally:
-        conn.close()
-
-
-# =====================================
-# 📅 Maanddata ophalen (user_id)
-# ✅ GEEN onboarding hier
-# =====================================
-@router.get("/macro_data/month")
-async def get_macro_month_data(current_user: dict = Depends(get_current_user)):
-    conn = get_db_connection()
-    if not conn:
-        raise HTTPException(500, "❌ Geen databaseverbinding.")
-
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT DISTINCT DATE_TRUNC('week', timestamp)::date
-                FROM macro_data
-                WHERE user_id = %s
-                ORDER BY 1 DESC
-                LIMIT 4;
-                """,
-                (current_user["id"],),
-            )
-
-            weken = [r[0] for r in cur.fetchall()]
-            if not weken:
-                return []
+            extra_sql, extra_params = history_filter(page)
 
+            # Oudste bucket als ondergrens ≡ "timestamp valt in een van de buckets"
             cur.execute(
-                """
-                SELECT name, value, trend, interpretation, action, score, timestamp
+                f"""
+                SELECT name, value, trend, interpretation, action, score, timestamp, id
                 FROM macro_data
                 WHERE user_id = %s
-                  AND DATE_TRUNC('week', timestamp)::date = ANY(%s)
-                ORDER BY timestamp DESC;
+                  AND timestamp >= %s{extra_sql}
+                ORDER BY timestamp DESC, id DESC
+                LIMIT %s;
                 """,
-                (current_user["id"], weken),
+                (user_id, min(buckets), *extra_params, page_limit(page)),
             )
 
-            rows = cur.fetchall()
+            rows = paginate(cur.fetchall(), page, response, ts_index=6, id_index=7)
 
         return [
             {
@@ -444,61 +388,34 @@ async def get_macro_month_data(current_user: dict = Depends(get_current_user)):
         conn.close()
 
 
-# =====================================
-# 📅 Kwartaaldata ophalen (user_id)
-# ✅ GEEN onboarding hier
-# =====================================
-@router.get("/macro_data/quarter")
-async def get_macro_quarter_data(current_user: dict = Depends(get_current_user)):
-    conn = get_db_connection()
-    if not conn:
-        raise HTTPException(500, "❌ Geen databaseverbinding.")
-
-    try:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT DISTINCT DATE_TRUNC('week', timestamp)::date
-                FROM macro_data
-                WHERE user_id = %s
-                ORDER BY 1 DESC
-                LIMIT 12;
-                """,
-                (current_user["id"],),
-            )
+@router.get("/macro_data/week")
+async def get_macro_week_data(
+    response: Response,
+    page: dict = Depends(page_params),
+    fmt: str = Depends(chart_format),
+    current_user: dict = Depends(get_current_user),
+):
+    return render_chart(await run_db(_get_macro_history, current_user["id"], "DATE(timestamp)", 7, page, response), fmt, response)
 
-            weken = [r[0] for r in cur.fetchall()]
-            if not weken:
-                return []
 
-            cur.execute(
-                """
-                SELECT name, value, trend, interpretation, action, score, timestamp
-                FROM macro_data
-                WHERE user_id = %s
-                  AND DATE_TRUNC('week', timestamp)::date = ANY(%s)
-                ORDER BY timestamp DESC;
-                """,
-                (current_user["id"], weken),
-            )
+@router.get("/macro_data/month")
+async def get_macro_month_data(
+    response: Response,
+    page: dict = Depends(page_params),
+    fmt: str = Depends(chart_format),
+    current_user: dict = Depends(get_current_user),
+):
+    return render_chart(await run_db(_get_macro_history, current_user["id"], "DATE_TRUNC('week', timestamp)::date", 4, page, response), fmt, response)
 
-            rows = cur.fetchall()
 
-        return [
-            {
-                "indicator": r[0],
-                "waarde": r[1],
-                "trend": r[2],
-                "interpretation": r[3],
-                "action": r[4],
-                "score": r[5],
-                "timestamp": r[6].isoformat() if r[6] else None,
-            }
-            for r in rows
-        ]
-
-    finally:
-        conn.close()
+@router.get("/macro_data/quarter")
+async def get_macro_quarter_data(
+    response: Response,
+    page: dict = Depends(page_params),
+    fmt: str = Depends(chart_format),
+    current_user: dict = Depends(get_current_user),
+):
+    return render_chart(await run_db(_get_macro_history, current_user["id"], "DATE_TRUNC('week', timestamp)::date", 12, page, response), fmt, response)
 
 
 # ===========================================
@@ -2,8 +2,9 @@ import logging
 import traceback
 from collections import defaultdict
 from datetime import datetime, timedelta
+from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Response
 import httpx
 
 from backend.utils.db import get_db_connection
@@ -11,6 +12,9 @@ from backend.utils.scoring_utils import (
     get_scores_for_symbol,
 )
 from backend.utils.auth_utils import get_current_user
+from backend.utils.async_db import run_db
+from backend.utils.chart_format import chart_format, render_chart
+from backend.utils.pagination import history_filter, page_limit, page_params, paginate, with_default_limit
 
 # ⭐ Onboarding helper importeren
 from backend.api.onboarding_api import mark_step_completed
@@ -55,8 +59,24 @@ def get_market_raw_endpoints():
         return {}
 
 
-# Globale cache
-MARKET_RAW_ENDPOINTS = get_market_raw_endpoints()
+# Globale cache — gevuld bij app-startup (lifespan) of bij eerste gebruik,
+# niet bij import
+MARKET_RAW_ENDPOINTS: dict = {}
+_market_raw_loaded = False
+
+
+def load_market_raw_endpoints() -> dict:
+    global _market_raw_loaded
+    MARKET_RAW_ENDPOINTS.clear()
+    MARKET_RAW_ENDPOINTS.update(get_market_raw_endpoints())
+    _market_raw_loaded = bool(MARKET_RAW_ENDPOINTS)
+    return MARKET_RAW_ENDPOINTS
+
+
+def market_raw_endpoints() -> dict:
+    if not _market_raw_loaded:
+        load_market_raw_endpoints()
+    return MARKET_RAW_ENDPOINTS
 
 
 # =========================================================
@@ -223,32 +243,37 @@ def add_user_market_indicator(
 # =========================================================
 @router.get("/market_data/indicators")
 def list_user_market_indicators(
-    limit: int = Query(200, ge=1, le=1000),
+    response: Response,
+    page: dict = Depends(page_params),
     current_user: dict = Depends(get_current_user),
 ):
     """
-    Haalt alle market_data_indicators op voor de huidige gebruiker.
-    Handig voor een uitgebreide tabel (history).
+    Haalt market_data_indicators op voor de huidige gebruiker (history).
+    Keyset-gepagineerd: volgende pagina via ?cursor=<X-Next-Cursor>.
+    Zonder ?limit blijft de oude standaard van 200 rijen.
     """
     user_id = current_user["id"]
+    page = with_default_limit(page, 200)
 
     conn = get_db_connection()
     if not conn:
         raise HTTPException(500, "❌ Geen databaseverbinding.")
 
     try:
+        extra_sql, extra_params = history_filter(page)
+
         cur = conn.cursor()
         cur.execute(
-            """
+            f"""
             SELECT id, name, value, trend, interpretation, action, score, timestamp
             FROM market_data_indicators
-            WHERE user_id = %s
-            ORDER BY timestamp DESC
+            WHERE user_id = %s{extra_sql}
+            ORDER BY timestamp DESC, id DESC
             LIMIT %s;
             """,
-            (user_id, limit),
+            (user_id, *extra_params, page_limit(page)),
         )
-        rows = cur.fetchall()
+        rows = paginate(cur.fetchall(), page, response, ts_index=7, id_index=0)
 
         return [
             {
@@ -264,6 +289,8 @@ def list_user_market_indicators(
             for r in rows
         ]
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ [market_data/indicators] {e}", exc_info=True)
         raise HTTPException(500, "Fout bij ophalen market-indicatoren.")
@@ -473,22 +500,34 @@ def get_market_indicator_rules(
 # =========================================================
 @router.get("/market_data/list")
 async def list_market_data(
+    response: Response,
     since_minutes: int = Query(default=1440),
+    page: dict = Depends(page_params),
 ):
+    return await run_db(_list_market_data, since_minutes, page, response)
+
+
+def _list_market_data(since_minutes: int, page: dict, response: Response):
     try:
+        # since_minutes blijft de standaard ondergrens als er geen ?since is
+        if page["since"] is None:
+            page = {**page, "since": datetime.utcnow() - timedelta(minutes=since_minutes)}
+
+        extra_sql, extra_params = history_filter(page)
+
         conn = get_db_connection()
         cur = conn.cursor()
-        time_threshold = datetime.utcnow() - timedelta(minutes=since_minutes)
         cur.execute(
-            """
+            f"""
             SELECT id, symbol, price, open, high, low, change_24h, volume, timestamp
             FROM market_data
-            WHERE timestamp >= %s
-            ORDER BY timestamp DESC
+            WHERE TRUE{extra_sql}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT %s
         """,
-            (time_threshold,),
+            (*extra_params, page_limit(page)),
         )
-        rows = cur.fetchall()
+        rows = paginate(cur.fetchall(), page, response, ts_index=8, id_index=0)
         conn.close()
 
         return [
@@ -526,7 +565,7 @@ async def fill_btc_7day_data():
         url_ohlc = (
             f"https://api.coingecko.com/api/v3/coins/{coingecko_id}/ohlc?vs_currency=usd&days=7"
         )
-        url_volume = MARKET_RAW_ENDPOINTS.get(
+        url_volume = market_raw_endpoints().get(
             "btc_volume",
             f"https://api.coingecko.com/api/v3/coins/{coingecko_id}/market_chart?vs_currency=usd&days=7",
         )
@@ -656,7 +695,7 @@ async def fetch_interpreted_data(current_user: dict = Depends(get_current_user))
 # GET /market_data/7d — laatste 7 dagen (globaal)
 # =========================================================
 @router.get("/market_data/7d")
-async def get_market_data_7d():
+async def get_market_data_7d(fmt: str = Depends(chart_format)):
     conn = get_db_connection()
     try:
         with conn.cursor() as cur:
@@ -672,7 +711,7 @@ async def get_market_data_7d():
             rows = cur.fetchall()
 
         rows.reverse()  # van oud → nieuw
-        return [
+        return render_chart([
             {
                 "id": r[0],
                 "symbol": r[1],
@@ -686,7 +725,7 @@ async def get_market_data_7d():
                 "created_at": r[9].isoformat() if r[9] else None,
             }
             for r in rows
-        ]
+        ], fmt)
 
     except Exception as e:
         logger.error(f"❌ [7d] Fout bij ophalen market_data_7d: {e}")
@@ -700,19 +739,38 @@ async def get_market_data_7d():
 # GET /market_data/forward — alle forward returns (globaal)
 # =========================================================
 @router.get("/market_data/forward")
-async def get_market_forward_returns():
+async def get_market_forward_returns(
+    response: Response,
+    period: Optional[str] = Query(None, description="Bijv. 7d, 30d, 90d"),
+    page: dict = Depends(page_params),
+    fmt: str = Depends(chart_format),
+):
+    return render_chart(await run_db(_get_market_forward_returns, period, page, response), fmt, response)
+
+
+def _get_market_forward_returns(period: Optional[str], page: dict, response: Response):
     try:
+        extra_sql, extra_params = history_filter(page, ts_col="start_date")
+        if period:
+            extra_sql += " AND period = %s"
+            extra_params.append(period)
+
+        # Keyset-volgorde alleen bij paginatie; anders de oude volgorde
+        order_sql = "start_date DESC, id DESC" if page["paged"] else "period, start_date DESC"
+
         conn = get_db_connection()
         cur = conn.cursor()
         cur.execute(
-            """
+            f"""
             SELECT id, symbol, period, start_date, end_date, change, avg_daily, created_at
             FROM market_forward_returns
-            WHERE symbol = 'BTC'
-            ORDER BY period, start_date DESC
-        """
+            WHERE symbol = 'BTC'{extra_sql}
+            ORDER BY {order_sql}
+            LIMIT %s
+        """,
+            (*extra_params, page_limit(page)),
         )
-        rows = cur.fetchall()
+        rows = paginate(cur.fetchall(), page, response, ts_index=3, id_index=0)
         conn.close()
 
         return [
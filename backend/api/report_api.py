@@ -1,21 +1,34 @@
 print("🟢 report_api wordt geladen ✅")
 
+import json
+import asyncio
 import logging
 from datetime import datetime
+from typing import Optional
 import os
 
-from fastapi import APIRouter, HTTPException, Query, Depends
-from fastapi.responses import StreamingResponse
-
-import io
+from fastapi import APIRouter, HTTPException, Query, Depends, Header
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from backend.utils.pdf_playwright import render_report_pdf_via_playwright
+from backend.utils.browser_pool import PdfBusyError, PdfRenderError
+from backend.utils.async_db import run_db
 
 from backend.utils.db import get_db_connection
-from backend.ai_agents.report_ai_agent import generate_daily_report_sections
-from backend.celery_task.daily_report_task import generate_daily_report
+from backend.utils.json_utils import FastJSONResponse
+from backend.ai_agents.report_ai_agent import (
+    generate_daily_report_sections,
+    iter_daily_report_sections,
+)
+from backend.celery_task.daily_report_task import (
+    generate_daily_report,
+    persist_daily_report,
+    refresh_regime_memory,
+)
 from backend.celery_task.weekly_report_task import generate_weekly_report
 from backend.celery_task.monthly_report_task import generate_monthly_report
 from backend.celery_task.quarterly_report_task import generate_quarterly_report
+from backend.services.report_snapshot_service import get_print_token
+from backend.services import pdf_cache
 from backend.utils.auth_utils import get_current_user  # ✅ centrale user helper
 
 router = APIRouter()
@@ -23,20 +36,13 @@ logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
-async def generate_pdf_response(
-    *,
-    table: str,
-    report_type: str,
-    date: str,
-    user_id: int,
-):
+def _load_report_for_pdf(table: str, date: str, user_id: int):
     conn = get_db_connection()
-
     try:
         with conn.cursor() as cur:
             cur.execute(
                 f"""
-                SELECT 1
+                SELECT *
                 FROM {table}
                 WHERE report_date = %s
                 AND user_id = %s
@@ -45,25 +51,82 @@ async def generate_pdf_response(
                 (date, user_id),
             )
 
-            if not cur.fetchone():
-                raise HTTPException(status_code=404, detail="Report niet gevonden")
+            row = cur.fetchone()
+            if not row:
+                return None
+
+            cols = [desc[0] for desc in cur.description]
+            return dict(zip(cols, row))
 
     finally:
         conn.close()
 
-    pdf_bytes = await render_report_pdf_via_playwright(
-        report_type=report_type,
-        date_str=date,
-        user_id=user_id,
+
+async def _render_report_pdf(report_type: str, user_id: int, report: dict) -> bytes:
+    token = await run_db(
+        get_print_token,
+        user_id,
+        report_type,
+        report.get("id") or 0,
+        report,
     )
 
-    filename = f"{report_type}_report_user_{user_id}_{date}.pdf"
+    try:
+        return await render_report_pdf_via_playwright(token)
+    except PdfBusyError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": "10"},
+        )
+    except PdfRenderError as e:
+        raise HTTPException(status_code=502, detail=str(e))
 
-    return StreamingResponse(
-        io.BytesIO(pdf_bytes),
+
+async def generate_pdf_response(
+    *,
+    table: str,
+    report_type: str,
+    date: str,
+    user_id: int,
+    if_none_match: Optional[str] = None,
+):
+    report = await run_db(_load_report_for_pdf, table, date, user_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Report niet gevonden")
+
+    # 📦 Zelfde rapportinhoud = zelfde PDF (ETag = content hash)
+    digest = pdf_cache.content_hash(report)
+    etag = pdf_cache.etag_for(digest)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if pdf_cache.etag_matches(if_none_match, etag):
+        pdf_cache.record_not_modified()
+        return Response(status_code=304, headers=cache_headers)
+
+    # Key uit de rij, niet uit de query string: Postgres accepteert
+    # ook 2026-10-1 / 20261001 → anders meerdere keys per rapport
+    report_date = report["report_date"].isoformat()
+
+    path = pdf_cache.get_cached_pdf(report_type, user_id, report_date, digest)
+    if path is None:
+        async with pdf_cache.render_lock(f"{report_type}:{user_id}:{report_date}:{digest}"):
+            # Concurrent request kan hem intussen gerenderd hebben
+            path = pdf_cache.cache_path(report_type, user_id, report_date, digest)
+            if not os.path.isfile(path):
+                pdf_bytes = await _render_report_pdf(report_type, user_id, report)
+                path = await asyncio.to_thread(
+                    pdf_cache.store_pdf, report_type, user_id, report_date, digest, pdf_bytes
+                )
+
+    filename = f"{report_type}_report_user_{user_id}_{report_date}.pdf"
+
+    return FileResponse(
+        path,
         media_type="application/pdf",
         headers={
-            "Content-Disposition": f'attachment; filename="{filename}"'
+            **cache_headers,
+            "Content-Disposition": f'attachment; filename="{filename}"',
         },
     )
 
@@ -92,7 +155,7 @@ async def get_daily_latest(current_user: dict = Depends(get_current_user)):
             if not row:
                 raise HTTPException(status_code=404, detail="Geen dagelijks rapport gevonden")
             cols = [desc[0] for desc in cur.description]
-            return dict(zip(cols, row))
+            return FastJSONResponse(dict(zip(cols, row)))
     finally:
         conn.close()
 
@@ -129,7 +192,7 @@ async def get_daily_by_date(
                 raise HTTPException(status_code=404, detail="Daily report niet gevonden")
 
             cols = [desc[0] for desc in cur.description]
-            return dict(zip(cols, row))
+            return FastJSONResponse(dict(zip(cols, row)))
 
     finally:
         conn.close()
@@ -217,9 +280,74 @@ async def generate_daily(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/report/daily/stream")
+async def stream_daily_report(
+    persist: bool = Query(True),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    Genereert het daily report als Server-Sent Events.
+
+    Events:
+    - delta   → {section, text}  ruwe modeltekst (live typen)
+    - section → {section, text, source}  definitieve sectietekst (vervangt deltas);
+                source = "ai" | "template"
+    - done    → {report_id, report_date, report}
+    - error   → {detail}
+
+    Met persist=false gedraagt dit zich als /report/daily/preview.
+    """
+    user_id = current_user["id"]
+
+    def event_stream():
+        try:
+            if persist:
+                refresh_regime_memory(user_id)
+
+            report = None
+
+            for event in iter_daily_report_sections(user_id, stream=True):
+                if event["event"] == "report":
+                    report = event["report"]
+                    continue
+                yield _sse(event["event"], {
+                    "section": event["section"],
+                    "text": event["text"],
+                    "source": event.get("source"),
+                })
+
+            report_id = persist_daily_report(user_id, report) if persist else None
+
+            yield _sse("done", {
+                "report_id": report_id,
+                "report_date": datetime.now().date().isoformat(),
+                "user_id": user_id,
+                "report": report,
+            })
+
+        except Exception as e:
+            logger.exception("[/report/daily/stream] Fout:")
+            yield _sse("error", {"detail": str(e)})
+
+    # sync generator → Starlette draait hem in de threadpool (event loop blijft vrij)
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 @router.get("/report/daily/export/pdf")
 async def export_daily_pdf(
     date: str = Query(...),
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
 ):
     user_id = current_user["id"]
@@ -234,6 +362,7 @@ async def export_daily_pdf(
         report_type="daily",
         date=date,
         user_id=user_id,
+        if_none_match=if_none_match,
     )
 
 
@@ -306,7 +435,7 @@ async def get_weekly_by_date(
                 raise HTTPException(status_code=404, detail="Weekly report niet gevonden")
 
             cols = [desc[0] for desc in cur.description]
-            return dict(zip(cols, row))
+            return FastJSONResponse(dict(zip(cols, row)))
 
     finally:
         conn.close()
@@ -363,6 +492,7 @@ async def generate_weekly(current_user: dict = Depends(get_current_user)):
 @router.get("/report/weekly/export/pdf")
 async def export_weekly_pdf(
     date: str = Query(...),
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
 ):
     user_id = current_user["id"]
@@ -377,6 +507,7 @@ async def export_weekly_pdf(
         report_type="weekly",
         date=date,
         user_id=user_id,
+        if_none_match=if_none_match,
     )
 
 
@@ -450,7 +581,7 @@ async def get_monthly_by_date(
                 raise HTTPException(status_code=404, detail="Monthly report niet gevonden")
 
             cols = [desc[0] for desc in cur.description]
-            return dict(zip(cols, row))
+            return FastJSONResponse(dict(zip(cols, row)))
 
     finally:
         conn.close()
@@ -504,6 +635,7 @@ async def generate_monthly(current_user: dict = Depends(get_current_user)):
 @router.get("/report/monthly/export/pdf")
 async def export_monthly_pdf(
     date: str = Query(...),
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
 ):
     user_id = current_user["id"]
@@ -518,6 +650,7 @@ async def export_monthly_pdf(
         report_type="monthly",
         date=date,
         user_id=user_id,
+        if_none_match=if_none_match,
     )
 
 
@@ -590,7 +723,7 @@ async def get_quarterly_by_date(
                 raise HTTPException(status_code=404, detail="Quarterly report niet gevonden")
 
             cols = [desc[0] for desc in cur.description]
-            return dict(zip(cols, row))
+            return FastJSONResponse(dict(zip(cols, row)))
 
     finally:
         conn.close()
@@ -644,6 +777,7 @@ async def generate_quarterly(current_user: dict = Depends(get_current_user)):
 @router.get("/report/quarterly/export/pdf")
 async def export_quarterly_pdf(
     date: str = Query(...),
+    if_none_match: Optional[str] = Header(None),
     current_user: dict = Depends(get_current_user),
 ):
     user_id = current_user["id"]
@@ -658,9 +792,5 @@ async def export_quarterly_pdf(
         report_type="quarterly",
         date=date,
         user_id=user_id,
+        if_none_match=if_none_match,
     )
-
-
-print("📦 report_api routes:")
-for route in router.routes:
-    print(f"{route.path} - {route.methods}")
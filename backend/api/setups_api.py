@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Request, Query, Depends
 from backend.utils.db import get_db_connection
 from backend.utils.auth_utils import get_current_user
+from backend.services.dashboard_read_model import invalidate_dashboard_read_model
 from backend.api.onboarding_api import mark_step_completed
 from datetime import datetime
 import logging
@@ -205,6 +206,7 @@ async def save_setup(request: Request, current_user: dict = Depends(get_current_
                 ),
             )
 
+            invalidate_dashboard_read_model(conn, user_id)
             conn.commit()
 
         mark_step_completed(conn, user_id, "setup")
@@ -430,6 +432,7 @@ async def update_setup(
 
             values.extend([setup_id, user_id])
             cur.execute(query, tuple(values))
+            invalidate_dashboard_read_model(conn, user_id)
             conn.commit()
 
         mark_step_completed(conn, user_id, "setup")
@@ -460,6 +463,7 @@ async def delete_setup(setup_id: int, current_user: dict = Depends(get_current_u
                 "DELETE FROM setups WHERE id=%s AND user_id=%s",
                 (setup_id, user_id),
             )
+            invalidate_dashboard_read_model(conn, user_id)
             conn.commit()
 
         mark_step_completed(conn, user_id, "setup")
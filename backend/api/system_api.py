@@ -1,10 +1,19 @@
 import os
 import logging
 from dotenv import load_dotenv
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 
-from backend.utils.auth_utils import get_current_user
+from backend.utils.auth_utils import get_current_admin, get_current_user, get_token_cache_stats
 from backend.celery_task.bootstrap_agents_task import bootstrap_agents_task
+from backend.ai_core.context_budget import AGENT_TOKEN_BUDGETS, get_token_usage_summary
+from backend.utils.async_db import get_db_pool_stats
+from backend.utils.db import get_db_connection
+from backend.celery_task.dispatcher import get_recent_waves
+from backend.celery_task.pipeline import get_recent_pipeline_runs
+from backend.utils.single_flight import get_single_flight_stats
+from backend.utils.query_stats import SORT_KEYS, get_query_stats, reset_query_stats
+from backend.utils.browser_pool import get_browser_pool_stats
+from backend.services.pdf_cache import get_pdf_cache_stats
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -43,3 +52,128 @@ def bootstrap_agents(current_user=Depends(get_current_user)):
             status_code=500,
             detail="Bootstrap agents starten mislukt",
         )
+
+
+# =====================================================
+# 📊 AI TOKEN USAGE (per agent)
+# =====================================================
+@router.get("/system/ai-usage")
+def get_ai_usage(
+    days: int = Query(7, ge=1, le=90),
+    scope: str = Query("me", pattern="^(me|all)$"),
+    current_user=Depends(get_current_user),
+):
+
+    # Gewone gebruikers zien alleen hun eigen verbruik;
+    # admins zonder scope=all ook, met scope=all alles.
+    all_users = scope == "all"
+    if all_users and current_user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Alleen voor admins")
+
+    try:
+
+        return {
+            "days": days,
+            "scope": scope,
+            "budgets": AGENT_TOKEN_BUDGETS,
+            "agents": get_token_usage_summary(
+                days=days,
+                user_id=None if all_users else current_user["id"],
+            ),
+        }
+
+    except Exception:
+
+        logger.exception("❌ AI usage ophalen mislukt")
+
+        raise HTTPException(
+            status_code=500,
+            detail="AI usage ophalen mislukt",
+        )
+
+
+# =====================================================
+# 🧵 API DB POOL (offload van sync DB-calls)
+# =====================================================
+@router.get("/system/db-pool")
+def get_db_pool(current_user=Depends(get_current_admin)):
+    return get_db_pool_stats()
+
+
+# =====================================================
+# 🔐 AUTH TOKEN CACHE (hit rate)
+# =====================================================
+@router.get("/system/auth-cache")
+def get_auth_cache(current_user=Depends(get_current_admin)):
+    return get_token_cache_stats()
+
+
+# =====================================================
+# 🌊 DISPATCH WAVES (duur + ok/failed per fan-out)
+# =====================================================
+@router.get("/system/dispatch-waves")
+def get_dispatch_waves(
+    limit: int = Query(50, ge=1, le=500),
+    current_user=Depends(get_current_admin),
+):
+    conn = get_db_connection()
+    if not conn:
+        raise HTTPException(status_code=500, detail="Geen databaseverbinding")
+    try:
+        return get_recent_waves(conn, limit)
+    finally:
+        conn.close()
+
+
+# =====================================================
+# 🧬 DAILY PIPELINE (critical path per run / batch)
+# =====================================================
+@router.get("/system/pipeline-runs")
+def get_pipeline_runs(
+    limit: int = Query(20, ge=1, le=200),
+    current_user=Depends(get_current_admin),
+):
+    conn = get_db_connection()
+    if not conn:
+        raise HTTPException(status_code=500, detail="Geen databaseverbinding")
+    try:
+        return get_recent_pipeline_runs(conn, limit)
+    finally:
+        conn.close()
+
+
+# =====================================================
+# 🔒 SINGLE-FLIGHT (overgeslagen / overlappende runs)
+# =====================================================
+@router.get("/system/single-flight")
+def get_single_flight(
+    days: int = Query(1, ge=1, le=8),
+    current_user=Depends(get_current_admin),
+):
+    return get_single_flight_stats(days)
+
+
+# =====================================================
+# 🐢 QUERY STATS (fingerprints, p50/p95/max, N+1)
+# =====================================================
+@router.get("/system/query-stats")
+def get_query_stats_endpoint(
+    limit: int = Query(50, ge=1, le=500),
+    sort: str = Query("total_ms", pattern="^(" + "|".join(SORT_KEYS) + ")$"),
+    current_user=Depends(get_current_admin),
+):
+    return get_query_stats(limit=limit, sort=sort)
+
+
+@router.delete("/system/query-stats")
+def reset_query_stats_endpoint(current_user=Depends(get_current_admin)):
+    reset_query_stats()
+    return {"ok": True}
+
+
+# =====================================================
+# 🖨️ PDF BROWSER POOL + ARTEFACT CACHE (dit API-proces)
+# =====================================================
+@router.get("/system/pdf-pool")
+def get_pdf_pool(current_user=Depends(get_current_admin)):
+    return {**get_browser_pool_stats(), "cache": get_pdf_cache_stats()}
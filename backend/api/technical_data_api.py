@@ -1,11 +1,14 @@
 import os
 import logging
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Request, Depends
+from fastapi import APIRouter, HTTPException, Request, Depends, Response
 from dotenv import load_dotenv
 
 from backend.utils.db import get_db_connection
 from backend.utils.auth_utils import get_current_user
+from backend.utils.async_db import run_db
+from backend.utils.chart_format import chart_format, render_chart
+from backend.utils.pagination import history_filter, page_limit, page_params, paginate, recent_buckets_sql
 from backend.utils.scoring_utils import normalize_indicator_name
 
 # ✅ Centrale scoring engine (1 bron van waarheid)
@@ -294,72 +297,34 @@ async def get_latest_day_data(current_user: dict = Depends(get_current_user)):
 
 # ===============================================================
 # WEEK / MONTH / QUARTER — dezelfde structuur
+# - laatste N dagen/weken met data
+# - buckets via loose index scan, range-predicaat op timestamp
+# - keyset-paginatie (opt-in) via limit / cursor / X-Next-Cursor
 # ===============================================================
-@router.get("/technical_data/week")
-async def get_technical_week_data(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
+def _get_technical_history(user_id: int, bucket_sql: str, periods: int, page: dict, response: Response):
     conn, cur = get_db_cursor()
 
     try:
-        cur.execute("""
-            SELECT DISTINCT DATE(timestamp)
-            FROM technical_indicators
-            WHERE user_id=%s
-            ORDER BY 1 DESC
-            LIMIT 7;
-        """, (user_id,))
-        dagen = [r[0] for r in safe_fetchall(cur)]
+        cur.execute(recent_buckets_sql("technical_indicators", bucket_sql), (user_id, user_id, periods))
+        buckets = [r[0] for r in safe_fetchall(cur)]
 
-        cur.execute("""
-            SELECT indicator, value, score, advies, uitleg, timestamp
-            FROM technical_indicators
-            WHERE DATE(timestamp)=ANY(%s)
-              AND user_id=%s
-            ORDER BY timestamp DESC;
-        """, (dagen, user_id))
+        if not buckets:
+            paginate([], page, response, ts_index=5, id_index=6)
+            return []
 
-        rows = safe_fetchall(cur)
+        extra_sql, extra_params = history_filter(page)
 
-        return [
-            {
-                "indicator": r[0],
-                "waarde": r[1],
-                "score": r[2],
-                "advies": r[3],
-                "uitleg": r[4],
-                "timestamp": r[5].isoformat()
-            }
-            for r in rows
-        ]
-
-    finally:
-        conn.close()
-
-
-@router.get("/technical_data/month")
-async def get_technical_month_data(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
-    conn, cur = get_db_cursor()
-
-    try:
-        cur.execute("""
-            SELECT DISTINCT DATE_TRUNC('week', timestamp)::date
+        # Oudste bucket als ondergrens ≡ "timestamp valt in een van de buckets"
+        cur.execute(f"""
+            SELECT indicator, value, score, advies, uitleg, timestamp, id
             FROM technical_indicators
             WHERE user_id=%s
-            ORDER BY 1 DESC
-            LIMIT 4;
-        """, (user_id,))
-        weken = [r[0] for r in safe_fetchall(cur)]
+              AND timestamp >= %s{extra_sql}
+            ORDER BY timestamp DESC, id DESC
+            LIMIT %s;
+        """, (user_id, min(buckets), *extra_params, page_limit(page)))
 
-        cur.execute("""
-            SELECT indicator, value, score, advies, uitleg, timestamp
-            FROM technical_indicators
-            WHERE DATE_TRUNC('week', timestamp)::date=ANY(%s)
-              AND user_id=%s
-            ORDER BY timestamp DESC;
-        """, (weken, user_id))
-
-        rows = safe_fetchall(cur)
+        rows = paginate(safe_fetchall(cur), page, response, ts_index=5, id_index=6)
 
         return [
             {
@@ -377,45 +342,34 @@ async def get_technical_month_data(current_user: dict = Depends(get_current_user
         conn.close()
 
 
-@router.get("/technical_data/quarter")
-async def get_technical_quarter_data(current_user: dict = Depends(get_current_user)):
-    user_id = current_user["id"]
-    conn, cur = get_db_cursor()
-
-    try:
-        cur.execute("""
-            SELECT DISTINCT DATE_TRUNC('week', timestamp)::date
-            FROM technical_indicators
-            WHERE user_id=%s
-            ORDER BY 1 DESC
-            LIMIT 12;
-        """, (user_id,))
-        weken = [r[0] for r in safe_fetchall(cur)]
+@router.get("/technical_data/week")
+async def get_technical_week_data(
+    response: Response,
+    page: dict = Depends(page_params),
+    fmt: str = Depends(chart_format),
+    current_user: dict = Depends(get_current_user),
+):
+    return render_chart(await run_db(_get_technical_history, current_user["id"], "DATE(timestamp)", 7, page, response), fmt, response)
 
-        cur.execute("""
-            SELECT indicator, value, score, advies, uitleg, timestamp
-            FROM technical_indicators
-            WHERE DATE_TRUNC('week', timestamp)::date=ANY(%s)
-              AND user_id=%s
-            ORDER BY timestamp DESC;
-        """, (weken, user_id))
 
-        rows = safe_fetchall(cur)
+@router.get("/technical_data/month")
+async def get_technical_month_data(
+    response: Response,
+    page: dict = Depends(page_params),
+    fmt: str = Depends(chart_format),
+    current_user: dict = Depends(get_current_user),
+):
+    return render_chart(await run_db(_get_technical_history, current_user["id"], "DATE_TRUNC('week', timestamp)::date", 4, page, response), fmt, response)
 
-        return [
-            {
-                "indicator": r[0],
-                "waarde": r[1],
-                "score": r[2],
-                "advies": r[3],
-                "uitleg": r[4],
-                "timestamp": r[5].isoformat()
-            }
-            for r in rows
-        ]
 
-    finally:
-        conn.close()
+@router.get("/technical_data/quarter")
+async def get_technical_quarter_data(
+    response: Response,
+    page: dict = Depends(page_params),
+    fmt: str = Depends(chart_format),
+    current_user: dict = Depends(get_current_user),
+):
+    return render_chart(await run_db(_get_technical_history, current_user["id"], "DATE_TRUNC('week', timestamp)::date", 12, page, response), fmt, response)
 
 
 # ===============================================================
@@ -0,0 +1,47 @@
+import logging
+from datetime import date, timedelta
+
+from celery import shared_task
+
+from backend.utils.db import get_db_connection
+from backend.services.bot_balance_service import reconcile_bot_balances
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Dagbuckets van de afgelopen N dagen worden meegecontroleerd
+RECONCILE_DAYS = 2
+
+
+# =====================================================
+# 🔁 BOT BALANCES RECONCILIATIE
+# =====================================================
+@shared_task(name="backend.celery_task.bot_balance_task.reconcile_bot_balances")
+def reconcile_bot_balances_task(user_id: int = None):
+    """
+    Controleert bot_balances / bot_balance_days tegen bot_ledger
+    en herbouwt bij drift.
+    """
+    conn = get_db_connection()
+    if not conn:
+        logger.error("❌ Geen DB-verbinding (bot balances reconcile)")
+        return {"status": "error", "error": "no_db"}
+
+    try:
+        result = reconcile_bot_balances(
+            conn,
+            user_id=user_id,
+            since=date.today() - timedelta(days=RECONCILE_DAYS),
+        )
+        conn.commit()
+
+        logger.info(f"🔁 Bot balances reconcile | {result}")
+        return {"status": "ok", **result}
+
+    except Exception as e:
+        conn.rollback()
+        logger.exception("❌ Bot balances reconcile mislukt")
+        return {"status": "error", "error": str(e)}
+
+    finally:
+        conn.close()
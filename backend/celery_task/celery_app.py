@@ -38,12 +38,63 @@ celery_app = Celery(
     backend=CELERY_BACKEND,
 )
 
+# =========================================================
+# 🚦 QUEUES / ROUTING (zie celery_task/queues.py voor profielen)
+# =========================================================
+from kombu import Queue
+
+from backend.celery_task.queues import (
+    DEFAULT_QUEUE,
+    QUEUE_PROFILES,
+    QueueAnnotations,
+    route_task,
+)
+
+celery_app.conf.task_queues = [Queue(name) for name in QUEUE_PROFILES]
+celery_app.conf.task_default_queue = DEFAULT_QUEUE
+celery_app.conf.task_routes = (route_task,)
+celery_app.conf.task_annotations = (QueueAnnotations(),)
+
+# Lange taken niet vooruit reserveren; per worker overschrijfbaar
+# met --prefetch-multiplier (zie profielen)
+celery_app.conf.worker_prefetch_multiplier = int(os.getenv("CELERY_PREFETCH_MULTIPLIER", "1"))
+celery_app.conf.task_reject_on_worker_lost = True
+
+# =========================================================
+# 🔭 TRACING (span per task, trace_id via headers)
+# =========================================================
+from backend.utils.tracing import install_celery_tracing, instrument_http
+
+install_celery_tracing()
+instrument_http()
+
+# AI token usage: buffer per worker-proces wegschrijven bij afsluiten
+from backend.ai_core.context_budget import install_celery_usage_flush
+
+install_celery_usage_flush()
+
 # =========================================================
 # 🕒 TIMEZONE
 # =========================================================
 celery_app.conf.enable_utc = False
 celery_app.conf.timezone = "Europe/Amsterdam"
 
+# =========================================================
+# 🔁 15-MIN TICKS: late berichten vervallen, dubbele waves
+# worden overgeslagen (zie utils/single_flight.py)
+# =========================================================
+TICK_SECONDS = 15 * 60
+TICK_OPTIONS = {"expires": TICK_SECONDS - 60}
+
+# =========================================================
+# 🧬 PIPELINE-UUR: de daily pipeline (04:00) draait ingest,
+# setup en bot zelf → die beat-runs vallen in dat uur weg
+# (ingest) of slaan alleen de 04:00-tick over (setup / bot)
+# =========================================================
+PIPELINE_HOUR = 4
+HOURS_WITHOUT_PIPELINE = f"0-{PIPELINE_HOUR - 1},{PIPELINE_HOUR + 1}-23"
+INGEST_HOURS = ",".join(str(h) for h in range(0, 24, 2) if h != PIPELINE_HOUR)
+
 # =========================================================
 # 🚀 CELERY BEAT SCHEDULE
 # =========================================================
@@ -55,6 +106,7 @@ celery_app.conf.beat_schedule = {
     "fetch_market_data": {
         "task": "backend.celery_task.market_task.fetch_market_data",
         "schedule": crontab(minute="*/15"),
+        "options": TICK_OPTIONS,
     },
 
     "fetch_market_data_7d": {
@@ -72,7 +124,7 @@ celery_app.conf.beat_schedule = {
     # =====================================================
     "dispatch_macro_indicators": {
         "task": "backend.celery_task.dispatcher.dispatch_for_all_users",
-        "schedule": crontab(hour="*/2", minute=5),
+        "schedule": crontab(hour=INGEST_HOURS, minute=5),
         "kwargs": {
             "task_name": "backend.celery_task.macro_task.fetch_macro_data"
         },
@@ -80,7 +132,7 @@ celery_app.conf.beat_schedule = {
 
     "dispatch_technical_indicators": {
         "task": "backend.celery_task.dispatcher.dispatch_for_all_users",
-        "schedule": crontab(hour="*/2", minute=10),
+        "schedule": crontab(hour=INGEST_HOURS, minute=10),
         "kwargs": {
             "task_name": "backend.celery_task.technical_task.fetch_technical_data_day"
         },
@@ -88,7 +140,7 @@ celery_app.conf.beat_schedule = {
 
     "dispatch_market_indicators": {
         "task": "backend.celery_task.dispatcher.dispatch_for_all_users",
-        "schedule": crontab(hour="*/2", minute=15),
+        "schedule": crontab(hour=INGEST_HOURS, minute=15),
         "kwargs": {
             "task_name": "backend.celery_task.market_task.fetch_market_indicators"
         },
@@ -100,6 +152,7 @@ celery_app.conf.beat_schedule = {
     "run_rule_based_scores": {
         "task": "backend.celery_task.store_daily_scores_task.run_rule_based_daily_scores",
         "schedule": crontab(minute="*/15"),
+        "options": TICK_OPTIONS,
     },
 
     # =====================================================
@@ -109,8 +162,21 @@ celery_app.conf.beat_schedule = {
         "task": "backend.celery_task.dispatcher.dispatch_for_all_users",
         "schedule": crontab(minute="*/15"),
         "kwargs": {
-            "task_name": "backend.celery_task.portfolio_snapshot_task.run_portfolio_snapshot"
+            "task_name": "backend.celery_task.portfolio_snapshot_task.run_portfolio_snapshot",
+            "dedupe_window": TICK_SECONDS,
         },
+        "options": TICK_OPTIONS,
+    },
+
+    "reconcile_bot_balances": {
+        "task": "backend.celery_task.bot_balance_task.reconcile_bot_balances",
+        "schedule": crontab(hour=3, minute=5),
+    },
+
+    # Partities + rollup volgens data_retention_policies
+    "run_data_retention": {
+        "task": "backend.celery_task.retention_task.run_data_retention",
+        "schedule": crontab(hour=3, minute=45),
     },
 
     # =====================================================
@@ -118,48 +184,67 @@ celery_app.conf.beat_schedule = {
     # =====================================================
     "dispatch_setup_agent": {
         "task": "backend.celery_task.dispatcher.dispatch_for_all_users",
-        "schedule": crontab(minute="*/15"),
+        "schedule": crontab(minute="*/15", hour=HOURS_WITHOUT_PIPELINE),
         "kwargs": {
-            "task_name": "backend.celery_task.setup_task.run_setup_agent_daily"
+            "task_name": "backend.celery_task.setup_task.run_setup_agent_daily",
+            "dedupe_window": TICK_SECONDS,
         },
+        "options": TICK_OPTIONS,
     },
 
-    # =====================================================
-    # 6️⃣ TRADING BOT DECISION ENGINE (15 MIN)
-    # =====================================================
-    "dispatch_trading_bot": {
+    # 04:00-tick = de pipeline-run
+    "dispatch_setup_agent_pipeline_hour": {
         "task": "backend.celery_task.dispatcher.dispatch_for_all_users",
-        "schedule": crontab(minute="*/15"),
+        "schedule": crontab(minute="15,30,45", hour=PIPELINE_HOUR),
         "kwargs": {
-            "task_name": "backend.celery_task.trading_bot_task.run_daily_trading_bot"
+            "task_name": "backend.celery_task.setup_task.run_setup_agent_daily",
+            "dedupe_window": TICK_SECONDS,
         },
+        "options": TICK_OPTIONS,
     },
 
     # =====================================================
-    # 7️⃣ AI CATEGORY AGENTS (1x PER DAG)
+    # 6️⃣ TRADING BOT DECISION ENGINE (15 MIN)
     # =====================================================
-    "dispatch_macro_ai": {
+    "dispatch_trading_bot": {
         "task": "backend.celery_task.dispatcher.dispatch_for_all_users",
-        "schedule": crontab(hour=4, minute=5),
+        "schedule": crontab(minute="*/15", hour=HOURS_WITHOUT_PIPELINE),
         "kwargs": {
-            "task_name": "backend.celery_task.macro_task.run_macro_agent_daily"
+            "task_name": "backend.celery_task.trading_bot_task.run_daily_trading_bot",
+            "dedupe_window": TICK_SECONDS,
         },
+        "options": TICK_OPTIONS,
     },
 
-    "dispatch_market_ai": {
+    # 04:00-tick = de pipeline-run
+    "dispatch_trading_bot_pipeline_hour": {
         "task": "backend.celery_task.dispatcher.dispatch_for_all_users",
-        "schedule": crontab(hour=4, minute=10),
+        "schedule": crontab(minute="15,30,45", hour=PIPELINE_HOUR),
         "kwargs": {
-            "task_name": "backend.celery_task.market_task.run_market_agent_daily"
+            "task_name": "backend.celery_task.trading_bot_task.run_daily_trading_bot",
+            "dedupe_window": TICK_SECONDS,
         },
+        "options": TICK_OPTIONS,
     },
 
-    "dispatch_technical_ai": {
-        "task": "backend.celery_task.dispatcher.dispatch_for_all_users",
-        "schedule": crontab(hour=4, minute=15),
-        "kwargs": {
-            "task_name": "backend.celery_task.technical_task.run_technical_agent_daily"
-        },
+    # =====================================================
+    # 7️⃣ DAILY PIPELINE (DAG, 1x PER DAG)
+    # ingest → score → setup → strategy → bot ┐
+    #                → agents ────────────────┴→ master → report
+    # Elke stage start zodra zijn inputs klaar zijn
+    # (vervangt AI agents 04:05-04:15, master 04:30, report 05:00,
+    # ingest 04:05-04:15 en de 04:00-tick van setup / bot)
+    # =====================================================
+    "run_daily_pipeline": {
+        "task": "backend.celery_task.pipeline.run_daily_pipeline",
+        "schedule": crontab(hour=PIPELINE_HOUR, minute=0),
+    },
+
+    # Stages die nooit klaar melden (worker weg, DB-fout) → stale
+    "sweep_stale_pipeline_stages": {
+        "task": "backend.celery_task.pipeline.sweep_stale_pipeline_stages",
+        "schedule": crontab(minute="*/15"),
+        "options": TICK_OPTIONS,
     },
 
     # =====================================================
@@ -183,25 +268,6 @@ celery_app.conf.beat_schedule = {
             "task_name": "backend.celery_task.strategy_task.run_daily_strategy_snapshot"
         },
     },
-
-    # =====================================================
-    # 🔟 MASTER AI SCORE (1x PER DAG)
-    # =====================================================
-    "run_master_score_ai": {
-        "task": "backend.celery_task.store_daily_scores_task.run_master_score_ai",
-        "schedule": crontab(hour=4, minute=30),
-    },
-
-    # =====================================================
-    # 1️⃣1️⃣ DAILY REPORT
-    # =====================================================
-    "dispatch_daily_report": {
-        "task": "backend.celery_task.dispatcher.dispatch_for_all_users",
-        "schedule": crontab(hour=5, minute=0),
-        "kwargs": {
-            "task_name": "backend.celery_task.daily_report_task.generate_daily_report"
-        },
-    },
 }
 
 logger.info("🚀 Celery Beat schedule geladen (EUROPE/AMSTERDAM)")
@@ -220,7 +286,10 @@ try:
     import backend.celery_task.trading_bot_task
     import backend.celery_task.regime_memory_task
     import backend.celery_task.portfolio_snapshot_task
+    import backend.celery_task.bot_balance_task
+    import backend.celery_task.retention_task
     import backend.celery_task.bootstrap_agents_task
+    import backend.celery_task.pipeline
 
     import backend.celery_task.daily_report_task
     import backend.celery_task.weekly_report_task
@@ -4,8 +4,9 @@ import logging
 from pathlib import Path
 
 from celery import shared_task
-from playwright.sync_api import sync_playwright, TimeoutError
+from celery.signals import worker_process_shutdown
 from backend.utils.db import get_db_connection
+from backend.utils.browser_pool import render_pdf_sync, shutdown_browser_pool
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -48,6 +49,10 @@ def _update_snapshot_status(conn, snapshot_id, *, status,
             (status, status == "ready", pdf_url, file_size, generation_ms, snapshot_id),
         )
 
+@worker_process_shutdown.connect(weak=False)
+def _close_browser_pool(**kwargs):
+    shutdown_browser_pool()
+
 # =========================================================
 # MAIN TASK
 # =========================================================
@@ -55,7 +60,6 @@ def _update_snapshot_status(conn, snapshot_id, *, status,
 @shared_task(bind=True, autoretry_for=(Exception,), retry_backoff=10,
              retry_kwargs={"max_retries": 4}, acks_late=True)
 def generate_report_pdf(self, snapshot_id: int):
-
     if not FRONTEND_URL:
         raise RuntimeError("FRONTEND_URL not configured")
 
@@ -93,57 +97,13 @@ def generate_report_pdf(self, snapshot_id: int):
         logger.info("➡️ Opening print URL: %s", url)
 
         # =====================================================
-        # PLAYWRIGHT
+        # PLAYWRIGHT (browser pool van dit worker-proces)
         # =====================================================
 
-        with sync_playwright() as p:
-            browser = p.chromium.launch(
-                headless=True,
-                args=[
-                    "--no-sandbox",
-                    "--disable-dev-shm-usage",
-                    "--disable-gpu",
-                ],
-            )
-
-            try:
-                context = browser.new_context(
-                    viewport={"width": 1280, "height": 900},
-                    device_scale_factor=2,
-                )
-
-                page = context.new_page()
-
-                page.goto(
-                    url,
-                    wait_until="domcontentloaded",
-                    timeout=PRINT_TIMEOUT,
-                )
-
-                logger.info("⏳ Waiting for print-ready marker…")
-
-                page.wait_for_selector(
-                    "[data-print-ready='true']",
-                    timeout=PRINT_TIMEOUT,
-                )
-
-                # stabilisatie
-                page.wait_for_timeout(800)
-
-                page.pdf(
-                    path=filepath,
-                    format="A4",
-                    print_background=True,
-                    prefer_css_page_size=True,
-                )
-
-            except TimeoutError:
-                logger.error("❌ PRINT MARKER NOT FOUND")
-                logger.error("Current URL: %s", page.url)
-                raise
+        pdf_bytes = render_pdf_sync(url, timeout_ms=PRINT_TIMEOUT, settle_ms=800)
 
-            finally:
-                browser.close()
+        with open(filepath, "wb") as f:
+            f.write(pdf_bytes)
 
         # =====================================================
         # Stats
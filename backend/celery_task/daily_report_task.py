@@ -2,6 +2,7 @@ import json
 import logging
 from datetime import date, datetime
 from decimal import Decimal
+from typing import Optional
 
 from celery import shared_task
 from dotenv import load_dotenv
@@ -18,6 +19,7 @@ from backend.ai_core.regime_memory import (
 
 # 📸 Snapshot service
 from backend.services.report_snapshot_service import create_report_snapshot
+from backend.services.pdf_cache import invalidate_report_pdfs
 
 logging.basicConfig(
     level=logging.INFO,
@@ -57,73 +59,43 @@ def jsonb(v, fallback=None):
 
 
 # =====================================================
-# 🧾 DAILY REPORT TASK
+# 💾 PERSIST (gedeeld door task + streaming endpoint)
 # =====================================================
 
-@shared_task(name="backend.celery_task.daily_report_task.generate_daily_report")
-def generate_daily_report(user_id: int):
-
-    today = date.today()
-    logger.info(f"📄 Daily report | user_id={user_id} | {today}")
-
-    conn = get_db_connection()
-    if not conn:
-        logger.error("❌ Geen databaseverbinding")
-        return
-
-    cursor = None
-
-    try:
-        cursor = conn.cursor()
-
-        # 🧠 REGIME MEMORY
-        get_regime_memory(user_id)
-        store_regime_memory(user_id)
-
-        # -------------------------------------------------
-        # 1️⃣ GENERATE REPORT
-        # -------------------------------------------------
-        report = generate_daily_report_sections(user_id=user_id)
-
-        if not isinstance(report, dict):
-            raise ValueError("Report agent gaf geen geldig dict terug")
-
-        report["meta"] = {
-            "version": "daily_v1",
-            "generated_at": datetime.utcnow().isoformat(),
-        }
-
-        executive_summary    = jsonb(report.get("executive_summary"), {})
-        market_analysis      = jsonb(report.get("market_analysis"), {})
-        macro_context        = jsonb(report.get("macro_context"), {})
-        technical_analysis   = jsonb(report.get("technical_analysis"), {})
-        setup_validation     = jsonb(report.get("setup_validation"), {})
-        strategy_implication = jsonb(report.get("strategy_implication"), {})
-        outlook              = jsonb(report.get("outlook"), {})
-
-        bot_strategy = jsonb(report.get("bot_strategy"), {})
-        bot_snapshot = jsonb(report.get("bot_snapshot"))
-
-        price      = to_float(report.get("price"))
-        change_24h = to_float(report.get("change_24h"))
-        volume     = to_float(report.get("volume"))
-
-        macro_score     = to_float(report.get("macro_score"))
-        technical_score = to_float(report.get("technical_score"))
-        market_score    = to_float(report.get("market_score"))
-        setup_score     = to_float(report.get("setup_score"))
-
-        market_indicators    = jsonb(report.get("market_indicator_highlights"), [])
-        macro_indicators     = jsonb(report.get("macro_indicator_highlights"), [])
-        technical_indicators = jsonb(report.get("technical_indicator_highlights"), [])
-
-        best_setup      = jsonb(report.get("best_setup"))
-        top_setups      = jsonb(report.get("top_setups"), [])
-        active_strategy = jsonb(report.get("active_strategy"))
-
-        # -------------------------------------------------
-        # 2️⃣ UPSERT REPORT
-        # -------------------------------------------------
+def save_daily_report(conn, user_id: int, report: dict, report_date: date) -> int:
+    """
+    Upsert van één daily report. Commit is aan de caller.
+    Retourneert het daily_reports.id.
+    """
+    executive_summary    = jsonb(report.get("executive_summary"), {})
+    market_analysis      = jsonb(report.get("market_analysis"), {})
+    macro_context        = jsonb(report.get("macro_context"), {})
+    technical_analysis   = jsonb(report.get("technical_analysis"), {})
+    setup_validation     = jsonb(report.get("setup_validation"), {})
+    strategy_implication = jsonb(report.get("strategy_implication"), {})
+    outlook              = jsonb(report.get("outlook"), {})
+
+    bot_strategy = jsonb(report.get("bot_strategy"), {})
+    bot_snapshot = jsonb(report.get("bot_snapshot"))
+
+    price      = to_float(report.get("price"))
+    change_24h = to_float(report.get("change_24h"))
+    volume     = to_float(report.get("volume"))
+
+    macro_score     = to_float(report.get("macro_score"))
+    technical_score = to_float(report.get("technical_score"))
+    market_score    = to_float(report.get("market_score"))
+    setup_score     = to_float(report.get("setup_score"))
+
+    market_indicators    = jsonb(report.get("market_indicator_highlights"), [])
+    macro_indicators     = jsonb(report.get("macro_indicator_highlights"), [])
+    technical_indicators = jsonb(report.get("technical_indicator_highlights"), [])
+
+    best_setup      = jsonb(report.get("best_setup"))
+    top_setups      = jsonb(report.get("top_setups"), [])
+    active_strategy = jsonb(report.get("active_strategy"))
+
+    with conn.cursor() as cursor:
         cursor.execute("""
             INSERT INTO daily_reports (
                 report_date, user_id,
@@ -168,9 +140,10 @@ def generate_daily_report(user_id: int):
                 best_setup = EXCLUDED.best_setup,
                 top_setups = EXCLUDED.top_setups,
                 active_strategy = EXCLUDED.active_strategy,
-                generated_at = NOW();
+                generated_at = NOW()
+            RETURNING id;
         """, (
-            today, user_id,
+            report_date, user_id,
             executive_summary, market_analysis, macro_context,
             technical_analysis, setup_validation, strategy_implication, outlook,
             bot_strategy, bot_snapshot,
@@ -180,30 +153,90 @@ def generate_daily_report(user_id: int):
             best_setup, top_setups, active_strategy
         ))
 
+        return cursor.fetchone()[0]
+
+
+def persist_daily_report(user_id: int, report: dict) -> Optional[int]:
+    """
+    Slaat het rapport op + maakt de snapshot (die de PDF triggert).
+    Retourneert daily_reports.id, of None bij een fout.
+    """
+    conn = get_db_connection()
+    if not conn:
+        logger.error("❌ Geen databaseverbinding")
+        return None
+
+    try:
+        report["meta"] = {
+            "version": "daily_v1",
+            "generated_at": datetime.utcnow().isoformat(),
+        }
+
+        report_id = save_daily_report(conn, user_id, report, date.today())
         conn.commit()
-        logger.info("💾 daily_reports opgeslagen")
+        invalidate_report_pdfs("daily", user_id, date.today())
+        logger.info(f"💾 daily_reports opgeslagen | id={report_id}")
+
+    except Exception:
+        logger.exception("❌ daily_reports opslaan mislukt")
+        conn.rollback()
+        return None
+
+    finally:
+        conn.close()
+
+    # -------------------------------------------------
+    # 📸 CREATE SNAPSHOT
+    # -------------------------------------------------
+    snapshot_id, token = create_report_snapshot(
+        user_id=user_id,
+        report_type="daily",
+        report_id=0,
+        report_json=report,
+    )
+
+    logger.info(f"📸 Snapshot created | id={snapshot_id}")
+
+    # ⚠️ GEEN PDF CALL HIER!
+    # snapshot service triggert Celery al.
+
+    return report_id
+
+
+def refresh_regime_memory(user_id: int) -> None:
+    # 🧠 REGIME MEMORY
+    get_regime_memory(user_id)
+    store_regime_memory(user_id)
+
+
+# =====================================================
+# 🧾 DAILY REPORT TASK
+# =====================================================
+
+@shared_task(name="backend.celery_task.daily_report_task.generate_daily_report")
+def generate_daily_report(user_id: int):
+
+    today = date.today()
+    logger.info(f"📄 Daily report | user_id={user_id} | {today}")
+
+    try:
+        refresh_regime_memory(user_id)
 
         # -------------------------------------------------
-        # 3️⃣ CREATE SNAPSHOT
+        # 1️⃣ GENERATE REPORT
         # -------------------------------------------------
-        snapshot_id, token = create_report_snapshot(
-            user_id=user_id,
-            report_type="daily",
-            report_id=0,
-            report_json=report,
-        )
+        report = generate_daily_report_sections(user_id=user_id)
 
-        logger.info(f"📸 Snapshot created | id={snapshot_id}")
+        if not isinstance(report, dict):
+            raise ValueError("Report agent gaf geen geldig dict terug")
 
-        # ⚠️ GEEN PDF CALL HIER!
-        # snapshot service triggert Celery al.
+        # -------------------------------------------------
+        # 2️⃣ UPSERT REPORT + SNAPSHOT
+        # -------------------------------------------------
+        persist_daily_report(user_id, report)
 
     except Exception:
         logger.exception("❌ Fout in daily_report_task")
-        conn.rollback()
 
     finally:
-        if cursor:
-            cursor.close()
-        conn.close()
         logger.info("✅ Daily report task afgerond")
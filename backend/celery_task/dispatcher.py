@@ -1,15 +1,143 @@
-from celery import shared_task, current_app
+import os
+import math
+import time
+import uuid
 import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from celery import shared_task, current_app, chord, group
+from celery.exceptions import SoftTimeLimitExceeded
+from celery.utils.time import get_exponential_backoff_interval
+
 from backend.utils.db import get_db_connection
+from backend.utils.db_schema import table_exists
+from backend.celery_task.queues import QUEUE_PROFILES, batch_options, queue_for_task
+from backend.utils.single_flight import acquire_lease, release_lease
+from backend.utils.tracing import span
 
 logger = logging.getLogger(__name__)
 
-@shared_task(name="backend.celery_task.dispatcher.dispatch_for_all_users")
-def dispatch_for_all_users(task_name: str, *, active_only: bool = True):
+# =========================================================
+# 🌊 FAN-OUT IN WAVES
+#
+# Eén wave = alle users voor één task:
+#   chord( group(run_user_chunk × ⌈N / chunk⌉), finish_wave )
+# - users per chunk in één worker-task → N/chunk broker messages
+# - chunkgrootte volgt aantal users en worker-concurrency van
+#   de queue: ook een kleine wave verdeelt zich over alle slots
+# - fout bij één user breekt de chunk niet af; tasks met
+#   autoretry_for krijgen die user als losse task terug
+#   (eigen backoff / max_retries)
+# - finish_wave draait pas als álle chunks klaar zijn:
+#   stats (duur, ok / failed) + optioneel vervolg-task (`then`);
+#   faalt een chunk toch (hard time limit, worker weg), dan
+#   rondt finish_wave_on_error de wave af
+# =========================================================
+
+# Bovengrens users per chunk
+DISPATCH_CHUNK_SIZE = int(os.getenv("DISPATCH_CHUNK_SIZE", "25"))
+# Chunks per worker-slot: een trage chunk houdt de wave niet op
+DISPATCH_CHUNKS_PER_SLOT = int(os.getenv("DISPATCH_CHUNKS_PER_SLOT", "2"))
+
+# Wave-lease (dedupe_window): vrijgegeven door finish_wave of
+# finish_wave_on_error; TTL is alleen het vangnet (beat / worker
+# weg) ≈ verwachte wave-duur: WAVE_LEASE_TTL_FACTOR × dedupe_window
+WAVE_LEASE_TTL_FACTOR = float(os.getenv("WAVE_LEASE_TTL_FACTOR", "2"))
+
+
+def chunk_user_ids(user_ids: Sequence[int], size: int) -> List[List[int]]:
+    size = max(1, int(size))
+    return [list(user_ids[i:i + size]) for i in range(0, len(user_ids), size)]
+
+
+def wave_lease_ttl(dedupe_window: int) -> int:
+    return max(60, int(dedupe_window * WAVE_LEASE_TTL_FACTOR))
+
+
+def chunk_size_for(task_name: str, users: int, max_size: Optional[int] = None) -> int:
+    """
+    Genoeg chunks om elke worker-slot van de queue van de task bezig
+    te houden (concurrency × DISPATCH_CHUNKS_PER_SLOT), met hoogstens
+    max_size users per chunk.
+    """
+    profile = QUEUE_PROFILES[queue_for_task(task_name)]
+    slots = max(1, profile["concurrency"] * DISPATCH_CHUNKS_PER_SLOT)
+    max_size = max(1, int(max_size or DISPATCH_CHUNK_SIZE))
+    return max(1, min(max_size, math.ceil(users / slots)))
+
+
+def retry_countdown(task, retries: int = 0) -> int:
+    """Wachttijd zoals Celery's autoretry die voor deze task kiest."""
+    retry_kwargs = getattr(task, "retry_kwargs", None) or {}
+    retry_backoff = float(getattr(task, "retry_backoff", False) or 0)
+
+    if retry_backoff:
+        return get_exponential_backoff_interval(
+            factor=int(max(1.0, retry_backoff)),
+            retries=retries,
+            maximum=int(getattr(task, "retry_backoff_max", 600)),
+            full_jitter=getattr(task, "retry_jitter", True),
+        )
+    return int(retry_kwargs.get("countdown", getattr(task, "default_retry_delay", 180)))
+
+
+def _retry_later(task, user_id: int, exc: Exception) -> bool:
+    """
+    In-process aanroep slaat autoretry over: bij een retrybare fout
+    gaat de user als losse task opnieuw de queue in (retries=1 →
+    daarna de gewone autoretry van de task). False = niet retrybaar.
+    """
+    retry_for = tuple(getattr(task, "autoretry_for", None) or ())
+    if not retry_for or not isinstance(exc, retry_for):
+        return False
+
+    retry_kwargs = getattr(task, "retry_kwargs", None) or {}
+    if retry_kwargs.get("max_retries", task.max_retries) == 0:
+        return False
+
+    try:
+        task.apply_async(kwargs={"user_id": user_id}, countdown=retry_countdown(task), retries=1)
+        return True
+    except Exception:
+        logger.warning(f"⚠️ Retry versturen mislukt | {task.name} user_id={user_id}", exc_info=True)
+        return False
+
+
+def summarize_wave(results: Sequence[Dict[str, Any]], started_at: float, finished_at: float) -> Dict[str, Any]:
+    failed_ids: List[int] = []
+    retried_ids: List[int] = []
+    ok = 0
+    skipped = 0
+    slowest_chunk_ms = 0
+
+    for r in results or []:
+        if not isinstance(r, dict):
+            continue
+        ok += int(r.get("ok", 0))
+        skipped += int(r.get("skipped", 0))
+        failed_ids.extend(r.get("failed", []))
+        retried_ids.extend(r.get("retried", []))
+        slowest_chunk_ms = max(slowest_chunk_ms, int(r.get("duration_ms", 0)))
+
+    return {
+        "chunks": len(results or []),
+        "ok": ok,
+        "failed": len(failed_ids),
+        "failed_user_ids": failed_ids,
+        "skipped": skipped,
+        "retried": len(retried_ids),
+        "retried_user_ids": retried_ids,
+        "duration_ms": int((finished_at - started_at) * 1000),
+        "slowest_chunk_ms": slowest_chunk_ms,
+    }
+
+
+def fetch_user_ids(active_only: bool) -> Optional[List[int]]:
     conn = get_db_connection()
     if not conn:
         logger.error("❌ Geen DB-verbinding in dispatcher")
-        return
+        return None
 
     try:
         with conn.cursor() as cur:
@@ -17,24 +145,309 @@ def dispatch_for_all_users(task_name: str, *, active_only: bool = True):
                 cur.execute("SELECT id FROM users WHERE is_active = true;")
             else:
                 cur.execute("SELECT id FROM users;")
+            return [r[0] for r in cur.fetchall()]
+    finally:
+        conn.close()
+
 
-            user_ids = [r[0] for r in cur.fetchall()]
+def build_wave(
+    task_name: str,
+    user_ids: Sequence[int],
+    *,
+    chunk_size: Optional[int] = None,
+    then: Optional[str] = None,
+    then_kwargs: Optional[Dict[str, Any]] = None,
+    wave_id: Optional[str] = None,
+    lease: Optional[Dict[str, Any]] = None,
+):
+    """
+    Chord-signature voor één wave (nog niet verstuurd).
+    """
+    wave_id = wave_id or uuid.uuid4().hex[:12]
+    chunks = chunk_user_ids(user_ids, chunk_size or chunk_size_for(task_name, len(user_ids)))
+
+    # Chunk draait op de queue van de target-task (ticks / ingest / llm)
+    header = group(
+        run_user_chunk.s(task_name, chunk).set(**batch_options([task_name], len(chunk)))
+        for chunk in chunks
+    )
+    wave = {
+        "wave_id": wave_id,
+        "task_name": task_name,
+        "users": len(user_ids),
+        "started_at": time.time(),
+        "then": then,
+        "then_kwargs": then_kwargs,
+        "lease_key": (lease or {}).get("key"),
+        "lease_token": (lease or {}).get("token"),
+    }
+    body = finish_wave.s(**wave)
+    body.on_error(finish_wave_on_error.s(**wave))
+    return chord(header, body)
+
+
+# =========================================================
+# 🚀 DISPATCH
+# =========================================================
+@shared_task(name="backend.celery_task.dispatcher.dispatch_for_all_users")
+def dispatch_for_all_users(
+    task_name: str,
+    *,
+    active_only: bool = True,
+    chunk_size: Optional[int] = None,
+    then: Optional[str] = None,
+    then_kwargs: Optional[Dict[str, Any]] = None,
+    dedupe_window: Optional[int] = None,
+):
+    """
+    dedupe_window (sec): max. één wave per venster en nooit twee
+    waves tegelijk voor dezelfde task; anders overgeslagen.
+    """
+    lease = None
+    try:
+        if dedupe_window:
+            lease = acquire_lease(
+                f"wave:{task_name}",
+                window_seconds=dedupe_window,
+                ttl=wave_lease_ttl(dedupe_window),
+            )
+            if not lease["acquired"]:
+                return {"status": "skipped", "reason": lease["outcome"], "task_name": task_name}
+
+        user_ids = fetch_user_ids(active_only)
+        if user_ids is None:
+            return
 
         if not user_ids:
             logger.warning("⚠️ Geen users gevonden om te dispatchen")
             return
 
-        logger.info(f"🚀 Dispatch '{task_name}' voor {len(user_ids)} users")
-
-        task = current_app.tasks.get(task_name)
-        if not task:
+        if task_name not in current_app.tasks:
             logger.error(f"❌ Task niet gevonden: {task_name}")
             return
 
-        for user_id in user_ids:
-            task.delay(user_id=user_id)
+        wave_id = uuid.uuid4().hex[:12]
+        chunk_size = chunk_size or chunk_size_for(task_name, len(user_ids))
+        chunks = len(chunk_user_ids(user_ids, chunk_size))
+
+        logger.info(
+            f"🚀 Dispatch '{task_name}' voor {len(user_ids)} users "
+            f"in {chunks} chunks (wave={wave_id})"
+        )
+
+        build_wave(
+            task_name,
+            user_ids,
+            chunk_size=chunk_size,
+            then=then,
+            then_kwargs=then_kwargs,
+            wave_id=wave_id,
+            lease=lease,
+        ).apply_async()
+        lease = None  # vanaf nu van finish_wave
+
+        return {"wave_id": wave_id, "users": len(user_ids), "chunks": chunks}
 
     except Exception as e:
         logger.error(f"❌ Dispatcher fout: {e}", exc_info=True)
+
+    finally:
+        release_lease(lease)
+
+
+# =========================================================
+# 🧩 CHUNK
+# =========================================================
+@shared_task(name="backend.celery_task.dispatcher.run_user_chunk")
+def run_user_chunk(task_name: str, user_ids: List[int]):
+    return run_task_for_users(task_name, user_ids)
+
+
+def run_task_for_users(task_name: str, user_ids: Sequence[int]) -> Dict[str, Any]:
+    """
+    Voert de task in-process uit voor elke user.
+    Een exception of {"status": "error"} telt als failed,
+    {"status": "skipped"} (single-flight) als skipped; een
+    retrybare exception als retried (zie _retry_later).
+    """
+    task = current_app.tasks[task_name]
+    started = time.perf_counter()
+
+    ok = 0
+    skipped = 0
+    failed: List[int] = []
+    retried: List[int] = []
+    timed_out = False
+    done = 0
+
+    try:
+        for user_id in user_ids:
+            try:
+                # per-user span onder de chunk-span (zelfde trace_id)
+                with span(task_name, "task", user_id=user_id):
+                    result = task(user_id=user_id)
+                status = result.get("status") if isinstance(result, dict) else None
+                if status == "error":
+                    failed.append(user_id)
+                elif status == "skipped":
+                    skipped += 1
+                else:
+                    ok += 1
+            except SoftTimeLimitExceeded:
+                raise
+            except Exception as e:
+                if _retry_later(task, user_id, e):
+                    logger.warning(f"🔁 {task_name} mislukt, retry gepland | user_id={user_id}: {e}")
+                    retried.append(user_id)
+                else:
+                    logger.error(f"❌ {task_name} mislukt | user_id={user_id}", exc_info=True)
+                    failed.append(user_id)
+            done += 1
+    except SoftTimeLimitExceeded:
+        # Chunk stopt hier; de rest telt als failed zodat de wave
+        # (finish_wave) gewoon afgerond wordt
+        remaining = list(user_ids[done:])
+        logger.error(f"⏱️ {task_name}: soft time limit, {len(remaining)} users niet verwerkt")
+        failed.extend(remaining)
+        timed_out = True
+
+    return {
+        "ok": ok,
+        "failed": failed,
+        "skipped": skipped,
+        "retried": retried,
+        "timed_out": timed_out,
+        "duration_ms": int((time.perf_counter() - started) * 1000),
+    }
+
+
+# =========================================================
+# 🏁 WAVE KLAAR (chord body)
+# =========================================================
+@shared_task(name="backend.celery_task.dispatcher.finish_wave")
+def finish_wave(
+    results,
+    *,
+    wave_id: str,
+    task_name: str,
+    users: int,
+    started_at: float,
+    then: Optional[str] = None,
+    then_kwargs: Optional[Dict[str, Any]] = None,
+    lease_key: Optional[str] = None,
+    lease_token: Optional[str] = None,
+):
+    return _finish(
+        results,
+        wave_id=wave_id,
+        task_name=task_name,
+        users=users,
+        started_at=started_at,
+        then=then,
+        then_kwargs=then_kwargs,
+        lease_key=lease_key,
+        lease_token=lease_token,
+    )
+
+
+@shared_task(name="backend.celery_task.dispatcher.finish_wave_on_error")
+def finish_wave_on_error(request, exc, traceback, **wave):
+    """
+    Chord errback: een chunk faalde (hard time limit, worker weg) →
+    de resultaten van de andere chunks zijn niet beschikbaar, maar
+    lease, stats en vervolg-task worden toch afgehandeld.
+    """
+    logger.error(f"❌ Wave {wave.get('wave_id')} '{wave.get('task_name')}': chunk mislukt: {exc!r}")
+    return _finish(None, error=repr(exc), **wave)
+
+
+def _finish(
+    results,
+    *,
+    wave_id: str,
+    task_name: str,
+    users: int,
+    started_at: float,
+    then: Optional[str] = None,
+    then_kwargs: Optional[Dict[str, Any]] = None,
+    lease_key: Optional[str] = None,
+    lease_token: Optional[str] = None,
+    error: Optional[str] = None,
+) -> Dict[str, Any]:
+    release_lease({"key": lease_key, "token": lease_token})
+
+    stats = summarize_wave(results, started_at, time.time())
+    stats.update({"wave_id": wave_id, "task_name": task_name, "users": users, "error": error})
+
+    logger.info(
+        f"🏁 Wave {wave_id} '{task_name}' {'afgebroken' if error else 'klaar'}: {stats['ok']} ok, "
+        f"{stats['failed']} failed, {stats['skipped']} skipped, {stats['retried']} retried "
+        f"in {stats['duration_ms']} ms"
+    )
+
+    _store_wave(stats, started_at)
+
+    if then:
+        current_app.send_task(then, kwargs=then_kwargs or {})
+        logger.info(f"➡️ Vervolg gestart na wave {wave_id}: {then}")
+
+    return stats
+
+
+def _store_wave(stats: Dict[str, Any], started_at: float) -> None:
+    conn = get_db_connection()
+    if not conn:
+        return
+
+    try:
+        if not table_exists(conn, "dispatch_waves"):
+            return
+
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO dispatch_waves (
+                    wave_id, task_name, users, chunks, ok, failed,
+                    failed_user_ids, started_at, duration_ms, slowest_chunk_ms
+                )
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (wave_id) DO NOTHING;
+                """,
+                (
+                    stats["wave_id"],
+                    stats["task_name"],
+                    stats["users"],
+                    stats["chunks"],
+                    stats["ok"],
+                    stats["failed"],
+                    stats["failed_user_ids"],
+                    datetime.fromtimestamp(started_at),
+                    stats["duration_ms"],
+                    stats["slowest_chunk_ms"],
+                ),
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        logger.warning("⚠️ Wave stats opslaan mislukt", exc_info=True)
     finally:
         conn.close()
+
+
+def get_recent_waves(conn, limit: int = 50) -> List[Dict[str, Any]]:
+    if not table_exists(conn, "dispatch_waves"):
+        return []
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT wave_id, task_name, users, chunks, ok, failed,
+                   started_at, duration_ms, slowest_chunk_ms
+            FROM dispatch_waves
+            ORDER BY started_at DESC
+            LIMIT %s;
+            """,
+            (limit,),
+        )
+        cols = [d[0] for d in cur.description]
+        return [dict(zip(cols, r)) for r in cur.fetchall()]
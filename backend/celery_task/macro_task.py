@@ -4,6 +4,7 @@ from tenacity import retry, stop_after_attempt, wait_exponential
 from celery import shared_task
 
 from backend.utils.db import get_db_connection
+from backend.services.dashboard_read_model import invalidate_dashboard_snapshots
 from backend.utils.scoring_utils import (
     generate_scores_db,
     normalize_indicator_name,
@@ -230,6 +231,8 @@ def fetch_macro_data(user_id: int):
         fetch_and_process_macro(user_id=user_id)
     except Exception:
         logger.error("❌ Macro ingestie task crash", exc_info=True)
+    finally:
+        invalidate_dashboard_snapshots(user_id)
 
 
 @shared_task(name="backend.celery_task.macro_task.run_macro_agent_daily")
@@ -10,6 +10,7 @@ from tenacity import retry, stop_after_attempt, wait_exponential
 from backend.utils.db import get_db_connection
 from backend.celery_task.btc_price_history_task import update_btc_history
 from backend.utils.scoring_utils import generate_scores_db
+from backend.services.dashboard_read_model import invalidate_dashboard_snapshots
 
 # =====================================================
 # ⚙️ Config
@@ -132,6 +133,9 @@ def fetch_market_data():
         logger.info("✅ Live market RAW data verwerkt.")
     except Exception:
         logger.error("❌ Fout in fetch_market_data", exc_info=True)
+    finally:
+        # market_data is globaal → alle dashboard snapshots
+        invalidate_dashboard_snapshots()
 
 # =====================================================
 # 🕛 Dagelijkse snapshot (GLOBAAL)
@@ -145,6 +149,8 @@ def save_market_data_daily():
         logger.info("✅ Dagelijkse market snapshot voltooid.")
     except Exception:
         logger.error("❌ Fout in save_market_data_daily", exc_info=True)
+    finally:
+        invalidate_dashboard_snapshots()
 
 # =====================================================
 # 📆 7-daagse OHLC + volume (GLOBAAL)
@@ -585,7 +591,11 @@ def fetch_market_indicators(user_id: int):
     logger.info("========================================")
 
     # 1️⃣ Indicators + market_score/top contributors
-    fetch_and_process_market_indicators(user_id)
+    try:
+        fetch_and_process_market_indicators(user_id)
+    finally:
+        # market_score in daily_scores → dashboard snapshot
+        invalidate_dashboard_snapshots(user_id)
 
     # 2️⃣ Market AI Agent
     try:
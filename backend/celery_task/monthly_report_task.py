@@ -5,6 +5,7 @@ from datetime import date, timedelta
 from celery import shared_task
 
 from backend.utils.db import get_db_connection
+from backend.services.pdf_cache import invalidate_report_pdfs
 from backend.ai_agents.monthly_report_agent import generate_monthly_report_sections
 
 # =====================================================
@@ -147,6 +148,7 @@ def generate_monthly_report(user_id: int):
             )
 
         conn.commit()
+        invalidate_report_pdfs("monthly", user_id, today)
 
         logger.info(
             "✅ Monthly report opgeslagen (user=%s, maand=%s → %s)",
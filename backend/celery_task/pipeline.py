@@ -0,0 +1,408 @@
+import os
+import json
+import time
+import uuid
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Set
+
+from celery import shared_task
+
+from backend.utils.db import get_db_connection
+from backend.celery_task.dispatcher import chunk_user_ids, fetch_user_ids, run_task_for_users
+from backend.celery_task.queues import batch_options
+from backend.celery_task.store_daily_scores_task import build_daily_scores_for_user
+from backend.ai_agents.score_ai_agent import generate_master_score_for_user
+from backend.services.dashboard_read_model import refresh_dashboard_read_model
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# =========================================================
+# 🧬 DAILY PIPELINE (DAG)
+#
+# Elke stage start zodra al zijn inputs (`after`) klaar zijn,
+# per user-batch — geen vaste klok-offsets meer tussen
+# ingest (:05/:10/:15), agents (04:05-04:15), master (04:30)
+# en report (05:00).
+#
+# Coördinatie via pipeline_stage_runs:
+# - stage klaar → commit → zoek stages waarvan alle inputs
+#   klaar zijn → claim (INSERT ... ON CONFLICT DO NOTHING)
+#   → alleen de winnaar start de stage
+# - laatste stage klaar → critical path in pipeline_runs
+# - stage die nooit klaar meldt (worker weg, DB-fout) → na
+#   deadline_at op 'stale' gezet door sweep_stale_pipeline_stages
+#
+#   ingest → score ─┬→ setup → strategy → bot ─┬→ master → report
+#                   └→ agents ─────────────────┘
+# =========================================================
+
+PIPELINE_BATCH_SIZE = int(os.getenv("PIPELINE_BATCH_SIZE", "25"))
+# Marge bovenop de hard time limit van een stage vóór 'stale'
+PIPELINE_STAGE_GRACE_S = int(os.getenv("PIPELINE_STAGE_GRACE_S", "600"))
+
+DAILY_PIPELINE: Dict[str, Dict[str, Any]] = {
+    "ingest": {
+        "after": [],
+        "tasks": [
+            "backend.celery_task.macro_task.fetch_macro_data",
+            "backend.celery_task.technical_task.fetch_technical_data_day",
+            "backend.celery_task.market_task.fetch_market_indicators",
+        ],
+    },
+    "score": {
+        "after": ["ingest"],
+        "tasks": ["backend.celery_task.pipeline.score_user"],
+    },
+    "setup": {
+        "after": ["score"],
+        "tasks": ["backend.celery_task.setup_task.run_setup_agent_daily"],
+    },
+    "strategy": {
+        "after": ["setup"],
+        "tasks": ["backend.celery_task.strategy_task.run_daily_strategy_snapshot"],
+    },
+    "bot": {
+        "after": ["strategy"],
+        "tasks": ["backend.celery_task.trading_bot_task.run_daily_trading_bot"],
+    },
+    "agents": {
+        "after": ["score"],
+        "tasks": [
+            "backend.celery_task.macro_task.run_macro_agent_daily",
+            "backend.celery_task.market_task.run_market_agent_daily",
+            "backend.celery_task.technical_task.run_technical_agent_daily",
+        ],
+    },
+    "master": {
+        "after": ["bot", "agents"],
+        "tasks": ["backend.celery_task.pipeline.master_score_user"],
+    },
+    "report": {
+        "after": ["master"],
+        "tasks": ["backend.celery_task.daily_report_task.generate_daily_report"],
+    },
+}
+
+
+# =========================================================
+# 📐 DAG HELPERS (puur)
+# =========================================================
+def topological_order(dag: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Stages in uitvoerbare volgorde; ValueError bij cycli / onbekende inputs."""
+    order: List[str] = []
+    done: Set[str] = set()
+
+    while len(order) < len(dag):
+        ready = [
+            name for name, stage in dag.items()
+            if name not in done and all(dep in done for dep in stage["after"])
+        ]
+        if not ready:
+            pending = sorted(set(dag) - done)
+            raise ValueError(f"Pipeline DAG heeft een cyclus of onbekende input: {pending}")
+        for name in ready:
+            order.append(name)
+            done.add(name)
+
+    return order
+
+
+def ready_stages(dag: Dict[str, Dict[str, Any]], done: Set[str], claimed: Set[str]) -> List[str]:
+    """Stages die nog niet geclaimd zijn en waarvan alle inputs klaar zijn."""
+    return [
+        name for name, stage in dag.items()
+        if name not in claimed and all(dep in done for dep in stage["after"])
+    ]
+
+
+def critical_path(dag: Dict[str, Dict[str, Any]], timings: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+    """
+    Loopt terug vanaf de stage die het laatst klaar was, telkens via
+    de input die het laatst klaar was.
+
+    timings: stage → {"started_at": epoch, "finished_at": epoch}
+    """
+    if not timings:
+        return {"stages": [], "duration_ms": 0}
+
+    current: Optional[str] = max(timings, key=lambda s: timings[s]["finished_at"])
+    path: List[Dict[str, Any]] = []
+
+    while current:
+        t = timings[current]
+        path.append({
+            "stage": current,
+            "duration_ms": int((t["finished_at"] - t["started_at"]) * 1000),
+        })
+        deps = [d for d in dag.get(current, {}).get("after", []) if d in timings]
+        current = max(deps, key=lambda d: timings[d]["finished_at"]) if deps else None
+
+    path.reverse()
+    start = timings[path[0]["stage"]]["started_at"]
+    end = timings[path[-1]["stage"]]["finished_at"]
+
+    return {"stages": path, "duration_ms": int((end - start) * 1000)}
+
+
+# =========================================================
+# 🧩 PER-USER STAPPEN (globale tasks → per user)
+# =========================================================
+@shared_task(name="backend.celery_task.pipeline.score_user")
+def score_user(user_id: int):
+    build_daily_scores_for_user(user_id)
+    refresh_dashboard_read_model(user_id)
+
+
+@shared_task(name="backend.celery_task.pipeline.master_score_user")
+def master_score_user(user_id: int):
+    generate_master_score_for_user(user_id)
+
+
+# =========================================================
+# 🚀 START
+# =========================================================
+@shared_task(name="backend.celery_task.pipeline.run_daily_pipeline")
+def run_daily_pipeline(batch_size: Optional[int] = None):
+    topological_order(DAILY_PIPELINE)  # valideer vóór dispatch
+
+    user_ids = fetch_user_ids(active_only=True)
+    if not user_ids:
+        logger.warning("⚠️ Daily pipeline: geen users")
+        return
+
+    run_id = uuid.uuid4().hex[:12]
+    batches = chunk_user_ids(user_ids, batch_size or PIPELINE_BATCH_SIZE)
+
+    logger.info(f"🧬 Daily pipeline {run_id}: {len(user_ids)} users in {len(batches)} batches")
+
+    conn = get_db_connection()
+    if not conn:
+        logger.error("❌ Geen DB-verbinding (pipeline)")
+        return
+
+    try:
+        for batch_no, batch in enumerate(batches):
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    INSERT INTO pipeline_runs (run_id, batch, user_ids, started_at)
+                    VALUES (%s, %s, %s, NOW());
+                    """,
+                    (run_id, batch_no, batch),
+                )
+            conn.commit()
+            _launch_ready(conn, run_id, batch_no, batch)
+    finally:
+        conn.close()
+
+    return {"run_id": run_id, "users": len(user_ids), "batches": len(batches)}
+
+
+# =========================================================
+# ⚙️ STAGE
+# =========================================================
+@shared_task(name="backend.celery_task.pipeline.run_pipeline_stage")
+def run_pipeline_stage(run_id: str, batch: int, stage: str, user_ids: List[int]):
+    started = time.time()
+    ok = failed = skipped = retried = 0
+
+    try:
+        status = "done"
+        for task_name in DAILY_PIPELINE[stage]["tasks"]:
+            result = run_task_for_users(task_name, user_ids)
+            ok += result["ok"]
+            failed += len(result["failed"])
+            skipped += result.get("skipped", 0)
+            retried += len(result.get("retried", []))
+            if result.get("timed_out"):
+                logger.error(f"⏱️ Pipeline stage '{stage}' soft time limit (run={run_id}, batch={batch})")
+                status = "failed"
+                break
+    except Exception:
+        logger.error(f"❌ Pipeline stage '{stage}' gecrasht (run={run_id}, batch={batch})", exc_info=True)
+        status = "failed"
+
+    conn = get_db_connection()
+    if not conn:
+        logger.error("❌ Geen DB-verbinding (pipeline stage)")
+        return
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE pipeline_stage_runs
+                SET status = %s, finished_at = NOW(), ok = %s, failed = %s,
+                    skipped = %s, retried = %s, duration_ms = %s
+                WHERE run_id = %s AND batch = %s AND stage = %s
+                  AND status = 'running'
+                RETURNING stage;
+                """,
+                (
+                    status, ok, failed, skipped, retried,
+                    int((time.time() - started) * 1000), run_id, batch, stage,
+                ),
+            )
+            updated = cur.fetchone() is not None
+        conn.commit()
+
+        if not updated:
+            # Al door de sweep op 'stale' gezet → batch is afgerond
+            logger.warning(f"⚠️ Pipeline stage '{stage}' te laat klaar (run={run_id}, batch={batch})")
+            return
+
+        logger.info(
+            f"✅ Pipeline stage '{stage}' {status} "
+            f"(run={run_id}, batch={batch}, ok={ok}, failed={failed}, "
+            f"skipped={skipped}, retried={retried})"
+        )
+
+        if status == "done":
+            _launch_ready(conn, run_id, batch, user_ids)
+        _maybe_finish(conn, run_id, batch)
+    finally:
+        conn.close()
+
+
+def _stage_rows(conn, run_id: str, batch: int) -> List[tuple]:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT stage, status, EXTRACT(EPOCH FROM started_at), EXTRACT(EPOCH FROM finished_at)
+            FROM pipeline_stage_runs
+            WHERE run_id = %s AND batch = %s;
+            """,
+            (run_id, batch),
+        )
+        return cur.fetchall()
+
+
+def _launch_ready(conn, run_id: str, batch: int, user_ids: Sequence[int]) -> None:
+    rows = _stage_rows(conn, run_id, batch)
+    done = {r[0] for r in rows if r[1] == "done"}
+    claimed = {r[0] for r in rows}
+
+    for stage in ready_stages(DAILY_PIPELINE, done, claimed):
+        tasks = DAILY_PIPELINE[stage]["tasks"]
+        options = batch_options(tasks, len(user_ids) * len(tasks))
+
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO pipeline_stage_runs (run_id, batch, stage, status, started_at, deadline_at)
+                VALUES (%s, %s, %s, 'running', NOW(), NOW() + %s * INTERVAL '1 second')
+                ON CONFLICT (run_id, batch, stage) DO NOTHING
+                RETURNING stage;
+                """,
+                (run_id, batch, stage, stage_deadline_s(options)),
+            )
+            won = cur.fetchone() is not None
+        conn.commit()
+
+        if won:
+            run_pipeline_stage.apply_async(
+                args=(run_id, batch, stage, list(user_ids)),
+                **options,
+            )
+
+
+def stage_deadline_s(options: Dict[str, Any]) -> int:
+    """Hard time limit van de stage-task + marge (wachtrij, DB-write)."""
+    return int(options["time_limit"]) + PIPELINE_STAGE_GRACE_S
+
+
+def _maybe_finish(conn, run_id: str, batch: int) -> None:
+    rows = _stage_rows(conn, run_id, batch)
+    if any(r[1] == "running" for r in rows):
+        return
+
+    timings = {
+        r[0]: {"started_at": float(r[2]), "finished_at": float(r[3])}
+        for r in rows if r[1] == "done" and r[2] is not None and r[3] is not None
+    }
+    path = critical_path(DAILY_PIPELINE, timings)
+    status = "done" if len(timings) == len(DAILY_PIPELINE) else "partial"
+
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            UPDATE pipeline_runs
+            SET finished_at = NOW(),
+                status = %s,
+                duration_ms = (EXTRACT(EPOCH FROM (NOW() - started_at)) * 1000)::int,
+                critical_path = %s::jsonb,
+                critical_path_ms = %s
+            WHERE run_id = %s AND batch = %s AND finished_at IS NULL
+            RETURNING duration_ms;
+            """,
+            (status, json.dumps(path["stages"]), path["duration_ms"], run_id, batch),
+        )
+        row = cur.fetchone()
+    conn.commit()
+
+    if row:
+        chain = " → ".join(f"{s['stage']} ({s['duration_ms']} ms)" for s in path["stages"])
+        logger.info(
+            f"🏁 Pipeline {run_id} batch {batch} {status} in {row[0]} ms | critical path: {chain}"
+        )
+
+
+# =========================================================
+# 🧹 STALE STAGES
+# =========================================================
+@shared_task(name="backend.celery_task.pipeline.sweep_stale_pipeline_stages")
+def sweep_stale_pipeline_stages():
+    """
+    'running' voorbij deadline_at → 'stale'; de batch wordt daarna
+    afgerond (status partial) zodat hij niet eeuwig open blijft.
+    """
+    conn = get_db_connection()
+    if not conn:
+        logger.error("❌ Geen DB-verbinding (pipeline sweep)")
+        return
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE pipeline_stage_runs
+                SET status = 'stale', finished_at = NOW(),
+                    duration_ms = (EXTRACT(EPOCH FROM (NOW() - started_at)) * 1000)::int
+                WHERE status = 'running'
+                  AND (
+                      deadline_at < NOW()
+                      -- stages van vóór migratie 0007
+                      OR (deadline_at IS NULL AND started_at < NOW() - INTERVAL '1 day')
+                  )
+                RETURNING run_id, batch, stage;
+                """
+            )
+            stale = cur.fetchall()
+        conn.commit()
+
+        for run_id, batch, stage in stale:
+            logger.error(f"⏱️ Pipeline stage '{stage}' stale (run={run_id}, batch={batch})")
+
+        for run_id, batch in sorted({(r[0], r[1]) for r in stale}):
+            _maybe_finish(conn, run_id, batch)
+
+        return {"stale": len(stale)}
+    finally:
+        conn.close()
+
+
+def get_recent_pipeline_runs(conn, limit: int = 20) -> List[Dict[str, Any]]:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT run_id, batch, status, started_at, finished_at,
+                   duration_ms, critical_path_ms, critical_path
+            FROM pipeline_runs
+            ORDER BY started_at DESC, batch ASC
+            LIMIT %s;
+            """,
+            (limit,),
+        )
+        cols = [d[0] for d in cur.description]
+        return [dict(zip(cols, r)) for r in cur.fetchall()]
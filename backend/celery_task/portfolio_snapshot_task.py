@@ -2,6 +2,7 @@ import logging
 from celery import shared_task
 
 from backend.services.portfolio_snapshot_service import snapshot_all_for_user
+from backend.utils.single_flight import single_flight
 
 logger = logging.getLogger(__name__)
 
@@ -10,6 +11,7 @@ logger = logging.getLogger(__name__)
 # 📊 PORTFOLIO SNAPSHOT TASK
 # =====================================================
 @shared_task
+@single_flight(per_user=True)
 def run_portfolio_snapshot(user_id: int):
     """
     Maakt een portfolio snapshot voor een specifieke gebruiker.
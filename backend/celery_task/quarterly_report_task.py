@@ -5,6 +5,7 @@ from datetime import date, timedelta
 from celery import shared_task
 
 from backend.utils.db import get_db_connection
+from backend.services.pdf_cache import invalidate_report_pdfs
 from backend.ai_agents.quarterly_report_agent import generate_quarterly_report_sections
 
 logger = logging.getLogger(__name__)
@@ -114,6 +115,7 @@ def generate_quarterly_report(user_id: int):
             )
 
         conn.commit()
+        invalidate_report_pdfs("quarterly", user_id, today)
         logger.info(
             "✅ Quarterly report opgeslagen (user=%s, report_date=%s)",
             user_id,
@@ -0,0 +1,154 @@
+import fnmatch
+from typing import Any, Dict, List, Optional, Sequence
+
+# =========================================================
+# 🚦 QUEUES PER WORKLOAD-KLASSE
+#
+# ticks  → goedkope 15-min taken (scores, bot, snapshots,
+#          dispatcher / chord callbacks)
+# ingest → netwerk-I/O naar externe API's
+# llm    → AI agents + rapporten (minuten per taak)
+# pdf    → Playwright rendering (CPU / geheugen)
+#
+# Zo wachten 15-min ticks nooit achter een rapport of PDF.
+#
+# DEPLOY PROFIELEN (één worker per queue):
+#   celery -A backend.celery_task.celery_app worker -Q ticks  -c 4 --prefetch-multiplier 4 -n ticks@%h
+#   celery -A backend.celery_task.celery_app worker -Q ingest -c 8 --prefetch-multiplier 2 -n ingest@%h
+#   celery -A backend.celery_task.celery_app worker -Q llm    -c 4 --prefetch-multiplier 1 -n llm@%h
+#   celery -A backend.celery_task.celery_app worker -Q pdf    -c 2 --prefetch-multiplier 1 -n pdf@%h
+#
+# Kleine server (één worker voor alles):
+#   celery -A backend.celery_task.celery_app worker -Q ticks,ingest,llm,pdf -c 4 --prefetch-multiplier 1
+# =========================================================
+
+QUEUE_TICKS = "ticks"
+QUEUE_INGEST = "ingest"
+QUEUE_LLM = "llm"
+QUEUE_PDF = "pdf"
+
+DEFAULT_QUEUE = QUEUE_TICKS
+
+# Eerste match wint (fnmatch op task-naam)
+TASK_QUEUE_PATTERNS: List[tuple] = [
+    # 🖨️ PDF
+    ("backend.celery_task.celery_task_generate_pdf.*", QUEUE_PDF),
+
+    # 🧠 LLM
+    ("backend.celery_task.*_report_task.*", QUEUE_LLM),
+    ("backend.celery_task.*.run_*_agent_daily", QUEUE_LLM),
+    ("backend.celery_task.macro_task.generate_macro_insight", QUEUE_LLM),
+    ("backend.celery_task.strategy_task.*", QUEUE_LLM),
+    ("backend.celery_task.store_daily_scores_task.run_master_score_ai", QUEUE_LLM),
+    ("backend.celery_task.pipeline.master_score_user", QUEUE_LLM),
+    ("backend.celery_task.regime_memory_task.*", QUEUE_LLM),
+    ("backend.celery_task.bootstrap_agents_task.*", QUEUE_LLM),
+    ("backend.celery_task.onboarding_task.*", QUEUE_LLM),
+
+    # 🌐 INGEST
+    ("backend.celery_task.market_task.fetch_*", QUEUE_INGEST),
+    ("backend.celery_task.market_task.save_market_data_daily", QUEUE_INGEST),
+    ("backend.celery_task.market_task.calculate_and_save_forward_returns", QUEUE_INGEST),
+    ("backend.celery_task.macro_task.fetch_*", QUEUE_INGEST),
+    ("backend.celery_task.technical_task.fetch_*", QUEUE_INGEST),
+    ("backend.celery_task.btc_price_history_task.*", QUEUE_INGEST),
+
+    # 🗂️ Onderhoud (lange bulk-deletes, lage concurrency)
+    ("backend.celery_task.retention_task.*", QUEUE_LLM),
+]
+
+# Per queue: worker-instellingen (documentatie / deploy) + task time limits
+QUEUE_PROFILES: Dict[str, Dict[str, Any]] = {
+    QUEUE_TICKS: {
+        "concurrency": 4,
+        "prefetch_multiplier": 4,
+        "soft_time_limit": 600,
+        "time_limit": 660,
+        "acks_late": False,
+    },
+    QUEUE_INGEST: {
+        "concurrency": 8,
+        "prefetch_multiplier": 2,
+        "soft_time_limit": 300,
+        "time_limit": 360,
+        "acks_late": False,
+    },
+    QUEUE_LLM: {
+        "concurrency": 4,
+        "prefetch_multiplier": 1,
+        "soft_time_limit": 1800,
+        "time_limit": 1900,
+        "acks_late": True,
+    },
+    QUEUE_PDF: {
+        "concurrency": 2,
+        "prefetch_multiplier": 1,
+        "soft_time_limit": 180,
+        "time_limit": 240,
+        "acks_late": True,
+    },
+}
+
+
+def queue_for_task(task_name: str) -> str:
+    for pattern, queue in TASK_QUEUE_PATTERNS:
+        if fnmatch.fnmatchcase(task_name, pattern):
+            return queue
+    return DEFAULT_QUEUE
+
+
+# Zwaarste eerst: een mix van taken gaat naar de zwaarste queue
+_QUEUE_WEIGHT = [QUEUE_PDF, QUEUE_LLM, QUEUE_INGEST, QUEUE_TICKS]
+
+
+def heaviest_queue(task_names: Sequence[str]) -> str:
+    queues = {queue_for_task(n) for n in task_names}
+    for queue in _QUEUE_WEIGHT:
+        if queue in queues:
+            return queue
+    return DEFAULT_QUEUE
+
+
+def batch_options(task_names: Sequence[str], units: int) -> Dict[str, Any]:
+    """
+    apply_async-opties voor een task die `units` × een task in-process
+    draait (dispatcher-chunk / pipeline-stage): queue van de zwaarste
+    task en time limits geschaald naar het aantal eenheden.
+    """
+    queue = heaviest_queue(task_names)
+    profile = QUEUE_PROFILES[queue]
+    units = max(1, int(units))
+
+    return {
+        "queue": queue,
+        "soft_time_limit": profile["soft_time_limit"] * units,
+        "time_limit": profile["time_limit"] * units,
+    }
+
+
+# =========================================================
+# 🔌 CELERY HOOKS
+# =========================================================
+def route_task(name, args, kwargs, options, task=None, **kw):
+    """task_routes router: queue op basis van de task-naam."""
+    return {"queue": queue_for_task(name)}
+
+
+class QueueAnnotations:
+    """
+    task_annotations: time limits / acks_late volgens het queue-profiel.
+    Expliciete instellingen op de task zelf blijven leidend.
+    """
+
+    def annotate(self, task) -> Optional[Dict[str, Any]]:
+        profile = QUEUE_PROFILES[queue_for_task(task.name)]
+        out: Dict[str, Any] = {}
+
+        if task.soft_time_limit is None:
+            out["soft_time_limit"] = profile["soft_time_limit"]
+        if task.time_limit is None:
+            out["time_limit"] = profile["time_limit"]
+        if profile["acks_late"] and not task.acks_late:
+            out["acks_late"] = True
+
+        return out or None
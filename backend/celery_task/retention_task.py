@@ -0,0 +1,38 @@
+import logging
+
+from celery import shared_task
+
+from backend.utils.db import get_db_connection
+from backend.services.retention_service import run_retention
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+# =====================================================
+# 🗂️ DATA RETENTIE + PARTITIE-ONDERHOUD
+# =====================================================
+@shared_task(name="backend.celery_task.retention_task.run_data_retention")
+def run_data_retention():
+    """
+    Dagelijks: maandpartities vooruit aanmaken, rijen ouder dan
+    raw_days terugbrengen naar één per dag en verlopen partities
+    droppen — volgens data_retention_policies.
+    """
+    conn = get_db_connection()
+    if not conn:
+        logger.error("❌ Geen DB-verbinding (data retentie)")
+        return {"status": "error", "error": "no_db"}
+
+    try:
+        results = run_retention(conn)
+        logger.info(f"🗂️ Data retentie | {results}")
+        return {"status": "ok", "tables": results}
+
+    except Exception as e:
+        conn.rollback()
+        logger.exception("❌ Data retentie mislukt")
+        return {"status": "error", "error": str(e)}
+
+    finally:
+        conn.close()
@@ -5,6 +5,9 @@ from celery import shared_task
 from backend.utils.db import get_db_connection
 from backend.utils.scoring_utils import generate_scores_db
 from backend.ai_agents.score_ai_agent import generate_master_score
+from backend.services.dashboard_read_model import refresh_dashboard_read_model
+from backend.utils.single_flight import single_flight
+from backend.utils.tracing import traced
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -48,6 +51,7 @@ def fetch_setup_score_from_setup_agent(conn, user_id: int):
 # =========================================================
 # 1️⃣ BUILD DAILY SCORES (RULE-BASED) — PER USER
 # =========================================================
+@traced()
 def build_daily_scores_for_user(user_id: int):
     """
     Bouwt daily_scores voor één user.
@@ -158,6 +162,7 @@ def build_daily_scores_for_user(user_id: int):
 @shared_task(
     name="backend.celery_task.store_daily_scores_task.run_rule_based_daily_scores"
 )
+@single_flight(window_seconds=15 * 60, ttl=60 * 60)  # 1 run per 15-min tick, nooit overlappend
 def run_rule_based_daily_scores():
     """
     Draait rule-based scoring voor alle users.
@@ -184,6 +189,9 @@ def run_rule_based_daily_scores():
     for user_id in users:
         build_daily_scores_for_user(user_id)
 
+        # 🧱 Dashboard read model na elke score-tick
+        refresh_dashboard_read_model(user_id)
+
     logger.info("✅ RULE-BASED daily_scores klaar")
 
 
@@ -6,6 +6,7 @@ from typing import Any, Dict, Optional
 from celery import shared_task
 
 from backend.utils.db import get_db_connection
+from backend.utils.json_utils import json_default
 from backend.ai_agents.strategy_ai_agent import (
     generate_strategy_from_setup,
     analyze_strategies,
@@ -33,18 +34,6 @@ def safe_json(value: Any) -> Dict[str, Any]:
             return {}
     return {}
 
-def convert_decimals(obj):
-    from decimal import Decimal
-
-    if isinstance(obj, list):
-        return [convert_decimals(i) for i in obj]
-    elif isinstance(obj, dict):
-        return {k: convert_decimals(v) for k, v in obj.items()}
-    elif isinstance(obj, Decimal):
-        return float(obj)
-    return obj
-
-
 def safe_numeric(value: Any) -> Optional[float]:
     """
     Probeert AI-output om te zetten naar numeric voor DB.
@@ -270,7 +259,7 @@ def generate_for_setup(user_id: int, setup_id: int):
         values.append(base_amount)
 
         values.extend([
-            json.dumps(enriched_data),
+            json.dumps(enriched_data, default=json_default),
             user_id,
         ])
 
@@ -323,17 +312,6 @@ def analyze_strategy(user_id: int, strategy_id: int):
     if not conn:
         raise RuntimeError("Geen databaseverbinding")
 
-    def convert_decimals(obj):
-        from decimal import Decimal
-
-        if isinstance(obj, list):
-            return [convert_decimals(i) for i in obj]
-        elif isinstance(obj, dict):
-            return {k: convert_decimals(v) for k, v in obj.items()}
-        elif isinstance(obj, Decimal):
-            return float(obj)
-        return obj
-
     try:
         cols = _get_strategy_columns(conn)
 
@@ -378,15 +356,12 @@ def analyze_strategy(user_id: int, strategy_id: int):
                 "stop_loss": safe_numeric(row_map["stop_loss"]),
                 "risk_reward": safe_numeric(row_map.get("risk_reward")),
                 "explanation": row_map["explanation"],
-                "data": convert_decimals(safe_json(row_map["data"])),
+                "data": safe_json(row_map["data"]),
                 "created_at": row_map["created_at"].isoformat()
                 if row_map["created_at"] else None,
             }
         ]
 
-        # 🔥 EXTRA SAFETY (voor nested Decimal)
-        payload = convert_decimals(payload)
-
         analysis = analyze_strategies(
             user_id=user_id,
             strategies=payload,
@@ -395,9 +370,6 @@ def analyze_strategy(user_id: int, strategy_id: int):
         if not analysis:
             raise RuntimeError("AI analyse gaf None terug")
 
-        # 🔥 FIX → Decimal uit AI response halen
-        analysis = convert_decimals(analysis)
-
         explanation_text = (
             f"{analysis.get('comment', '')}\n\n"
             f"{analysis.get('recommendation', '')}"
@@ -516,7 +488,7 @@ def run_dca_strategy_snapshot(user_id: int, setup: dict):
             entry = safe_numeric(base_strategy.get("entry"))
             stop = safe_numeric(base_strategy.get("stop_loss"))
             targets = base_strategy.get("targets") or []
-            targets_text = json.dumps(targets) if targets else None
+            targets_text = json.dumps(targets, default=json_default) if targets else None
 
             cur.execute(
                 """
@@ -564,8 +536,8 @@ def run_dca_strategy_snapshot(user_id: int, setup: dict):
                     targets_text,
                     confidence,
                     adjustment.get("adjustment_reason"),
-                    json.dumps(market_context),
-                    json.dumps(adjustment),
+                    json.dumps(market_context, default=json_default),
+                    json.dumps(adjustment, default=json_default),
                     today,
                 ),
             )
@@ -653,16 +625,6 @@ def run_daily_strategy_snapshot(user_id: int):
         logger.error("❌ Geen databaseverbinding")
         return
 
-    def convert_decimals(obj):
-        from decimal import Decimal
-        if isinstance(obj, list):
-            return [convert_decimals(i) for i in obj]
-        elif isinstance(obj, dict):
-            return {k: convert_decimals(v) for k, v in obj.items()}
-        elif isinstance(obj, Decimal):
-            return float(obj)
-        return obj
-
     try:
         # =====================================================
         # 1️⃣ BEST SETUP
@@ -738,7 +700,7 @@ def run_daily_strategy_snapshot(user_id: int):
                         strategy.get("explanation"),
                         setup_type,
                         base_amount,
-                        json.dumps(strategy),
+                        json.dumps(strategy, default=json_default),
                         user_id,
                     ),
                 )
@@ -797,8 +759,6 @@ def run_daily_strategy_snapshot(user_id: int):
         if not analysis:
             raise RuntimeError("AI analyse failed")
 
-        analysis = convert_decimals(analysis)
-
         # =====================================================
         # 5️⃣ AI EXPLANATION (rechter blok)
         # =====================================================
@@ -838,11 +798,11 @@ def run_daily_strategy_snapshot(user_id: int):
                     setup_id,
                     safe_numeric(base_strategy.get("entry")),
                     safe_numeric(base_strategy.get("stop_loss")),
-                    json.dumps(base_strategy.get("targets") or []),
+                    json.dumps(base_strategy.get("targets") or [], default=json_default),
                     safe_confidence(analysis.get("confidence_score")),
                     analysis.get("recommendation"),
-                    json.dumps(market_context),
-                    json.dumps(analysis),
+                    json.dumps(market_context, default=json_default),
+                    json.dumps(analysis, default=json_default),
                     today,
                 ),
             )
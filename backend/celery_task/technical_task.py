@@ -3,6 +3,7 @@ import asyncio
 from celery import shared_task
 
 from backend.utils.db import get_db_connection
+from backend.services.dashboard_read_model import invalidate_dashboard_snapshots
 from backend.utils.technical_interpreter import (
     fetch_technical_value,
     interpret_technical_indicator_db,
@@ -175,7 +176,10 @@ def fetch_technical_data_day(user_id: int):
         raise ValueError("❌ user_id is verplicht voor technical task")
 
     logger.info(f"📌 Celery technical ingestie gestart (user_id={user_id})")
-    fetch_and_process_technical(user_id)
+    try:
+        fetch_and_process_technical(user_id)
+    finally:
+        invalidate_dashboard_snapshots(user_id)
 
 
 # =====================================================
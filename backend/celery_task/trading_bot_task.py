@@ -9,6 +9,7 @@ from celery import shared_task
 from backend.ai_agents.trading_bot_agent import run_trading_bot_agent
 from backend.services.portfolio_snapshot_service import snapshot_all_for_user
 from backend.celery_task.strategy_task import run_daily_strategy_snapshot
+from backend.utils.single_flight import single_flight
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -21,6 +22,7 @@ logger.setLevel(logging.INFO)
     retry_backoff=True,
     retry_kwargs={"max_retries": 3},
 )
+@single_flight(per_user=True)  # nooit twee bot-beslissingen tegelijk per user
 def run_daily_trading_bot(self, user_id: int, report_date: Optional[str] = None):
 
     try:
@@ -5,6 +5,7 @@ from datetime import date, timedelta
 from celery import shared_task
 
 from backend.utils.db import get_db_connection
+from backend.services.pdf_cache import invalidate_report_pdfs
 from backend.ai_agents.weekly_report_agent import generate_weekly_report_sections
 
 # =====================================================
@@ -163,6 +164,7 @@ def generate_weekly_report(user_id: int):
             )
 
         conn.commit()
+        invalidate_report_pdfs("weekly", user_id, today)
 
         logger.info(
             "✅ Weekly report opgeslagen (user=%s, report_date=%s, week=%s → %s)",
@@ -73,6 +73,12 @@ fi
 echo "✅ Environment loaded"
 echo "➡ FRONTEND_URL=$FRONTEND_URL"
 
+# =====================================================
+# DATABASE MIGRATIES
+# =====================================================
+echo "🧱 Applying database migrations..."
+python3 backend/scripts/init_db.py
+
 # =====================================================
 # RESTART BACKEND SERVICES ONLY
 # =====================================================
@@ -0,0 +1,287 @@
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+# =========================================================
+# Report Template Engine (rule-based, geen AI)
+#
+# Rendert daily-report secties uit dezelfde compacte context
+# als de report agent (scores, deltas, transition, indicatoren).
+# Gebruikt wanneer de LLM niet beschikbaar is of het
+# latency-budget van een rapport op is.
+# =========================================================
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+
+# Scoredrempels → label (ondergrens inclusief)
+SCORE_LABELS = [
+    (70, "sterk"),
+    (55, "constructief"),
+    (40, "neutraal"),
+    (25, "zwak"),
+    (0, "defensief"),
+]
+
+# Delta kleiner dan dit telt als "gelijk gebleven"
+DELTA_NOISE = 1.0
+
+TRANSITION_TEXT = {
+    "distribution_build": "distributiekenmerken nemen toe en de opwaartse ruimte wordt kleiner",
+    "bull_trap_risk": "opwaartse pogingen missen kwaliteit, waardoor het bull-trap risico verhoogd is",
+    "volatility_compression": "de volatiliteit comprimeert en het risico op een uitbraak neemt toe",
+    "volatility_expansion": "de volatiliteit zet uit en bewegingen worden grilliger",
+    "risk_asymmetry_negative": "de neerwaartse asymmetrie wordt groter en risicobeheer krijgt voorrang",
+    "momentum_fade": "het momentum zwakt af en het regime raakt verder volwassen",
+    "insufficient_history": "er is nog te weinig historie om transities betrouwbaar te duiden",
+}
+
+
+# =========================================================
+# HELPERS
+# =========================================================
+
+def _num(v: Any) -> Optional[float]:
+    try:
+        if v is None:
+            return None
+        return float(v)
+    except Exception:
+        return None
+
+
+def _score_label(v: Any) -> str:
+    score = _num(v)
+    if score is None:
+        return "onbekend"
+    for floor, label in SCORE_LABELS:
+        if score >= floor:
+            return label
+    return SCORE_LABELS[-1][1]
+
+
+def _fmt(v: Any, decimals: int = 0) -> str:
+    n = _num(v)
+    if n is None:
+        return "n.b."
+    return f"{n:.{decimals}f}"
+
+
+def _movement(delta: Any, subject: str) -> str:
+    d = _num(delta)
+    if d is None:
+        return f"{subject} is niet te vergelijken met gisteren"
+    if abs(d) < DELTA_NOISE:
+        return f"{subject} bleef vrijwel gelijk"
+    verb = "steeg" if d > 0 else "daalde"
+    return f"{subject} {verb} met {abs(d):.0f} punten"
+
+
+def _top_names(indicators: List[dict], n: int = 2) -> str:
+    names = [i.get("name") for i in (indicators or []) if i.get("name")]
+    return ", ".join(names[:n])
+
+
+def _transition_sentence(transition: Dict[str, Any]) -> str:
+    flag = transition.get("flag")
+    risk = _num(transition.get("risk"))
+
+    text = TRANSITION_TEXT.get(flag)
+    if not text:
+        text = "er is geen duidelijke transitiesignatuur en het regime lijkt aan te houden"
+
+    if risk is None:
+        return f"Transitiebeeld: {text}."
+    return f"Transitierisico staat op {risk:.0f}/100: {text}."
+
+
+# =========================================================
+# SECTIES
+# =========================================================
+
+def _exec(ctx: Dict[str, Any]) -> str:
+    scores = ctx.get("scores") or {}
+    deltas = ctx.get("deltas") or {}
+    regime = ctx.get("regime") or {}
+
+    regime_label = regime.get("label") or "onbepaald"
+    avg = [s for s in (_num(scores.get(k)) for k in ("macro", "market", "technical")) if s is not None]
+    overall = sum(avg) / len(avg) if avg else None
+
+    return (
+        f"Het marktregime blijft {regime_label}, met een {_score_label(overall)} totaalbeeld. "
+        f"{_movement(deltas.get('market'), 'De market score').capitalize()}, "
+        f"{_movement(deltas.get('technical'), 'de technische score')} en "
+        f"{_movement(deltas.get('macro'), 'de macro score')}. "
+        f"{_transition_sentence(ctx.get('transition') or {})}"
+    )
+
+
+def _market(ctx: Dict[str, Any]) -> str:
+    scores = ctx.get("scores") or {}
+    deltas = ctx.get("deltas") or {}
+    market = ctx.get("market") or {}
+    top = _top_names((ctx.get("indicators") or {}).get("market"))
+
+    change = _num(market.get("change"))
+    if change is None:
+        move = "De 24-uurs beweging is niet beschikbaar"
+    elif abs(change) < 0.5:
+        move = f"De koers bewoog nauwelijks ({change:+.1f}% in 24 uur)"
+    else:
+        move = f"De koers bewoog {change:+.1f}% in 24 uur"
+
+    volume_delta = _num(deltas.get("volume"))
+    if volume_delta is None:
+        volume = "Volumevergelijking met gisteren ontbreekt, waardoor de kwaliteit van de beweging lastig te beoordelen is."
+    elif volume_delta > 0:
+        volume = "Het volume nam toe, wat de beweging meer gewicht geeft."
+    else:
+        volume = "Het volume nam af, wat de duurzaamheid van de beweging beperkt."
+
+    drivers = f" De belangrijkste marktsignalen komen uit {top}." if top else ""
+
+    return (
+        f"{move}. De market score staat op {_fmt(scores.get('market'))} ({_score_label(scores.get('market'))}); "
+        f"{_movement(deltas.get('market'), 'de score')}. {volume}{drivers}"
+    )
+
+
+def _macro(ctx: Dict[str, Any]) -> str:
+    scores = ctx.get("scores") or {}
+    deltas = ctx.get("deltas") or {}
+    top = _top_names((ctx.get("indicators") or {}).get("macro"))
+
+    drivers = f" Dominante macro-indicatoren zijn {top}." if top else ""
+
+    return (
+        f"De macro score staat op {_fmt(scores.get('macro'))} en is daarmee {_score_label(scores.get('macro'))}; "
+        f"{_movement(deltas.get('macro'), 'de score')}.{drivers} "
+        "Zolang macro niet duidelijk verschuift, blijft het speelveld voor risicobereidheid ongewijzigd."
+    )
+
+
+def _technical(ctx: Dict[str, Any]) -> str:
+    scores = ctx.get("scores") or {}
+    deltas = ctx.get("deltas") or {}
+    top = _top_names((ctx.get("indicators") or {}).get("technical"))
+
+    tech = _num(scores.get("technical"))
+    market = _num(scores.get("market"))
+
+    if tech is None or market is None:
+        alignment = "Of techniek de marktbeweging bevestigt, is met de beschikbare data niet vast te stellen."
+    elif abs(tech - market) < 10:
+        alignment = "Techniek en markt liggen in lijn, wat de structuur ondersteunt."
+    elif tech > market:
+        alignment = "Techniek loopt voor op de markt; bevestiging vanuit prijs en volume ontbreekt nog."
+    else:
+        alignment = "Techniek blijft achter bij de markt, wat de betrouwbaarheid van de beweging ondermijnt."
+
+    drivers = f" Relevante signalen: {top}." if top else ""
+
+    return (
+        f"De technische score staat op {_fmt(tech)} ({_score_label(tech)}); "
+        f"{_movement(deltas.get('technical'), 'de score')}. {alignment}{drivers}"
+    )
+
+
+def _setup(ctx: Dict[str, Any]) -> str:
+    positioning = ctx.get("positioning") or {}
+    scores = ctx.get("scores") or {}
+    best = positioning.get("best_setup")
+
+    if not best:
+        return (
+            "Er is vandaag geen setup die voldoende aansluit bij de scorecombinatie. "
+            "Setups worden pas weer relevant wanneer market en techniek samen verbeteren."
+        )
+
+    return (
+        f"De best scorende setup is {best}, met een setup score van {_fmt(scores.get('setup'))} "
+        f"({_score_label(scores.get('setup'))}). De huidige omstandigheden maken dit vooral een setup om "
+        f"{'actief te gebruiken' if (_num(scores.get('setup')) or 0) >= 55 else 'te monitoren'}."
+    )
+
+
+def _strategy(ctx: Dict[str, Any]) -> str:
+    positioning = ctx.get("positioning") or {}
+    strategy = positioning.get("strategy")
+
+    if not strategy:
+        return (
+            "Er is geen actieve strategie. De scorecombinatie rechtvaardigt op dit moment "
+            "geen nieuwe strategie; eerst moeten market en techniek overtuigender worden."
+        )
+
+    return (
+        f"De actieve strategie ({strategy}) blijft binnen het huidige kader. "
+        "De belangrijkste aanname is dat het regime intact blijft; een stijgend transitierisico maakt de strategie fragieler."
+    )
+
+
+def _bot(ctx: Dict[str, Any]) -> str:
+    action = ((ctx.get("positioning") or {}).get("bot_action") or "hold").lower()
+
+    if action == "hold":
+        return (
+            "De bot heeft vandaag bewust geen trade geplaatst omdat de drempels niet werden gehaald. "
+            "Terughoudendheid past bij de huidige scorecombinatie."
+        )
+
+    return (
+        "De bot heeft vandaag gehandeld binnen de ingestelde drempels. "
+        "De beslissing volgt uit de scorecombinatie en niet uit een inschatting van de koers."
+    )
+
+
+def _outlook(ctx: Dict[str, Any]) -> str:
+    transition = ctx.get("transition") or {}
+    risk = _num(transition.get("risk"))
+
+    if risk is not None and risk >= 60:
+        stance = "Met een verhoogd transitierisico ligt de nadruk op bevestiging voordat exposure toeneemt"
+    else:
+        stance = "Zolang het transitierisico beperkt blijft, is voortzetting van het huidige regime het basisscenario"
+
+    return (
+        f"{stance}. Als market en techniek samen verbeteren, versterkt dat het regime; "
+        "als de technische score verder terugvalt terwijl het volume afneemt, wijst dat op een mogelijke regime-shift."
+    )
+
+
+SECTION_RENDERERS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "executive_summary": _exec,
+    "market_analysis": _market,
+    "macro_context": _macro,
+    "technical_analysis": _technical,
+    "setup_validation": _setup,
+    "strategy_implication": _strategy,
+    "bot_strategy": _bot,
+    "outlook": _outlook,
+}
+
+
+# =========================================================
+# PUBLIC
+# =========================================================
+
+def render_section(section: str, context: Dict[str, Any], fallback: str = "") -> str:
+    """
+    Rendert één report-sectie uit de compacte context.
+    Faalt nooit: bij ontbrekende renderer of fout → fallback.
+    """
+    renderer = SECTION_RENDERERS.get(section)
+    if renderer is None:
+        return fallback
+
+    try:
+        return renderer(context or {})
+    except Exception:
+        logger.warning("⚠️ Template render mislukt voor sectie=%s", section, exc_info=True)
+        return fallback
@@ -40,20 +40,6 @@ def _to_float(v) -> Optional[float]:
         return None
 
 
-def _safe_json(obj: Any) -> Any:
-    from datetime import datetime
-
-    if obj is None:
-        return None
-    if isinstance(obj, (date, datetime)):
-        return obj.isoformat()
-    if isinstance(obj, dict):
-        return {k: _safe_json(v) for k, v in obj.items()}
-    if isinstance(obj, list):
-        return [_safe_json(v) for v in obj]
-    return obj
-
-
 def _slope(values: List[Optional[float]]) -> Optional[float]:
     clean = [v for v in values if v is not None]
     if len(clean) < 2:
@@ -311,7 +297,7 @@ def compute_transition_detector(user_id: int, lookback_days: int = 14) -> Dict[s
         "transition_risk": risk,
         "normalized_risk": normalized_risk,
         "primary_flag": primary_flag,
-        "signals": _safe_json(signals),
+        "signals": signals,
         "narrative": narrative,
         "confidence": round(confidence, 2),
     }
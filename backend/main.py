@@ -1,11 +1,19 @@
 import sys
 import os
+import time
 import logging
+import asyncio
 import importlib
 import traceback
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+_import_started = time.perf_counter()
+
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
 from fastapi.routing import APIRoute
 from dotenv import load_dotenv
 
@@ -34,7 +42,75 @@ logger = logging.getLogger(__name__)
 # ------------------------------------------------------------
 # 🚀 FastAPI app
 # ------------------------------------------------------------
-app = FastAPI(title="Market Dashboard API", version="1.0")
+from backend.utils.json_utils import FastJSONResponse
+from backend.utils.tracing import TracingMiddleware, instrument_http, render_prometheus
+from backend.utils.auth_utils import require_metrics_access
+
+
+# ------------------------------------------------------------
+# ♻️ Lifespan — I/O bij startup i.p.v. bij import
+# ------------------------------------------------------------
+# Routers importeren is puur (geen DB / netwerk / AI-client).
+# Caches worden hier best-effort opgewarmd; falen = lazy bij
+# eerste gebruik.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info(f"⏱️ App import: {time.perf_counter() - _import_started:.2f}s")
+
+    from backend.utils.async_db import run_db
+
+    try:
+        await run_db(_warm_schema_cache)
+    except Exception as e:
+        logger.warning(f"⚠️ Schema cache opwarmen mislukt: {e}")
+
+    try:
+        from backend.api.market_data_api import load_market_raw_endpoints
+        await run_db(load_market_raw_endpoints)
+    except Exception as e:
+        logger.warning(f"⚠️ Market RAW endpoints laden mislukt: {e}")
+
+    _log_routes()
+    yield
+
+    # Chromium van de PDF-pool netjes afsluiten (als die gestart is)
+    from backend.utils.browser_pool import shutdown_browser_pool
+    await asyncio.to_thread(shutdown_browser_pool)
+
+    # Gebufferde AI token usage nog wegschrijven
+    from backend.ai_core.context_budget import flush_token_usage
+    await asyncio.to_thread(flush_token_usage)
+
+
+def _warm_schema_cache():
+    from backend.utils.db import get_db_connection
+    from backend.utils.db_schema import warm_schema_cache
+
+    conn = get_db_connection()
+    if not conn:
+        return
+    try:
+        warm_schema_cache(conn)
+    finally:
+        conn.close()
+
+
+def _log_routes():
+    routes = [r for r in app.routes if isinstance(r, APIRoute)]
+    logger.info(f"🚦 {len(routes)} API-routes geregistreerd")
+
+    # Volledige lijst alleen op verzoek
+    if os.getenv("API_LOG_ROUTES", "0") == "1":
+        for route in routes:
+            logger.info(f"{route.path} - methods: {route.methods}")
+
+
+app = FastAPI(
+    title="Market Dashboard API",
+    version="1.0",
+    default_response_class=FastJSONResponse,   # orjson + Decimal/date encoder
+    lifespan=lifespan,
+)
 
 # ------------------------------------------------------------
 # 🌍 CORS — correct voor COOKIE-AUTH met Next.js + FastAPI
@@ -66,8 +142,23 @@ app.add_middleware(
     allow_credentials=True,     # ⭐ Cookies toestaan
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],   # keyset-paginatie (history endpoints)
 )
 
+# ------------------------------------------------------------
+# 🗜️ Gzip — grote JSON (chart histories) comprimeren
+# ------------------------------------------------------------
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=int(os.getenv("API_GZIP_MIN_SIZE", "1024")),
+)
+
+# ------------------------------------------------------------
+# 🔭 Tracing — duur + DB/HTTP/LLM calls per request (X-Trace-Id)
+# ------------------------------------------------------------
+instrument_http()
+app.add_middleware(TracingMiddleware)
+
 # ------------------------------------------------------------
 # 📂 Static files
 # ------------------------------------------------------------
@@ -126,11 +217,9 @@ def health_check():
 
 
 # ==================================================================
-# 🧭 Debug: toon alle routes bij boot
+# 📈 Prometheus metrics (latency + calls per route, dit proces)
+# Scraper via METRICS_SCRAPE_TOKEN (bearer), anders alleen admins
 # ==================================================================
-print("\n--------------------------------------------------")
-print("🚦 Geregistreerde API-routes:")
-for route in app.routes:
-    if isinstance(route, APIRoute):
-        print(f"{route.path} - methods: {route.methods}")
-print("--------------------------------------------------\n")
+@app.get("/api/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_access)])
+def metrics():
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,783 @@
+-- =========================================================
+-- 🧱 0001 BASELINE SCHEMA
+--
+-- Het volledige schema zoals de code het gebruikt (reconstructie
+-- uit de queries in api/, celery_task/, services/ en ai_agents/).
+-- Alles IF NOT EXISTS → veilig op een bestaande productie-DB:
+-- bestaande tabellen blijven ongemoeid, tabellen die oude
+-- init_db-versies te smal aanmaakten krijgen ADD COLUMN IF NOT EXISTS.
+--
+-- UNIQUE-constraints = de ON CONFLICT-targets van de upserts.
+-- =========================================================
+
+
+-- =========================================================
+-- 👤 USERS + ONBOARDING
+-- =========================================================
+CREATE TABLE IF NOT EXISTS users (
+    id SERIAL PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    password_hash TEXT NOT NULL,
+    role TEXT NOT NULL DEFAULT 'user',
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    first_name TEXT,
+    last_name TEXT,
+    last_login_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS onboarding_steps (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    flow TEXT NOT NULL DEFAULT 'default',
+    step_key TEXT NOT NULL,
+    completed BOOLEAN NOT NULL DEFAULT FALSE,
+    completed_at TIMESTAMP,
+    metadata JSONB,
+    pipeline_started BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, flow, step_key)
+);
+
+
+-- =========================================================
+-- 📚 INDICATOREN + SCORE-REGELS
+-- =========================================================
+CREATE TABLE IF NOT EXISTS indicators (
+    id SERIAL PRIMARY KEY,
+    name TEXT NOT NULL,
+    display_name TEXT,
+    category TEXT NOT NULL,
+    source TEXT,
+    link TEXT,
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- user_id NULL = globale regel
+CREATE TABLE IF NOT EXISTS macro_indicator_rules (
+    id SERIAL PRIMARY KEY,
+    indicator TEXT NOT NULL,
+    range_min NUMERIC,
+    range_max NUMERIC,
+    score NUMERIC,
+    trend TEXT,
+    interpretation TEXT,
+    action TEXT,
+    user_id INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS technical_indicator_rules (
+    id SERIAL PRIMARY KEY,
+    indicator TEXT NOT NULL,
+    range_min NUMERIC,
+    range_max NUMERIC,
+    score NUMERIC,
+    trend TEXT,
+    interpretation TEXT,
+    action TEXT,
+    user_id INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS market_indicator_rules (
+    id SERIAL PRIMARY KEY,
+    indicator TEXT NOT NULL,
+    range_min NUMERIC,
+    range_max NUMERIC,
+    score NUMERIC,
+    trend TEXT,
+    interpretation TEXT,
+    action TEXT,
+    user_id INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS indicator_curves (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER,
+    domain TEXT NOT NULL,
+    indicator TEXT NOT NULL,
+    name TEXT,
+    curve JSONB NOT NULL,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    is_preset BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+
+-- =========================================================
+-- 📈 MARKT
+-- =========================================================
+CREATE TABLE IF NOT EXISTS market_data (
+    id SERIAL PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    price NUMERIC,
+    open NUMERIC,
+    high NUMERIC,
+    low NUMERIC,
+    volume NUMERIC,
+    change_24h NUMERIC,
+    is_updated BOOLEAN DEFAULT TRUE,
+    user_id INTEGER,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE market_data ADD COLUMN IF NOT EXISTS open NUMERIC;
+ALTER TABLE market_data ADD COLUMN IF NOT EXISTS high NUMERIC;
+ALTER TABLE market_data ADD COLUMN IF NOT EXISTS low NUMERIC;
+ALTER TABLE market_data ADD COLUMN IF NOT EXISTS user_id INTEGER;
+
+CREATE TABLE IF NOT EXISTS market_data_7d (
+    id SERIAL PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    date DATE NOT NULL,
+    open NUMERIC,
+    high NUMERIC,
+    low NUMERIC,
+    close NUMERIC,
+    change NUMERIC,
+    volume NUMERIC,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (symbol, date)
+);
+
+CREATE TABLE IF NOT EXISTS market_forward_returns (
+    id SERIAL PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    period TEXT NOT NULL,
+    start_date DATE NOT NULL,
+    end_date DATE,
+    change NUMERIC,
+    avg_daily NUMERIC,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (symbol, period, start_date)
+);
+
+CREATE TABLE IF NOT EXISTS btc_price_history (
+    date DATE PRIMARY KEY,
+    price NUMERIC
+);
+
+CREATE TABLE IF NOT EXISTS market_data_indicators (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER,
+    name TEXT NOT NULL,
+    value NUMERIC,
+    trend TEXT,
+    interpretation TEXT,
+    action TEXT,
+    score NUMERIC,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- legacy (init_db), niet meer beschreven door de code
+CREATE TABLE IF NOT EXISTS technical_data (
+    id SERIAL PRIMARY KEY,
+    symbol TEXT NOT NULL,
+    rsi NUMERIC,
+    volume NUMERIC,
+    ma_200 NUMERIC,
+    price NUMERIC,
+    is_updated BOOLEAN DEFAULT TRUE,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+
+-- =========================================================
+-- 🌍 MACRO + TECHNICAL
+-- =========================================================
+CREATE TABLE IF NOT EXISTS macro_data (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER,
+    name TEXT NOT NULL,
+    value NUMERIC,
+    trend TEXT,
+    interpretation TEXT,
+    action TEXT,
+    score NUMERIC,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE macro_data ADD COLUMN IF NOT EXISTS user_id INTEGER;
+ALTER TABLE macro_data ADD COLUMN IF NOT EXISTS score NUMERIC;
+
+CREATE TABLE IF NOT EXISTS technical_indicators (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER,
+    indicator TEXT NOT NULL,
+    value NUMERIC,
+    score NUMERIC,
+    advies TEXT,
+    uitleg TEXT,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+
+-- =========================================================
+-- 🧩 SETUPS + STRATEGIES
+-- =========================================================
+CREATE TABLE IF NOT EXISTS setups (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER,
+    name TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    timeframe TEXT NOT NULL,
+    setup_type TEXT,
+    dca_frequency TEXT,
+    dca_day TEXT,
+    dca_month_day INTEGER,
+    account_type TEXT,
+    strategy_type TEXT,
+    min_investment NUMERIC,
+    dynamic_investment BOOLEAN DEFAULT FALSE,
+    score NUMERIC,
+    score_logic TEXT,
+    trend TEXT,
+    favorite BOOLEAN DEFAULT FALSE,
+    explanation TEXT,
+    description TEXT,
+    action TEXT,
+    category TEXT,
+    tags TEXT[],
+    filters JSONB,
+    min_macro_score NUMERIC,
+    max_macro_score NUMERIC,
+    min_technical_score NUMERIC,
+    max_technical_score NUMERIC,
+    min_market_score NUMERIC,
+    max_market_score NUMERIC,
+    last_validated TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS user_id INTEGER;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS setup_type TEXT;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS dca_frequency TEXT;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS dca_day TEXT;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS dca_month_day INTEGER;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS score_logic TEXT;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS trend TEXT;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS favorite BOOLEAN DEFAULT FALSE;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS explanation TEXT;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS action TEXT;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS category TEXT;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS filters JSONB;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS min_macro_score NUMERIC;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS max_macro_score NUMERIC;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS min_technical_score NUMERIC;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS max_technical_score NUMERIC;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS min_market_score NUMERIC;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS max_market_score NUMERIC;
+ALTER TABLE setups ADD COLUMN IF NOT EXISTS last_validated TIMESTAMP;
+
+CREATE TABLE IF NOT EXISTS strategies (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER,
+    setup_id INTEGER,
+    name TEXT,
+    symbol TEXT,
+    timeframe TEXT,
+    setup_type TEXT,
+    execution_mode TEXT,
+    base_amount NUMERIC,
+    decision_curve JSONB,
+    decision_curve_id INTEGER,
+    entry NUMERIC,
+    targets NUMERIC[],
+    stop_loss NUMERIC,
+    risk_reward NUMERIC,
+    explanation TEXT,
+    risk_profile TEXT,
+    score NUMERIC,
+    data JSONB,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS active_strategy_snapshot (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    setup_id INTEGER NOT NULL,
+    strategy_id INTEGER,
+    snapshot_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    entry NUMERIC,
+    targets NUMERIC[],
+    stop_loss NUMERIC,
+    adjustment_reason TEXT,
+    confidence_score NUMERIC,
+    market_context JSONB,
+    changes JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, setup_id, snapshot_date)
+);
+
+
+-- =========================================================
+-- 🧮 SCORES
+-- =========================================================
+CREATE TABLE IF NOT EXISTS daily_scores (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    report_date DATE NOT NULL,
+    macro_score NUMERIC,
+    technical_score NUMERIC,
+    market_score NUMERIC,
+    setup_score NUMERIC,
+    strategy_score NUMERIC,
+    macro_interpretation TEXT,
+    technical_interpretation TEXT,
+    market_interpretation TEXT,
+    macro_top_contributors JSONB,
+    technical_top_contributors JSONB,
+    market_top_contributors JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, report_date)
+);
+
+CREATE TABLE IF NOT EXISTS daily_setup_scores (
+    id SERIAL PRIMARY KEY,
+    setup_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    report_date DATE NOT NULL,
+    score NUMERIC,
+    is_active BOOLEAN DEFAULT FALSE,
+    active BOOLEAN DEFAULT FALSE,
+    is_best BOOLEAN DEFAULT FALSE,
+    explanation TEXT,
+    breakdown JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (setup_id, user_id, report_date)
+);
+
+
+-- =========================================================
+-- 🤖 AI
+-- =========================================================
+CREATE TABLE IF NOT EXISTS ai_category_insights (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    avg_score NUMERIC,
+    trend TEXT,
+    bias TEXT,
+    risk TEXT,
+    summary TEXT,
+    top_signals JSONB,
+    date DATE NOT NULL DEFAULT CURRENT_DATE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, category, date)
+);
+
+CREATE TABLE IF NOT EXISTS ai_reflections (
+    id SERIAL PRIMARY KEY,
+    category TEXT NOT NULL,
+    user_id INTEGER NOT NULL,
+    indicator TEXT NOT NULL,
+    raw_score NUMERIC,
+    ai_score NUMERIC,
+    compliance NUMERIC,
+    comment TEXT,
+    recommendation TEXT,
+    input_hash TEXT,
+    date DATE NOT NULL DEFAULT CURRENT_DATE,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (category, user_id, indicator, date)
+);
+
+-- Fingerprint van de indicator-input → reflection diffing
+ALTER TABLE ai_reflections ADD COLUMN IF NOT EXISTS input_hash TEXT;
+
+CREATE TABLE IF NOT EXISTS regime_memory (
+    user_id INTEGER NOT NULL,
+    date DATE NOT NULL,
+    regime_label TEXT,
+    confidence NUMERIC,
+    signals_json JSONB,
+    narrative TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, date)
+);
+
+CREATE TABLE IF NOT EXISTS ai_token_usage (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER,
+    agent TEXT NOT NULL,
+    call_type TEXT NOT NULL,
+    model TEXT,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    estimated_prompt_tokens INTEGER,
+    duration_ms INTEGER,
+    success BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_ai_token_usage_agent_created
+    ON ai_token_usage (agent, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS trading_advice (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER,
+    symbol TEXT NOT NULL,
+    advice TEXT,
+    explanation TEXT,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+
+-- =========================================================
+-- 🤖 BOTS
+-- =========================================================
+CREATE TABLE IF NOT EXISTS bot_configs (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    strategy_id INTEGER,
+    mode TEXT NOT NULL DEFAULT 'manual',
+    cadence TEXT DEFAULT 'daily',
+    risk_profile TEXT DEFAULT 'balanced',
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    budget_total_eur NUMERIC DEFAULT 0,
+    budget_daily_limit_eur NUMERIC DEFAULT 0,
+    budget_min_order_eur NUMERIC DEFAULT 0,
+    budget_max_order_eur NUMERIC DEFAULT 0,
+    max_asset_exposure_pct NUMERIC DEFAULT 100,
+    last_run TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS bot_decisions (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    bot_id INTEGER NOT NULL,
+    strategy_id INTEGER,
+    setup_id INTEGER,
+    symbol TEXT NOT NULL DEFAULT 'BTC',
+    decision_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    decision_ts TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    action TEXT NOT NULL,
+    confidence TEXT,
+    amount_eur NUMERIC DEFAULT 0,
+    scores_json JSONB,
+    reason_json JSONB,
+    status TEXT NOT NULL DEFAULT 'planned',
+    executed_by TEXT,
+    executed_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS bot_orders (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    bot_id INTEGER NOT NULL,
+    decision_id INTEGER,
+    symbol TEXT NOT NULL DEFAULT 'BTC',
+    side TEXT NOT NULL,
+    order_type TEXT DEFAULT 'market',
+    quantity NUMERIC,
+    limit_price NUMERIC,
+    quote_amount_eur NUMERIC,
+    estimated_price_eur NUMERIC,
+    estimated_qty NUMERIC,
+    executed_price_eur NUMERIC,
+    executed_qty NUMERIC,
+    status TEXT NOT NULL DEFAULT 'planned',
+    source TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS bot_executions (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    bot_order_id INTEGER NOT NULL,
+    filled_qty NUMERIC,
+    avg_fill_price NUMERIC,
+    status TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS bot_trade_plans (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    bot_id INTEGER NOT NULL,
+    decision_id INTEGER NOT NULL UNIQUE,
+    symbol TEXT NOT NULL DEFAULT 'BTC',
+    side TEXT,
+    entry_plan JSONB,
+    stop_loss JSONB,
+    targets JSONB,
+    risk_json JSONB,
+    status TEXT DEFAULT 'planned',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS bot_ledger (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    bot_id INTEGER NOT NULL,
+    decision_id INTEGER,
+    order_id INTEGER,
+    entry_type TEXT NOT NULL,
+    symbol TEXT NOT NULL DEFAULT 'BTC',
+    cash_delta_eur NUMERIC NOT NULL DEFAULT 0,
+    qty_delta NUMERIC NOT NULL DEFAULT 0,
+    note TEXT,
+    meta JSONB,
+    ts TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Gematerialiseerde bot_ledger totalen + dagbuckets (O(1) reads)
+CREATE TABLE IF NOT EXISTS bot_balances (
+    user_id INTEGER NOT NULL,
+    bot_id INTEGER NOT NULL,
+    symbol TEXT NOT NULL DEFAULT 'BTC',
+    cash_delta_eur NUMERIC NOT NULL DEFAULT 0,
+    qty_delta NUMERIC NOT NULL DEFAULT 0,
+    executed_cash_eur NUMERIC NOT NULL DEFAULT 0,
+    bought_eur NUMERIC NOT NULL DEFAULT 0,
+    entry_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, bot_id, symbol)
+);
+
+CREATE TABLE IF NOT EXISTS bot_balance_days (
+    user_id INTEGER NOT NULL,
+    bot_id INTEGER NOT NULL,
+    symbol TEXT NOT NULL DEFAULT 'BTC',
+    day DATE NOT NULL,
+    cash_delta_eur NUMERIC NOT NULL DEFAULT 0,
+    qty_delta NUMERIC NOT NULL DEFAULT 0,
+    spent_eur NUMERIC NOT NULL DEFAULT 0,
+    reserved_eur NUMERIC NOT NULL DEFAULT 0,
+    entry_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, bot_id, symbol, day)
+);
+
+
+-- =========================================================
+-- 💼 PORTFOLIO SNAPSHOTS
+-- =========================================================
+CREATE TABLE IF NOT EXISTS portfolio_balance_snapshots (
+    user_id INTEGER NOT NULL,
+    bucket TEXT NOT NULL,
+    ts TIMESTAMP NOT NULL,
+    equity_eur NUMERIC,
+    cash_eur NUMERIC,
+    btc_qty NUMERIC,
+    btc_value_eur NUMERIC,
+    invested_eur NUMERIC,
+    unrealized_pnl_eur NUMERIC,
+    UNIQUE (user_id, bucket, ts)
+);
+
+CREATE TABLE IF NOT EXISTS bot_portfolio_snapshots (
+    user_id INTEGER NOT NULL,
+    bot_id INTEGER NOT NULL,
+    bucket TEXT NOT NULL,
+    ts TIMESTAMP NOT NULL,
+    symbol TEXT DEFAULT 'BTC',
+    net_qty NUMERIC,
+    cash_eur NUMERIC,
+    price_eur NUMERIC,
+    equity_eur NUMERIC,
+    invested_eur NUMERIC,
+    UNIQUE (user_id, bot_id, bucket, ts)
+);
+
+
+-- =========================================================
+-- 📄 RAPPORTEN
+-- =========================================================
+CREATE TABLE IF NOT EXISTS daily_reports (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    report_date DATE NOT NULL,
+    executive_summary TEXT,
+    market_analysis TEXT,
+    macro_context TEXT,
+    technical_analysis TEXT,
+    setup_validation TEXT,
+    strategy_implication TEXT,
+    outlook TEXT,
+    bot_strategy TEXT,
+    bot_snapshot JSONB,
+    price NUMERIC,
+    change_24h NUMERIC,
+    volume NUMERIC,
+    macro_score NUMERIC,
+    technical_score NUMERIC,
+    market_score NUMERIC,
+    setup_score NUMERIC,
+    macro_indicator_highlights JSONB,
+    technical_indicator_highlights JSONB,
+    market_indicator_highlights JSONB,
+    best_setup JSONB,
+    top_setups JSONB,
+    active_strategy JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, report_date)
+);
+
+CREATE TABLE IF NOT EXISTS weekly_reports (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    report_date DATE NOT NULL,
+    period_start DATE,
+    period_end DATE,
+    summary TEXT,
+    macro_score NUMERIC,
+    technical_score NUMERIC,
+    setup_score NUMERIC,
+    executive_summary TEXT,
+    market_overview TEXT,
+    macro_trends TEXT,
+    technical_structure TEXT,
+    setup_performance TEXT,
+    bot_performance TEXT,
+    strategic_lessons TEXT,
+    outlook TEXT,
+    meta_json JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, report_date)
+);
+
+CREATE TABLE IF NOT EXISTS monthly_reports (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    report_date DATE NOT NULL,
+    period_start DATE,
+    period_end DATE,
+    executive_summary TEXT,
+    market_overview TEXT,
+    macro_trends TEXT,
+    technical_structure TEXT,
+    setup_performance TEXT,
+    bot_performance TEXT,
+    strategic_lessons TEXT,
+    outlook TEXT,
+    meta_json JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, report_date)
+);
+
+CREATE TABLE IF NOT EXISTS quarterly_reports (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    report_date DATE NOT NULL,
+    period_start DATE,
+    period_end DATE,
+    executive_summary TEXT,
+    market_overview TEXT,
+    macro_trends TEXT,
+    technical_structure TEXT,
+    setup_performance TEXT,
+    bot_performance TEXT,
+    strategic_lessons TEXT,
+    outlook TEXT,
+    meta_json JSONB,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, report_date)
+);
+
+CREATE TABLE IF NOT EXISTS report_snapshots (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    report_type TEXT NOT NULL,
+    report_id INTEGER,
+    token TEXT NOT NULL UNIQUE,
+    report_json JSONB,
+    valid_until TIMESTAMP,
+    status TEXT DEFAULT 'pending',
+    pdf_generated BOOLEAN DEFAULT FALSE,
+    pdf_url TEXT,
+    file_size INTEGER,
+    generation_ms INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+
+-- =========================================================
+-- 🖥️ READ MODELS + ORCHESTRATIE
+-- =========================================================
+-- Per-user dashboard read model (GET /dashboard = één key lookup)
+CREATE TABLE IF NOT EXISTS dashboard_snapshots (
+    user_id INTEGER PRIMARY KEY,
+    payload JSONB NOT NULL,
+    as_of TIMESTAMP,
+    built_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Per dispatcher-wave: duur + ok/failed (chord callback)
+CREATE TABLE IF NOT EXISTS dispatch_waves (
+    wave_id TEXT PRIMARY KEY,
+    task_name TEXT NOT NULL,
+    users INTEGER NOT NULL DEFAULT 0,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    ok INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    failed_user_ids INTEGER[] DEFAULT '{}',
+    started_at TIMESTAMP NOT NULL,
+    duration_ms INTEGER,
+    slowest_chunk_ms INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_dispatch_waves_task_started
+    ON dispatch_waves (task_name, started_at DESC);
+
+-- Daily pipeline (DAG): run per user-batch + status per stage
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+    run_id TEXT NOT NULL,
+    batch INTEGER NOT NULL,
+    user_ids INTEGER[] DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'running',
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP,
+    duration_ms INTEGER,
+    critical_path JSONB,
+    critical_path_ms INTEGER,
+    PRIMARY KEY (run_id, batch)
+);
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_runs_started
+    ON pipeline_runs (started_at DESC);
+
+CREATE TABLE IF NOT EXISTS pipeline_stage_runs (
+    run_id TEXT NOT NULL,
+    batch INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    started_at TIMESTAMP NOT NULL,
+    finished_at TIMESTAMP,
+    duration_ms INTEGER,
+    ok INTEGER DEFAULT 0,
+    failed INTEGER DEFAULT 0,
+    PRIMARY KEY (run_id, batch, stage)
+);
+
+
+-- =========================================================
+-- 📜 HISTORY (keyset-paginatie (ts, id) per user)
+-- =========================================================
+CREATE INDEX IF NOT EXISTS idx_technical_indicators_user_ts_id
+    ON technical_indicators (user_id, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_macro_data_user_ts_id
+    ON macro_data (user_id, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_market_data_indicators_user_ts_id
+    ON market_data_indicators (user_id, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_market_data_ts_id
+    ON market_data (timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_market_forward_returns_symbol_start_id
+    ON market_forward_returns (symbol, start_date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_portfolio_balance_snapshots_user_bucket_ts
+    ON portfolio_balance_snapshots (user_id, bucket, ts);
+CREATE INDEX IF NOT EXISTS idx_bot_portfolio_snapshots_user_bot_bucket_ts
+    ON bot_portfolio_snapshots (user_id, bot_id, bucket, ts);
@@ -0,0 +1,85 @@
+-- =========================================================
+-- ⚡ 0002 HOT-PATH INDEXES
+--
+-- Composite indexes die de access patterns van de hete queries
+-- volgen (kolomvolgorde = gelijkheid → sortering):
+--
+-- - DISTINCT ON (name) ... WHERE user_id = %s
+--   ORDER BY name, timestamp DESC         → (user_id, name, timestamp DESC)
+-- - laatste prijs: WHERE symbol = %s
+--   ORDER BY timestamp DESC LIMIT 1       → (symbol, timestamp DESC)
+-- - ledger-aggregaten per user + bot      → (user_id, bot_id, ts)
+-- - score-regels: WHERE indicator = %s
+--   AND (user_id = %s OR user_id IS NULL) → (indicator, user_id)
+--
+-- Plain CREATE INDEX (in de migratietransactie). Voor grote
+-- bestaande tabellen kan dit in een onderhoudsvenster ook
+-- vooraf met CREATE INDEX CONCURRENTLY onder dezelfde naam.
+-- =========================================================
+
+-- 🌍 Laatste waarde per indicator (DISTINCT ON)
+CREATE INDEX IF NOT EXISTS idx_macro_data_user_name_ts
+    ON macro_data (user_id, name, timestamp DESC);
+
+CREATE INDEX IF NOT EXISTS idx_market_data_indicators_user_name_ts
+    ON market_data_indicators (user_id, name, timestamp DESC);
+
+CREATE INDEX IF NOT EXISTS idx_technical_indicators_user_indicator_ts
+    ON technical_indicators (user_id, indicator, timestamp DESC);
+
+-- technical matcht case-insensitive (LOWER(indicator))
+CREATE INDEX IF NOT EXISTS idx_technical_indicators_user_lower_indicator_ts
+    ON technical_indicators (user_id, LOWER(indicator), timestamp DESC);
+
+-- 📈 Laatste prijs per symbol
+CREATE INDEX IF NOT EXISTS idx_market_data_symbol_ts
+    ON market_data (symbol, timestamp DESC);
+
+-- 📚 Score-regels
+CREATE INDEX IF NOT EXISTS idx_macro_indicator_rules_indicator_user
+    ON macro_indicator_rules (indicator, user_id);
+
+CREATE INDEX IF NOT EXISTS idx_market_indicator_rules_indicator_user
+    ON market_indicator_rules (indicator, user_id);
+
+CREATE INDEX IF NOT EXISTS idx_technical_indicator_rules_indicator_user
+    ON technical_indicator_rules (indicator, user_id);
+
+CREATE INDEX IF NOT EXISTS idx_technical_indicator_rules_lower_indicator_user
+    ON technical_indicator_rules (LOWER(indicator), user_id);
+
+CREATE INDEX IF NOT EXISTS idx_indicators_category_active
+    ON indicators (category, active);
+
+-- 🤖 Bots
+CREATE INDEX IF NOT EXISTS idx_bot_ledger_user_bot_ts
+    ON bot_ledger (user_id, bot_id, ts);
+
+CREATE INDEX IF NOT EXISTS idx_bot_decisions_user_date_bot
+    ON bot_decisions (user_id, decision_date DESC, bot_id);
+
+CREATE INDEX IF NOT EXISTS idx_bot_orders_user_bot_decision
+    ON bot_orders (user_id, bot_id, decision_id);
+
+CREATE INDEX IF NOT EXISTS idx_bot_executions_order
+    ON bot_executions (bot_order_id);
+
+CREATE INDEX IF NOT EXISTS idx_bot_configs_user_active
+    ON bot_configs (user_id, is_active);
+
+-- 🧮 Scores + AI
+CREATE INDEX IF NOT EXISTS idx_daily_setup_scores_user_date_score
+    ON daily_setup_scores (user_id, report_date DESC, score DESC);
+
+CREATE INDEX IF NOT EXISTS idx_ai_category_insights_user_category_date
+    ON ai_category_insights (user_id, category, date DESC);
+
+CREATE INDEX IF NOT EXISTS idx_ai_reflections_user_category_date
+    ON ai_reflections (user_id, category, date DESC);
+
+-- 🧩 Setups + strategies per user
+CREATE INDEX IF NOT EXISTS idx_setups_user_created
+    ON setups (user_id, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_strategies_user_setup
+    ON strategies (user_id, setup_id);
@@ -0,0 +1,19 @@
+import logging
+
+from backend.services.bot_balance_service import rebuild_bot_balances
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade(cur):
+    # Eenmalige backfill van bot_balances uit een bestaande ledger
+    cur.execute("SELECT EXISTS (SELECT 1 FROM bot_balances);")
+    if cur.fetchone()[0]:
+        return
+
+    cur.execute("SELECT EXISTS (SELECT 1 FROM bot_ledger);")
+    if not cur.fetchone()[0]:
+        return
+
+    rebuild_bot_balances(cur)
+    logger.info("✅ bot_balances gevuld vanuit bot_ledger.")
@@ -0,0 +1,29 @@
+-- =========================================================
+-- 🗂️ 0004 RETENTIE-POLICIES
+--
+-- Per time-series tabel (zie services/retention_service.py):
+--   raw_days         → zoveel dagen alle rijen bewaren
+--   drop_after_days  → hele maandpartities verwijderen (NULL = nooit)
+--   rolled_up_until  → voortgang van de dagelijkse rollup
+-- =========================================================
+
+CREATE TABLE IF NOT EXISTS data_retention_policies (
+    table_name TEXT PRIMARY KEY,
+    raw_days INTEGER NOT NULL CHECK (raw_days >= 1),
+    drop_after_days INTEGER CHECK (drop_after_days IS NULL OR drop_after_days > raw_days),
+    enabled BOOLEAN NOT NULL DEFAULT TRUE,
+    rolled_up_until DATE,
+    last_run_at TIMESTAMP,
+    last_result JSONB,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO data_retention_policies (table_name, raw_days, drop_after_days)
+VALUES
+    ('market_data', 30, NULL),
+    ('macro_data', 90, NULL),
+    ('technical_indicators', 90, NULL),
+    ('market_data_indicators', 90, NULL),
+    ('portfolio_balance_snapshots', 30, NULL),
+    ('bot_portfolio_snapshots', 30, NULL)
+ON CONFLICT (table_name) DO NOTHING;
@@ -0,0 +1,12 @@
+import logging
+
+from backend.services.retention_service import TIME_SERIES_TABLES, convert_to_partitioned
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade(cur):
+    # Eenmalig: append-only tabellen → maandpartities (kopieert bestaande rijen)
+    for table in TIME_SERIES_TABLES:
+        if convert_to_partitioned(cur, table):
+            logger.info(f"✅ {table} gepartitioneerd")
@@ -0,0 +1,11 @@
+-- =========================================================
+-- 🕒 0006 daily_reports.generated_at
+--
+-- De upsert in celery_task/daily_report_task.py zet
+-- generated_at = NOW() bij een conflict; de kolom ontbrak
+-- in de baseline (0001). Apart versiebestand, zodat ook
+-- databases die 0001 al toepasten de kolom krijgen.
+-- =========================================================
+
+ALTER TABLE daily_reports
+    ADD COLUMN IF NOT EXISTS generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
@@ -0,0 +1,17 @@
+-- =========================================================
+-- 🧬 0007 PIPELINE STAGE TRACKING
+--
+-- skipped     → users overgeslagen door single-flight
+-- retried     → users opnieuw ingepland als losse task
+-- deadline_at → hard time limit van de stage (+ marge);
+--               sweep_stale_pipeline_stages zet 'running'
+--               voorbij de deadline op 'stale'
+-- =========================================================
+
+ALTER TABLE pipeline_stage_runs ADD COLUMN IF NOT EXISTS skipped INTEGER DEFAULT 0;
+ALTER TABLE pipeline_stage_runs ADD COLUMN IF NOT EXISTS retried INTEGER DEFAULT 0;
+ALTER TABLE pipeline_stage_runs ADD COLUMN IF NOT EXISTS deadline_at TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_stage_runs_running
+    ON pipeline_stage_runs (deadline_at)
+    WHERE status = 'running';
@@ -0,0 +1,100 @@
+"""
+Micro-benchmark JSON serialisatie van API-payloads.
+
+Vergelijkt FastAPI's standaardpad (jsonable_encoder + JSONResponse)
+met FastJSONResponse (orjson + json_default) op een dashboard- en
+een report-achtige payload.
+
+Voorbeeld:
+    python -m backend.scripts.bench_json --rounds 500
+"""
+
+import argparse
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from backend.utils.json_utils import FastJSONResponse
+
+
+# =====================================================
+# 🧪 PAYLOADS
+# =====================================================
+def dashboard_payload() -> Dict[str, Any]:
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    return {
+        "user_id": 1,
+        "as_of": now,
+        "market_data": [
+            {"symbol": "BTC", "price": Decimal("43250.12"), "volume": Decimal("1234567.8"),
+             "change_24h": Decimal("-1.25"), "timestamp": now}
+        ],
+        "technical_data": {
+            f"ind_{i}": {"value": Decimal("51.3"), "score": 60, "timestamp": now}
+            for i in range(40)
+        },
+        "macro_data": [
+            {"name": f"macro_{i}", "value": Decimal("4.25"), "trend": "up",
+             "interpretation": "neutraal", "action": "hold", "score": 55, "timestamp": now}
+            for i in range(40)
+        ],
+        "setups": [{"name": f"setup_{i}", "timestamp": now} for i in range(25)],
+        "scores": {"macro": 55, "technical": 60, "market": 50, "setup": 45},
+    }
+
+
+def report_payload() -> Dict[str, Any]:
+    today = date(2024, 1, 1)
+    return {
+        "id": 1,
+        "user_id": 1,
+        "report_date": today,
+        "created_at": datetime(2024, 1, 1, 7, 0, 0),
+        "executive_summary": "Lorem ipsum " * 200,
+        "market_analysis": "Lorem ipsum " * 300,
+        "price": Decimal("43250.12"),
+        "scores": [
+            {"date": today - timedelta(days=i), "macro": Decimal("55.5"), "technical": Decimal("60.1")}
+            for i in range(90)
+        ],
+    }
+
+
+# =====================================================
+# ⏱️ BENCH
+# =====================================================
+def _default_path(payload):
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def _fast_path(payload):
+    return FastJSONResponse(payload).body
+
+
+def bench(fn: Callable[[Any], bytes], payload, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(payload)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=500)
+    args = parser.parse_args()
+
+    for name, payload in (("dashboard", dashboard_payload()), ("report", report_payload())):
+        default_ms = bench(_default_path, payload, args.rounds)
+        fast_ms = bench(_fast_path, payload, args.rounds)
+        print(
+            f"{name:<10} default={default_ms:.3f}ms  orjson={fast_ms:.3f}ms  "
+            f"x{default_ms / fast_ms:.1f}  bytes={len(_fast_path(payload))}"
+        )
+
+
+if __name__ == "__main__":
+    main()
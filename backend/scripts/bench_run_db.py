@@ -0,0 +1,112 @@
+"""
+Lokale before/after-meting van de run_db offload (zonder Postgres).
+
+Start een uvicorn-server met twee varianten van dezelfde route:
+- /before: sync "query" (time.sleep) direct in een async route
+  → blokkeert de event loop (oude situatie)
+- /after:  dezelfde functie via run_db (thread-pool)
+en draait daarop de load_test_api harness (zelfde p50/p99).
+
+Meet alleen het event-loop effect: de echte endpoints hebben
+Postgres nodig; draai daarvoor load_test_api tegen de API.
+
+Voorbeeld:
+    python -m backend.scripts.bench_run_db --db-ms 20 --concurrency 50 --requests 500
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from backend.scripts.load_test_api import run_path
+from backend.utils.async_db import API_DB_WORKERS, run_db
+
+
+def build_app(db_ms: float = None) -> FastAPI:
+    if db_ms is None:
+        db_ms = float(os.getenv("BENCH_DB_MS", "20"))
+    app = FastAPI()
+
+    def fake_query():
+        time.sleep(db_ms / 1000)
+        return {"ok": True}
+
+    @app.get("/before")
+    async def before():
+        return fake_query()
+
+    @app.get("/after")
+    async def after():
+        return await run_db(fake_query)
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(client: httpx.AsyncClient) -> None:
+    for _ in range(100):
+        try:
+            await client.get("/after")
+            return
+        except httpx.HTTPError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("bench server start niet")
+
+
+async def main_async(args) -> None:
+    # Server in een eigen proces: client en server delen geen GIL / loop
+    port = _free_port()
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "--factory", "backend.scripts.bench_run_db:build_app",
+            "--port", str(port), "--log-level", "warning",
+        ],
+        env={**os.environ, "BENCH_DB_MS": str(args.db_ms)},
+    )
+
+    try:
+        results = {}
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}",
+            limits=httpx.Limits(max_connections=args.concurrency),
+            timeout=120,
+        ) as client:
+            await _wait_ready(client)
+            for path in ("/before", "/after"):
+                results[path] = await run_path(client, path, args.requests, args.concurrency)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(
+        f"db_ms={args.db_ms} concurrency={args.concurrency} requests={args.requests} "
+        f"API_DB_WORKERS={API_DB_WORKERS}"
+    )
+    print(f"{'':8s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'rps':>8s} {'errors':>7s}")
+    for path, r in results.items():
+        print(f"{path:8s} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['rps']:>8.1f} {r['errors']:>7d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-ms", type=float, default=20.0, help="gesimuleerde querytijd per request")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
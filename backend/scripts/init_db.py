@@ -1,7 +1,14 @@
+import os
+import sys
 import logging
-from utils.db import get_db_connection
+import argparse
 from dotenv import load_dotenv  # ✅ Toegevoegd
-import os
+
+# ✅ Projectroot op sys.path → backend.* imports (zoals main.py)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from backend.utils.db import get_db_connection
+from backend.utils.migrations import migrate, migration_status
 
 # ✅ .env-bestand laden
 load_dotenv()
@@ -10,91 +17,54 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-def create_setups_table(conn):
-    with conn.cursor() as cur:
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS setups (
-                id SERIAL PRIMARY KEY,
-                name TEXT NOT NULL,
-                symbol TEXT NOT NULL,
-                timeframe TEXT NOT NULL,
-                account_type TEXT,
-                strategy_type TEXT,
-                min_investment NUMERIC,
-                dynamic_investment BOOLEAN DEFAULT FALSE,
-                score NUMERIC,
-                description TEXT,
-                tags TEXT[],
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-        logger.info("✅ Tabel 'setups' succesvol aangemaakt.")
+# Het schema staat in backend/migrations (NNNN_naam.sql / .py).
+# Dit script past openstaande migraties toe:
+#
+#   python backend/scripts/init_db.py              # migreren
+#   python backend/scripts/init_db.py --status     # overzicht
+#   python backend/scripts/init_db.py --dry-run    # tonen wat zou draaien
+#   python backend/scripts/init_db.py --target 2   # t/m versie 0002
 
-def create_market_data_table(conn):
-    with conn.cursor() as cur:
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS market_data (
-                id SERIAL PRIMARY KEY,
-                symbol TEXT NOT NULL,
-                price NUMERIC,
-                volume NUMERIC,
-                change_24h NUMERIC,
-                is_updated BOOLEAN DEFAULT TRUE,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-        logger.info("✅ Tabel 'market_data' succesvol aangemaakt.")
 
-def create_technical_data_table(conn):
-    with conn.cursor() as cur:
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS technical_data (
-                id SERIAL PRIMARY KEY,
-                symbol TEXT NOT NULL,
-                rsi NUMERIC,
-                volume NUMERIC,
-                ma_200 NUMERIC,
-                price NUMERIC,
-                is_updated BOOLEAN DEFAULT TRUE,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-        logger.info("✅ Tabel 'technical_data' succesvol aangemaakt.")
+def run_all(target=None, dry_run=False):
+    conn = get_db_connection()
+    if not conn:
+        logger.error("❌ Kan geen verbinding maken met de database.")
+        return False
+
+    try:
+        applied = migrate(conn, target=target, dry_run=dry_run)
+        logger.info(f"✅ Schema gecontroleerd ({len(applied)} migratie(s) {'gepland' if dry_run else 'toegepast'}).")
+        return True
+    except Exception as e:
+        logger.error(f"❌ Fout bij migreren: {e}")
+        return False
+    finally:
+        conn.close()
 
-def create_macro_data_table(conn):
-    with conn.cursor() as cur:
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS macro_data (
-                id SERIAL PRIMARY KEY,
-                name TEXT NOT NULL,
-                value NUMERIC,
-                trend TEXT,
-                interpretation TEXT,
-                action TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-        """)
-        logger.info("✅ Tabel 'macro_data' succesvol aangemaakt.")
 
-def run_all():
+def print_status():
     conn = get_db_connection()
     if not conn:
         logger.error("❌ Kan geen verbinding maken met de database.")
-        return
+        return False
 
     try:
-        conn.autocommit = False
-        create_setups_table(conn)
-        create_market_data_table(conn)
-        create_technical_data_table(conn)
-        create_macro_data_table(conn)
-        conn.commit()
-        logger.info("✅ Alle tabellen succesvol gecreëerd of gecontroleerd.")
-    except Exception as e:
-        conn.rollback()
-        logger.error(f"❌ Fout bij aanmaken tabellen: {e}")
+        for m in migration_status(conn):
+            state = "✅" if m["applied"] else "⏳"
+            changed = "  ⚠️ gewijzigd" if m["changed"] else ""
+            print(f"{state} {m['filename']:<45} {m['applied_at'] or ''}{changed}")
+        return True
     finally:
         conn.close()
 
+
 if __name__ == "__main__":
-    run_all()
+    parser = argparse.ArgumentParser(description="Database schema migraties")
+    parser.add_argument("--status", action="store_true", help="toon toegepaste / openstaande migraties")
+    parser.add_argument("--dry-run", action="store_true", help="toon wat zou draaien, zonder toe te passen")
+    parser.add_argument("--target", type=int, default=None, help="migreer t/m deze versie")
+    args = parser.parse_args()
+
+    ok = print_status() if args.status else run_all(target=args.target, dry_run=args.dry_run)
+    sys.exit(0 if ok else 1)
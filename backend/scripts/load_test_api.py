@@ -0,0 +1,145 @@
+"""
+Eenvoudige load-test voor de API (latency onder concurrency).
+
+Voorbeeld:
+    python -m backend.scripts.load_test_api \\
+        --base-url http://127.0.0.1:5002 \\
+        --token <access_token cookie> \\
+        --concurrency 50 --requests 500 \\
+        --label after --out after.json
+
+Draai dezelfde set vóór en na een wijziging en vergelijk
+p50/p99 per endpoint (--compare before.json after.json).
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+DEFAULT_PATHS = [
+    "/api/dashboard",
+    "/api/bot/portfolios",
+    "/api/agents/insights/macro",
+    "/api/market_data/list",
+]
+
+
+# =====================================================
+# 📐 STATISTIEK
+# =====================================================
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[k]
+
+
+def summarize(latencies: List[float], errors: int, wall: float) -> Dict[str, float]:
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "rps": round((len(latencies) + errors) / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "mean_ms": round(statistics.fmean(latencies), 1) if latencies else 0.0,
+        "max_ms": round(max(latencies), 1) if latencies else 0.0,
+    }
+
+
+# =====================================================
+# 🚀 LOAD
+# =====================================================
+async def run_path(client: httpx.AsyncClient, path: str, total: int, concurrency: int):
+    sem = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with sem:
+            started = time.perf_counter()
+            try:
+                resp = await client.get(path)
+                if resp.status_code >= 400:
+                    errors += 1
+                    return
+            except httpx.HTTPError:
+                errors += 1
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return summarize(latencies, errors, time.perf_counter() - wall_start)
+
+
+async def run(args) -> Dict[str, Dict[str, float]]:
+    cookies = {"access_token": args.token} if args.token else None
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    results = {}
+    async with httpx.AsyncClient(
+        base_url=args.base_url,
+        cookies=cookies,
+        limits=limits,
+        timeout=args.timeout,
+    ) as client:
+        for path in args.paths:
+            results[path] = await run_path(client, path, args.requests, args.concurrency)
+            print(f"{path:40s} {results[path]}")
+
+    return results
+
+
+def compare(before_file: str, after_file: str):
+    with open(before_file) as f:
+        before = json.load(f)["results"]
+    with open(after_file) as f:
+        after = json.load(f)["results"]
+
+    print(f"{'endpoint':40s} {'p50 voor':>10s} {'p50 na':>10s} {'p99 voor':>10s} {'p99 na':>10s}")
+    for path in before:
+        if path not in after:
+            continue
+        b, a = before[path], after[path]
+        print(f"{path:40s} {b['p50_ms']:>10.1f} {a['p50_ms']:>10.1f} {b['p99_ms']:>10.1f} {a['p99_ms']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API latency load-test")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5002")
+    parser.add_argument("--token", default=None, help="access_token cookie")
+    parser.add_argument("--paths", nargs="+", default=DEFAULT_PATHS)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500, help="requests per endpoint")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--out", default=None, help="schrijf resultaten als JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = asyncio.run(run(args))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({
+                "label": args.label,
+                "concurrency": args.concurrency,
+                "requests": args.requests,
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,380 @@
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_SYMBOL = "BTC"
+
+
+# =====================================================
+# 📒 BOT BALANCES (materialised bot_ledger)
+#
+# bot_balances      → totalen per (user, bot, symbol)
+# bot_balance_days  → dagbuckets per (user, bot, symbol, dag)
+#
+# Elke ledger-insert werkt beide tabellen bij in DEZELFDE
+# transactie (apply_ledger_delta). Reads zijn daarmee O(1)
+# i.p.v. SUM over de volledige ledger-historie.
+# reconcile_bot_balances() controleert tegen de ledger.
+# =====================================================
+
+
+def _split_delta(entry_type: str, cash_delta_eur: float) -> Dict[str, float]:
+    cash = float(cash_delta_eur or 0)
+    outflow = abs(cash) if cash < 0 else 0.0
+
+    return {
+        "executed_cash_eur": cash if entry_type == "execute" else 0.0,
+        "bought_eur": outflow if entry_type == "execute" else 0.0,
+        "reserved_eur": outflow if entry_type == "reserve" else 0.0,
+    }
+
+
+# =====================================================
+# ✍️ WRITE PATH (zelfde transactie als de ledger)
+# =====================================================
+def apply_ledger_delta(
+    cur,
+    *,
+    user_id: int,
+    bot_id: int,
+    entry_type: str,
+    cash_delta_eur: float = 0.0,
+    qty_delta: float = 0.0,
+    symbol: Optional[str] = None,
+) -> None:
+    """
+    Verwerkt één ledger-regel in bot_balances + bot_balance_days.
+    Aanroepen met de cursor van de ledger-insert; commit is aan de caller.
+    """
+    symbol = symbol or DEFAULT_SYMBOL
+    cash = float(cash_delta_eur or 0)
+    qty = float(qty_delta or 0)
+    parts = _split_delta(entry_type, cash)
+
+    cur.execute(
+        """
+        INSERT INTO bot_balances (
+            user_id, bot_id, symbol,
+            cash_delta_eur, qty_delta, executed_cash_eur, bought_eur,
+            entry_count, updated_at
+        )
+        VALUES (%s,%s,%s,%s,%s,%s,%s,1,NOW())
+        ON CONFLICT (user_id, bot_id, symbol)
+        DO UPDATE SET
+            cash_delta_eur    = bot_balances.cash_delta_eur + EXCLUDED.cash_delta_eur,
+            qty_delta         = bot_balances.qty_delta + EXCLUDED.qty_delta,
+            executed_cash_eur = bot_balances.executed_cash_eur + EXCLUDED.executed_cash_eur,
+            bought_eur        = bot_balances.bought_eur + EXCLUDED.bought_eur,
+            entry_count       = bot_balances.entry_count + 1,
+            updated_at        = NOW()
+        """,
+        (
+            user_id,
+            bot_id,
+            symbol,
+            cash,
+            qty,
+            parts["executed_cash_eur"],
+            parts["bought_eur"],
+        ),
+    )
+
+    # Dagbucket volgt DATE(ts) van de ledger-regel (ts = NOW())
+    cur.execute(
+        """
+        INSERT INTO bot_balance_days (
+            user_id, bot_id, symbol, day,
+            cash_delta_eur, qty_delta, spent_eur, reserved_eur, entry_count
+        )
+        VALUES (%s,%s,%s,CURRENT_DATE,%s,%s,%s,%s,1)
+        ON CONFLICT (user_id, bot_id, symbol, day)
+        DO UPDATE SET
+            cash_delta_eur = bot_balance_days.cash_delta_eur + EXCLUDED.cash_delta_eur,
+            qty_delta      = bot_balance_days.qty_delta + EXCLUDED.qty_delta,
+            spent_eur      = bot_balance_days.spent_eur + EXCLUDED.spent_eur,
+            reserved_eur   = bot_balance_days.reserved_eur + EXCLUDED.reserved_eur,
+            entry_count    = bot_balance_days.entry_count + 1
+        """,
+        (
+            user_id,
+            bot_id,
+            symbol,
+            cash,
+            qty,
+            parts["bought_eur"],
+            parts["reserved_eur"],
+        ),
+    )
+
+
+# =====================================================
+# 📖 READ PATH
+# =====================================================
+def get_bot_totals(conn, user_id: int, bot_id: int, symbol: Optional[str] = None) -> Dict[str, float]:
+    """
+    Totalen voor één bot (optioneel één symbool).
+    """
+    sql = """
+        SELECT
+            COALESCE(SUM(cash_delta_eur), 0),
+            COALESCE(SUM(qty_delta), 0),
+            COALESCE(SUM(executed_cash_eur), 0),
+            COALESCE(SUM(bought_eur), 0)
+        FROM bot_balances
+        WHERE user_id = %s
+          AND bot_id = %s
+    """
+    params: List[Any] = [user_id, bot_id]
+    if symbol:
+        sql += " AND symbol = %s"
+        params.append(symbol)
+
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        cash, qty, executed, bought = cur.fetchone()
+
+    return {
+        "net_cash_delta_eur": float(cash or 0),
+        "net_qty": float(qty or 0),
+        "net_executed_cash_delta_eur": float(executed or 0),
+        "bought_eur": float(bought or 0),
+    }
+
+
+def get_bot_day(conn, user_id: int, bot_id: int, day: date) -> Dict[str, float]:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT
+                COALESCE(SUM(spent_eur), 0),
+                COALESCE(SUM(reserved_eur), 0)
+            FROM bot_balance_days
+            WHERE user_id = %s
+              AND bot_id = %s
+              AND day = %s
+            """,
+            (user_id, bot_id, day),
+        )
+        spent, reserved = cur.fetchone()
+
+    return {
+        "today_spent_eur": float(spent or 0),
+        "today_reserved_eur": float(reserved or 0),
+    }
+
+
+def get_user_bot_balances(conn, user_id: int, day: date) -> Dict[int, Dict[str, float]]:
+    """
+    Totalen + dagbucket voor alle bots van een user (één query).
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT
+                b.bot_id,
+                SUM(b.cash_delta_eur),
+                SUM(b.qty_delta),
+                SUM(b.executed_cash_eur),
+                SUM(b.bought_eur),
+                COALESCE(SUM(d.spent_eur), 0),
+                COALESCE(SUM(d.reserved_eur), 0)
+            FROM bot_balances b
+            LEFT JOIN bot_balance_days d
+              ON d.user_id = b.user_id
+             AND d.bot_id = b.bot_id
+             AND d.symbol = b.symbol
+             AND d.day = %s
+            WHERE b.user_id = %s
+            GROUP BY b.bot_id
+            """,
+            (day, user_id),
+        )
+        rows = cur.fetchall()
+
+    return {
+        int(bot_id): {
+            "net_cash_delta_eur": float(cash or 0),
+            "net_qty": float(qty or 0),
+            "net_executed_cash_delta_eur": float(executed or 0),
+            "bought_eur": float(bought or 0),
+            "today_spent_eur": float(spent or 0),
+            "today_reserved_eur": float(reserved or 0),
+        }
+        for bot_id, cash, qty, executed, bought, spent, reserved in rows
+    }
+
+
+# =====================================================
+# 🔁 RECONCILIATIE / BACKFILL
+# =====================================================
+_LEDGER_TOTALS_SQL = """
+    SELECT
+        user_id,
+        bot_id,
+        COALESCE(symbol, 'BTC') AS symbol,
+        COALESCE(SUM(cash_delta_eur), 0) AS cash_delta_eur,
+        COALESCE(SUM(qty_delta), 0) AS qty_delta,
+        COALESCE(SUM(cash_delta_eur) FILTER (WHERE entry_type = 'execute'), 0) AS executed_cash_eur,
+        COALESCE(SUM(ABS(cash_delta_eur)) FILTER (
+            WHERE entry_type = 'execute' AND cash_delta_eur < 0
+        ), 0) AS bought_eur,
+        COUNT(*) AS entry_count
+    FROM bot_ledger
+    {where}
+    GROUP BY user_id, bot_id, COALESCE(symbol, 'BTC')
+"""
+
+_LEDGER_DAYS_SQL = """
+    SELECT
+        user_id,
+        bot_id,
+        COALESCE(symbol, 'BTC') AS symbol,
+        DATE(ts) AS day,
+        COALESCE(SUM(cash_delta_eur), 0) AS cash_delta_eur,
+        COALESCE(SUM(qty_delta), 0) AS qty_delta,
+        COALESCE(SUM(ABS(cash_delta_eur)) FILTER (
+            WHERE entry_type = 'execute' AND cash_delta_eur < 0
+        ), 0) AS spent_eur,
+        COALESCE(SUM(ABS(cash_delta_eur)) FILTER (
+            WHERE entry_type = 'reserve' AND cash_delta_eur < 0
+        ), 0) AS reserved_eur,
+        COUNT(*) AS entry_count
+    FROM bot_ledger
+    {where}
+    GROUP BY user_id, bot_id, COALESCE(symbol, 'BTC'), DATE(ts)
+"""
+
+
+def _scope(user_id: Optional[int], days_col: Optional[str] = None, since: Optional[date] = None):
+    clauses, params = [], []
+    if user_id is not None:
+        clauses.append("user_id = %s")
+        params.append(user_id)
+    if days_col and since is not None:
+        clauses.append(f"{days_col} >= %s")
+        params.append(since)
+    return (("WHERE " + " AND ".join(clauses)) if clauses else ""), params
+
+
+def _find_mismatches(cur, user_id: Optional[int], since: date) -> Dict[str, int]:
+    where, params = _scope(user_id)
+    cur.execute(
+        f"""
+        WITH l AS ({_LEDGER_TOTALS_SQL.format(where=where)})
+        SELECT COUNT(*)
+        FROM l
+        FULL OUTER JOIN (SELECT * FROM bot_balances {where}) b
+          ON b.user_id = l.user_id AND b.bot_id = l.bot_id AND b.symbol = l.symbol
+        WHERE l.user_id IS NULL
+           OR b.user_id IS NULL
+           OR ROUND(b.cash_delta_eur::numeric, 6) <> ROUND(l.cash_delta_eur::numeric, 6)
+           OR ROUND(b.qty_delta::numeric, 8) <> ROUND(l.qty_delta::numeric, 8)
+           OR b.entry_count <> l.entry_count
+        """,
+        params + params,
+    )
+    totals = int(cur.fetchone()[0])
+
+    day_where, day_params = _scope(user_id, "DATE(ts)", since)
+    bal_where, bal_params = _scope(user_id, "day", since)
+    cur.execute(
+        f"""
+        WITH l AS ({_LEDGER_DAYS_SQL.format(where=day_where)})
+        SELECT COUNT(*)
+        FROM l
+        FULL OUTER JOIN (SELECT * FROM bot_balance_days {bal_where}) d
+          ON d.user_id = l.user_id AND d.bot_id = l.bot_id
+         AND d.symbol = l.symbol AND d.day = l.day
+        WHERE l.user_id IS NULL
+           OR d.user_id IS NULL
+           OR ROUND(d.spent_eur::numeric, 6) <> ROUND(l.spent_eur::numeric, 6)
+           OR ROUND(d.reserved_eur::numeric, 6) <> ROUND(l.reserved_eur::numeric, 6)
+           OR d.entry_count <> l.entry_count
+        """,
+        day_params + bal_params,
+    )
+    days = int(cur.fetchone()[0])
+
+    return {"totals": totals, "days": days}
+
+
+def rebuild_bot_balances(cur, user_id: Optional[int] = None, since: Optional[date] = None) -> None:
+    """
+    Herbouwt bot_balances (volledig) en bot_balance_days (vanaf `since`,
+    of volledig) uit bot_ledger. Lockt bot_ledger tegen writes zodat
+    er tijdens het herbouwen geen delta's verloren gaan.
+    """
+    cur.execute("LOCK TABLE bot_ledger IN SHARE MODE")
+
+    where, params = _scope(user_id)
+    cur.execute(f"DELETE FROM bot_balances {where}", params)
+    cur.execute(
+        f"""
+        INSERT INTO bot_balances (
+            user_id, bot_id, symbol,
+            cash_delta_eur, qty_delta, executed_cash_eur, bought_eur,
+            entry_count, updated_at
+        )
+        SELECT
+            user_id, bot_id, symbol,
+            cash_delta_eur, qty_delta, executed_cash_eur, bought_eur,
+            entry_count, NOW()
+        FROM ({_LEDGER_TOTALS_SQL.format(where=where)}) l
+        """,
+        params,
+    )
+
+    bal_where, bal_params = _scope(user_id, "day", since)
+    day_where, day_params = _scope(user_id, "DATE(ts)", since)
+    cur.execute(f"DELETE FROM bot_balance_days {bal_where}", bal_params)
+    cur.execute(
+        f"""
+        INSERT INTO bot_balance_days (
+            user_id, bot_id, symbol, day,
+            cash_delta_eur, qty_delta, spent_eur, reserved_eur, entry_count
+        )
+        SELECT
+            user_id, bot_id, symbol, day,
+            cash_delta_eur, qty_delta, spent_eur, reserved_eur, entry_count
+        FROM ({_LEDGER_DAYS_SQL.format(where=day_where)}) l
+        """,
+        day_params,
+    )
+
+
+def reconcile_bot_balances(
+    conn,
+    user_id: Optional[int] = None,
+    since: Optional[date] = None,
+    repair: bool = True,
+) -> Dict[str, Any]:
+    """
+    Vergelijkt bot_balances / bot_balance_days met bot_ledger.
+    Bij afwijkingen (en repair=True) wordt de scope herbouwd.
+    Commit is aan de caller.
+    """
+    since = since or date.today()
+
+    with conn.cursor() as cur:
+        mismatches = _find_mismatches(cur, user_id, since)
+        drift = mismatches["totals"] + mismatches["days"] > 0
+
+        if drift:
+            logger.warning(
+                "⚠️ bot_balances drift | user=%s | totals=%s | days=%s",
+                user_id,
+                mismatches["totals"],
+                mismatches["days"],
+            )
+            if repair:
+                rebuild_bot_balances(cur, user_id=user_id, since=since)
+
+    return {
+        "user_id": user_id,
+        "since": since.isoformat(),
+        "mismatches": mismatches,
+        "repaired": bool(drift and repair),
+    }
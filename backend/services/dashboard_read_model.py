@@ -0,0 +1,298 @@
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+import psycopg2.extras
+
+from backend.utils.db import get_db_connection
+from backend.utils.db_schema import table_exists
+from backend.utils.json_utils import json_default
+from backend.utils.tracing import traced
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+# =====================================================
+# 🧱 DASHBOARD READ MODEL
+#
+# De dashboard-payload wordt per user opgebouwd na elke
+# score-tick (run_rule_based_daily_scores) en opgeslagen in
+# dashboard_snapshots. GET /dashboard is daarmee één
+# primary-key lookup. Writes die het dashboard raken
+# (setups, ingest-taken) invalideren de snapshot; de
+# volgende read bouwt hem opnieuw op.
+#
+# Scores zonder waarde blijven None (≠ score 0).
+#
+# as_of = meest recente brontimestamp → verandert alleen
+# wanneer de onderliggende data verandert.
+# =====================================================
+
+
+def _latest(*values) -> Optional[datetime]:
+    stamps = [v for v in values if isinstance(v, datetime)]
+    return max(stamps) if stamps else None
+
+
+# =====================================================
+# 🏗️ BUILD
+# =====================================================
+def build_dashboard_payload(conn, user_id: int) -> Dict[str, Any]:
+    """
+    Bouwt de volledige dashboard-payload met één connectie.
+    """
+    with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+
+        # 📈 MARKET DATA (laatste snapshot per user)
+        try:
+            cur.execute("""
+                SELECT DISTINCT ON (symbol)
+                    symbol, price, volume, change_24h, timestamp
+                FROM market_data
+                WHERE user_id = %s AND symbol = 'BTC'
+                ORDER BY symbol, timestamp DESC
+            """, (user_id,))
+            market_data = [dict(row) for row in cur.fetchall()]
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"⚠️ DASH01: Market data fout: {e}")
+            market_data = []
+
+        # 🧪 TECHNICAL DATA (laatste waarde per indicator)
+        try:
+            cur.execute("""
+                SELECT DISTINCT ON (LOWER(indicator))
+                    LOWER(indicator) AS indicator, value, score, timestamp
+                FROM technical_indicators
+                WHERE user_id = %s
+                ORDER BY LOWER(indicator), timestamp DESC
+            """, (user_id,))
+            technical_data = {
+                row["indicator"]: {
+                    "value": row["value"],
+                    "score": row["score"],
+                    "timestamp": row["timestamp"],
+                }
+                for row in cur.fetchall()
+            }
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"⚠️ DASH02: Technical data fout: {e}")
+            technical_data = {}
+
+        # 🌍 MACRO DATA (laatste per naam)
+        try:
+            cur.execute("""
+                SELECT DISTINCT ON (name)
+                    name, value, trend, interpretation, action, score, timestamp
+                FROM macro_data
+                WHERE user_id = %s
+                ORDER BY name, timestamp DESC
+            """, (user_id,))
+            macro_data = [dict(row) for row in cur.fetchall()]
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"⚠️ DASH03: Macro data fout: {e}")
+            macro_data = []
+
+        # 🧾 SETUPS (laatste per naam)
+        try:
+            cur.execute("""
+                SELECT DISTINCT ON (name)
+                    name, created_at AS timestamp
+                FROM setups
+                WHERE user_id = %s
+                ORDER BY name, created_at DESC
+            """, (user_id,))
+            setups = [dict(row) for row in cur.fetchall()]
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"⚠️ DASH04: Setups fout: {e}")
+            setups = []
+
+        # 🧠 SCORES (zelfde connectie, geen tweede get_db_connection)
+        try:
+            cur.execute("""
+                SELECT macro_score, technical_score, market_score, setup_score
+                FROM daily_scores
+                WHERE user_id = %s
+                  AND report_date = CURRENT_DATE
+                LIMIT 1
+            """, (user_id,))
+            score_row = cur.fetchone() or {}
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"⚠️ DASH05: Scores fout: {e}")
+            score_row = {}
+
+    macro_explanation = (
+        "📊 Gebaseerd op: " + ", ".join(d["name"] for d in macro_data)
+        if macro_data else "❌ Geen macrodata"
+    )
+
+    if technical_data:
+        technical_explanation = " | ".join(
+            f"{k.upper()}: {v['value']} (score {v['score']})"
+            for k, v in technical_data.items()
+        )
+    else:
+        technical_explanation = "❌ Geen technische data"
+
+    setup_explanation = (
+        f"🧠 {len(setups)} actieve setups" if setups else "❌ Geen setups"
+    )
+
+    as_of = _latest(
+        *(r.get("timestamp") for r in market_data),
+        *(v.get("timestamp") for v in technical_data.values()),
+        *(r.get("timestamp") for r in macro_data),
+        *(r.get("timestamp") for r in setups),
+    )
+
+    return {
+        "user_id": user_id,
+        "as_of": as_of,
+        "market_data": market_data,
+        "technical_data": technical_data,
+        "macro_data": macro_data,
+        "setups": setups,
+        "scores": {
+            "macro": score_row.get("macro_score"),
+            "technical": score_row.get("technical_score"),
+            "market": score_row.get("market_score"),
+            "setup": score_row.get("setup_score"),
+        },
+        "explanation": {
+            "macro": macro_explanation,
+            "technical": technical_explanation,
+            "setup": setup_explanation,
+        },
+    }
+
+
+def _store(conn, user_id: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    # Via JSON heen en terug → payload is identiek aan wat een read oplevert
+    encoded = json.dumps(payload, default=json_default, ensure_ascii=False)
+
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO dashboard_snapshots (user_id, payload, as_of, built_at)
+            VALUES (%s, %s::jsonb, %s, NOW())
+            ON CONFLICT (user_id)
+            DO UPDATE SET
+                payload = EXCLUDED.payload,
+                as_of = EXCLUDED.as_of,
+                built_at = NOW();
+        """, (user_id, encoded, payload.get("as_of")))
+
+    return json.loads(encoded)
+
+
+# =====================================================
+# 🔄 REFRESH / INVALIDATE
+# =====================================================
+@traced()
+def refresh_dashboard_read_model(user_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Bouwt + bewaart de snapshot. Best-effort: fouten loggen, niet raisen.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    try:
+        if not table_exists(conn, "dashboard_snapshots"):
+            return None
+
+        payload = _store(conn, user_id, build_dashboard_payload(conn, user_id))
+        conn.commit()
+        logger.info(f"🧱 Dashboard read model ververst (user_id={user_id}, as_of={payload.get('as_of')})")
+        return payload
+    except Exception:
+        conn.rollback()
+        logger.warning(f"⚠️ Dashboard read model verversen mislukt (user_id={user_id})", exc_info=True)
+        return None
+    finally:
+        conn.close()
+
+
+def invalidate_dashboard_read_model(conn, user_id: int) -> None:
+    """
+    Gooit de snapshot weg binnen de transactie van de caller.
+    """
+    if not table_exists(conn, "dashboard_snapshots"):
+        return
+
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM dashboard_snapshots WHERE user_id = %s", (user_id,))
+
+
+def invalidate_dashboard_snapshots(user_id: Optional[int] = None) -> int:
+    """
+    Na een ingest-taak: snapshot van user_id weg (None = alle users,
+    voor globale data zoals market_data). Eigen connectie, best-effort.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return 0
+
+    try:
+        if not table_exists(conn, "dashboard_snapshots"):
+            return 0
+
+        with conn.cursor() as cur:
+            if user_id is None:
+                cur.execute("DELETE FROM dashboard_snapshots")
+            else:
+                cur.execute("DELETE FROM dashboard_snapshots WHERE user_id = %s", (user_id,))
+            removed = cur.rowcount
+        conn.commit()
+        return removed
+    except Exception:
+        conn.rollback()
+        logger.warning(f"⚠️ Dashboard snapshot invalidatie mislukt (user_id={user_id})", exc_info=True)
+        return 0
+    finally:
+        conn.close()
+
+
+# =====================================================
+# 📖 READ
+# =====================================================
+def get_dashboard_read_model(user_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Eén key lookup; bij een ontbrekende snapshot wordt hij direct opgebouwd.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None
+
+    try:
+        # Tabel nog niet gemigreerd → live opbouwen zonder opslaan
+        if not table_exists(conn, "dashboard_snapshots"):
+            return json.loads(json.dumps(
+                build_dashboard_payload(conn, user_id),
+                default=json_default,
+            ))
+
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT payload FROM dashboard_snapshots WHERE user_id = %s",
+                (user_id,),
+            )
+            row = cur.fetchone()
+
+        if row:
+            return row[0]
+
+        payload = _store(conn, user_id, build_dashboard_payload(conn, user_id))
+        conn.commit()
+        return payload
+
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
@@ -0,0 +1,162 @@
+import os
+import json
+import glob
+import asyncio
+import hashlib
+import logging
+import threading
+import weakref
+from datetime import date
+from typing import Any, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# =====================================================
+# 📦 PDF ARTEFACT CACHE
+#
+# Gerenderde rapport-PDF's worden één keer opgeslagen onder
+#   PDF_OUTPUT_DIR/cache/<type>/<user_id>/<datum>_<hash>.pdf
+#
+# hash = sha256 van de rapportrij (+ PDF_CACHE_VERSION voor
+# template-wijzigingen) → ook de ETag. Zelfde inhoud = zelfde
+# bestand; een geregenereerd rapport krijgt automatisch een
+# nieuwe hash, en invalidate_report_pdfs() ruimt de oude op.
+# =====================================================
+
+PDF_OUTPUT_DIR = os.getenv("PDF_OUTPUT_DIR", "/var/reports")
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(PDF_OUTPUT_DIR, "cache"))
+PDF_CACHE_VERSION = os.getenv("PDF_CACHE_VERSION", "1")
+
+REPORT_TYPES = ("daily", "weekly", "monthly", "quarterly")
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stored": 0, "invalidated": 0, "not_modified": 0}
+
+_render_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _count(key: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[key] += n
+
+
+# =====================================================
+# 🔑 KEYS + ETAG
+# =====================================================
+def content_hash(report: Dict[str, Any]) -> str:
+    payload = json.dumps(report, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(f"{PDF_CACHE_VERSION}:{payload}".encode("utf-8")).hexdigest()[:32]
+
+
+def etag_for(digest: str) -> str:
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match: lijst, wildcard en weak-validators (W/)."""
+    if not if_none_match:
+        return False
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _report_dir(report_type: str, user_id: int) -> str:
+    if report_type not in REPORT_TYPES:
+        raise ValueError(f"Onbekend rapporttype: {report_type}")
+    return os.path.join(PDF_CACHE_DIR, report_type, str(int(user_id)))
+
+
+def cache_path(report_type: str, user_id: int, report_date: Union[str, date], digest: str) -> str:
+    return os.path.join(_report_dir(report_type, user_id), f"{report_date}_{digest}.pdf")
+
+
+# =====================================================
+# 📥 LEZEN / SCHRIJVEN
+# =====================================================
+def get_cached_pdf(report_type: str, user_id: int, report_date: Union[str, date], digest: str) -> Optional[str]:
+    path = cache_path(report_type, user_id, report_date, digest)
+    if os.path.isfile(path):
+        _count("hits")
+        return path
+    _count("misses")
+    return None
+
+
+def store_pdf(
+    report_type: str,
+    user_id: int,
+    report_date: Union[str, date],
+    digest: str,
+    pdf_bytes: bytes,
+) -> str:
+    """Atomisch wegschrijven; oudere versies van dezelfde datum verdwijnen."""
+    path = cache_path(report_type, user_id, report_date, digest)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(pdf_bytes)
+    os.replace(tmp, path)
+    _count("stored")
+
+    _remove_versions(report_type, user_id, report_date, keep=path)
+    return path
+
+
+def _remove_versions(report_type: str, user_id: int, report_date: Union[str, date], keep: Optional[str] = None) -> int:
+    pattern = os.path.join(_report_dir(report_type, user_id), f"{glob.escape(str(report_date))}_*.pdf")
+    removed = 0
+    for path in glob.glob(pattern):
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def invalidate_report_pdfs(report_type: str, user_id: int, report_date: Union[str, date]) -> int:
+    """Na (her)generatie van een rapport: gecachte PDF's van die datum weg."""
+    try:
+        removed = _remove_versions(report_type, user_id, report_date)
+    except Exception:
+        logger.warning("⚠️ PDF cache invalidatie mislukt", exc_info=True)
+        return 0
+
+    if removed:
+        _count("invalidated", removed)
+        logger.info(f"🧹 PDF cache | {report_type} user={user_id} {report_date} → {removed} verwijderd")
+    return removed
+
+
+def render_lock(key: str) -> asyncio.Lock:
+    """Eén render per key tegelijk (binnen dit proces)."""
+    lock = _render_locks.get(key)
+    if lock is None:
+        lock = asyncio.Lock()
+        _render_locks[key] = lock
+    return lock
+
+
+def record_not_modified() -> None:
+    _count("not_modified")
+
+
+def get_pdf_cache_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    stats["dir"] = PDF_CACHE_DIR
+    return stats
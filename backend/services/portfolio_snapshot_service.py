@@ -3,6 +3,7 @@ from datetime import datetime
 from typing import Literal, List, Tuple
 
 from backend.utils.db import get_db_connection
+from backend.services.bot_balance_service import get_user_bot_balances
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -75,6 +76,9 @@ def snapshot_all_for_user(
 
             bots: List[Tuple[int, float]] = cur.fetchall()
 
+            # Ledger totalen voor alle bots uit bot_balances (één query)
+            balances = get_user_bot_balances(conn, user_id, ts.date())
+
             # =====================================================
             # 🔁 PER BOT
             # =====================================================
@@ -85,24 +89,10 @@ def snapshot_all_for_user(
 
             for bot_id, budget_total in bots:
 
-                cur.execute("""
-                    SELECT
-                        COALESCE(SUM(qty_delta),0),
-                        COALESCE(SUM(cash_delta_eur),0),
-                        COALESCE(SUM(
-                            CASE
-                                WHEN entry_type='execute'
-                                     AND cash_delta_eur < 0
-                                THEN ABS(cash_delta_eur)
-                                ELSE 0
-                            END
-                        ),0)
-                    FROM bot_ledger
-                    WHERE user_id=%s
-                      AND bot_id=%s
-                """, (user_id, bot_id))
-
-                net_qty, net_cash_delta, invested_eur = cur.fetchone() or (0,0,0)
+                balance = balances.get(int(bot_id), {})
+                net_qty = balance.get("net_qty", 0.0)
+                net_cash_delta = balance.get("net_cash_delta_eur", 0.0)
+                invested_eur = balance.get("bought_eur", 0.0)
 
                 net_qty = float(net_qty or 0)
                 net_cash_delta = float(net_cash_delta or 0)
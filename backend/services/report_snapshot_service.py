@@ -92,3 +92,64 @@ def create_report_snapshot(
 
     finally:
         conn.close()
+
+
+def get_print_token(
+    user_id: int,
+    report_type: str,
+    report_id: int,
+    report_json: dict,
+) -> str:
+    """
+    Print-token voor directe (API) PDF-export, zonder Celery-job.
+    Bestaande snapshot wordt hergebruikt en bijgewerkt met de
+    actuele report_json, zodat de print route nooit verouderd is.
+    """
+
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("DB unavailable")
+
+    valid_until = datetime.utcnow() + timedelta(days=7)
+    payload = json.dumps(report_json, default=str)
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE report_snapshots
+                SET report_json = %s,
+                    valid_until = GREATEST(valid_until, %s),
+                    status = 'ready'
+                WHERE user_id=%s
+                  AND report_type=%s
+                  AND report_id=%s
+                RETURNING token
+                """,
+                (payload, valid_until, user_id, report_type, report_id),
+            )
+            row = cur.fetchone()
+
+            if row:
+                token = row[0]
+            else:
+                token = secrets.token_urlsafe(32)
+                cur.execute(
+                    """
+                    INSERT INTO report_snapshots
+                    (user_id, report_type, report_id, token, report_json, valid_until, status)
+                    VALUES (%s,%s,%s,%s,%s,%s,'ready')
+                    """,
+                    (user_id, report_type, report_id, token, payload, valid_until),
+                )
+
+        conn.commit()
+        return token
+
+    except Exception:
+        conn.rollback()
+        logger.exception("❌ Print token failed")
+        raise
+
+    finally:
+        conn.close()
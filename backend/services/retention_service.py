@@ -0,0 +1,486 @@
+import os
+import re
+import json
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# =====================================================
+# 🗂️ TIME-SERIES: MAANDPARTITIES + RETENTIE / ROLLUP
+#
+# Append-only tabellen zijn RANGE-gepartitioneerd per maand
+# (<tabel>_pYYYYMM + <tabel>_default als vangnet).
+#
+# Per tabel een policy in data_retention_policies:
+#   raw_days         → zoveel dagen alle rijen bewaren
+#   daarna           → één rij per groep per dag (de laatste)
+#   drop_after_days  → hele maandpartities weg (NULL = nooit)
+#
+# Snapshot-tabellen hebben al een '1d' bucket: daar wordt de
+# laatste '1h' rij van de dag naar '1d' gepromoveerd (als die
+# nog ontbreekt) en de '1h' rijen verwijderd.
+#
+# Voortgang per tabel in rolled_up_until → elke run verwerkt
+# alleen nieuwe dagen (max. RETENTION_MAX_DAYS_PER_RUN).
+# =====================================================
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "2"))
+RETENTION_MAX_DAYS_PER_RUN = int(os.getenv("RETENTION_MAX_DAYS_PER_RUN", "31"))
+
+# ts = partitiesleutel, group = één rij per groep per dag
+TIME_SERIES_TABLES: Dict[str, Dict[str, Any]] = {
+    "market_data": {
+        "ts": "timestamp",
+        "group": ["symbol"],
+    },
+    "macro_data": {
+        "ts": "timestamp",
+        "group": ["user_id", "name"],
+    },
+    "technical_indicators": {
+        "ts": "timestamp",
+        "group": ["user_id", "indicator"],
+    },
+    "market_data_indicators": {
+        "ts": "timestamp",
+        "group": ["user_id", "name"],
+    },
+    "portfolio_balance_snapshots": {
+        "ts": "ts",
+        "group": ["user_id"],
+        "buckets": ("1h", "1d"),
+        "values": ["equity_eur", "cash_eur", "btc_qty", "btc_value_eur", "invested_eur", "unrealized_pnl_eur"],
+    },
+    "bot_portfolio_snapshots": {
+        "ts": "ts",
+        "group": ["user_id", "bot_id"],
+        "buckets": ("1h", "1d"),
+        "values": ["symbol", "net_qty", "cash_eur", "price_eur", "equity_eur", "invested_eur"],
+    },
+}
+
+_PARTITION_SUFFIX = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+# =====================================================
+# 📅 MAANDEN
+# =====================================================
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + (d.month - 1) + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def months_between(first: date, last: date) -> List[date]:
+    months, current = [], month_start(first)
+    while current <= month_start(last):
+        months.append(current)
+        current = add_months(current, 1)
+    return months
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month.year:04d}{month.month:02d}"
+
+
+def partition_month(table: str, name: str) -> Optional[date]:
+    if not name.startswith(f"{table}_p"):
+        return None
+    match = _PARTITION_SUFFIX.search(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def default_partition(table: str) -> str:
+    return f"{table}_default"
+
+
+# =====================================================
+# 🔎 CATALOGUS
+# =====================================================
+def is_partitioned(cur, table: str) -> bool:
+    cur.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s));",
+        (table,),
+    )
+    return bool(cur.fetchone()[0])
+
+
+def list_partitions(cur, table: str) -> List[str]:
+    cur.execute(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+        ORDER BY c.relname;
+        """,
+        (table,),
+    )
+    return [r[0] for r in cur.fetchall()]
+
+
+# =====================================================
+# 🧱 PARTITIES AANMAKEN
+# =====================================================
+def ensure_partition(cur, table: str, month: date) -> bool:
+    """
+    Maakt de maandpartitie aan als die ontbreekt. Rijen die al in de
+    default-partitie beland waren verhuizen mee (anders weigert
+    Postgres de nieuwe partitie). True als er iets is aangemaakt.
+    """
+    name = partition_name(table, month)
+    if name in list_partitions(cur, table):
+        return False
+
+    ts = TIME_SERIES_TABLES[table]["ts"]
+    lower, upper = month, add_months(month, 1)
+    default = default_partition(table)
+
+    cur.execute(f"CREATE TABLE IF NOT EXISTS {name} (LIKE {table} INCLUDING DEFAULTS);")
+    cur.execute(
+        f"""
+        WITH moved AS (
+            DELETE FROM {default}
+            WHERE {ts} >= %s AND {ts} < %s
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved;
+        """,
+        (lower, upper),
+    )
+    cur.execute(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s);",
+        (lower, upper),
+    )
+    logger.info(f"🗂️ Partitie {name} aangemaakt")
+    return True
+
+
+def ensure_partitions(cur, table: str, today: Optional[date] = None, months_ahead: Optional[int] = None) -> List[str]:
+    today = today or date.today()
+    months_ahead = PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+
+    created = []
+    for month in months_between(today, add_months(today, months_ahead)):
+        if ensure_partition(cur, table, month):
+            created.append(partition_name(table, month))
+    return created
+
+
+# =====================================================
+# 🔁 CONVERSIE (eenmalig, vanuit migratie)
+# =====================================================
+def _constraint_columns(definition: str) -> List[str]:
+    columns = definition[definition.index("(") + 1:definition.index(")")]
+    return [c.strip().strip('"') for c in columns.split(",")]
+
+
+def partition_blockers(
+    table: str,
+    constraints: List[Tuple[str, str, str]],
+    referenced_by: List[str],
+) -> List[str]:
+    """
+    Wat een conversie zou laten verdwijnen of breken:
+    - UNIQUE zonder partitiesleutel (kan niet op een partitietabel)
+    - exclusion constraints
+    - foreign keys van andere tabellen naar deze tabel (de PK krijgt
+      de partitiesleutel erbij → de FK klopt niet meer)
+    """
+    ts = TIME_SERIES_TABLES[table]["ts"]
+    problems = []
+
+    for name, kind, definition in constraints:
+        if kind == "u" and ts not in _constraint_columns(definition):
+            problems.append(f"UNIQUE {name} {definition} bevat {ts} niet")
+        elif kind == "x":
+            problems.append(f"exclusion constraint {name}")
+
+    for name in referenced_by:
+        problems.append(f"foreign key {name} verwijst naar {table}")
+
+    return problems
+
+
+def convert_to_partitioned(cur, table: str, today: Optional[date] = None) -> bool:
+    """
+    Zet een gewone tabel om naar een maand-gepartitioneerde tabel met
+    dezelfde naam, kolommen, defaults, sequences, indexes en
+    constraints (PK / UNIQUE / CHECK / FK). PK krijgt de
+    partitiesleutel erbij (eis van Postgres).
+
+    Eén transactie per tabel: de ACCESS EXCLUSIVE lock duurt alleen
+    zo lang als deze tabel; bij een fout blijft de oude tabel staan.
+    ValueError als een constraint niet mee kan (zie partition_blockers).
+    """
+    if is_partitioned(cur, table):
+        return False
+
+    ts = TIME_SERIES_TABLES[table]["ts"]
+    old = f"{table}_unpartitioned"
+    today = today or date.today()
+
+    # Index- en constraintdefinities vóór het hernoemen vastleggen
+    cur.execute(
+        """
+        SELECT c.conname, c.contype, pg_get_constraintdef(c.oid)
+        FROM pg_constraint c
+        WHERE c.conrelid = to_regclass(%s) AND c.contype IN ('p', 'u', 'c', 'f', 'x')
+        ORDER BY c.conname;
+        """,
+        (table,),
+    )
+    constraints = cur.fetchall()
+    cur.execute(
+        """
+        SELECT c.conname
+        FROM pg_constraint c
+        WHERE c.confrelid = to_regclass(%s) AND c.contype = 'f' AND c.conrelid <> c.confrelid;
+        """,
+        (table,),
+    )
+    referenced_by = [r[0] for r in cur.fetchall()]
+
+    problems = partition_blockers(table, constraints, referenced_by)
+    if problems:
+        raise ValueError(f"{table} kan niet gepartitioneerd worden: " + "; ".join(problems))
+
+    cur.execute(
+        """
+        SELECT i.indexname, i.indexdef
+        FROM pg_indexes i
+        WHERE i.schemaname = current_schema() AND i.tablename = %s
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_constraint c
+              WHERE c.conindid = to_regclass(i.indexname)
+          );
+        """,
+        (table,),
+    )
+    indexes = cur.fetchall()
+
+    cur.execute(f"ALTER TABLE {table} RENAME TO {old};")
+    cur.execute(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE ({ts});")
+    cur.execute(f"CREATE TABLE {default_partition(table)} PARTITION OF {table} DEFAULT;")
+
+    cur.execute(f"SELECT MIN({ts})::date FROM {old};")
+    oldest = cur.fetchone()[0] or today
+    for month in months_between(oldest, add_months(today, PARTITION_MONTHS_AHEAD)):
+        cur.execute(
+            f"CREATE TABLE {partition_name(table, month)} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s);",
+            (month, add_months(month, 1)),
+        )
+
+    cur.execute(f"INSERT INTO {table} SELECT * FROM {old};")
+
+    # SERIAL-sequences verhuizen mee, anders verdwijnen ze met de oude tabel
+    cur.execute(
+        """
+        SELECT column_name, pg_get_serial_sequence(%s, column_name)
+        FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s;
+        """,
+        (old, old),
+    )
+    for column, sequence in cur.fetchall():
+        if sequence:
+            cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.{column};")
+
+    cur.execute(f"DROP TABLE {old};")
+
+    # Sleutels eerst (FK's van deze tabel naar zichzelf hebben ze nodig)
+    order = {"p": 0, "u": 1, "c": 2, "f": 3}
+    for name, kind, definition in sorted(constraints, key=lambda c: order[c[1]]):
+        if kind in ("p", "u"):
+            columns = _constraint_columns(definition)
+            if ts not in columns:
+                # alleen PK (UNIQUE is hierboven al geweigerd)
+                columns.append(ts)
+                cur.execute(f"UPDATE {table} SET {ts} = 'epoch' WHERE {ts} IS NULL;")
+            keyword = "PRIMARY KEY" if kind == "p" else "UNIQUE"
+            quoted = ", ".join(f'"{c}"' for c in columns)
+            cur.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {keyword} ({quoted});")
+        else:
+            cur.execute(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition};")
+
+    for _, definition in indexes:
+        cur.execute(definition)
+
+    cur.connection.commit()
+    logger.info(f"🗂️ {table} omgezet naar maandpartities")
+    return True
+
+
+# =====================================================
+# 📉 ROLLUP (één dag)
+# =====================================================
+def rollup_day(cur, table: str, day: date) -> int:
+    """Reduceert `day` tot één rij per groep; geeft aantal verwijderde rijen."""
+    spec = TIME_SERIES_TABLES[table]
+    ts = spec["ts"]
+    group = ", ".join(spec["group"])
+    window = {"start": day, "end": day + timedelta(days=1)}
+
+    if "buckets" in spec:
+        raw_bucket, daily_bucket = spec["buckets"]
+        values = ", ".join(spec["values"])
+        cur.execute(
+            f"""
+            INSERT INTO {table} ({group}, {values}, bucket, {ts})
+            SELECT DISTINCT ON ({group}) {group}, {values}, %(daily)s, %(start)s::timestamp
+            FROM {table}
+            WHERE bucket = %(raw)s AND {ts} >= %(start)s AND {ts} < %(end)s
+            ORDER BY {group}, {ts} DESC
+            ON CONFLICT ({group}, bucket, {ts}) DO NOTHING;
+            """,
+            dict(window, raw=raw_bucket, daily=daily_bucket),
+        )
+        cur.execute(
+            f"DELETE FROM {table} WHERE bucket = %(raw)s AND {ts} >= %(start)s AND {ts} < %(end)s;",
+            dict(window, raw=raw_bucket),
+        )
+        return cur.rowcount
+
+    cur.execute(
+        f"""
+        DELETE FROM {table}
+        WHERE {ts} >= %(start)s AND {ts} < %(end)s
+          AND (tableoid, ctid) IN (
+              SELECT tableoid, ctid
+              FROM (
+                  SELECT tableoid, ctid,
+                         ROW_NUMBER() OVER (PARTITION BY {group} ORDER BY {ts} DESC) AS rn
+                  FROM {table}
+                  WHERE {ts} >= %(start)s AND {ts} < %(end)s
+              ) ranked
+              WHERE rn > 1
+          );
+        """,
+        window,
+    )
+    return cur.rowcount
+
+
+def rollup_days(policy: Dict[str, Any], oldest: Optional[date], today: date) -> List[date]:
+    """Dagen die deze run gerollupt moeten worden (oudste eerst, begrensd)."""
+    cutoff = today - timedelta(days=int(policy["raw_days"]))
+    done = policy.get("rolled_up_until")
+    first = done + timedelta(days=1) if done else oldest
+
+    if first is None or first >= cutoff:
+        return []
+
+    days = []
+    while first < cutoff and len(days) < RETENTION_MAX_DAYS_PER_RUN:
+        days.append(first)
+        first += timedelta(days=1)
+    return days
+
+
+def expired_partitions(table: str, partitions: List[str], policy: Dict[str, Any], today: date) -> List[str]:
+    """Maandpartities die volledig ouder zijn dan drop_after_days."""
+    if not policy.get("drop_after_days"):
+        return []
+
+    cutoff = today - timedelta(days=int(policy["drop_after_days"]))
+    expired = []
+    for name in partitions:
+        month = partition_month(table, name)
+        if month is not None and add_months(month, 1) <= cutoff:
+            expired.append(name)
+    return expired
+
+
+# =====================================================
+# 🚀 RUN (alle policies)
+# =====================================================
+def load_policies(cur) -> List[Dict[str, Any]]:
+    cur.execute(
+        """
+        SELECT table_name, raw_days, drop_after_days, enabled, rolled_up_until
+        FROM data_retention_policies
+        ORDER BY table_name;
+        """
+    )
+    policies = []
+    for table, raw_days, drop_after_days, enabled, rolled_up_until in cur.fetchall():
+        if table not in TIME_SERIES_TABLES:
+            logger.warning(f"⚠️ Retentie-policy voor onbekende tabel '{table}' genegeerd")
+            continue
+        policies.append({
+            "table_name": table,
+            "raw_days": raw_days,
+            "drop_after_days": drop_after_days,
+            "enabled": enabled,
+            "rolled_up_until": rolled_up_until,
+        })
+    return policies
+
+
+def run_retention_for_table(conn, policy: Dict[str, Any], today: Optional[date] = None) -> Dict[str, Any]:
+    """Partities bijmaken, dagen rollupen (commit per dag), oude partities droppen."""
+    table = policy["table_name"]
+    ts = TIME_SERIES_TABLES[table]["ts"]
+    today = today or date.today()
+    result: Dict[str, Any] = {"created": [], "days": 0, "deleted": 0, "dropped": []}
+
+    with conn.cursor() as cur:
+        if is_partitioned(cur, table):
+            result["created"] = ensure_partitions(cur, table, today)
+        conn.commit()
+
+        oldest = None
+        if policy.get("rolled_up_until") is None:
+            cur.execute(f"SELECT MIN({ts})::date FROM {table};")
+            oldest = cur.fetchone()[0]
+
+        for day in rollup_days(policy, oldest, today):
+            result["deleted"] += rollup_day(cur, table, day)
+            result["days"] += 1
+            cur.execute(
+                "UPDATE data_retention_policies SET rolled_up_until = %s WHERE table_name = %s;",
+                (day, table),
+            )
+            conn.commit()
+
+        for name in expired_partitions(table, list_partitions(cur, table), policy, today):
+            cur.execute(f"ALTER TABLE {table} DETACH PARTITION {name};")
+            cur.execute(f"DROP TABLE {name};")
+            result["dropped"].append(name)
+
+        cur.execute(
+            """
+            UPDATE data_retention_policies
+            SET last_run_at = NOW(), last_result = %s
+            WHERE table_name = %s;
+            """,
+            (json.dumps(result), table),
+        )
+        conn.commit()
+
+    return result
+
+
+def run_retention(conn, today: Optional[date] = None) -> Dict[str, Any]:
+    with conn.cursor() as cur:
+        policies = load_policies(cur)
+    conn.commit()
+
+    results: Dict[str, Any] = {}
+    for policy in policies:
+        if not policy["enabled"]:
+            continue
+        try:
+            results[policy["table_name"]] = run_retention_for_table(conn, policy, today)
+        except Exception as e:
+            conn.rollback()
+            logger.exception(f"❌ Retentie mislukt voor {policy['table_name']}")
+            results[policy["table_name"]] = {"error": str(e)}
+
+    return results
@@ -0,0 +1,49 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.utils.async_db import get_db_pool_stats, run_db
+
+
+def _slow_query(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def test_event_loop_stays_responsive():
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        t = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        results = await asyncio.gather(*(run_db(_slow_query, 0.1) for _ in range(4)))
+        elapsed = time.perf_counter() - started
+        t.cancel()
+        return results, elapsed, ticks
+
+    results, elapsed, ticks = asyncio.run(scenario())
+
+    assert results == [0.1] * 4
+    assert elapsed < 0.35
+    assert ticks >= 5
+
+
+def test_exceptions_propagate_and_are_counted():
+    def boom():
+        raise ValueError("kapot")
+
+    before = get_db_pool_stats()["errors"]
+
+    with pytest.raises(ValueError):
+        asyncio.run(run_db(boom))
+
+    stats = get_db_pool_stats()
+    assert stats["errors"] == before + 1
+    assert stats["in_flight"] == 0
@@ -0,0 +1,216 @@
+from datetime import timedelta
+
+import pytest
+
+import asyncio
+
+from fastapi import HTTPException
+
+from backend.utils import auth_utils
+from backend.utils.auth_utils import (
+    clear_token_cache,
+    create_access_token,
+    create_token,
+    get_current_admin,
+    get_current_user,
+    get_token_cache_stats,
+    require_metrics_access,
+    is_refresh_token_revoked,
+    revoke_token,
+    sync_revocations,
+    verify_token_cached,
+)
+from backend.utils.redis_client import set_redis
+
+
+class FakeRedis:
+    """Gedeelde store = andere workers zien dezelfde revocations."""
+
+    def __init__(self):
+        self.data = {}
+        self.zsets = {}
+        self.calls = 0
+
+    def set(self, key, value, ex=None):
+        self.calls += 1
+        self.data[key] = value
+        return True
+
+    def get(self, key):
+        self.calls += 1
+        return self.data.get(key)
+
+    def zadd(self, key, mapping):
+        self.calls += 1
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zremrangebyscore(self, key, low, high):
+        self.calls += 1
+        zset = self.zsets.get(key, {})
+        low = float(low)
+        for member in [m for m, score in zset.items() if low <= score <= float(high)]:
+            del zset[member]
+
+    def zrangebyscore(self, key, low, high, withscores=False):
+        self.calls += 1
+        items = sorted(
+            ((m, score) for m, score in self.zsets.get(key, {}).items() if float(low) <= score <= float(high)),
+            key=lambda item: item[1],
+        )
+        return items if withscores else [m for m, _ in items]
+
+
+class DownRedis:
+    def __getattr__(self, name):
+        raise ConnectionError("redis down")
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache(monkeypatch):
+    # Geen achtergrond-sync in tests; sync_revocations() wordt expliciet aangeroepen
+    monkeypatch.setattr(auth_utils, "_ensure_revocation_sync", lambda: None)
+    clear_token_cache()
+    yield
+    clear_token_cache()
+
+
+def test_second_verify_is_a_hit():
+    token = create_access_token({"sub": "7"})
+
+    assert verify_token_cached(token)["sub"] == "7"
+    assert verify_token_cached(token)["sub"] == "7"
+
+    stats = get_token_cache_stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_invalid_token_is_not_cached():
+    with pytest.raises(ValueError):
+        verify_token_cached("not-a-jwt")
+
+    assert get_token_cache_stats()["size"] == 0
+
+
+def test_entry_expires_at_token_exp(monkeypatch):
+    token = create_token({"sub": "1"}, timedelta(seconds=60), "access")
+    payload = verify_token_cached(token)
+
+    monkeypatch.setattr(auth_utils.time, "time", lambda: payload["exp"] + 1)
+    verify_token_cached(token)
+
+    # Verlopen entry → opnieuw verifiëren i.p.v. cache hit
+    assert get_token_cache_stats()["hits"] == 0
+    assert get_token_cache_stats()["misses"] == 2
+
+
+@pytest.fixture
+def fake_redis():
+    client = FakeRedis()
+    set_redis(client)
+    yield client
+    set_redis(None)
+
+
+def _current_user(token):
+    return asyncio.run(get_current_user(access_token=token))
+
+
+def _other_worker():
+    """Lege lokale state = een ander proces dat alleen via Redis synct."""
+    clear_token_cache()
+
+
+def test_revocation_check_does_no_redis_io(fake_redis):
+    token = create_access_token({"sub": "1"})
+    calls = fake_redis.calls
+
+    for _ in range(5):
+        assert _current_user(token)["id"] == 1
+
+    assert fake_redis.calls == calls
+
+
+def test_revoked_token_is_rejected_here_and_after_sync_elsewhere(fake_redis):
+    token = create_access_token({"sub": "1"})
+    assert _current_user(token)["id"] == 1
+
+    assert revoke_token(token)
+    with pytest.raises(HTTPException) as exc:
+        _current_user(token)
+    assert exc.value.status_code == 401
+
+    _other_worker()
+    verify_token_cached(token)
+    assert _current_user(token)["id"] == 1  # nog niet gesynct
+
+    assert sync_revocations() == 1
+    with pytest.raises(HTTPException):
+        _current_user(token)
+
+    # andere tokens blijven geldig
+    assert _current_user(create_access_token({"sub": "3"}))["id"] == 3
+
+
+def test_rotation_grace_and_refresh_token_revocation(fake_redis, monkeypatch):
+    access = create_access_token({"sub": "2"})
+    refresh = create_token({"sub": "2"}, timedelta(days=1), "refresh")
+
+    assert revoke_token(access, grace_s=10)
+    assert revoke_token(refresh, grace_s=10)
+
+    # binnen de grace nog geldig (parallelle requests / tabs)
+    assert _current_user(access)["id"] == 2
+    assert not is_refresh_token_revoked(refresh)
+
+    now = auth_utils.time.time()
+    monkeypatch.setattr(auth_utils.time, "time", lambda: now + 11)
+    with pytest.raises(HTTPException):
+        _current_user(access)
+    assert is_refresh_token_revoked(refresh)
+
+
+def test_redis_down_fails_open():
+    set_redis(DownRedis())
+    try:
+        assert sync_revocations() == 0
+        assert not is_refresh_token_revoked(create_token({"sub": "4"}, timedelta(days=1), "refresh"))
+        assert _current_user(create_access_token({"sub": "4"}))["id"] == 4
+        assert get_token_cache_stats()["revocation_sync_healthy"] is False
+    finally:
+        set_redis(None)
+        auth_utils._revocation_state["healthy"] = True
+
+
+def test_admin_dependency_checks_role():
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(get_current_admin({"id": 1, "role": "user"}))
+    assert exc.value.status_code == 403
+
+    assert asyncio.run(get_current_admin({"id": 1, "role": "admin"}))["id"] == 1
+
+
+def test_metrics_access_needs_scrape_token_or_admin(monkeypatch):
+    monkeypatch.setattr(auth_utils, "METRICS_SCRAPE_TOKEN", "s3cret")
+
+    asyncio.run(require_metrics_access("Bearer s3cret", None))
+
+    for header in (None, "Bearer wrong"):
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(require_metrics_access(header, None))
+        assert exc.value.status_code == 401
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(require_metrics_access(None, create_access_token({"sub": "1", "role": "user"})))
+    assert exc.value.status_code == 403
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(auth_utils, "TOKEN_CACHE_SIZE", 2)
+
+    for i in range(3):
+        verify_token_cached(create_access_token({"sub": str(i)}))
+
+    stats = get_token_cache_stats()
+    assert stats["size"] == 2
+    assert stats["evictions"] == 1
@@ -0,0 +1,48 @@
+from backend.services.bot_balance_service import apply_ledger_delta
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.calls = []
+
+    def execute(self, sql, params=None):
+        self.calls.append((sql, params))
+
+
+def test_execute_buy_updates_totals_and_day_bucket():
+    cur = RecordingCursor()
+
+    apply_ledger_delta(
+        cur, user_id=1, bot_id=2, entry_type="execute",
+        cash_delta_eur=-100.0, qty_delta=0.002, symbol="BTC",
+    )
+
+    (totals_sql, totals), (days_sql, days) = cur.calls
+    assert "bot_balances" in totals_sql
+    assert totals == (1, 2, "BTC", -100.0, 0.002, -100.0, 100.0)
+    assert "bot_balance_days" in days_sql
+    assert days == (1, 2, "BTC", -100.0, 0.002, 100.0, 0.0)
+
+
+def test_reserve_counts_as_reserved_not_spent():
+    cur = RecordingCursor()
+
+    apply_ledger_delta(cur, user_id=1, bot_id=2, entry_type="reserve", cash_delta_eur=-50)
+
+    _, totals = cur.calls[0]
+    _, days = cur.calls[1]
+    assert totals[2] == "BTC"
+    assert totals[5:] == (0.0, 0.0)
+    assert days[5:] == (0.0, 50.0)
+
+
+def test_sell_is_not_counted_as_bought():
+    cur = RecordingCursor()
+
+    apply_ledger_delta(
+        cur, user_id=1, bot_id=2, entry_type="execute",
+        cash_delta_eur=120.0, qty_delta=-0.002,
+    )
+
+    _, totals = cur.calls[0]
+    assert totals[5:] == (120.0, 0.0)
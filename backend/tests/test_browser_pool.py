@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+from backend.utils import browser_pool as bp
+
+
+class FakePage:
+    def __init__(self, fail=False):
+        self.closed = False
+        self.fail = fail
+        self.gotos = 0
+
+    def is_closed(self):
+        return self.closed
+
+    async def goto(self, url, **kwargs):
+        self.gotos += 1
+        if "fail" in url:
+            raise RuntimeError("navigation failed")
+        if "slow" in url:
+            await asyncio.sleep(0.05)
+
+    async def wait_for_selector(self, selector, **kwargs):
+        pass
+
+    async def wait_for_timeout(self, ms):
+        pass
+
+    async def pdf(self, **options):
+        return b"%PDF-" + options["format"].encode()
+
+
+class FakeContext:
+    def __init__(self):
+        self.page = FakePage()
+        self.closed = False
+
+    async def new_page(self):
+        return self.page
+
+    async def clear_cookies(self):
+        pass
+
+    async def close(self):
+        self.closed = True
+        self.page.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **kwargs):
+        context = FakeContext()
+        self.contexts.append(context)
+        return context
+
+    async def close(self):
+        self.connected = False
+
+
+class FakePool(bp.BrowserPool):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.browsers = []
+
+    async def _launch(self):
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+
+def test_pages_are_reused_and_contexts_recycled():
+    pool = FakePool(max_contexts=1, context_recycle=3, browser_recycle=100)
+
+    async def run():
+        for _ in range(4):
+            assert await pool.render("http://print/ok", settle_ms=0) == b"%PDF-A4"
+
+    asyncio.run(run())
+
+    browser = pool.browsers[0]
+    assert len(pool.browsers) == 1
+    # 3 renders op context 1, daarna gerecycled → 4e op een nieuwe
+    assert len(browser.contexts) == 2
+    assert browser.contexts[0].page.gotos == 3
+    assert browser.contexts[0].closed
+    assert pool.snapshot()["renders"] == 4
+
+
+def test_failed_render_discards_context_and_dead_browser_is_relaunched():
+    pool = FakePool(max_contexts=1)
+
+    async def run():
+        with pytest.raises(bp.PdfRenderError):
+            await pool.render("http://print/fail", settle_ms=0)
+
+        pool.browsers[0].connected = False
+        await pool.render("http://print/ok", settle_ms=0)
+
+    asyncio.run(run())
+
+    assert pool.browsers[0].contexts[0].closed
+    assert len(pool.browsers) == 2
+    assert pool.stats["failed"] == 1
+    assert pool.stats["browser_launches"] == 2
+
+
+def test_browser_recycled_after_n_renders():
+    pool = FakePool(max_contexts=1, browser_recycle=2)
+
+    async def run():
+        for _ in range(3):
+            await pool.render("http://print/ok", settle_ms=0)
+
+    asyncio.run(run())
+
+    assert len(pool.browsers) == 2
+    assert not pool.browsers[0].connected
+
+
+def test_queue_backpressure_rejects_when_full():
+    pool = FakePool(max_contexts=1, queue_max=1, queue_timeout_s=5)
+
+    async def run():
+        return await asyncio.gather(
+            *(pool.render("http://print/slow", settle_ms=0) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(run())
+
+    busy = [r for r in results if isinstance(r, bp.PdfBusyError)]
+    assert len(busy) == 1
+    assert pool.stats["renders"] == 2
+    # nooit meer contexts dan max_contexts
+    assert len(pool.browsers[0].contexts) == 1
@@ -0,0 +1,70 @@
+import pytest
+from fastapi import Depends, FastAPI, Response
+from fastapi.testclient import TestClient
+
+from backend.utils.chart_format import MSGPACK_MEDIA_TYPE, chart_format, render_chart, to_columnar
+
+
+ROWS = [
+    {"ts": "2024-01-01T00:00:00", "equity": 100.0},
+    {"ts": "2024-01-01T01:00:00", "equity": 101.5, "cash": 5.0},
+]
+
+
+def test_to_columnar_keeps_order_and_fills_missing():
+    cols = to_columnar(ROWS)
+
+    assert list(cols) == ["ts", "equity", "cash"]
+    assert cols["equity"] == [100.0, 101.5]
+    assert cols["cash"] == [None, 5.0]
+
+
+def test_to_columnar_empty():
+    assert to_columnar([]) == {}
+
+
+def _client():
+    app = FastAPI()
+
+    @app.get("/chart")
+    def chart(fmt: str = Depends(chart_format)):
+        return render_chart(ROWS, fmt)
+
+    @app.get("/paged")
+    def paged(response: Response, fmt: str = Depends(chart_format)):
+        response.headers["X-Next-Cursor"] = "abc"
+        return render_chart(ROWS, fmt, response)
+
+    return TestClient(app)
+
+
+def test_default_format_is_rows():
+    assert _client().get("/chart").json() == ROWS
+
+
+def test_columnar_format():
+    body = _client().get("/chart", params={"format": "columnar"}).json()
+
+    assert body["ts"] == [r["ts"] for r in ROWS]
+
+
+def test_unknown_format_is_rejected():
+    assert _client().get("/chart", params={"format": "xml"}).status_code == 422
+
+
+def test_json_response_varies_on_accept():
+    res = _client().get("/paged")
+
+    assert res.headers["vary"] == "Accept"
+    assert res.headers["x-next-cursor"] == "abc"
+
+
+def test_binary_response_keeps_route_headers():
+    msgpack = pytest.importorskip("msgpack")
+
+    res = _client().get("/paged", headers={"Accept": MSGPACK_MEDIA_TYPE})
+
+    assert res.headers["content-type"] == MSGPACK_MEDIA_TYPE
+    assert res.headers["x-next-cursor"] == "abc"
+    assert res.headers["vary"] == "Accept"
+    assert msgpack.unpackb(res.content)["equity"] == [100.0, 101.5]
@@ -0,0 +1,135 @@
+from backend.ai_core.context_budget import (
+    estimate_tokens,
+    fit_context_to_budget,
+    shrink_to_tokens,
+)
+
+
+def test_estimate_tokens_text_and_json():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens(None) == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+    assert estimate_tokens({"a": 1}) == estimate_tokens('{"a": 1}')
+
+
+def test_within_budget_is_untouched():
+    blocks = {"scores": {"macro": 50}, "memory": "kort"}
+
+    assert fit_context_to_budget(blocks, ["scores", "memory"], budget=1000) is blocks
+
+
+def test_lowest_priority_is_shrunk_first():
+    blocks = {
+        "scores": {"macro": 50, "market": 60},
+        "memory": "x" * 4000,
+    }
+
+    fitted = fit_context_to_budget(blocks, ["scores", "memory"], budget=200)
+
+    assert fitted["scores"] == blocks["scores"]
+    assert len(fitted["memory"]) < len(blocks["memory"])
+    assert sum(estimate_tokens(v) for v in fitted.values()) <= 200
+
+
+def test_block_dropped_when_no_room_left():
+    blocks = {"scores": "s" * 400, "memory": "m" * 400}
+
+    fitted = fit_context_to_budget(blocks, ["scores", "memory"], budget=100)
+
+    assert fitted["memory"] is None
+    assert estimate_tokens(fitted["scores"]) <= 100
+
+
+def test_list_keeps_leading_items():
+    items = [{"name": f"ind_{i}", "score": i} for i in range(40)]
+
+    shrunk = shrink_to_tokens(items, 50)
+
+    assert shrunk == items[: len(shrunk)]
+    assert estimate_tokens(shrunk) <= 50
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        if self.conn.fail:
+            raise RuntimeError("db down")
+        self.conn.inserts.append((sql, params))
+
+
+class _FakeConn:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.inserts = []
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _record(cb, n, user_id=7):
+    for i in range(n):
+        cb.record_token_usage(
+            agent="monthly_report",
+            call_type="text",
+            model="gpt",
+            prompt_tokens=10 + i,
+            completion_tokens=5,
+            estimated_prompt_tokens=12,
+            duration_ms=100,
+            success=True,
+            user_id=user_id,
+        )
+
+
+def test_token_usage_is_buffered_and_batched(monkeypatch):
+    from backend.ai_core import context_budget as cb
+
+    conn = _FakeConn()
+    monkeypatch.setattr(cb, "get_db_connection", lambda: conn)
+    monkeypatch.setattr(cb, "AI_USAGE_FLUSH_INTERVAL_S", 3600)
+    cb.flush_token_usage()
+    conn.inserts.clear()
+
+    _record(cb, 5)
+    # record_token_usage zelf doet geen DB-I/O
+    assert conn.inserts == []
+
+    monkeypatch.setattr(cb, "AI_USAGE_BATCH_MAX", 3)
+    assert cb.flush_token_usage() == 5
+    # 5 rijen → 2 INSERTs (3 + 2)
+    assert len(conn.inserts) == 2
+    assert len(conn.inserts[0][1]) == 3 * 9
+    assert conn.inserts[0][1][0] == 7
+
+
+def test_failed_flush_keeps_rows_for_next_attempt(monkeypatch):
+    from backend.ai_core import context_budget as cb
+
+    conn = _FakeConn(fail=True)
+    monkeypatch.setattr(cb, "get_db_connection", lambda: conn)
+    monkeypatch.setattr(cb, "AI_USAGE_FLUSH_INTERVAL_S", 3600)
+    cb.flush_token_usage()
+
+    _record(cb, 2)
+    assert cb.flush_token_usage() == 0
+
+    conn.fail = False
+    assert cb.flush_token_usage() == 2
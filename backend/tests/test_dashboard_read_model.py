@@ -0,0 +1,98 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from backend.services.dashboard_read_model import build_dashboard_payload
+from backend.utils.json_utils import json_default
+
+
+class FakeCursor:
+    def __init__(self, results):
+        self.results = results
+        self.current = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.current = self.results.pop(0)
+
+    def fetchall(self):
+        return self.current
+
+    def fetchone(self):
+        return self.current[0] if self.current else None
+
+
+class FakeConn:
+    def __init__(self, results):
+        self.results = results
+
+    def cursor(self, cursor_factory=None):
+        return FakeCursor(self.results)
+
+    def rollback(self):
+        pass
+
+
+def test_payload_shape_and_as_of():
+    t1 = datetime(2024, 5, 1, 10)
+    t2 = datetime(2024, 5, 1, 12)
+    conn = FakeConn([
+        [{"symbol": "BTC", "price": Decimal("60000.5"), "volume": 1, "change_24h": 2, "timestamp": t1}],
+        [{"indicator": "rsi", "value": 55, "score": 60, "timestamp": t2}],
+        [{"name": "dxy", "value": 104, "trend": None, "interpretation": None, "action": None, "score": 40, "timestamp": t1}],
+        [],
+        [{"macro_score": 40, "technical_score": 60, "market_score": None, "setup_score": 30}],
+    ])
+
+    payload = build_dashboard_payload(conn, user_id=7)
+
+    assert payload["as_of"] == t2
+    assert payload["technical_data"]["rsi"]["score"] == 60
+    assert payload["scores"] == {"macro": 40, "technical": 60, "market": None, "setup": 30}
+    assert payload["explanation"]["setup"] == "❌ Geen setups"
+
+    encoded = json.loads(json.dumps(payload, default=json_default))
+    assert encoded["market_data"][0]["price"] == 60000.5
+    assert encoded["as_of"] == "2024-05-01T12:00:00"
+
+
+def test_ingest_invalidation_scopes_to_user_or_all(monkeypatch):
+    from backend.services import dashboard_read_model as rm
+
+    statements = []
+
+    class Cur:
+        rowcount = 1
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, sql, params=None):
+            statements.append((sql, params))
+
+    class Conn:
+        def cursor(self):
+            return Cur()
+
+        def commit(self):
+            pass
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(rm, "get_db_connection", Conn)
+    monkeypatch.setattr(rm, "table_exists", lambda conn, name: True)
+
+    rm.invalidate_dashboard_snapshots(7)
+    rm.invalidate_dashboard_snapshots()
+
+    assert statements[0] == ("DELETE FROM dashboard_snapshots WHERE user_id = %s", (7,))
+    assert statements[1] == ("DELETE FROM dashboard_snapshots", None)
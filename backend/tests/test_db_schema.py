@@ -0,0 +1,46 @@
+from backend.utils import db_schema
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.queries += 1
+
+    def fetchall(self):
+        return [("bot_ledger", "bot_id"), ("bot_ledger", "qty_delta"), ("empty_table", None)]
+
+
+class FakeConn:
+    def __init__(self):
+        self.queries = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+
+def test_probes_hit_database_once():
+    db_schema.invalidate_schema_cache()
+    conn = FakeConn()
+
+    assert db_schema.table_exists(conn, "bot_ledger")
+    assert db_schema.table_exists(conn, "empty_table")
+    assert not db_schema.table_exists(conn, "bot_configs")
+    assert db_schema.get_table_columns(conn, "bot_ledger") == ["bot_id", "qty_delta"]
+    assert conn.queries == 1
+
+
+def test_invalidate_reloads():
+    conn = FakeConn()
+    db_schema.warm_schema_cache(conn)
+    db_schema.invalidate_schema_cache()
+    db_schema.table_exists(conn, "bot_ledger")
+
+    assert conn.queries == 2
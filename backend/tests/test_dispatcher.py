@@ -0,0 +1,112 @@
+from types import SimpleNamespace
+
+from backend.celery_task import dispatcher
+from backend.celery_task.dispatcher import chunk_user_ids, summarize_wave
+
+
+def test_chunk_user_ids():
+    assert chunk_user_ids([1, 2, 3, 4, 5], 2) == [[1, 2], [3, 4], [5]]
+    assert chunk_user_ids([], 10) == []
+    assert chunk_user_ids([1, 2], 0) == [[1], [2]]
+
+
+def test_summarize_wave():
+    results = [
+        {"ok": 2, "failed": [], "duration_ms": 120},
+        {"ok": 1, "failed": [7], "duration_ms": 300},
+        None,
+    ]
+
+    stats = summarize_wave(results, started_at=100.0, finished_at=101.5)
+
+    assert stats["ok"] == 3
+    assert stats["failed"] == 1
+    assert stats["failed_user_ids"] == [7]
+    assert stats["duration_ms"] == 1500
+    assert stats["slowest_chunk_ms"] == 300
+
+
+def test_chunk_size_spreads_small_waves_over_worker_slots():
+    # llm-queue: concurrency 4 × 2 chunks per slot
+    task = "backend.celery_task.daily_report_task.generate_daily_report"
+    assert dispatcher.chunk_size_for(task, 20) == 3
+    assert dispatcher.chunk_size_for(task, 3) == 1
+    assert dispatcher.chunk_size_for(task, 10_000) == dispatcher.DISPATCH_CHUNK_SIZE
+    assert dispatcher.chunk_size_for(task, 10_000, max_size=5) == 5
+
+
+class _FakeTask:
+    name = "fake.per_user"
+    autoretry_for = (ConnectionError,)
+    retry_kwargs = {"max_retries": 3}
+    retry_backoff = 10
+    retry_backoff_max = 600
+    retry_jitter = False
+    max_retries = 3
+
+    def __init__(self):
+        self.sent = []
+
+    def __call__(self, user_id):
+        if user_id == 2:
+            raise ConnectionError("tijdelijk")
+        if user_id == 3:
+            raise ValueError("permanent")
+        return {"status": "skipped"} if user_id == 4 else {"status": "ok"}
+
+    def apply_async(self, **options):
+        self.sent.append(options)
+
+
+def test_retryable_failures_are_requeued_as_real_tasks(monkeypatch):
+    task = _FakeTask()
+    monkeypatch.setattr(dispatcher, "current_app", SimpleNamespace(tasks={task.name: task}))
+
+    result = dispatcher.run_task_for_users(task.name, [1, 2, 3, 4])
+
+    assert result["ok"] == 1
+    assert result["skipped"] == 1
+    assert result["failed"] == [3]
+    assert result["retried"] == [2]
+    assert task.sent == [{"kwargs": {"user_id": 2}, "countdown": 10, "retries": 1}]
+
+
+def test_wave_body_has_error_callback():
+    wave = dispatcher.build_wave(
+        "backend.celery_task.portfolio_snapshot_task.run_portfolio_snapshot",
+        list(range(10)),
+        lease={"key": "sf:run:x:all", "token": "t"},
+    )
+
+    errbacks = wave.body.options["link_error"]
+    assert [e["task"] for e in errbacks] == ["backend.celery_task.dispatcher.finish_wave_on_error"]
+    assert errbacks[0]["kwargs"]["lease_token"] == "t"
+
+
+def test_soft_time_limit_stops_the_chunk(monkeypatch):
+    from celery.exceptions import SoftTimeLimitExceeded
+
+    calls = []
+
+    class SlowTask(_FakeTask):
+        def __call__(self, user_id):
+            calls.append(user_id)
+            if user_id == 2:
+                raise SoftTimeLimitExceeded()
+            return {"status": "ok"}
+
+    task = SlowTask()
+    monkeypatch.setattr(dispatcher, "current_app", SimpleNamespace(tasks={task.name: task}))
+
+    result = dispatcher.run_task_for_users(task.name, [1, 2, 3, 4])
+
+    assert calls == [1, 2]
+    assert result["timed_out"] is True
+    assert result["ok"] == 1
+    assert result["failed"] == [2, 3, 4]
+    assert task.sent == []
+
+
+def test_wave_lease_ttl_follows_dedupe_window():
+    assert dispatcher.wave_lease_ttl(15 * 60) == 30 * 60
+    assert dispatcher.wave_lease_ttl(1) == 60
@@ -0,0 +1,26 @@
+from backend.utils.downsampling import MAX_POINTS, bin_width_for_span
+
+
+def test_width_from_points_keeps_bucket_count_bounded():
+    span = 365 * 24 * 3600
+
+    width = bin_width_for_span(span, points=500)
+
+    assert span // width + 1 <= 500
+
+
+def test_explicit_width_is_widened_beyond_max_points():
+    span = 10 * 365 * 24 * 3600
+
+    width = bin_width_for_span(span, bin_seconds=60)
+
+    assert width > 60
+    assert span // width + 1 <= MAX_POINTS
+
+
+def test_explicit_width_kept_when_small_enough():
+    assert bin_width_for_span(24 * 3600, bin_seconds=3600) == 3600
+
+
+def test_single_snapshot():
+    assert bin_width_for_span(0, points=100) == 1
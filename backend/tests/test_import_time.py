@@ -0,0 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Budget voor `import backend.main` (koude start per uvicorn worker)
+IMPORT_BUDGET_S = float(os.getenv("API_IMPORT_BUDGET_S", "5.0"))
+
+HEAVY_MODULES = ("openai", "playwright", "reportlab")
+
+# Steekproef van safe_include-routers: safe_include slikt importfouten,
+# dus zonder deze check slaagt de test ook als routers niet laden
+EXPECTED_ROUTES = ("/api/auth/login", "/api/dashboard", "/api/report/daily/export/pdf")
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+SCRIPT = f"""
+import json, sys, time
+import psycopg2
+
+db_calls = []
+psycopg2.connect = lambda *a, **k: db_calls.append(1)
+
+started = time.perf_counter()
+import backend.main
+elapsed = time.perf_counter() - started
+
+print(json.dumps({{
+    "seconds": elapsed,
+    "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+    "db_calls": len(db_calls),
+    "routes": sorted({{getattr(r, "path", "") for r in backend.main.app.routes}}),
+}}))
+"""
+
+
+def _import_main(tmp_path):
+    # main.py mount "backend/static" relatief aan de cwd
+    (tmp_path / "backend" / "static").mkdir(parents=True)
+
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    env["PYTHONPATH"] = str(REPO_ROOT)
+
+    out = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert out.returncode == 0, out.stderr[-2000:]
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["log"] = out.stdout + out.stderr
+    return result
+
+
+def test_main_import_is_cheap_and_side_effect_free(tmp_path):
+    result = _import_main(tmp_path)
+
+    assert result["db_calls"] == 0
+    assert result["heavy"] == []
+    assert result["seconds"] < IMPORT_BUDGET_S
+
+
+def test_main_import_registers_all_routers(tmp_path):
+    result = _import_main(tmp_path)
+
+    assert "Router FOUT" not in result["log"], result["log"][-2000:]
+    missing = [p for p in EXPECTED_ROUTES if p not in result["routes"]]
+    assert missing == []
@@ -0,0 +1,38 @@
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+from backend.utils.json_utils import FastJSONResponse, json_default
+
+
+def test_fast_json_response_encodes_decimal_and_dates():
+    body = FastJSONResponse({
+        "price": Decimal("1.5"),
+        "day": date(2024, 1, 2),
+        "ts": datetime(2024, 1, 2, 3, 4, 5),
+        1: "int key",
+    }).body
+
+    assert json.loads(body) == {
+        "price": 1.5,
+        "day": "2024-01-02",
+        "ts": "2024-01-02T03:04:05",
+        "1": "int key",
+    }
+
+
+def test_matches_stdlib_with_json_default():
+    payload = {"rows": [{"v": Decimal("2.25"), "d": date(2024, 5, 1)}]}
+
+    assert json.loads(FastJSONResponse(payload).body) == json.loads(json.dumps(payload, default=json_default))
+
+
+def test_decimals_match_jsonable_encoder():
+    payload = {"whole": Decimal("5"), "numeric0": Decimal("60000"), "scaled": Decimal("5.0"), "frac": Decimal("0.25")}
+
+    body = FastJSONResponse(payload).body
+
+    assert body == b'{"whole":5,"numeric0":60000,"scaled":5.0,"frac":0.25}'
+    assert json.loads(body) == jsonable_encoder(payload)
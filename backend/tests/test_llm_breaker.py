@@ -0,0 +1,49 @@
+import pytest
+
+from backend.utils import openai_client as oc
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    clock = {"now": 1000.0}
+    monkeypatch.setattr(oc.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(oc, "BREAKER_THRESHOLD", 2)
+    monkeypatch.setattr(oc, "BREAKER_COOLDOWN", 60)
+    monkeypatch.setattr(oc, "BREAKER_PROBE_TIMEOUT", 90)
+    monkeypatch.setattr(oc, "_breaker_state", {"failures": 0, "opened_at": None, "probe_started": None})
+    return clock
+
+
+def test_half_open_lets_exactly_one_probe_through(breaker):
+    oc._breaker_failure()
+    oc._breaker_failure()
+    assert not oc._breaker_acquire()
+
+    breaker["now"] += 61
+    assert oc.llm_available()
+    assert oc._breaker_acquire()
+
+    # proefcall loopt → iedereen anders blijft buiten
+    assert not oc.llm_available()
+    assert not oc._breaker_acquire()
+
+    oc._breaker_success()
+    assert oc._breaker_acquire() and oc._breaker_acquire()
+
+
+def test_failed_probe_reopens_and_stale_probe_expires(breaker):
+    oc._breaker_failure()
+    oc._breaker_failure()
+    breaker["now"] += 61
+
+    assert oc._breaker_acquire()
+    oc._breaker_failure()
+    assert not oc._breaker_acquire()
+
+    # nieuwe proefcall die nooit afrondt → verloopt na BREAKER_PROBE_TIMEOUT
+    breaker["now"] += 61
+    assert oc._breaker_acquire()
+    breaker["now"] += 89
+    assert not oc._breaker_acquire()
+    breaker["now"] += 1
+    assert oc._breaker_acquire()
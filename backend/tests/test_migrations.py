@@ -0,0 +1,168 @@
+import os
+import uuid
+
+import pytest
+
+from backend.utils import migrations as mig
+
+
+def _write(tmp_path, name, content="SELECT 1;"):
+    (tmp_path / name).write_text(content)
+
+
+def test_discovery_orders_versions_and_ignores_other_files(tmp_path):
+    _write(tmp_path, "0002_indexes.sql")
+    _write(tmp_path, "0001_baseline.sql")
+    _write(tmp_path, "0003_backfill.py", "def upgrade(cur):\n    pass\n")
+    _write(tmp_path, "README.md")
+    _write(tmp_path, "__init__.py")
+
+    found = mig.discover_migrations(str(tmp_path))
+
+    assert [m["version"] for m in found] == [1, 2, 3]
+    assert [m["kind"] for m in found] == ["sql", "sql", "py"]
+    assert found[0]["name"] == "baseline"
+
+
+def test_duplicate_version_is_rejected(tmp_path):
+    _write(tmp_path, "0001_a.sql")
+    _write(tmp_path, "0001_b.sql")
+
+    with pytest.raises(ValueError):
+        mig.discover_migrations(str(tmp_path))
+
+
+def test_pending_and_changed(tmp_path):
+    _write(tmp_path, "0001_a.sql")
+    _write(tmp_path, "0002_b.sql")
+    _write(tmp_path, "0003_c.sql")
+    found = mig.discover_migrations(str(tmp_path))
+
+    applied = {1: {"checksum": found[0]["checksum"]}, 2: {"checksum": "oud"}}
+
+    assert [m["version"] for m in mig.pending_migrations(found, applied)] == [3]
+    assert mig.pending_migrations(found, applied, target=2) == []
+    assert [m["version"] for m in mig.changed_migrations(found, applied)] == [2]
+
+
+def test_repo_migrations_are_well_formed():
+    found = mig.discover_migrations()
+    versions = [m["version"] for m in found]
+
+    assert versions == list(range(1, len(found) + 1))
+
+
+# =========================================================
+# 🔍 EXPLAIN (alleen met een echte Postgres: TEST_DATABASE_URL)
+# =========================================================
+HOT_QUERIES = [
+    (
+        "idx_macro_data_user_name_ts",
+        """
+        SELECT DISTINCT ON (name) name, value, timestamp
+        FROM macro_data
+        WHERE user_id = 1
+        ORDER BY name, timestamp DESC
+        """,
+    ),
+    (
+        "idx_market_data_indicators_user_name_ts",
+        """
+        SELECT DISTINCT ON (name) name, value, timestamp
+        FROM market_data_indicators
+        WHERE user_id = 1
+        ORDER BY name, timestamp DESC
+        """,
+    ),
+    (
+        "idx_market_data_symbol_ts",
+        "SELECT price FROM market_data WHERE symbol = 'BTC' ORDER BY timestamp DESC LIMIT 1",
+    ),
+    (
+        "idx_bot_ledger_user_bot_ts",
+        """
+        SELECT COALESCE(SUM(cash_delta_eur), 0), COALESCE(SUM(qty_delta), 0)
+        FROM bot_ledger
+        WHERE user_id = 1 AND bot_id = 2 AND ts >= NOW() - INTERVAL '1 day'
+        """,
+    ),
+    (
+        "idx_macro_indicator_rules_indicator_user",
+        "SELECT score FROM macro_indicator_rules WHERE indicator = 'dxy' AND user_id = 1",
+    ),
+]
+
+
+@pytest.fixture
+def scratch_db():
+    psycopg2 = pytest.importorskip("psycopg2")
+    dsn = os.getenv("TEST_DATABASE_URL")
+    if not dsn:
+        pytest.skip("TEST_DATABASE_URL niet gezet")
+
+    try:
+        conn = psycopg2.connect(dsn)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Postgres niet bereikbaar: {e}")
+
+    schema = f"test_migrations_{uuid.uuid4().hex[:8]}"
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE SCHEMA {schema};")
+        cur.execute(f"SET search_path TO {schema};")
+    conn.commit()
+
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA {schema} CASCADE;")
+        conn.commit()
+        conn.close()
+
+
+def test_hot_queries_use_composite_indexes(scratch_db):
+    conn = scratch_db
+    mig.migrate(conn)
+    # tweede run = no-op
+    assert mig.migrate(conn) == []
+
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO macro_data (user_id, name, value, timestamp)
+            SELECT g % 50, 'ind_' || (g % 20), g, NOW() - g * INTERVAL '1 minute'
+            FROM generate_series(1, 5000) g;
+        """)
+        cur.execute("""
+            INSERT INTO market_data_indicators (user_id, name, value, timestamp)
+            SELECT g % 50, 'ind_' || (g % 20), g, NOW() - g * INTERVAL '1 minute'
+            FROM generate_series(1, 5000) g;
+        """)
+        cur.execute("""
+            INSERT INTO market_data (symbol, price, timestamp)
+            SELECT (ARRAY['BTC', 'ETH', 'SOL'])[1 + g % 3], g, NOW() - g * INTERVAL '15 minutes'
+            FROM generate_series(1, 5000) g;
+        """)
+        cur.execute("""
+            INSERT INTO bot_ledger (user_id, bot_id, entry_type, cash_delta_eur, qty_delta, ts)
+            SELECT g % 50, g % 7, 'execute', -10, 0.001, NOW() - g * INTERVAL '1 hour'
+            FROM generate_series(1, 5000) g;
+        """)
+        cur.execute("""
+            INSERT INTO macro_indicator_rules (indicator, range_min, range_max, score, user_id)
+            SELECT 'ind_' || (g % 40), g, g + 1, 50, g % 50
+            FROM generate_series(1, 5000) g;
+        """)
+        for table in ("macro_data", "market_data_indicators", "market_data", "bot_ledger", "macro_indicator_rules"):
+            cur.execute(f"ANALYZE {table};")
+
+        cur.execute("SET enable_seqscan = off;")
+
+        for index_name, query in HOT_QUERIES:
+            # gepartitioneerde tabellen: plan toont de partitie-indexes
+            cur.execute("SELECT relid::regclass::text FROM pg_partition_tree(%s);", (index_name,))
+            names = {index_name} | {r[0].split(".")[-1] for r in cur.fetchall()}
+
+            cur.execute(f"EXPLAIN {query}")
+            plan = "\n".join(row[0] for row in cur.fetchall())
+            assert any(name in plan for name in names), f"{index_name} niet gebruikt:\n{plan}"
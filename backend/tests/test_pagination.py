@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException, Response
+
+from backend.utils.pagination import (
+    NEXT_CURSOR_HEADER,
+    decode_cursor,
+    encode_cursor,
+    history_filter,
+    page_limit,
+    page_params,
+    paginate,
+    recent_buckets_sql,
+    with_default_limit,
+)
+
+
+def _page(**kw):
+    return {"paged": True, "limit": 2, "cursor": None, "since": None, "until": None, **kw}
+
+
+def test_cursor_roundtrip():
+    ts = datetime(2024, 3, 1, 12, 30, 5)
+
+    assert decode_cursor(encode_cursor(ts, 42)) == (ts, 42)
+
+
+def test_invalid_cursor_is_400():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("nope")
+
+    assert exc.value.status_code == 400
+
+
+def test_history_filter_uses_range_and_row_comparison():
+    ts = datetime(2024, 3, 1)
+    page = _page(since=ts, cursor=(ts, 7))
+
+    sql, params = history_filter(page, ts_col="start_date")
+
+    assert sql == " AND start_date >= %s AND (start_date, id) < (%s, %s)"
+    assert params == [ts, ts, 7]
+    assert page_limit(page) == 3
+
+
+def test_paginate_sets_next_cursor_only_when_more_rows():
+    rows = [(datetime(2024, 3, 3), 3), (datetime(2024, 3, 2), 2), (datetime(2024, 3, 1), 1)]
+    response = Response()
+
+    page_rows = paginate(rows, _page(), response, ts_index=0, id_index=1)
+
+    assert page_rows == rows[:2]
+    assert decode_cursor(response.headers[NEXT_CURSOR_HEADER]) == rows[1]
+
+    last = Response()
+    paginate(rows[:1], _page(), last, ts_index=0, id_index=1)
+    assert last.headers[NEXT_CURSOR_HEADER] == ""
+
+
+def test_paging_is_opt_in():
+    page = page_params(limit=None, cursor=None, since=None, until=None)
+    rows = [(datetime(2024, 3, d), d) for d in (3, 2, 1)]
+    response = Response()
+
+    # Geen ?limit / ?cursor → geen LIMIT, alle rijen, geen cursor-header
+    assert page_limit(page) is None
+    assert paginate(rows, page, response, ts_index=0, id_index=1) == rows
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+    # Alleen ?cursor → standaard paginagrootte
+    cursor_page = page_params(limit=None, cursor=encode_cursor(*rows[0]), since=None, until=None)
+    assert cursor_page["paged"] and cursor_page["limit"] > 0
+
+    assert with_default_limit(page, 200)["limit"] == 200
+    assert with_default_limit(_page(), 200)["limit"] == 2
+
+
+def test_recent_buckets_is_bounded_loose_scan():
+    sql = recent_buckets_sql("macro_data", "DATE(timestamp)")
+
+    assert "DISTINCT" not in sql
+    assert "WITH RECURSIVE" in sql
+    # (user_id, user_id, N)
+    assert sql.count("%s") == 3
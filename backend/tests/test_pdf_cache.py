@@ -0,0 +1,111 @@
+import os
+from datetime import date
+
+import pytest
+
+from backend.services import pdf_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_cache, "PDF_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_content_hash_is_stable_and_content_sensitive(monkeypatch):
+    a = pdf_cache.content_hash({"id": 1, "outlook": "bullish", "report_date": date(2026, 10, 1)})
+    b = pdf_cache.content_hash({"report_date": date(2026, 10, 1), "outlook": "bullish", "id": 1})
+    c = pdf_cache.content_hash({"id": 1, "outlook": "bearish", "report_date": date(2026, 10, 1)})
+
+    assert a == b != c
+
+    monkeypatch.setattr(pdf_cache, "PDF_CACHE_VERSION", "2")
+    assert pdf_cache.content_hash({"id": 1, "outlook": "bullish", "report_date": date(2026, 10, 1)}) != a
+
+
+def test_etag_matching():
+    etag = pdf_cache.etag_for("abc")
+
+    assert pdf_cache.etag_matches('"abc"', etag)
+    assert pdf_cache.etag_matches('W/"abc"', etag)
+    assert pdf_cache.etag_matches('"x", "abc"', etag)
+    assert pdf_cache.etag_matches("*", etag)
+    assert not pdf_cache.etag_matches('"abd"', etag)
+    assert not pdf_cache.etag_matches(None, etag)
+
+
+def test_store_replaces_old_version_and_invalidate_clears(cache_dir):
+    assert pdf_cache.get_cached_pdf("daily", 7, "2026-10-01", "h1") is None
+
+    old = pdf_cache.store_pdf("daily", 7, "2026-10-01", "h1", b"%PDF-1")
+    other_day = pdf_cache.store_pdf("daily", 7, "2026-10-02", "h1", b"%PDF-x")
+    new = pdf_cache.store_pdf("daily", 7, "2026-10-01", "h2", b"%PDF-2")
+
+    assert not os.path.exists(old)
+    assert pdf_cache.get_cached_pdf("daily", 7, "2026-10-01", "h2") == new
+    assert open(new, "rb").read() == b"%PDF-2"
+
+    # taak geeft een date mee, API een string → zelfde key
+    assert pdf_cache.invalidate_report_pdfs("daily", 7, date(2026, 10, 1)) == 1
+    assert not os.path.exists(new)
+    assert os.path.exists(other_day)
+
+
+def test_unknown_report_type_is_rejected(cache_dir):
+    with pytest.raises(ValueError):
+        pdf_cache.cache_path("../etc", 1, "2026-10-01", "h")
+
+
+# =========================================================
+# 🌐 ENDPOINT: ETag / If-None-Match
+# =========================================================
+@pytest.fixture
+def pdf_client(cache_dir, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from backend.api import report_api
+    from backend.utils.auth_utils import get_current_user
+
+    report = {"id": 3, "user_id": 7, "report_date": date(2026, 10, 1), "outlook": "bullish"}
+    renders = []
+
+    async def fake_render(report_type, user_id, row):
+        renders.append((report_type, user_id))
+        return b"%PDF-fake"
+
+    monkeypatch.setattr(report_api, "_load_report_for_pdf", lambda table, d, user_id: dict(report))
+    monkeypatch.setattr(report_api, "_render_report_pdf", fake_render)
+
+    app = FastAPI()
+    app.include_router(report_api.router)
+    app.dependency_overrides[get_current_user] = lambda: {"id": 7}
+
+    return TestClient(app), renders
+
+
+def test_pdf_export_is_cached_and_honours_if_none_match(pdf_client, cache_dir):
+    client, renders = pdf_client
+
+    first = client.get("/report/daily/export/pdf", params={"date": "2026-10-01"})
+    assert first.status_code == 200
+    assert first.content == b"%PDF-fake"
+    etag = first.headers["etag"]
+
+    # niet-ISO schrijfwijze → zelfde cachebestand, geen tweede render
+    second = client.get("/report/daily/export/pdf", params={"date": "2026-10-1"})
+    assert second.status_code == 200
+    assert second.headers["etag"] == etag
+    assert renders == [("daily", 7)]
+    assert "2026-10-01" in second.headers["content-disposition"]
+    assert len(list(cache_dir.rglob("*.pdf"))) == 1
+
+    not_modified = client.get(
+        "/report/daily/export/pdf",
+        params={"date": "2026-10-01"},
+        headers={"If-None-Match": etag},
+    )
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+    assert not_modified.content == b""
+    assert renders == [("daily", 7)]
@@ -0,0 +1,75 @@
+import pytest
+
+from backend.celery_task.pipeline import (
+    DAILY_PIPELINE,
+    critical_path,
+    ready_stages,
+    topological_order,
+)
+
+
+def test_daily_pipeline_is_a_dag():
+    order = topological_order(DAILY_PIPELINE)
+
+    assert order[0] == "ingest"
+    assert order[-1] == "report"
+    assert order.index("master") > max(order.index("bot"), order.index("agents"))
+
+
+def test_cycle_is_rejected():
+    with pytest.raises(ValueError):
+        topological_order({"a": {"after": ["b"]}, "b": {"after": ["a"]}})
+
+
+def test_ready_stages_waits_for_all_inputs():
+    done = {"ingest", "score", "setup", "strategy", "bot"}
+    claimed = done | {"agents"}
+
+    assert ready_stages(DAILY_PIPELINE, done, claimed) == []
+    assert ready_stages(DAILY_PIPELINE, done | {"agents"}, claimed) == ["master"]
+
+
+def test_critical_path_follows_latest_input():
+    dag = {
+        "a": {"after": []},
+        "fast": {"after": ["a"]},
+        "slow": {"after": ["a"]},
+        "z": {"after": ["fast", "slow"]},
+    }
+    timings = {
+        "a": {"started_at": 0.0, "finished_at": 1.0},
+        "fast": {"started_at": 1.0, "finished_at": 2.0},
+        "slow": {"started_at": 1.0, "finished_at": 5.0},
+        "z": {"started_at": 5.0, "finished_at": 6.0},
+    }
+
+    path = critical_path(dag, timings)
+
+    assert [s["stage"] for s in path["stages"]] == ["a", "slow", "z"]
+    assert path["duration_ms"] == 6000
+
+
+def test_stage_deadline_covers_the_hard_time_limit():
+    from backend.celery_task.pipeline import PIPELINE_STAGE_GRACE_S, stage_deadline_s
+    from backend.celery_task.queues import batch_options
+
+    options = batch_options(DAILY_PIPELINE["bot"]["tasks"], 25)
+
+    assert stage_deadline_s(options) == options["time_limit"] + PIPELINE_STAGE_GRACE_S
+
+
+def test_beat_skips_runs_the_pipeline_already_does():
+    from celery.schedules import crontab
+
+    from backend.celery_task.celery_app import PIPELINE_HOUR, celery_app
+
+    schedule = celery_app.conf.beat_schedule
+    pipeline_tasks = {t for stage in DAILY_PIPELINE.values() for t in stage["tasks"]}
+
+    for entry in schedule.values():
+        task_name = entry.get("kwargs", {}).get("task_name")
+        if task_name not in pipeline_tasks:
+            continue
+        cron: crontab = entry["schedule"]
+        # geen beat-run terwijl de pipeline die stage zelf draait
+        assert not (PIPELINE_HOUR in cron.hour and min(cron.minute) < 15), task_name
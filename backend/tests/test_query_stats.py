@@ -0,0 +1,41 @@
+from backend.utils import query_stats as qs
+
+
+def test_fingerprint_normalises_literals_and_params():
+    a = qs.fingerprint("""
+        SELECT * FROM macro_data   -- laatste waarde
+        WHERE user_id = %s AND name = 'dxy' AND id IN (1, 2, 3)
+        LIMIT 10;
+    """)
+    b = qs.fingerprint("select * from macro_data where user_id = 7 and name = 'vix' and id in (%s, %s) limit 1")
+
+    assert a == b == "select * from macro_data where user_id = ? and name = ? and id in (...) limit ?"
+
+
+def test_fingerprint_collapses_multi_row_values():
+    fp = qs.fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)")
+    assert fp == "insert into t (a, b) values (?, ?), ..."
+
+
+def test_stats_percentiles_and_slow_count(monkeypatch):
+    qs.reset_query_stats()
+    monkeypatch.setattr(qs, "DB_SLOW_QUERY_MS", 100.0)
+
+    for ms in (1, 2, 3, 4, 200):
+        qs.record_query("select ?", ms, per_span=int(ms))
+
+    row = qs.get_query_stats()["queries"][0]
+
+    assert row["count"] == 5
+    assert row["p50_ms"] == 3
+    assert row["max_ms"] == 200
+    assert row["slow"] == 1
+    assert row["max_per_span"] == 200
+
+
+def test_explain_is_rate_limited_per_fingerprint():
+    qs.reset_query_stats()
+
+    assert qs.should_explain("select ?", now=1000.0)
+    assert not qs.should_explain("select ?", now=1001.0)
+    assert qs.should_explain("select ?", now=1000.0 + qs.DB_SLOW_EXPLAIN_INTERVAL_S)
@@ -0,0 +1,28 @@
+from backend.celery_task.queues import (
+    QUEUE_PROFILES,
+    batch_options,
+    heaviest_queue,
+    queue_for_task,
+)
+
+
+def test_queue_for_task_per_workload():
+    assert queue_for_task("backend.celery_task.celery_task_generate_pdf.generate_report_pdf") == "pdf"
+    assert queue_for_task("backend.celery_task.daily_report_task.generate_daily_report") == "llm"
+    assert queue_for_task("backend.celery_task.macro_task.run_macro_agent_daily") == "llm"
+    assert queue_for_task("backend.celery_task.macro_task.fetch_macro_data") == "ingest"
+    assert queue_for_task("backend.celery_task.portfolio_snapshot_task.run_portfolio_snapshot") == "ticks"
+    assert queue_for_task("onbekend.task") == "ticks"
+
+
+def test_batch_options_scales_limits_with_heaviest_queue():
+    tasks = [
+        "backend.celery_task.pipeline.score_user",
+        "backend.celery_task.macro_task.run_macro_agent_daily",
+    ]
+    assert heaviest_queue(tasks) == "llm"
+
+    opts = batch_options(tasks, 3)
+    assert opts["queue"] == "llm"
+    assert opts["soft_time_limit"] == QUEUE_PROFILES["llm"]["soft_time_limit"] * 3
+    assert opts["time_limit"] == QUEUE_PROFILES["llm"]["time_limit"] * 3
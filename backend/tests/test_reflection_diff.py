@@ -0,0 +1,65 @@
+from backend.ai_core.reflection_diff import (
+    reflection_input_hash,
+    split_changed_items,
+    unwrap_reflections,
+)
+
+FIELDS = ("value", "score")
+
+
+def _prev(item, rule=None, **extra):
+    return {
+        "indicator": item["indicator"],
+        "ai_score": 60,
+        "input_hash": reflection_input_hash(item, FIELDS, rule),
+        **extra,
+    }
+
+
+def test_hash_ignores_timestamp():
+    a = {"indicator": "dxy", "value": 104.2, "score": 40, "timestamp": "2024-01-01"}
+    b = dict(a, timestamp="2024-01-02")
+
+    assert reflection_input_hash(a, FIELDS) == reflection_input_hash(b, FIELDS)
+
+
+def test_only_changed_items_are_returned():
+    dxy = {"indicator": "dxy", "value": 104.2, "score": 40}
+    vix = {"indicator": "vix", "value": 14.0, "score": 55}
+    previous = {
+        "dxy": _prev(dxy),
+        "vix": _prev(dict(vix, score=50)),
+    }
+
+    changed, carried, hashes = split_changed_items([dxy, vix], previous, FIELDS)
+
+    assert [i["indicator"] for i in changed] == ["vix"]
+    assert [r["indicator"] for r in carried] == ["dxy"]
+    assert set(hashes) == {"dxy", "vix"}
+
+
+def test_rule_change_triggers_reflection():
+    dxy = {"indicator": "dxy", "value": 104.2, "score": 40}
+    previous = {"dxy": _prev(dxy, rule=[{"range_min": 0}])}
+
+    changed, carried, _ = split_changed_items(
+        [dxy], previous, FIELDS, rules={"dxy": [{"range_min": 1}]}
+    )
+
+    assert changed == [dxy]
+    assert carried == []
+
+
+def test_newest_item_per_indicator_wins():
+    new = {"indicator": "dxy", "value": 105, "score": 45}
+    old = {"indicator": "dxy", "value": 104.2, "score": 40}
+
+    changed, _, _ = split_changed_items([new, old], {"dxy": _prev(old)}, FIELDS)
+
+    assert changed == [new]
+
+
+def test_unwrap_reflections():
+    assert unwrap_reflections({"reflections": [{"indicator": "dxy"}, "x"]}) == [{"indicator": "dxy"}]
+    assert unwrap_reflections([{"indicator": "vix"}]) == [{"indicator": "vix"}]
+    assert unwrap_reflections({}) == []
@@ -0,0 +1,63 @@
+from backend.engine.report_template_engine import SECTION_RENDERERS, render_section
+
+
+CONTEXT = {
+    "regime": {"label": "accumulatie", "confidence": 0.6},
+    "transition": {"risk": 70, "flag": "momentum_fade", "narrative": None},
+    "deltas": {"macro": 2.0, "market": -5.0, "technical": 0.2, "price": None, "volume": 120.0},
+    "market": {"price": 60000, "change": 2.4, "volume": 1000},
+    "scores": {"macro": 48, "technical": 62, "market": 58, "setup": 40},
+    "indicators": {
+        "market": [{"name": "funding", "score": 60}],
+        "macro": [{"name": "dxy", "score": 30}],
+        "technical": [{"name": "rsi", "score": 65}],
+    },
+    "positioning": {"best_setup": "DCA dip", "strategy": None, "bot_action": "buy"},
+    "memory": {"prev_summary": None},
+}
+
+
+def test_all_sections_render_text():
+    for section in SECTION_RENDERERS:
+        text = render_section(section, CONTEXT, fallback="FALLBACK")
+        assert text and text != "FALLBACK"
+
+
+def test_uses_scores_deltas_and_transition():
+    text = render_section("executive_summary", CONTEXT)
+
+    assert "accumulatie" in text
+    assert "daalde met 5 punten" in text
+    assert "70/100" in text
+
+
+def test_missing_context_does_not_crash():
+    for section in SECTION_RENDERERS:
+        assert render_section(section, {}, fallback="x")
+
+
+def test_unknown_section_returns_fallback():
+    assert render_section("nope", CONTEXT, fallback="fb") == "fb"
+
+
+def test_stream_error_midway_falls_back_to_template(monkeypatch):
+    from backend.ai_agents import report_ai_agent as ra
+    from backend.utils.openai_client import LLMStreamError
+
+    def broken_stream(**kwargs):
+        yield "Half "
+        yield "afgebroken"
+        raise LLMStreamError("connection reset")
+
+    monkeypatch.setattr(ra, "load_daily_report_inputs", lambda user_id: {"base_context": "", "context": CONTEXT})
+    monkeypatch.setattr(ra, "daily_section_specs", lambda inputs: [("executive_summary", "prompt", "FALLBACK")])
+    monkeypatch.setattr(ra, "llm_available", lambda: True)
+    monkeypatch.setattr(ra, "stream_gpt_text", broken_stream)
+    monkeypatch.setattr(ra, "assemble_daily_report", lambda inputs, sections: dict(sections))
+
+    events = list(ra.iter_daily_report_sections(user_id=1, stream=True))
+
+    section = next(e for e in events if e["event"] == "section")
+    assert section["source"] == "template"
+    assert "afgebroken" not in section["text"]
+    assert events[-1]["report"]["executive_summary"] == section["text"]
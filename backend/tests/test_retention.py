@@ -0,0 +1,62 @@
+from datetime import date
+
+from backend.services import retention_service as rs
+
+
+def test_month_helpers():
+    assert rs.add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert rs.months_between(date(2026, 11, 20), date(2027, 1, 5)) == [
+        date(2026, 11, 1), date(2026, 12, 1), date(2027, 1, 1),
+    ]
+    assert rs.partition_name("macro_data", date(2026, 3, 1)) == "macro_data_p202603"
+    assert rs.partition_month("macro_data", "macro_data_p202603") == date(2026, 3, 1)
+    assert rs.partition_month("macro_data", "macro_data_default") is None
+    # prefix van een andere tabel telt niet
+    assert rs.partition_month("market_data", "market_data_indicators_p202603") is None
+
+
+def test_rollup_days_resumes_and_stops_at_cutoff(monkeypatch):
+    monkeypatch.setattr(rs, "RETENTION_MAX_DAYS_PER_RUN", 5)
+    today = date(2026, 10, 18)
+
+    fresh = {"raw_days": 30, "rolled_up_until": None}
+    assert rs.rollup_days(fresh, date(2026, 9, 10), today) == [
+        date(2026, 9, 10), date(2026, 9, 11), date(2026, 9, 12), date(2026, 9, 13), date(2026, 9, 14),
+    ]
+
+    resumed = {"raw_days": 30, "rolled_up_until": date(2026, 9, 15)}
+    # cutoff = 18 sep → 16 en 17 sep
+    assert rs.rollup_days(resumed, None, today) == [date(2026, 9, 16), date(2026, 9, 17)]
+
+    assert rs.rollup_days({"raw_days": 30, "rolled_up_until": date(2026, 9, 17)}, None, today) == []
+    assert rs.rollup_days(fresh, None, today) == []
+
+
+def test_expired_partitions_only_whole_months():
+    partitions = ["macro_data_default", "macro_data_p202603", "macro_data_p202604", "macro_data_p202605"]
+    policy = {"drop_after_days": 170}
+
+    # cutoff = 1 mei 2026 → maart en april liggen er volledig voor
+    assert rs.expired_partitions("macro_data", partitions, policy, date(2026, 10, 18)) == [
+        "macro_data_p202603", "macro_data_p202604",
+    ]
+    assert rs.expired_partitions("macro_data", partitions, {"drop_after_days": None}, date(2026, 10, 18)) == []
+
+
+def test_partition_blockers_refuse_constraints_that_would_be_lost():
+    constraints = [
+        ("macro_data_pkey", "p", "PRIMARY KEY (id)"),
+        ("macro_data_score_check", "c", "CHECK ((score >= (0)::numeric))"),
+        ("macro_data_user_fk", "f", "FOREIGN KEY (user_id) REFERENCES users(id)"),
+        ("macro_data_user_ts_key", "u", 'UNIQUE (user_id, name, "timestamp")'),
+    ]
+    assert rs.partition_blockers("macro_data", constraints, []) == []
+
+    problems = rs.partition_blockers(
+        "macro_data",
+        constraints + [("macro_data_name_key", "u", "UNIQUE (user_id, name)")],
+        ["alerts_macro_data_fk"],
+    )
+    assert len(problems) == 2
+    assert "macro_data_name_key" in problems[0]
+    assert "alerts_macro_data_fk" in problems[1]
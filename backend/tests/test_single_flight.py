@@ -0,0 +1,108 @@
+import pytest
+
+from backend.utils import single_flight as sf
+from backend.utils.redis_client import set_redis
+
+
+class FakeRedis:
+    """In-memory subset: SET NX, release-script, HINCRBY."""
+
+    def __init__(self):
+        self.data = {}
+        self.hashes = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    def eval(self, script, numkeys, key, token):
+        if self.data.get(key) == token:
+            del self.data[key]
+            return 1
+        return 0
+
+    def hincrby(self, key, field, amount):
+        bucket = self.hashes.setdefault(key, {})
+        bucket[field] = str(int(bucket.get(field, 0)) + amount)
+
+    def expire(self, key, seconds):
+        return True
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+
+@pytest.fixture
+def fake_redis():
+    client = FakeRedis()
+    set_redis(client)
+    yield client
+    set_redis(None)
+
+
+def test_window_key_is_stable_within_window():
+    assert sf.window_start(1000, 900) == 900
+    assert sf.window_key("t", 7, 900, 901) == sf.window_key("t", 7, 900, 1799)
+    assert sf.window_key("t", 7, 900, 1799) != sf.window_key("t", 7, 900, 1800)
+    assert sf.running_key("t") == "sf:run:t:all"
+
+
+def test_overlapping_run_is_skipped(fake_redis):
+    first = sf.acquire_lease("task", scope=1)
+    second = sf.acquire_lease("task", scope=1)
+    other_user = sf.acquire_lease("task", scope=2)
+
+    assert first["acquired"] and other_user["acquired"]
+    assert not second["acquired"]
+    assert second["outcome"] == sf.OUTCOME_RUNNING
+
+    sf.release_lease(first)
+    assert sf.acquire_lease("task", scope=1)["acquired"]
+
+
+def test_duplicate_in_same_window_is_skipped(fake_redis):
+    first = sf.acquire_lease("task", window_seconds=900, now=1000)
+    sf.release_lease(first)
+
+    duplicate = sf.acquire_lease("task", window_seconds=900, now=1500)
+    next_window = sf.acquire_lease("task", window_seconds=900, now=1900)
+
+    assert duplicate["outcome"] == sf.OUTCOME_DUPLICATE
+    assert next_window["acquired"]
+    # duplicate mag de run-lease niet vasthouden
+    assert sf.running_key("task") in fake_redis.data
+
+
+def test_decorator_skips_and_reports(fake_redis):
+    calls = []
+
+    @sf.single_flight(per_user=True, name="demo")
+    def task(user_id):
+        calls.append(user_id)
+        # geneste aanroep voor dezelfde user overlapt → skipped
+        return task(user_id=user_id)
+
+    result = task(3)
+
+    assert calls == [3]
+    assert result == {"status": "skipped", "reason": sf.OUTCOME_RUNNING, "user_id": 3}
+
+    stats = sf.get_single_flight_stats()["tasks"]["demo"]
+    assert stats[sf.OUTCOME_RAN] == 1
+    assert stats[sf.OUTCOME_RUNNING] == 1
+    assert stats["skip_rate"] == 0.5
+
+
+def test_redis_down_fails_open():
+    class Broken:
+        def __getattr__(self, name):
+            raise ConnectionError("redis down")
+
+    set_redis(Broken())
+    try:
+        assert sf.acquire_lease("task")["acquired"]
+        assert sf.get_single_flight_stats()["available"] is False
+    finally:
+        set_redis(None)
@@ -0,0 +1,70 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.utils import tracing
+from backend.utils.async_db import run_db
+
+
+def test_calls_roll_up_to_parent_spans():
+    tracing.reset_metrics()
+
+    with tracing.span("outer", "task") as outer:
+        with tracing.span("inner") as inner:
+            tracing.add_call("db", 0.01)
+            tracing.add_call("llm", 0.5)
+        tracing.add_call("db", 0.02)
+
+    assert inner["trace_id"] == outer["trace_id"]
+    assert inner["parent_id"] == outer["span_id"]
+    assert inner["calls"]["db"]["count"] == 1
+    assert outer["calls"]["db"]["count"] == 2
+    assert outer["calls"]["llm"]["count"] == 1
+    assert tracing.current_trace_id() is None
+
+    metrics = tracing.get_metrics()
+    assert metrics["task|outer"]["count"] == 1
+    assert metrics["task|outer"]["calls"]["db"]["count"] == 2
+
+    text = tracing.render_prometheus()
+    assert 'app_span_calls_total{kind="task",name="outer",call="db"} 2' in text
+    assert 'app_span_duration_seconds_count{kind="internal",name="inner"} 1' in text
+
+
+def test_error_status_is_recorded():
+    tracing.reset_metrics()
+
+    try:
+        with tracing.span("boom"):
+            raise RuntimeError("x")
+    except RuntimeError:
+        pass
+
+    assert tracing.get_metrics()["internal|boom"]["errors"] == 1
+
+
+def _query(n):
+    for _ in range(n):
+        with tracing.record_call("db"):
+            pass
+    return {"n": n}
+
+
+def test_middleware_traces_route_and_run_db_calls():
+    tracing.reset_metrics()
+
+    app = FastAPI()
+    app.add_middleware(tracing.TracingMiddleware)
+
+    @app.get("/items/{n}")
+    async def items(n: int):
+        return await run_db(_query, n)
+
+    client = TestClient(app)
+    response = client.get("/items/3", headers={"X-Trace-Id": "abc123"})
+
+    assert response.status_code == 200
+    assert response.headers["x-trace-id"] == "abc123"
+    assert "db;dur=" in response.headers["server-timing"]
+
+    metrics = tracing.get_metrics()
+    assert metrics["http|GET /items/{n}"]["calls"]["db"]["count"] == 3
@@ -0,0 +1,81 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+T = TypeVar("T")
+
+
+# =========================================================
+# DB offload voor async FastAPI routes
+#
+# psycopg2 is synchroon: een query binnen een `async def`
+# route blokkeert de volledige uvicorn event loop.
+# run_db() voert de sync DB-functie uit in een begrensde
+# thread-pool, zodat de loop vrij blijft en het aantal
+# gelijktijdige DB-connecties per worker begrensd is.
+# =========================================================
+
+# Max gelijktijdige DB-calls per API-proces (≈ max open connecties)
+API_DB_WORKERS = int(os.getenv("API_DB_WORKERS", "16"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=API_DB_WORKERS,
+    thread_name_prefix="api-db",
+)
+
+_stats_lock = threading.Lock()
+_stats = {
+    "in_flight": 0,
+    "peak_in_flight": 0,
+    "calls": 0,
+    "errors": 0,
+}
+
+
+def _tracked(fn: Callable[..., T]) -> Callable[..., T]:
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _stats_lock:
+            _stats["in_flight"] += 1
+            _stats["calls"] += 1
+            _stats["peak_in_flight"] = max(_stats["peak_in_flight"], _stats["in_flight"])
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            with _stats_lock:
+                _stats["errors"] += 1
+            raise
+        finally:
+            with _stats_lock:
+                _stats["in_flight"] -= 1
+
+    return wrapper
+
+
+async def run_db(fn: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Voert een synchrone DB-functie uit in de API DB-pool.
+
+    Gebruik in een route:
+        return await run_db(_load_dashboard_data, user_id)
+
+    Excepties (incl. HTTPException) komen ongewijzigd terug in de route.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(_tracked(fn), *args, **kwargs)
+    # contextvars mee naar de thread (tracing span van de request)
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, ctx.run, call)
+
+
+def get_db_pool_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        return {"max_workers": API_DB_WORKERS, **_stats}
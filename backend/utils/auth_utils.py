@@ -1,12 +1,23 @@
+import hashlib
+import hmac
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 
 import jwt
 from jwt import PyJWTError
-from fastapi import Cookie, HTTPException, status
+from fastapi import Cookie, Depends, Header, HTTPException, status
 from passlib.context import CryptContext
 
+from backend.utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
 # =========================================================
 # 🔐 CONFIG
 # =========================================================
@@ -17,6 +28,12 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "60"))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 
+# Max aantal geverifieerde access tokens in het geheugen (per proces)
+TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "1024"))
+
+# Prometheus scraper (geen cookie): Authorization: Bearer <token>
+METRICS_SCRAPE_TOKEN = os.getenv("METRICS_SCRAPE_TOKEN", "")
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
@@ -72,6 +89,264 @@ def decode_token(token: str) -> Dict[str, Any]:
         raise ValueError(f"Invalid token: {e}")
 
 
+# =========================================================
+# 🗃️ VERIFIED-TOKEN CACHE
+# =========================================================
+# Dezelfde access token raakt tientallen endpoints per page load.
+# Een geverifieerde payload wordt bewaard onder sha256(token) tot
+# de exp van de token (LRU, begrensd). Ongeldige tokens worden
+# nooit gecached. Intrekken: zie REVOCATION (lokale kopie, geen
+# Redis per request); de cache bespaart de HMAC-verificatie.
+
+_token_cache: "OrderedDict[str, Tuple[Dict[str, Any], float]]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+_token_cache_stats = {"hits": 0, "misses": 0, "evictions": 0, "revocations": 0}
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def verify_token_cached(token: str) -> Dict[str, Any]:
+    """
+    decode_token met cache. Raise ValueError bij een ongeldige token.
+    """
+    key = _token_key(token)
+    now = time.time()
+
+    with _token_cache_lock:
+        entry = _token_cache.get(key)
+        if entry is not None:
+            payload, exp = entry
+            if now < exp:
+                _token_cache.move_to_end(key)
+                _token_cache_stats["hits"] += 1
+                return payload
+            del _token_cache[key]
+        _token_cache_stats["misses"] += 1
+
+    payload = decode_token(token)
+
+    exp = payload.get("exp")
+    if exp is None or TOKEN_CACHE_SIZE <= 0:
+        return payload
+
+    with _token_cache_lock:
+        _token_cache[key] = (payload, float(exp))
+        _token_cache.move_to_end(key)
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+            _token_cache_stats["evictions"] += 1
+
+    return payload
+
+
+def evict_token(token: Optional[str]) -> None:
+    """Verwijdert één token uit de cache van dit proces."""
+    if not token:
+        return
+    with _token_cache_lock:
+        _token_cache.pop(_token_key(token), None)
+
+
+# =========================================================
+# 🚫 REVOCATION (Redis → geldt voor alle workers)
+# =========================================================
+# Geen Redis in de hot path:
+# - access tokens: ZSET auth:revoked:access (score = moment van
+#   intrekken, member = "<sha256>|<ingaand>|<exp>"). Elk proces
+#   houdt een lokale kopie bij die een daemon-thread elke
+#   AUTH_REVOCATION_SYNC_S incrementeel bijwerkt; get_current_user
+#   doet alleen een dict-lookup. Het intrekkende proces zelf kent
+#   de intrekking direct, andere workers na hooguit één sync.
+# - refresh tokens: auth:revoked:refresh:<sha256> = ingaand (tot
+#   de exp); alleen /auth/refresh kijkt ernaar (sync route).
+# - "ingaand" = nu (logout) of nu + AUTH_ROTATION_GRACE_S (refresh):
+#   parallelle requests/tabs met de oude cookie falen dan niet.
+# Redis weg → fail-open (zoals single_flight), met warning.
+
+AUTH_REVOCATION_SYNC_S = float(os.getenv("AUTH_REVOCATION_SYNC_S", "2"))
+AUTH_ROTATION_GRACE_S = float(os.getenv("AUTH_ROTATION_GRACE_S", "10"))
+
+REVOKED_ACCESS_KEY = "auth:revoked:access"
+REVOKED_REFRESH_PREFIX = "auth:revoked:refresh"
+
+# Overlap bij incrementeel ophalen (klokverschil tussen servers)
+_SYNC_OVERLAP_S = 60
+
+_revocation_lock = threading.Lock()
+_revocation_state: Dict[str, Any] = {
+    "pid": None,
+    "revoked": {},          # sha256 → (ingaand, exp)
+    "synced_until": None,   # hoogste score gezien
+    "synced_at": None,
+    "healthy": True,
+}
+
+
+def _refresh_revoked_key(token_key: str) -> str:
+    return f"{REVOKED_REFRESH_PREFIX}:{token_key}"
+
+
+def _remember_revocation(token_key: str, effective: float, exp: float) -> None:
+    with _revocation_lock:
+        _revocation_state["revoked"][token_key] = (effective, exp)
+
+
+def revoke_token(token: Optional[str], grace_s: float = 0.0) -> bool:
+    """
+    Trekt één access- of refresh token in (logout / rotatie).
+    grace_s > 0: de oude token blijft nog zo lang geldig.
+    False als dat niet lukte.
+    """
+    if not token:
+        return False
+
+    try:
+        payload = decode_token(token)
+    except ValueError:
+        return False  # al ongeldig / verlopen
+
+    now = time.time()
+    exp = float(payload.get("exp", 0))
+    if exp <= now:
+        return False
+
+    key = _token_key(token)
+    effective = now + max(0.0, grace_s)
+
+    if payload.get("type") == "access":
+        if not grace_s:
+            evict_token(token)
+        _remember_revocation(key, effective, exp)
+
+    try:
+        if payload.get("type") == "access":
+            get_redis().zadd(REVOKED_ACCESS_KEY, {f"{key}|{effective:.3f}|{exp:.0f}": now})
+        else:
+            get_redis().set(_refresh_revoked_key(key), f"{effective:.3f}", ex=int(exp - now) + 1)
+    except Exception:
+        logger.warning("⚠️ Token intrekken mislukt (Redis)", exc_info=True)
+        return False
+
+    with _token_cache_lock:
+        _token_cache_stats["revocations"] += 1
+    return True
+
+
+def sync_revocations() -> int:
+    """
+    Haalt nieuwe access-token intrekkingen op (incrementeel) en ruimt
+    verlopen entries op. Draait in de sync-thread; nooit in een request.
+    """
+    now = time.time()
+    lifetime = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+    with _revocation_lock:
+        synced_until = _revocation_state["synced_until"]
+    since = (synced_until - _SYNC_OVERLAP_S) if synced_until is not None else now - lifetime
+
+    try:
+        client = get_redis()
+        # Ingetrokken vóór de maximale levensduur → token sowieso verlopen
+        client.zremrangebyscore(REVOKED_ACCESS_KEY, "-inf", now - lifetime - _SYNC_OVERLAP_S)
+        members = client.zrangebyscore(REVOKED_ACCESS_KEY, since, "+inf", withscores=True)
+    except Exception:
+        with _revocation_lock:
+            was_healthy = _revocation_state["healthy"]
+            _revocation_state["healthy"] = False
+        if was_healthy:
+            logger.warning("⚠️ Revocation sync niet beschikbaar (Redis), laatst bekende lijst blijft gelden", exc_info=True)
+        return 0
+
+    added = 0
+    with _revocation_lock:
+        revoked = _revocation_state["revoked"]
+        for member, score in members:
+            try:
+                key, effective, exp = member.split("|")
+                effective, exp = float(effective), float(exp)
+            except ValueError:
+                continue
+            if exp > now and key not in revoked:
+                added += 1
+            if exp > now:
+                revoked[key] = (effective, exp)
+            synced_until = max(synced_until or score, score)
+
+        for key in [k for k, (_, exp) in revoked.items() if exp <= now]:
+            del revoked[key]
+
+        if not _revocation_state["healthy"]:
+            logger.info("✅ Revocation sync hersteld")
+        _revocation_state.update(synced_until=synced_until if synced_until is not None else now, synced_at=now, healthy=True)
+
+    return added
+
+
+def _sync_loop() -> None:
+    while True:
+        sync_revocations()
+        time.sleep(AUTH_REVOCATION_SYNC_S)
+
+
+def _ensure_revocation_sync() -> None:
+    """Start de sync-thread van dit proces (fork-safe)."""
+    if _revocation_state["pid"] == os.getpid():
+        return
+    with _revocation_lock:
+        if _revocation_state["pid"] == os.getpid():
+            return
+        _revocation_state["pid"] = os.getpid()
+    threading.Thread(target=_sync_loop, name="auth-revocation-sync", daemon=True).start()
+
+
+def is_token_revoked(token: str) -> bool:
+    """
+    Hot path (access tokens): alleen de lokale kopie, geen I/O.
+    """
+    _ensure_revocation_sync()
+    with _revocation_lock:
+        entry = _revocation_state["revoked"].get(_token_key(token))
+    return entry is not None and time.time() >= entry[0]
+
+
+def is_refresh_token_revoked(token: str) -> bool:
+    """Alleen voor /auth/refresh (sync route): één Redis GET."""
+    try:
+        effective = get_redis().get(_refresh_revoked_key(_token_key(token)))
+    except Exception:
+        logger.warning("⚠️ Revocation check niet beschikbaar (Redis), refresh token geaccepteerd", exc_info=True)
+        return False
+    return effective is not None and time.time() >= float(effective)
+
+
+def clear_token_cache() -> None:
+    with _token_cache_lock:
+        _token_cache.clear()
+        for k in _token_cache_stats:
+            _token_cache_stats[k] = 0
+    with _revocation_lock:
+        _revocation_state["revoked"].clear()
+        _revocation_state["synced_until"] = None
+
+
+def get_token_cache_stats() -> Dict[str, Any]:
+    with _token_cache_lock:
+        stats = dict(_token_cache_stats)
+        stats["size"] = len(_token_cache)
+
+    lookups = stats["hits"] + stats["misses"]
+    stats["max_size"] = TOKEN_CACHE_SIZE
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+
+    with _revocation_lock:
+        stats["revoked_known"] = len(_revocation_state["revoked"])
+        stats["revocation_synced_at"] = _revocation_state["synced_at"]
+        stats["revocation_sync_healthy"] = _revocation_state["healthy"]
+    return stats
+
+
 # =========================================================
 # 👤 CURRENT USER VIA COOKIE
 # =========================================================
@@ -84,7 +359,7 @@ async def get_current_user(access_token: str = Cookie(default=None)):
         )
 
     try:
-        payload = decode_token(access_token)
+        payload = verify_token_cached(access_token)
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -104,4 +379,38 @@ async def get_current_user(access_token: str = Cookie(default=None)):
             detail="Token missing subject",
         )
 
-    return {"id": int(user_id)}
+    if is_token_revoked(access_token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revoked",
+        )
+
+    return {"id": int(user_id), "role": payload.get("role")}
+
+
+async def get_current_admin(current_user: dict = Depends(get_current_user)):
+    """
+    Alleen admins. De rol komt uit de token; /auth/refresh leest hem
+    opnieuw uit de DB, dus een rolwijziging geldt binnen de
+    levensduur van één access token.
+    """
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin only",
+        )
+    return current_user
+
+
+async def require_metrics_access(
+    authorization: Optional[str] = Header(default=None),
+    access_token: Optional[str] = Cookie(default=None),
+):
+    """
+    /api/metrics: scraper met METRICS_SCRAPE_TOKEN, anders alleen admins.
+    """
+    if METRICS_SCRAPE_TOKEN and authorization and hmac.compare_digest(
+        authorization.encode(), f"Bearer {METRICS_SCRAPE_TOKEN}".encode()
+    ):
+        return
+    await get_current_admin(await get_current_user(access_token))
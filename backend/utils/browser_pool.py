@@ -0,0 +1,328 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# =========================================================
+# 🖨️ PLAYWRIGHT BROWSER POOL (per proces)
+#
+# Eén Chromium per proces (API of Celery pdf-worker), lazy
+# gestart en daarna hergebruikt:
+# - max PDF_POOL_MAX_CONTEXTS contexts tegelijk, elk met één
+#   page die tussen renders hergebruikt wordt
+# - context gerecycled na PDF_POOL_CONTEXT_RECYCLE renders of
+#   na een fout; browser na PDF_POOL_BROWSER_RECYCLE renders
+#   (zodra idle) → geheugen blijft begrensd
+# - health check bij elke checkout (browser connected, page open)
+# - render-queue: max PDF_POOL_QUEUE_MAX wachtenden, max
+#   PDF_POOL_QUEUE_TIMEOUT_S wachten → anders PdfBusyError
+#
+# Playwright draait op een eigen event loop in een daemon-thread,
+# zodat dezelfde pool werkt vanuit async FastAPI-routes
+# (render_pdf) én sync Celery-taken (render_pdf_sync).
+# =========================================================
+
+PDF_POOL_MAX_CONTEXTS = int(os.getenv("PDF_POOL_MAX_CONTEXTS", "2"))
+PDF_POOL_CONTEXT_RECYCLE = int(os.getenv("PDF_POOL_CONTEXT_RECYCLE", "50"))
+PDF_POOL_BROWSER_RECYCLE = int(os.getenv("PDF_POOL_BROWSER_RECYCLE", "500"))
+PDF_POOL_QUEUE_MAX = int(os.getenv("PDF_POOL_QUEUE_MAX", "20"))
+PDF_POOL_QUEUE_TIMEOUT_S = float(os.getenv("PDF_POOL_QUEUE_TIMEOUT_S", "30"))
+
+DEFAULT_RENDER_TIMEOUT_MS = 60_000
+PRINT_READY_SELECTOR = '[data-print-ready="true"]'
+
+CHROMIUM_ARGS = [
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+]
+VIEWPORT = {"width": 1280, "height": 900}
+DEVICE_SCALE_FACTOR = 2
+PDF_DEFAULTS = {
+    "format": "A4",
+    "print_background": True,
+    "prefer_css_page_size": True,
+}
+
+
+class PdfRenderError(Exception):
+    pass
+
+
+class PdfBusyError(PdfRenderError):
+    """Render-queue vol of wachttijd verstreken (→ 503 / retry)."""
+
+
+# =========================================================
+# 🧰 POOL
+# =========================================================
+class BrowserPool:
+    def __init__(
+        self,
+        *,
+        max_contexts: int = PDF_POOL_MAX_CONTEXTS,
+        context_recycle: int = PDF_POOL_CONTEXT_RECYCLE,
+        browser_recycle: int = PDF_POOL_BROWSER_RECYCLE,
+        queue_max: int = PDF_POOL_QUEUE_MAX,
+        queue_timeout_s: float = PDF_POOL_QUEUE_TIMEOUT_S,
+    ):
+        self.max_contexts = max(1, max_contexts)
+        self.context_recycle = max(1, context_recycle)
+        self.browser_recycle = max(1, browser_recycle)
+        self.queue_max = queue_max
+        self.queue_timeout_s = queue_timeout_s
+
+        self._playwright = None
+        self._browser = None
+        self._browser_renders = 0
+        self._idle: List[Dict[str, Any]] = []
+        self._in_use = 0
+        self._waiting = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+
+        self.stats = {
+            "renders": 0,
+            "failed": 0,
+            "rejected": 0,
+            "browser_launches": 0,
+            "contexts_created": 0,
+            "contexts_recycled": 0,
+            "render_ms_total": 0.0,
+            "wait_ms_total": 0.0,
+        }
+
+    # -----------------------------------------------------
+    # 🚦 Queue / backpressure
+    # -----------------------------------------------------
+    async def _acquire_slot(self) -> None:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_contexts)
+            self._launch_lock = asyncio.Lock()
+
+        # Vrije renderer → direct, telt niet als wachtend
+        if not self._slots.locked():
+            await self._slots.acquire()
+            return
+
+        if self._waiting >= self.queue_max:
+            self.stats["rejected"] += 1
+            raise PdfBusyError(f"PDF render-queue vol ({self._waiting} wachtend)")
+
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout_s)
+        except asyncio.TimeoutError:
+            self.stats["rejected"] += 1
+            raise PdfBusyError(f"Geen vrije PDF-renderer binnen {self.queue_timeout_s:.0f}s")
+        finally:
+            self._waiting -= 1
+
+    # -----------------------------------------------------
+    # 🌐 Browser
+    # -----------------------------------------------------
+    def _browser_healthy(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _ensure_browser(self) -> None:
+        async with self._launch_lock:
+            recycle_due = self._browser_renders >= self.browser_recycle and self._in_use <= 1
+            if self._browser_healthy() and not recycle_due:
+                return
+
+            if self._browser is not None:
+                logger.info("♻️ Chromium herstarten (%s renders / health)", self._browser_renders)
+                await self._close_browser()
+
+            self._browser = await self._launch()
+            self._browser_renders = 0
+            self.stats["browser_launches"] += 1
+            logger.info("🚀 Chromium gestart (pool)")
+
+    async def _launch(self):
+        # Lazy: playwright is zwaar en alleen nodig waar PDF's gerenderd worden
+        if self._playwright is None:
+            from playwright.async_api import async_playwright
+
+            self._playwright = await async_playwright().start()
+
+        return await self._playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
+
+    async def _close_browser(self) -> None:
+        idle, self._idle = self._idle, []
+        for slot in idle:
+            await self._close_slot(slot)
+        try:
+            await self._browser.close()
+        except Exception:
+            pass
+        self._browser = None
+
+    # -----------------------------------------------------
+    # 📄 Contexts + pages
+    # -----------------------------------------------------
+    async def _checkout(self) -> Dict[str, Any]:
+        await self._ensure_browser()
+
+        while self._idle:
+            slot = self._idle.pop()
+            if slot["browser"] is self._browser and not slot["page"].is_closed():
+                return slot
+            await self._close_slot(slot)
+
+        context = await self._browser.new_context(viewport=VIEWPORT, device_scale_factor=DEVICE_SCALE_FACTOR)
+        page = await context.new_page()
+        self.stats["contexts_created"] += 1
+        return {"browser": self._browser, "context": context, "page": page, "renders": 0}
+
+    async def _checkin(self, slot: Dict[str, Any], healthy: bool) -> None:
+        slot["renders"] += 1
+        self._browser_renders += 1
+
+        if not healthy or slot["renders"] >= self.context_recycle or slot["browser"] is not self._browser:
+            self.stats["contexts_recycled"] += 1
+            await self._close_slot(slot)
+            return
+
+        try:
+            await slot["context"].clear_cookies()
+            self._idle.append(slot)
+        except Exception:
+            await self._close_slot(slot)
+
+    async def _close_slot(self, slot: Dict[str, Any]) -> None:
+        try:
+            await slot["context"].close()
+        except Exception:
+            pass
+
+    # -----------------------------------------------------
+    # 🖨️ Render
+    # -----------------------------------------------------
+    async def render(
+        self,
+        url: str,
+        *,
+        timeout_ms: int = DEFAULT_RENDER_TIMEOUT_MS,
+        settle_ms: int = 500,
+        **pdf_options,
+    ) -> bytes:
+        queued = time.perf_counter()
+        await self._acquire_slot()
+        started = time.perf_counter()
+        self.stats["wait_ms_total"] += (started - queued) * 1000
+
+        self._in_use += 1
+        try:
+            slot = await self._checkout()
+            healthy = False
+            try:
+                page = slot["page"]
+                await page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+                await page.wait_for_selector(PRINT_READY_SELECTOR, timeout=timeout_ms)
+                if settle_ms:
+                    await page.wait_for_timeout(settle_ms)
+
+                pdf_bytes = await page.pdf(**{**PDF_DEFAULTS, **pdf_options})
+                healthy = True
+            finally:
+                await self._checkin(slot, healthy)
+
+            self.stats["renders"] += 1
+            self.stats["render_ms_total"] += (time.perf_counter() - started) * 1000
+            return pdf_bytes
+
+        except PdfRenderError:
+            self.stats["failed"] += 1
+            raise
+        except Exception as e:
+            self.stats["failed"] += 1
+            if type(e).__name__ == "TimeoutError":
+                raise PdfRenderError("PDF render timeout — print marker ontbreekt") from e
+            raise PdfRenderError(f"PDF render error: {e}") from e
+        finally:
+            self._in_use -= 1
+            self._slots.release()
+
+    async def close(self) -> None:
+        if self._browser is not None:
+            await self._close_browser()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        renders = self.stats["renders"]
+        return {
+            **self.stats,
+            "avg_render_ms": round(self.stats["render_ms_total"] / renders, 1) if renders else 0.0,
+            "browser_alive": self._browser_healthy(),
+            "browser_renders": self._browser_renders,
+            "contexts_idle": len(self._idle),
+            "contexts_in_use": self._in_use,
+            "waiting": self._waiting,
+            "max_contexts": self.max_contexts,
+            "queue_max": self.queue_max,
+        }
+
+
+# =========================================================
+# 🧵 EVENT LOOP THREAD (één per proces, fork-safe)
+# =========================================================
+_lock = threading.Lock()
+_state: Dict[str, Any] = {"pid": None, "loop": None, "pool": None}
+
+
+def _runtime():
+    with _lock:
+        if _state["pid"] != os.getpid() or _state["loop"] is None:
+            # Na fork (Celery prefork) is de thread van de parent weg
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="pdf-browser-pool", daemon=True).start()
+            _state.update(pid=os.getpid(), loop=loop, pool=BrowserPool())
+        return _state["loop"], _state["pool"]
+
+
+async def render_pdf(url: str, **kwargs) -> bytes:
+    """Async (FastAPI): rendert via de pool van dit proces."""
+    loop, pool = _runtime()
+    future = asyncio.run_coroutine_threadsafe(pool.render(url, **kwargs), loop)
+    return await asyncio.wrap_future(future)
+
+
+def render_pdf_sync(url: str, **kwargs) -> bytes:
+    """Sync (Celery): rendert via de pool van dit proces."""
+    loop, pool = _runtime()
+    return asyncio.run_coroutine_threadsafe(pool.render(url, **kwargs), loop).result()
+
+
+def get_browser_pool_stats() -> Dict[str, Any]:
+    pool = _state["pool"] if _state["pid"] == os.getpid() else None
+    if pool is None:
+        return {"started": False}
+    loop = _state["loop"]
+    return {"started": True, "pid": os.getpid(), **asyncio.run_coroutine_threadsafe(_snapshot(pool), loop).result(5)}
+
+
+async def _snapshot(pool: BrowserPool) -> Dict[str, Any]:
+    return pool.snapshot()
+
+
+def shutdown_browser_pool(timeout: float = 10.0) -> None:
+    with _lock:
+        if _state["pid"] != os.getpid() or _state["loop"] is None:
+            return
+        loop, pool = _state["loop"], _state["pool"]
+        _state.update(pid=None, loop=None, pool=None)
+
+    try:
+        asyncio.run_coroutine_threadsafe(pool.close(), loop).result(timeout)
+    except Exception:
+        logger.warning("⚠️ Browser pool sluiten mislukt", exc_info=True)
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,126 @@
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import Query, Request, Response
+
+from backend.utils.json_utils import json_default
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# msgpack / pyarrow zijn optioneel; zonder package valt de
+# negotiatie terug op JSON
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+
+# =========================================================
+# Compacte responseformaten voor chart endpoints
+#
+# - standaard: lijst van dicts (ongewijzigd voor de frontend)
+# - ?format=columnar → {"ts": [...], "equity": [...]}
+#   → keys één keer i.p.v. per rij
+# - Accept: application/msgpack → columnar als msgpack
+# - Accept: application/vnd.apache.arrow.stream → Arrow IPC
+# =========================================================
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+FORMAT_ROWS = "rows"
+FORMAT_COLUMNAR = "columnar"
+FORMAT_MSGPACK = "msgpack"
+FORMAT_ARROW = "arrow"
+
+
+def chart_format(
+    request: Request,
+    response: Response,
+    format: Optional[str] = Query(None, pattern="^(rows|columnar)$"),
+) -> str:
+    """
+    FastAPI dependency: bepaalt het responseformaat.
+    Accept-header (binair) gaat voor ?format.
+    """
+    # Ook JSON varieert op Accept → caches mengen de formaten niet
+    response.headers["Vary"] = "Accept"
+
+    accept = request.headers.get("accept", "")
+
+    if ARROW_MEDIA_TYPE in accept and pa is not None:
+        return FORMAT_ARROW
+    if MSGPACK_MEDIA_TYPE in accept and msgpack is not None:
+        return FORMAT_MSGPACK
+
+    return format or FORMAT_ROWS
+
+
+def to_columnar(rows: Sequence[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Lijst van dicts → dict van lijsten. Kolomvolgorde = eerste rij;
+    ontbrekende keys worden None.
+    """
+    if not rows:
+        return {}
+
+    keys = list(rows[0])
+    for row in rows[1:]:
+        for k in row:
+            if k not in keys:
+                keys.append(k)
+
+    return {k: [row.get(k) for row in rows] for k in keys}
+
+
+def _binary_headers(response: Optional[Response]) -> Dict[str, str]:
+    """
+    Een eigen Response negeert de geïnjecteerde `response`; headers
+    die de route daar zette (X-Next-Cursor) gaan hier mee.
+    """
+    headers = {}
+    if response is not None:
+        headers = {
+            k: v for k, v in response.headers.items()
+            if k not in ("content-length", "content-type", "vary")
+        }
+    headers["vary"] = "Accept"
+    return headers
+
+
+def render_chart(rows: Sequence[Dict[str, Any]], fmt: str, response: Optional[Response] = None):
+    """
+    Geeft rows terug in het gevraagde formaat (lijst, dict of Response).
+    Geef de geïnjecteerde `response` mee als de route headers zet.
+    """
+    if fmt == FORMAT_ROWS:
+        return rows
+
+    columns = to_columnar(rows)
+
+    if fmt == FORMAT_MSGPACK:
+        body = msgpack.packb(columns, default=json_default, use_bin_type=True)
+        return Response(content=body, media_type=MSGPACK_MEDIA_TYPE, headers=_binary_headers(response))
+
+    if fmt == FORMAT_ARROW:
+        try:
+            table = pa.table(columns)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return Response(
+                content=sink.getvalue().to_pybytes(),
+                media_type=ARROW_MEDIA_TYPE,
+                headers=_binary_headers(response),
+            )
+        except Exception:
+            # Gemengde types in een kolom → Arrow kan niet afleiden
+            logger.warning("⚠️ Arrow serialisatie mislukt, terugval op columnar JSON", exc_info=True)
+
+    return columns
@@ -1,14 +1,121 @@
 import psycopg2
+import psycopg2.extensions
 import os
+import re
+import time
 import logging
 from dotenv import load_dotenv  # ✅ Zorg dat .env automatisch geladen wordt
 
+from backend.utils.tracing import add_call, current_span
+from backend.utils.query_stats import (
+    fingerprint,
+    log_slow_query,
+    query_text,
+    record_query,
+    should_explain,
+)
+
 # ✅ .env-bestand laden (alleen nodig als dit bestand los wordt aangeroepen)
 load_dotenv()
 
 # ✅ Logging instellen
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+
+# =========================================================
+# 🔭 Getimede cursors
+# - tracing: DB-calls per span
+# - query profiling: fingerprint stats + slow-query log met
+#   EXPLAIN (zie utils/query_stats.py)
+# Werkt ook met cursor_factory=RealDictCursor e.d.
+# =========================================================
+class _TracedCursorMixin:
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _after_execute(self, query, vars, time.perf_counter() - started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _after_execute(self, query, None, time.perf_counter() - started, explain=False)
+
+
+def _after_execute(cursor, query, vars, seconds: float, explain: bool = True) -> None:
+    add_call("db", seconds)
+
+    try:
+        fp = fingerprint(query_text(query, cursor))
+
+        # zelfde fingerprint binnen één request / task → N+1
+        per_span = 0
+        span = current_span()
+        if span is not None:
+            counts = span.setdefault("queries", {})
+            per_span = counts[fp] = counts.get(fp, 0) + 1
+
+        ms = seconds * 1000
+        if record_query(fp, ms, per_span) and explain and should_explain(fp):
+            log_slow_query(fp, ms, _explain(cursor, query, vars))
+    except Exception:
+        logging.debug("Query profiling mislukt", exc_info=True)
+
+
+_EXPLAINABLE = re.compile(r"^\s*(select|with|insert|update|delete)\b", re.I)
+
+
+def _explain(cursor, query, vars):
+    """EXPLAIN (zonder ANALYZE) op dezelfde connectie, in een savepoint."""
+    conn = cursor.connection
+    status = conn.get_transaction_status()
+    if status == psycopg2.extensions.TRANSACTION_STATUS_INERROR:
+        return None
+
+    text = query_text(query, cursor)
+    if not _EXPLAINABLE.match(text):
+        return None
+
+    in_txn = status == psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+
+    # Ongetraceerde cursor: EXPLAIN telt niet mee in de stats
+    with psycopg2.extensions.cursor(conn) as cur:
+        if in_txn:
+            cur.execute("SAVEPOINT query_explain")
+        try:
+            cur.execute("EXPLAIN " + text, vars)
+            plan = "\n".join(r[0] for r in cur.fetchall())
+        except psycopg2.Error:
+            plan = None
+            if in_txn:
+                cur.execute("ROLLBACK TO SAVEPOINT query_explain")
+        if in_txn:
+            cur.execute("RELEASE SAVEPOINT query_explain")
+
+    return plan
+
+
+_traced_cursor_classes = {}
+
+
+def _traced_cursor_class(base):
+    cls = _traced_cursor_classes.get(base)
+    if cls is None:
+        cls = type(f"Traced{base.__name__}", (_TracedCursorMixin, base), {})
+        _traced_cursor_classes[base] = cls
+    return cls
+
+
+class TracedConnection(psycopg2.extensions.connection):
+    def cursor(self, *args, **kwargs):
+        base = kwargs.get("cursor_factory") or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs["cursor_factory"] = _traced_cursor_class(base)
+        return super().cursor(*args, **kwargs)
+
+
 def get_db_connection():
     """Maakt een verbinding met de PostgreSQL database op basis van omgevingsvariabelen."""
     db_config = {
@@ -20,7 +127,7 @@ def get_db_connection():
     }
 
     try:
-        conn = psycopg2.connect(**db_config)
+        conn = psycopg2.connect(connection_factory=TracedConnection, **db_config)
         logging.info(f"✅ Verbonden met database {db_config['database']} op {db_config['host']}:{db_config['port']}")
         return conn
     except psycopg2.Error as e:
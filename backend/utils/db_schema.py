@@ -0,0 +1,84 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+# =========================================================
+# Schema cache (information_schema probes)
+#
+# API's en agents checken per request of optionele tabellen
+# bestaan. Het schema verandert alleen bij migraties, dus
+# één snapshot van alle public tabellen + kolommen per proces
+# volstaat; na SCHEMA_CACHE_TTL wordt opnieuw geladen.
+# =========================================================
+
+SCHEMA_CACHE_TTL = int(os.getenv("SCHEMA_CACHE_TTL", "600"))
+
+_lock = threading.Lock()
+_columns_by_table: Optional[Dict[str, Set[str]]] = None
+_loaded_at = 0.0
+
+
+def _load(conn) -> Dict[str, Set[str]]:
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT t.table_name, c.column_name
+            FROM information_schema.tables t
+            LEFT JOIN information_schema.columns c
+              ON c.table_schema = t.table_schema
+             AND c.table_name = t.table_name
+            WHERE t.table_schema = 'public'
+            """
+        )
+        rows = cur.fetchall()
+
+    out: Dict[str, Set[str]] = {}
+    for table, column in rows:
+        cols = out.setdefault(table, set())
+        if column:
+            cols.add(column)
+    return out
+
+
+def _snapshot(conn) -> Dict[str, Set[str]]:
+    global _columns_by_table, _loaded_at
+
+    with _lock:
+        fresh = (
+            _columns_by_table is not None
+            and time.monotonic() - _loaded_at < SCHEMA_CACHE_TTL
+        )
+        if fresh:
+            return _columns_by_table
+
+        _columns_by_table = _load(conn)
+        _loaded_at = time.monotonic()
+        logger.info("🗂️ Schema cache geladen (%s tabellen)", len(_columns_by_table))
+        return _columns_by_table
+
+
+def warm_schema_cache(conn) -> None:
+    """Laadt de cache direct (bijv. bij startup)."""
+    invalidate_schema_cache()
+    _snapshot(conn)
+
+
+def invalidate_schema_cache() -> None:
+    """Na migraties aanroepen; volgende probe laadt opnieuw."""
+    global _columns_by_table
+    with _lock:
+        _columns_by_table = None
+
+
+def table_exists(conn, table: str) -> bool:
+    return table in _snapshot(conn)
+
+
+def get_table_columns(conn, table: str) -> List[str]:
+    return sorted(_snapshot(conn).get(table, ()))
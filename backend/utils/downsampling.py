@@ -0,0 +1,116 @@
+import math
+from typing import Any, Dict, List, Optional, Sequence
+
+# =========================================================
+# Server-side downsampling voor tijdreeksen (PostgreSQL 14+)
+#
+# Groepeert snapshots met date_bin() in N buckets:
+# - standaard kolommen → laatste waarde in de bucket
+#   (snapshots zijn standen, geen flows)
+# - "ohlc" kolom → ook open / min / max per bucket
+# Payload groeit daardoor niet mee met de historie.
+# =========================================================
+
+MAX_POINTS = 2000
+
+
+def resolve_bin_seconds(
+    cur,
+    *,
+    table: str,
+    where_sql: str,
+    params: Sequence[Any],
+    points: Optional[int] = None,
+    bin_seconds: Optional[int] = None,
+) -> Optional[int]:
+    """
+    Bucketbreedte in seconden: expliciet of afgeleid uit tijdspanne / points.
+    Een expliciete breedte wordt verbreed als die meer dan MAX_POINTS
+    buckets zou opleveren. None → geen data.
+    """
+    cur.execute(
+        f"SELECT EXTRACT(EPOCH FROM MAX(ts) - MIN(ts)) FROM {table} WHERE {where_sql}",
+        tuple(params),
+    )
+    row = cur.fetchone()
+    if not row or row[0] is None:
+        return None
+
+    return bin_width_for_span(float(row[0]), points=points, bin_seconds=bin_seconds)
+
+
+def bin_width_for_span(
+    span_seconds: float,
+    points: Optional[int] = None,
+    bin_seconds: Optional[int] = None,
+) -> int:
+    # N buckets overspannen N-1 breedtes (origin = eerste snapshot)
+    target = max(2, min(int(points or MAX_POINTS), MAX_POINTS))
+    minimum = max(1, math.ceil(span_seconds / (target - 1))) if span_seconds > 0 else 1
+
+    if bin_seconds:
+        return max(int(bin_seconds), minimum)
+    return minimum
+
+
+def fetch_downsampled(
+    cur,
+    *,
+    table: str,
+    columns: Dict[str, str],
+    where_sql: str,
+    params: Sequence[Any],
+    bin_seconds: int,
+    ohlc: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Eén rij per bucket: ts (laatste snapshot), kolommen (laatste waarde)
+    en voor `ohlc` ook <naam>_open / _min / _max.
+
+    columns: outputnaam → SQL-expressie op `table`
+    """
+    names = list(columns)
+    src_cols = ",\n                ".join(f"{expr} AS {name}" for name, expr in columns.items())
+
+    aggs = [f"(array_agg({n} ORDER BY ts DESC))[1] AS {n}" for n in names]
+    if ohlc:
+        aggs += [
+            f"(array_agg({ohlc} ORDER BY ts ASC))[1] AS {ohlc}_open",
+            f"MIN({ohlc}) AS {ohlc}_min",
+            f"MAX({ohlc}) AS {ohlc}_max",
+        ]
+    agg_sql = ",\n            ".join(aggs)
+
+    cur.execute(
+        f"""
+        WITH src AS (
+            SELECT
+                ts,
+                {src_cols}
+            FROM {table}
+            WHERE {where_sql}
+        ),
+        origin AS (
+            SELECT MIN(ts) AS t0 FROM src
+        )
+        SELECT
+            MAX(ts) AS ts,
+            {agg_sql}
+        FROM src
+        GROUP BY date_bin(make_interval(secs => %s), ts, (SELECT t0 FROM origin))
+        ORDER BY 1 ASC
+        """,
+        (*params, bin_seconds),
+    )
+
+    out_names = ["ts"] + names
+    if ohlc:
+        out_names += [f"{ohlc}_open", f"{ohlc}_min", f"{ohlc}_max"]
+
+    rows = []
+    for r in cur.fetchall():
+        item = dict(zip(out_names, r))
+        for k in out_names[1:]:
+            item[k] = float(item[k] or 0)
+        rows.append(item)
+    return rows
@@ -1,6 +1,12 @@
 import json
+from datetime import date, datetime
+from decimal import Decimal
 import logging
 
+import orjson
+from fastapi.encoders import decimal_encoder
+from fastapi.responses import JSONResponse
+
 logger = logging.getLogger(__name__)
 
 def sanitize_json_input(data, context=""):
@@ -20,3 +26,37 @@ def sanitize_json_input(data, context=""):
             return {"error": f"Invalid JSON in {context}", "raw": data}
     logger.warning(f"[sanitize_json_input] ❌ Onverwacht datatype ({type(data)}) in context '{context}'")
     return {"error": f"Unexpected type in {context}", "raw": str(data)}
+
+
+def json_default(obj):
+    """
+    `default=` voor json.dumps: date/datetime → ISO-string, Decimal zoals
+    jsonable_encoder (zonder decimalen → int, anders float: 5 → 5, 5.0 → 5.0).
+    """
+    if isinstance(obj, Decimal):
+        return decimal_encoder(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# =========================================================
+# ⚡ Snelle JSON responses (orjson)
+#
+# - default_response_class in main.py
+# - endpoints die direct FastJSONResponse(payload) teruggeven
+#   slaan FastAPI's recursieve jsonable_encoder over;
+#   Decimal/date gaan via json_default, datetime/UUID native
+# =========================================================
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def dumps_json(obj) -> bytes:
+    return orjson.dumps(obj, default=json_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps_json(content)
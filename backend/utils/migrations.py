@@ -0,0 +1,227 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import importlib.util
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# =========================================================
+# 🧱 SCHEMA MIGRATIES
+#
+# Versiebestanden in backend/migrations:
+#   NNNN_naam.sql  → als één script uitgevoerd
+#   NNNN_naam.py   → def upgrade(cur) (data-migraties)
+#
+# - schema_migrations houdt bij wat is toegepast (+ checksum)
+# - elke migratie in een eigen transactie; een .py migratie mag
+#   zelf tussentijds committen (0005: per tabel) en moet dan
+#   idempotent zijn — na een fout draait hij opnieuw
+# - toegepast via scripts/init_db.py (deploy-backend.sh draait
+#   dat vóór de herstart van API/Celery)
+# - pg_advisory_lock → gelijktijdige runs (deploy + handmatig)
+#   passen niets dubbel toe
+# - gewijzigde checksum van een toegepaste migratie → warning
+#   (nooit opnieuw uitvoeren; schrijf een nieuwe versie)
+# =========================================================
+
+MIGRATIONS_DIR = os.getenv(
+    "MIGRATIONS_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations"),
+)
+MIGRATION_LOCK_ID = 72_031_047
+
+_FILENAME = re.compile(r"^(\d{4})_([a-z0-9_]+)\.(sql|py)$")
+
+
+# =========================================================
+# 🔎 DISCOVERY
+# =========================================================
+def checksum(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def discover_migrations(directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    directory = directory or MIGRATIONS_DIR
+    migrations: Dict[int, Dict[str, Any]] = {}
+
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(
+                f"Dubbele migratieversie {version:04d}: "
+                f"{migrations[version]['filename']} en {filename}"
+            )
+
+        path = os.path.join(directory, filename)
+        with open(path, "rb") as f:
+            content = f.read()
+
+        migrations[version] = {
+            "version": version,
+            "name": match.group(2),
+            "kind": match.group(3),
+            "filename": filename,
+            "path": path,
+            "checksum": checksum(content),
+        }
+
+    return [migrations[v] for v in sorted(migrations)]
+
+
+def pending_migrations(
+    migrations: List[Dict[str, Any]],
+    applied: Dict[int, Dict[str, Any]],
+    target: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    return [
+        m for m in migrations
+        if m["version"] not in applied and (target is None or m["version"] <= target)
+    ]
+
+
+def changed_migrations(
+    migrations: List[Dict[str, Any]],
+    applied: Dict[int, Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    return [
+        m for m in migrations
+        if m["version"] in applied and applied[m["version"]]["checksum"] != m["checksum"]
+    ]
+
+
+# =========================================================
+# 🗄️ BOOKKEEPING
+# =========================================================
+def ensure_migrations_table(cur) -> None:
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            checksum TEXT NOT NULL,
+            duration_ms INTEGER,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
+
+def applied_migrations(cur) -> Dict[int, Dict[str, Any]]:
+    cur.execute("SELECT version, name, checksum, applied_at FROM schema_migrations ORDER BY version;")
+    return {
+        row[0]: {"version": row[0], "name": row[1], "checksum": row[2], "applied_at": row[3]}
+        for row in cur.fetchall()
+    }
+
+
+def _run_python(cur, migration: Dict[str, Any]) -> None:
+    spec = importlib.util.spec_from_file_location(
+        f"migration_{migration['version']:04d}", migration["path"]
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    module.upgrade(cur)
+
+
+def apply_migration(conn, migration: Dict[str, Any]) -> int:
+    """Past één migratie toe in een eigen transactie; geeft duur in ms."""
+    started = time.perf_counter()
+    try:
+        with conn.cursor() as cur:
+            if migration["kind"] == "sql":
+                with open(migration["path"], "r", encoding="utf-8") as f:
+                    cur.execute(f.read())
+            else:
+                _run_python(cur, migration)
+
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            cur.execute(
+                """
+                INSERT INTO schema_migrations (version, name, checksum, duration_ms)
+                VALUES (%s, %s, %s, %s);
+                """,
+                (migration["version"], migration["name"], migration["checksum"], duration_ms),
+            )
+        conn.commit()
+        return duration_ms
+    except Exception:
+        conn.rollback()
+        raise
+
+
+# =========================================================
+# 🚀 MIGRATE
+# =========================================================
+def migrate(conn, target: Optional[int] = None, dry_run: bool = False) -> List[Dict[str, Any]]:
+    """
+    Past alle openstaande migraties (t/m `target`) toe.
+    Stopt bij de eerste fout; eerdere migraties blijven toegepast.
+    """
+    migrations = discover_migrations()
+    conn.autocommit = False
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s);", (MIGRATION_LOCK_ID,))
+        ensure_migrations_table(cur)
+    conn.commit()
+
+    try:
+        with conn.cursor() as cur:
+            applied = applied_migrations(cur)
+        conn.commit()
+
+        for m in changed_migrations(migrations, applied):
+            logger.warning(
+                f"⚠️ Migratie {m['filename']} is gewijzigd na toepassen "
+                f"(checksum wijkt af) — wordt niet opnieuw uitgevoerd."
+            )
+
+        todo = pending_migrations(migrations, applied, target)
+        if not todo:
+            logger.info("✅ Schema is up-to-date.")
+            return []
+
+        done = []
+        for m in todo:
+            if dry_run:
+                logger.info(f"📝 [dry-run] {m['filename']}")
+                done.append(dict(m, duration_ms=None))
+                continue
+
+            logger.info(f"🧱 Migratie {m['filename']}...")
+            duration_ms = apply_migration(conn, m)
+            logger.info(f"✅ {m['filename']} toegepast ({duration_ms} ms)")
+            done.append(dict(m, duration_ms=duration_ms))
+
+        return done
+    finally:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (MIGRATION_LOCK_ID,))
+        conn.commit()
+
+
+def migration_status(conn) -> List[Dict[str, Any]]:
+    migrations = discover_migrations()
+
+    with conn.cursor() as cur:
+        ensure_migrations_table(cur)
+        applied = applied_migrations(cur)
+    conn.commit()
+
+    changed = {m["version"] for m in changed_migrations(migrations, applied)}
+    return [
+        {
+            "version": m["version"],
+            "filename": m["filename"],
+            "applied": m["version"] in applied,
+            "applied_at": applied.get(m["version"], {}).get("applied_at"),
+            "changed": m["version"] in changed,
+        }
+        for m in migrations
+    ]
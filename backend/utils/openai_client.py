@@ -1,12 +1,15 @@
 import os
 import json
 import logging
+import threading
 import time
 import re
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, Optional, Tuple
 
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from backend.ai_core.context_budget import estimate_tokens, record_token_usage
+from backend.utils.tracing import add_call
 
 # ============================================================
 # ⚙️ Setup
@@ -21,21 +24,43 @@ api_key = os.getenv("OPENAI_API_KEY")
 # 🔧 FIX: goedkopere default
 model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
-if not api_key:
-    raise RuntimeError("OPENAI_API_KEY ontbreekt.")
+LOG_FILE = os.getenv("OPENAI_LOG_FILE", "/tmp/ai_agent_debug.log")
 
-client = OpenAI(api_key=api_key)
+# ============================================================
+# 🔌 Client (lazy)
+# ============================================================
+# Pas bij de eerste AI-call aanmaken: import van deze module
+# (via routers / agents) kost dan geen openai-import, geen
+# client-constructie en geen logbestand.
 
-LOG_FILE = os.getenv("OPENAI_LOG_FILE", "/tmp/ai_agent_debug.log")
+_client = None
+_client_lock = threading.Lock()
 
-if not logger.handlers:
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[logging.FileHandler(LOG_FILE), logging.StreamHandler()],
-    )
 
-logger.info(f"🤖 OpenAI model: {model}")
+def get_client():
+    global _client
+
+    if _client is not None:
+        return _client
+
+    with _client_lock:
+        if _client is None:
+            if not api_key:
+                raise RuntimeError("OPENAI_API_KEY ontbreekt.")
+
+            from openai import OpenAI
+
+            if not logger.handlers:
+                logging.basicConfig(
+                    level=logging.INFO,
+                    format="%(asctime)s - %(levelname)s - %(message)s",
+                    handlers=[logging.FileHandler(LOG_FILE), logging.StreamHandler()],
+                )
+
+            _client = OpenAI(api_key=api_key)
+            logger.info(f"🤖 OpenAI model: {model}")
+
+    return _client
 
 # ============================================================
 # 🔥 AI DEFAULTS
@@ -50,6 +75,87 @@ JSON_MAX_TOKENS = int(os.getenv("OPENAI_JSON_MAX_TOKENS", "600"))
 
 TIMEOUT = int(os.getenv("OPENAI_TIMEOUT", "45"))
 
+# Sentinel voor een mislukte tekst-call (bestaand contract)
+AI_ERROR_TEXT = "AI-error"
+
+
+class LLMStreamError(Exception):
+    """Stream brak af na (mogelijk) al verstuurde deltas."""
+
+# ============================================================
+# 🔌 Circuit breaker (per proces)
+# ============================================================
+# Na BREAKER_THRESHOLD opeenvolgende fouten gaan calls BREAKER_COOLDOWN
+# seconden direct terug zonder netwerk-call. Daarna half-open: precies
+# één call claimt de proefcall (_breaker_acquire); alle andere blijven
+# afgewezen tot die slaagt (→ dicht) of faalt (→ weer open). Een
+# proefcall die nooit afrondt (bv. afgebroken stream) verloopt na
+# BREAKER_PROBE_TIMEOUT seconden.
+
+BREAKER_THRESHOLD = int(os.getenv("OPENAI_BREAKER_THRESHOLD", "3"))
+BREAKER_COOLDOWN = float(os.getenv("OPENAI_BREAKER_COOLDOWN", "120"))
+BREAKER_PROBE_TIMEOUT = float(os.getenv("OPENAI_BREAKER_PROBE_TIMEOUT", str(2 * TIMEOUT)))
+
+_breaker_lock = threading.Lock()
+_breaker_state = {"failures": 0, "opened_at": None, "probe_started": None}
+
+
+def _probe_allowed(now: float) -> bool:
+    # lock wordt door de caller vastgehouden
+    if now - _breaker_state["opened_at"] < BREAKER_COOLDOWN:
+        return False
+    probe_started = _breaker_state["probe_started"]
+    return probe_started is None or (now - probe_started) >= BREAKER_PROBE_TIMEOUT
+
+
+def llm_available() -> bool:
+    """
+    Alleen kijken (claimt niets): dicht, of half-open zonder lopende proefcall.
+    """
+    with _breaker_lock:
+        if _breaker_state["opened_at"] is None:
+            return True
+        return _probe_allowed(time.monotonic())
+
+
+def _breaker_acquire() -> bool:
+    """
+    Vóór een netwerk-call: dicht → ja; half-open → alleen de eerste
+    caller krijgt de proefcall.
+    """
+    with _breaker_lock:
+        if _breaker_state["opened_at"] is None:
+            return True
+
+        now = time.monotonic()
+        if not _probe_allowed(now):
+            return False
+
+        _breaker_state["probe_started"] = now
+        logger.info("🔌 LLM circuit breaker half-open — proefcall")
+        return True
+
+
+def _breaker_success() -> None:
+    with _breaker_lock:
+        if _breaker_state["opened_at"] is not None:
+            logger.info("🔌 LLM circuit breaker dicht")
+        _breaker_state["failures"] = 0
+        _breaker_state["opened_at"] = None
+        _breaker_state["probe_started"] = None
+
+
+def _breaker_failure() -> None:
+    with _breaker_lock:
+        _breaker_state["failures"] += 1
+        _breaker_state["probe_started"] = None
+        if _breaker_state["failures"] >= BREAKER_THRESHOLD:
+            if _breaker_state["opened_at"] is None:
+                logger.warning(
+                    f"🔌 LLM circuit breaker open ({_breaker_state['failures']} fouten, cooldown {BREAKER_COOLDOWN}s)"
+                )
+            _breaker_state["opened_at"] = time.monotonic()
+
 # ============================================================
 # 🧰 JSON parsing helpers
 # ============================================================
@@ -180,6 +286,49 @@ def _repair_prompt(bad_output: str, base_prompt: str) -> str:
     )
 
 
+# ============================================================
+# 📊 Token accounting
+# ============================================================
+
+def _usage_tokens(response) -> Tuple[Optional[int], Optional[int]]:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None, None
+    return getattr(usage, "input_tokens", None), getattr(usage, "output_tokens", None)
+
+
+def _track_usage(
+    *,
+    agent: str,
+    user_id: Optional[int],
+    call_type: str,
+    system_role: str,
+    prompt: str,
+    started: float,
+    response=None,
+    success: bool = True,
+) -> None:
+    prompt_tokens, completion_tokens = _usage_tokens(response)
+    elapsed = time.perf_counter() - started
+
+    add_call("llm", elapsed)
+
+    try:
+        record_token_usage(
+            agent=agent,
+            user_id=user_id,
+            call_type=call_type,
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            estimated_prompt_tokens=estimate_tokens(system_role) + estimate_tokens(prompt),
+            duration_ms=int(elapsed * 1000),
+            success=success,
+        )
+    except Exception:
+        logger.warning("⚠️ Token usage tracking mislukt", exc_info=True)
+
+
 # ============================================================
 # ✅ GPT JSON CALL
 # ============================================================
@@ -191,19 +340,31 @@ def ask_gpt_json(
     schema: Optional[Dict[str, Any]] = None,
     retries: int = 2,   # 🔧 lager
     delay: float = 2.0,
+    agent: str = "general",
+    user_id: Optional[int] = None,
 ) -> Dict[str, Any]:
 
+    if not _breaker_acquire():
+        logger.warning(f"🔌 LLM breaker open — JSON call overgeslagen (agent={agent})")
+        return {}
+
     base_prompt = _make_json_guard_prompt(prompt, schema=schema)
 
     last_raw = ""
 
     for attempt in range(1, retries + 1):
 
+        # Breaker (weer) open na een fout → niet verder proberen
+        if attempt > 1 and not _breaker_acquire():
+            break
+
+        started = time.perf_counter()
+
         try:
 
             logger.info(f"🧠 JSON attempt {attempt}")
 
-            response = client.responses.create(
+            response = get_client().responses.create(
                 model=model,
                 temperature=JSON_TEMP,
                 top_p=0.8,
@@ -215,6 +376,18 @@ def ask_gpt_json(
                 ],
             )
 
+            _track_usage(
+                agent=agent,
+                user_id=user_id,
+                call_type="json",
+                system_role=system_role,
+                prompt=base_prompt,
+                started=started,
+                response=response,
+            )
+
+            _breaker_success()
+
             content = (response.output_text or "").strip()
 
             last_raw = content
@@ -227,7 +400,9 @@ def ask_gpt_json(
             # 🔧 repair 1x
             repair_prompt = _repair_prompt(content, base_prompt)
 
-            response2 = client.responses.create(
+            started = time.perf_counter()
+
+            response2 = get_client().responses.create(
                 model=model,
                 temperature=0,
                 max_output_tokens=JSON_MAX_TOKENS,
@@ -238,6 +413,16 @@ def ask_gpt_json(
                 ],
             )
 
+            _track_usage(
+                agent=agent,
+                user_id=user_id,
+                call_type="json_repair",
+                system_role=system_role,
+                prompt=repair_prompt,
+                started=started,
+                response=response2,
+            )
+
             parsed2 = sanitize_json_output(response2.output_text)
 
             if parsed2:
@@ -247,6 +432,18 @@ def ask_gpt_json(
 
             logger.warning(f"⚠️ JSON error attempt {attempt}: {e}")
 
+            _breaker_failure()
+
+            _track_usage(
+                agent=agent,
+                user_id=user_id,
+                call_type="json",
+                system_role=system_role,
+                prompt=base_prompt,
+                started=started,
+                success=False,
+            )
+
             if attempt < retries:
                 time.sleep(delay)
 
@@ -259,9 +456,19 @@ def ask_gpt_json(
 # Backwards compatible alias
 # ============================================================
 
-def ask_gpt(prompt: str, system_role: str) -> Dict[str, Any]:
+def ask_gpt(
+    prompt: str,
+    system_role: str,
+    agent: str = "general",
+    user_id: Optional[int] = None,
+) -> Dict[str, Any]:
 
-    return ask_gpt_json(prompt=prompt, system_role=system_role)
+    return ask_gpt_json(
+        prompt=prompt,
+        system_role=system_role,
+        agent=agent,
+        user_id=user_id,
+    )
 
 
 # ============================================================
@@ -274,28 +481,53 @@ def ask_gpt_text(
     system_role: str,
     retries: int = 2,
     delay: float = 2.0,
+    agent: str = "general",
+    user_id: Optional[int] = None,
+    timeout: Optional[float] = None,
 ) -> str:
 
+    if not _breaker_acquire():
+        logger.warning(f"🔌 LLM breaker open — text call overgeslagen (agent={agent})")
+        return AI_ERROR_TEXT
+
     last = ""
 
     for attempt in range(1, retries + 1):
 
+        # Breaker (weer) open na een fout → niet verder proberen
+        if attempt > 1 and not _breaker_acquire():
+            break
+
+        started = time.perf_counter()
+
         try:
 
             logger.info(f"🧠 Text attempt {attempt}")
 
-            response = client.responses.create(
+            response = get_client().responses.create(
                 model=model,
                 temperature=TEXT_TEMP,
                 top_p=0.9,
                 max_output_tokens=TEXT_MAX_TOKENS,
-                timeout=TIMEOUT,
+                timeout=timeout or TIMEOUT,
                 input=[
                     {"role": "system", "content": system_role},
                     {"role": "user", "content": prompt},
                 ],
             )
 
+            _breaker_success()
+
+            _track_usage(
+                agent=agent,
+                user_id=user_id,
+                call_type="text",
+                system_role=system_role,
+                prompt=prompt,
+                started=started,
+                response=response,
+            )
+
             content = (response.output_text or "").strip()
 
             last = content
@@ -306,9 +538,105 @@ def ask_gpt_text(
 
             logger.warning(f"⚠️ Text error attempt {attempt}: {e}")
 
+            _breaker_failure()
+
+            _track_usage(
+                agent=agent,
+                user_id=user_id,
+                call_type="text",
+                system_role=system_role,
+                prompt=prompt,
+                started=started,
+                success=False,
+            )
+
             if attempt < retries:
                 time.sleep(delay)
 
     logger.error("❌ Text call failed")
 
-    return last or "AI-error"
+    return last or AI_ERROR_TEXT
+
+
+# ============================================================
+# 🌊 GPT TEXT STREAM
+# ============================================================
+
+def stream_gpt_text(
+    *,
+    prompt: str,
+    system_role: str,
+    agent: str = "general",
+    user_id: Optional[int] = None,
+    timeout: Optional[float] = None,
+) -> Iterator[str]:
+    """
+    Streamt tekst-deltas van het model.
+    Geen retries. Breaker open → lege stream. Fout tijdens de stream →
+    LLMStreamError; de caller gooit de deels ontvangen tekst weg (fallback).
+    """
+
+    if not _breaker_acquire():
+        logger.warning(f"🔌 LLM breaker open — text stream overgeslagen (agent={agent})")
+        return
+
+    started = time.perf_counter()
+    response = None
+
+    try:
+
+        logger.info("🌊 Text stream start")
+
+        stream = get_client().responses.create(
+            model=model,
+            temperature=TEXT_TEMP,
+            top_p=0.9,
+            max_output_tokens=TEXT_MAX_TOKENS,
+            timeout=timeout or TIMEOUT,
+            stream=True,
+            input=[
+                {"role": "system", "content": system_role},
+                {"role": "user", "content": prompt},
+            ],
+        )
+
+        for event in stream:
+
+            event_type = getattr(event, "type", "")
+
+            if event_type == "response.output_text.delta":
+                delta = getattr(event, "delta", "")
+                if delta:
+                    yield delta
+
+            elif event_type == "response.completed":
+                response = getattr(event, "response", None)
+
+    except Exception as e:
+
+        logger.warning(f"⚠️ Text stream error: {e}")
+
+        _breaker_failure()
+
+        _track_usage(
+            agent=agent,
+            user_id=user_id,
+            call_type="text_stream",
+            system_role=system_role,
+            prompt=prompt,
+            started=started,
+            success=False,
+        )
+        raise LLMStreamError(str(e)) from e
+
+    _breaker_success()
+
+    _track_usage(
+        agent=agent,
+        user_id=user_id,
+        call_type="text_stream",
+        system_role=system_role,
+        prompt=prompt,
+        started=started,
+        response=response,
+    )
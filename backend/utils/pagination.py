@@ -0,0 +1,174 @@
+import base64
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Query, Response
+
+
+# =========================================================
+# Keyset-paginatie + tijdsrange voor history endpoints
+#
+# - Cursor = (timestamp, id) van de laatste rij, base64
+# - Predicaten zijn index-vriendelijk:
+#       ts >= since AND ts < until AND (ts, id) < (cursor)
+#   → gebruikt een (user_id, timestamp, id) index, geen
+#     DATE(ts)=ANY(...) of OFFSET scans
+# - Response-body blijft een lijst; de volgende cursor staat
+#   in de header X-Next-Cursor (leeg = laatste pagina)
+# - Opt-in: zonder ?limit / ?cursor geen LIMIT en de
+#   oorspronkelijke volgorde van het endpoint (bestaande
+#   clients krijgen nog steeds alle rijen)
+# =========================================================
+
+DEFAULT_PAGE_SIZE = int(os.getenv("API_DEFAULT_PAGE_SIZE", "500"))
+MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", "2000"))
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+# =========================================================
+# CURSOR
+# =========================================================
+def encode_cursor(ts: datetime, row_id: Any) -> str:
+    raw = f"{ts.isoformat()}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts_raw, id_raw = base64.urlsafe_b64decode(padded).decode("utf-8").split("|", 1)
+        return datetime.fromisoformat(ts_raw), int(id_raw)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Ongeldige cursor")
+
+
+# =========================================================
+# FASTAPI DEPENDENCY
+# =========================================================
+def page_params(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Paginagrootte (zet paginatie aan)"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor van de vorige pagina"),
+    since: Optional[datetime] = Query(None, description="Vanaf (inclusief)"),
+    until: Optional[datetime] = Query(None, description="Tot (exclusief)"),
+) -> Dict[str, Any]:
+    if since and until and since >= until:
+        raise HTTPException(status_code=400, detail="'since' moet vóór 'until' liggen")
+
+    paged = limit is not None or cursor is not None
+
+    return {
+        "paged": paged,
+        "limit": (limit or DEFAULT_PAGE_SIZE) if paged else None,
+        "cursor": decode_cursor(cursor) if cursor else None,
+        "since": since,
+        "until": until,
+    }
+
+
+def with_default_limit(page: Dict[str, Any], limit: int) -> Dict[str, Any]:
+    """Voor endpoints die vóór de paginatie al een vaste LIMIT hadden."""
+    if page.get("paged"):
+        return page
+    return {**page, "paged": True, "limit": limit}
+
+
+# =========================================================
+# SQL
+# =========================================================
+def history_filter(
+    page: Dict[str, Any],
+    ts_col: str = "timestamp",
+    id_col: str = "id",
+) -> Tuple[str, List[Any]]:
+    """
+    Extra WHERE-predicaten (beginnend met ' AND') + params.
+    Gebruik met ORDER BY ts_col DESC, id_col DESC LIMIT page_limit(page).
+    """
+    sql, params = "", []
+
+    if page.get("since") is not None:
+        sql += f" AND {ts_col} >= %s"
+        params.append(page["since"])
+
+    if page.get("until") is not None:
+        sql += f" AND {ts_col} < %s"
+        params.append(page["until"])
+
+    if page.get("cursor") is not None:
+        sql += f" AND ({ts_col}, {id_col}) < (%s, %s)"
+        params.extend(page["cursor"])
+
+    return sql, params
+
+
+def page_limit(page: Dict[str, Any]) -> Optional[int]:
+    """
+    Eén rij extra ophalen om te weten of er een volgende pagina is.
+    Niet gepagineerd → None (LIMIT NULL = geen limiet in Postgres).
+    """
+    if not page.get("paged"):
+        return None
+    return int(page["limit"]) + 1
+
+
+def recent_buckets_sql(table: str, bucket_sql: str) -> str:
+    """
+    De laatste N buckets (dag/week) met data, via een loose index
+    scan op (user_id, timestamp): per bucket één index-probe i.p.v.
+    SELECT DISTINCT over de hele history.
+    Params: (user_id, user_id, N). bucket_sql is een expressie op
+    `timestamp` waarvan de waarde het begin van de bucket is.
+    """
+    return f"""
+        WITH RECURSIVE buckets(bucket, n) AS (
+            (
+                SELECT {bucket_sql}, 1
+                FROM {table}
+                WHERE user_id = %s
+                ORDER BY timestamp DESC
+                LIMIT 1
+            )
+            UNION ALL
+            SELECT (
+                SELECT {bucket_sql}
+                FROM {table} t
+                WHERE t.user_id = %s
+                  AND t.timestamp < b.bucket
+                ORDER BY t.timestamp DESC
+                LIMIT 1
+            ), b.n + 1
+            FROM buckets b
+            WHERE b.bucket IS NOT NULL
+              AND b.n < %s
+        )
+        SELECT bucket FROM buckets WHERE bucket IS NOT NULL;
+    """
+
+
+def paginate(
+    rows: Sequence[Sequence[Any]],
+    page: Dict[str, Any],
+    response: Optional[Response],
+    ts_index: int,
+    id_index: int,
+) -> List[Sequence[Any]]:
+    """
+    Knipt de extra rij af en zet X-Next-Cursor.
+    """
+    if not page.get("paged"):
+        return list(rows)
+
+    limit = int(page["limit"])
+    has_more = len(rows) > limit
+    rows = list(rows[:limit])
+
+    if response is not None:
+        if has_more and rows:
+            last = rows[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last[ts_index], last[id_index])
+        else:
+            response.headers[NEXT_CURSOR_HEADER] = ""
+
+    return rows
@@ -1,67 +1,39 @@
-async def render_report_pdf_via_playwright(token: str) -> bytes:
-    """
-    Render report PDF via frontend print route.
-    Token komt uit report_snapshots tabel.
-    """
-
-    url = f"{FRONTEND_BASE_URL}/print/daily?token={token}"
-
-    logger.info("🧾 Playwright PDF render: %s", url)
+import os
+import logging
 
-    try:
-        async with async_playwright() as p:
+from backend.utils.browser_pool import render_pdf
 
-            browser = await p.chromium.launch(
-                headless=True,
-                args=[
-                    "--no-sandbox",
-                    "--disable-dev-shm-usage",
-                    "--disable-gpu",
-                ],
-            )
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
 
-            context = await browser.new_context(
-                viewport={"width": 1280, "height": 900},
-                device_scale_factor=2,
-            )
+FRONTEND_BASE_URL = os.getenv("FRONTEND_URL", "").rstrip("/")
+DEFAULT_TIMEOUT_MS = 60_000
 
-            page = await context.new_page()
+PDF_MARGIN = {
+    "top": "12mm",
+    "right": "12mm",
+    "bottom": "12mm",
+    "left": "12mm",
+}
 
-            await page.goto(
-                url,
-                wait_until="domcontentloaded",
-                timeout=DEFAULT_TIMEOUT_MS,
-            )
 
-            # wacht tot print klaar
-            await page.wait_for_selector(
-                '[data-print-ready="true"]',
-                timeout=DEFAULT_TIMEOUT_MS,
-            )
+def build_print_url(token: str) -> str:
+    return f"{FRONTEND_BASE_URL}/print/daily?token={token}"
 
-            await page.wait_for_timeout(500)
 
-            pdf_bytes = await page.pdf(
-                format="A4",
-                print_background=True,
-                prefer_css_page_size=True,
-                margin={
-                    "top": "12mm",
-                    "right": "12mm",
-                    "bottom": "12mm",
-                    "left": "12mm",
-                },
-            )
-
-            await browser.close()
+async def render_report_pdf_via_playwright(token: str) -> bytes:
+    """
+    Render report PDF via frontend print route.
+    Token komt uit report_snapshots tabel.
+    Browser + context komen uit de pool (utils/browser_pool).
+    """
+    if not FRONTEND_BASE_URL:
+        raise RuntimeError("FRONTEND_URL not configured")
 
-            logger.info("✅ PDF render OK (%d bytes)", len(pdf_bytes))
-            return pdf_bytes
+    url = build_print_url(token)
+    logger.info("🧾 Playwright PDF render: %s", url)
 
-    except PlaywrightTimeout:
-        logger.exception("❌ PDF render timeout")
-        raise Exception("PDF render timeout — print marker ontbreekt")
+    pdf_bytes = await render_pdf(url, timeout_ms=DEFAULT_TIMEOUT_MS, margin=PDF_MARGIN)
 
-    except Exception as e:
-        logger.exception("❌ Playwright crash")
-        raise Exception(f"PDF render error: {str(e)}")
+    logger.info("✅ PDF render OK (%d bytes)", len(pdf_bytes))
+    return pdf_bytes
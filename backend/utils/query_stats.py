@@ -0,0 +1,169 @@
+import os
+import re
+import time
+import logging
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# =========================================================
+# 🐢 QUERY PROFILING (per proces)
+#
+# Elke execute() via utils/db wordt getimed en geteld per
+# fingerprint (SQL zonder literals / parameters):
+# - count, totaal, p50 / p95 / max (laatste N samples)
+# - max_per_span: hoe vaak dezelfde query binnen één request /
+#   task draaide → N+1 patronen
+# - trager dan DB_SLOW_QUERY_MS → warning + EXPLAIN (max. 1x per
+#   fingerprint per DB_SLOW_EXPLAIN_INTERVAL_S)
+# =========================================================
+
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "500"))
+DB_SLOW_EXPLAIN_INTERVAL_S = float(os.getenv("DB_SLOW_EXPLAIN_INTERVAL_S", "300"))
+QUERY_STATS_SAMPLES = int(os.getenv("QUERY_STATS_SAMPLES", "500"))
+QUERY_STATS_MAX_FINGERPRINTS = int(os.getenv("QUERY_STATS_MAX_FINGERPRINTS", "2000"))
+
+OVERFLOW_FINGERPRINT = "<overig>"
+
+_lock = threading.Lock()
+_stats: Dict[str, Dict[str, Any]] = {}
+_last_explain: Dict[str, float] = {}
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PARAMS = re.compile(r"%\([^)]+\)s|%s")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_VALUES = re.compile(r"\bvalues\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+")
+_SPACES = re.compile(r"\s+")
+
+
+# =========================================================
+# 🔎 FINGERPRINT
+# =========================================================
+@lru_cache(maxsize=4096)
+def fingerprint(query: str) -> str:
+    text = _COMMENTS.sub(" ", query)
+    text = _STRINGS.sub("?", text)
+    text = _PARAMS.sub("?", text)
+    text = _NUMBERS.sub("?", text)
+    text = _SPACES.sub(" ", text).strip().lower()
+    text = _IN_LISTS.sub("in (...)", text)
+    text = _VALUES.sub(r"values \1, ...", text)
+    return text.rstrip(";").strip()[:500]
+
+
+def query_text(query, cursor=None) -> str:
+    """str / bytes / psycopg2.sql.Composed → str."""
+    if isinstance(query, str):
+        return query
+    if isinstance(query, bytes):
+        return query.decode("utf-8", "replace")
+    if cursor is not None and hasattr(query, "as_string"):
+        try:
+            return query.as_string(cursor)
+        except Exception:
+            pass
+    return str(query)
+
+
+# =========================================================
+# 📊 AGGREGATIE
+# =========================================================
+def record_query(fp: str, ms: float, per_span: int = 0) -> bool:
+    """Registreert één execute; True als hij boven de slow-drempel zat."""
+    with _lock:
+        entry = _stats.get(fp)
+        if entry is None:
+            if len(_stats) >= QUERY_STATS_MAX_FINGERPRINTS:
+                fp = OVERFLOW_FINGERPRINT
+                entry = _stats.get(fp)
+            if entry is None:
+                entry = _stats[fp] = {
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "slow": 0,
+                    "max_per_span": 0,
+                    "samples": deque(maxlen=QUERY_STATS_SAMPLES),
+                }
+
+        entry["count"] += 1
+        entry["total_ms"] += ms
+        entry["max_ms"] = max(entry["max_ms"], ms)
+        entry["max_per_span"] = max(entry["max_per_span"], per_span)
+        entry["samples"].append(ms)
+
+        slow = ms >= DB_SLOW_QUERY_MS
+        if slow:
+            entry["slow"] += 1
+
+    return slow
+
+
+def should_explain(fp: str, now: Optional[float] = None) -> bool:
+    now = time.monotonic() if now is None else now
+    with _lock:
+        last = _last_explain.get(fp)
+        if last is not None and now - last < DB_SLOW_EXPLAIN_INTERVAL_S:
+            return False
+        _last_explain[fp] = now
+        return True
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+SORT_KEYS = ("total_ms", "p95_ms", "max_ms", "count", "max_per_span")
+
+
+def get_query_stats(limit: int = 50, sort: str = "total_ms") -> Dict[str, Any]:
+    if sort not in SORT_KEYS:
+        sort = "total_ms"
+
+    with _lock:
+        snapshot = [(fp, dict(e, samples=list(e["samples"]))) for fp, e in _stats.items()]
+
+    rows = []
+    for fp, e in snapshot:
+        rows.append({
+            "fingerprint": fp,
+            "count": e["count"],
+            "total_ms": round(e["total_ms"], 2),
+            "avg_ms": round(e["total_ms"] / e["count"], 2) if e["count"] else 0.0,
+            "p50_ms": round(percentile(e["samples"], 50), 2),
+            "p95_ms": round(percentile(e["samples"], 95), 2),
+            "max_ms": round(e["max_ms"], 2),
+            "slow": e["slow"],
+            "max_per_span": e["max_per_span"],
+        })
+
+    rows.sort(key=lambda r: r[sort], reverse=True)
+
+    return {
+        "slow_query_ms": DB_SLOW_QUERY_MS,
+        "fingerprints": len(rows),
+        "queries": rows[:limit],
+    }
+
+
+def reset_query_stats() -> None:
+    with _lock:
+        _stats.clear()
+        _last_explain.clear()
+
+
+def log_slow_query(fp: str, ms: float, plan: Optional[str]) -> None:
+    logger.warning(
+        f"🐢 Trage query ({ms:.0f} ms ≥ {DB_SLOW_QUERY_MS:.0f} ms): {fp}"
+        + (f"\n{plan}" if plan else "")
+    )
@@ -0,0 +1,47 @@
+import os
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# =========================================================
+# 🧰 REDIS CLIENT (gedeeld, lazy)
+#
+# Zelfde Redis als de Celery broker, tenzij REDIS_URL gezet is.
+# Korte socket timeouts: locks / tellers mogen een task nooit
+# laten hangen als Redis traag of weg is.
+# =========================================================
+
+REDIS_URL = os.getenv("REDIS_URL") or os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "2"))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis():
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import redis
+
+                _client = redis.Redis.from_url(
+                    REDIS_URL,
+                    socket_timeout=REDIS_SOCKET_TIMEOUT,
+                    socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+                    decode_responses=True,
+                )
+                logger.info("🧰 Redis client aangemaakt")
+
+    return _client
+
+
+def set_redis(client: Optional[object]) -> None:
+    """Vervang de client (tests / alternatieve backend)."""
+    global _client
+    with _client_lock:
+        _client = client
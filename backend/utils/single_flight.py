@@ -0,0 +1,203 @@
+import os
+import time
+import uuid
+import inspect
+import logging
+import functools
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from backend.utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# =========================================================
+# 🔒 SINGLE-FLIGHT LEASES (Redis, met TTL)
+#
+# 15-min taken overlappen zodra een run langer duurt dan 15 min.
+# Per (task, user / scope):
+# - run-lease   sf:run:<task>:<scope>           → max. één run tegelijk
+# - venster-key sf:win:<task>:<scope>:<window>  → max. één run per venster
+# Een dubbele / late aanroep wordt overgeslagen en geteld.
+#
+# TTL = vangnet: een gecrashte worker houdt de lease nooit langer
+# vast dan de TTL. Redis weg → fail-open (task draait zonder lock).
+# =========================================================
+
+LEASE_PREFIX = "sf"
+DEFAULT_LEASE_TTL = int(os.getenv("SINGLE_FLIGHT_TTL", "1800"))
+STATS_RETENTION_DAYS = 8
+
+OUTCOME_RAN = "ran"
+OUTCOME_RUNNING = "skipped_running"
+OUTCOME_DUPLICATE = "skipped_duplicate"
+OUTCOMES = (OUTCOME_RAN, OUTCOME_RUNNING, OUTCOME_DUPLICATE)
+
+# Alleen verwijderen als de lease nog van ons is
+_RELEASE_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+# =========================================================
+# 🔑 KEYS
+# =========================================================
+def window_start(now: float, window_seconds: int) -> int:
+    return int(now // window_seconds) * window_seconds
+
+
+def running_key(task_name: str, scope: Any = None) -> str:
+    return f"{LEASE_PREFIX}:run:{task_name}:{'all' if scope is None else scope}"
+
+
+def window_key(task_name: str, scope: Any, window_seconds: int, now: float) -> str:
+    return (
+        f"{LEASE_PREFIX}:win:{task_name}:{'all' if scope is None else scope}:"
+        f"{window_start(now, window_seconds)}"
+    )
+
+
+def _stats_key(day: date) -> str:
+    return f"{LEASE_PREFIX}:stats:{day.isoformat()}"
+
+
+# =========================================================
+# 🔒 ACQUIRE / RELEASE
+# =========================================================
+def acquire_lease(
+    task_name: str,
+    *,
+    scope: Any = None,
+    window_seconds: Optional[int] = None,
+    ttl: Optional[int] = None,
+    now: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Probeert de lease te claimen.
+    Return: {"acquired", "outcome", "key", "token"}
+    """
+    now = time.time() if now is None else now
+    key = running_key(task_name, scope)
+    token = uuid.uuid4().hex
+
+    try:
+        client = get_redis()
+
+        if not client.set(key, token, nx=True, ex=int(ttl or DEFAULT_LEASE_TTL)):
+            return _skipped(client, task_name, scope, OUTCOME_RUNNING)
+
+        if window_seconds:
+            wkey = window_key(task_name, scope, window_seconds, now)
+            if not client.set(wkey, token, nx=True, ex=int(window_seconds)):
+                client.eval(_RELEASE_LUA, 1, key, token)
+                return _skipped(client, task_name, scope, OUTCOME_DUPLICATE)
+
+        _count(client, task_name, OUTCOME_RAN)
+        return {"acquired": True, "outcome": OUTCOME_RAN, "key": key, "token": token}
+
+    except Exception:
+        logger.warning(f"⚠️ Redis lease niet beschikbaar, '{task_name}' draait zonder lock", exc_info=True)
+        return {"acquired": True, "outcome": OUTCOME_RAN, "key": None, "token": None}
+
+
+def release_lease(lease: Optional[Dict[str, Any]]) -> None:
+    if not lease or not lease.get("key") or not lease.get("token"):
+        return
+
+    try:
+        get_redis().eval(_RELEASE_LUA, 1, lease["key"], lease["token"])
+    except Exception:
+        logger.warning(f"⚠️ Lease vrijgeven mislukt: {lease['key']} (verloopt via TTL)", exc_info=True)
+
+
+def _skipped(client, task_name: str, scope: Any, outcome: str) -> Dict[str, Any]:
+    _count(client, task_name, outcome)
+    logger.warning(f"⏭️ '{task_name}' overgeslagen ({outcome}, scope={scope if scope is not None else 'all'})")
+    return {"acquired": False, "outcome": outcome, "key": None, "token": None}
+
+
+def _count(client, task_name: str, outcome: str) -> None:
+    key = _stats_key(date.today())
+    client.hincrby(key, f"{task_name}|{outcome}", 1)
+    client.expire(key, STATS_RETENTION_DAYS * 86400)
+
+
+@contextmanager
+def lease(task_name: str, **kwargs) -> Iterator[Dict[str, Any]]:
+    current = acquire_lease(task_name, **kwargs)
+    try:
+        yield current
+    finally:
+        if current["acquired"]:
+            release_lease(current)
+
+
+# =========================================================
+# 🎀 DECORATOR (onder @shared_task)
+# =========================================================
+def single_flight(
+    *,
+    window_seconds: Optional[int] = None,
+    ttl: Optional[int] = None,
+    per_user: bool = False,
+    name: Optional[str] = None,
+) -> Callable:
+    """
+    Laat de task alleen draaien als hij de lease krijgt; anders
+    {"status": "skipped", "reason": ...}.
+
+    per_user=True → scope = user_id-argument van de task.
+    """
+
+    def decorator(fn: Callable) -> Callable:
+        task_name = name or f"{fn.__module__}.{fn.__name__}"
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            scope = None
+            if per_user:
+                scope = signature.bind_partial(*args, **kwargs).arguments.get("user_id")
+
+            with lease(task_name, scope=scope, window_seconds=window_seconds, ttl=ttl) as current:
+                if not current["acquired"]:
+                    return {"status": "skipped", "reason": current["outcome"], "user_id": scope}
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# =========================================================
+# 📊 STATS (skip-tellers per dag)
+# =========================================================
+def get_single_flight_stats(days: int = 1) -> Dict[str, Any]:
+    days = max(1, min(int(days), STATS_RETENTION_DAYS))
+    today = date.today()
+
+    try:
+        client = get_redis()
+        raw = [client.hgetall(_stats_key(today - timedelta(days=i))) for i in range(days)]
+    except Exception:
+        logger.warning("⚠️ Single-flight stats niet beschikbaar", exc_info=True)
+        return {"available": False, "days": days, "tasks": {}}
+
+    tasks: Dict[str, Dict[str, Any]] = {}
+    for counts in raw:
+        for field, count in (counts or {}).items():
+            task_name, _, outcome = field.rpartition("|")
+            entry = tasks.setdefault(task_name, {o: 0 for o in OUTCOMES})
+            entry[outcome] = entry.get(outcome, 0) + int(count)
+
+    for entry in tasks.values():
+        total = sum(entry[o] for o in OUTCOMES)
+        skipped = entry[OUTCOME_RUNNING] + entry[OUTCOME_DUPLICATE]
+        entry["skip_rate"] = round(skipped / total, 3) if total else 0.0
+
+    return {"available": True, "days": days, "tasks": tasks}
@@ -0,0 +1,384 @@
+import os
+import copy
+import json
+import time
+import uuid
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# =========================================================
+# 🔭 TRACING + LATENCY METRICS
+#
+# Eén span per API-request / Celery-task / per-user run:
+#   duur + aantal en tijd van DB-, HTTP- en LLM-calls.
+#
+# - span()       context manager (contextvars → ook in run_db threads)
+# - traced       decorator voor losse functies
+# - add_call()   DB-cursor, HTTP-clients en openai_client melden hier
+# - trace_id     gaat mee van dispatcher → chunk → per-user run
+#                (Celery header "trace_id", HTTP header X-Trace-Id)
+#
+# Export:
+# - Prometheus text format (render_prometheus → /api/metrics),
+#   per proces geaggregeerd
+# - JSONL per afgeronde span (TRACE_EXPORT_PATH) voor offline
+#   analyse, ook vanuit Celery workers
+# =========================================================
+
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+TRACE_HEADER = "X-Trace-Id"
+
+CALL_KINDS = ("db", "http", "llm")
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+_current_span: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_span", default=None)
+
+_lock = threading.Lock()
+_metrics: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_export_lock = threading.Lock()
+
+
+# =========================================================
+# 🧵 SPANS
+# =========================================================
+def new_trace_id() -> str:
+    return uuid.uuid4().hex
+
+
+def current_span() -> Optional[Dict[str, Any]]:
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span["trace_id"] if span else None
+
+
+def start_span(name: str, kind: str = "internal", *, trace_id: Optional[str] = None, **attrs):
+    parent = _current_span.get()
+    span = {
+        "trace_id": trace_id or (parent["trace_id"] if parent else new_trace_id()),
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": parent["span_id"] if parent else None,
+        "name": name,
+        "kind": kind,
+        "attrs": attrs,
+        "status": "ok",
+        "started": time.time(),
+        "_t0": time.perf_counter(),
+        "_parent": parent,
+        "calls": {k: {"count": 0, "seconds": 0.0} for k in CALL_KINDS},
+    }
+    return span, _current_span.set(span)
+
+
+def finish_span(span: Dict[str, Any], token, status: Optional[str] = None) -> Dict[str, Any]:
+    try:
+        _current_span.reset(token)
+    except ValueError:
+        # token uit een andere context (bv. Celery signal-handlers)
+        _current_span.set(span["_parent"])
+
+    if status:
+        span["status"] = status
+    span["duration_s"] = time.perf_counter() - span["_t0"]
+
+    _observe(span)
+    if TRACE_EXPORT_PATH:
+        _export(span)
+
+    return span
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", *, trace_id: Optional[str] = None, **attrs) -> Iterator[Dict[str, Any]]:
+    current, token = start_span(name, kind, trace_id=trace_id, **attrs)
+    try:
+        yield current
+    except BaseException:
+        finish_span(current, token, status="error")
+        raise
+    else:
+        finish_span(current, token)
+
+
+def traced(name: Optional[str] = None, kind: str = "internal") -> Callable:
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name, kind):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# =========================================================
+# 📞 CALLS (DB / HTTP / LLM)
+# =========================================================
+def add_call(kind: str, seconds: float) -> None:
+    """Telt de call mee in de actieve span én al zijn parents."""
+    span = _current_span.get()
+    if span is None:
+        return
+
+    with _lock:
+        while span is not None:
+            calls = span["calls"][kind]
+            calls["count"] += 1
+            calls["seconds"] += seconds
+            span = span["_parent"]
+
+
+@contextmanager
+def record_call(kind: str) -> Iterator[None]:
+    if _current_span.get() is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_call(kind, time.perf_counter() - started)
+
+
+_http_instrumented = False
+
+
+def instrument_http() -> None:
+    """requests + httpx (sync / async) tellen als HTTP-calls. Idempotent."""
+    global _http_instrumented
+    if _http_instrumented:
+        return
+    _http_instrumented = True
+
+    try:
+        import requests
+
+        original_send = requests.Session.send
+
+        @functools.wraps(original_send)
+        def send(self, *args, **kwargs):
+            with record_call("http"):
+                return original_send(self, *args, **kwargs)
+
+        requests.Session.send = send
+    except ImportError:
+        pass
+
+    try:
+        import httpx
+
+        original_sync = httpx.Client.send
+        original_async = httpx.AsyncClient.send
+
+        @functools.wraps(original_sync)
+        def sync_send(self, *args, **kwargs):
+            with record_call("http"):
+                return original_sync(self, *args, **kwargs)
+
+        @functools.wraps(original_async)
+        async def async_send(self, *args, **kwargs):
+            with record_call("http"):
+                return await original_async(self, *args, **kwargs)
+
+        httpx.Client.send = sync_send
+        httpx.AsyncClient.send = async_send
+    except ImportError:
+        pass
+
+
+# =========================================================
+# 📊 METRICS (per proces)
+# =========================================================
+def _observe(span: Dict[str, Any]) -> None:
+    key = (span["kind"], span["name"])
+    seconds = span["duration_s"]
+
+    with _lock:
+        m = _metrics.get(key)
+        if m is None:
+            m = _metrics[key] = {
+                "count": 0,
+                "errors": 0,
+                "seconds": 0.0,
+                "buckets": [0] * len(LATENCY_BUCKETS),
+                "calls": {k: {"count": 0, "seconds": 0.0} for k in CALL_KINDS},
+            }
+
+        m["count"] += 1
+        m["seconds"] += seconds
+        if span["status"] != "ok":
+            m["errors"] += 1
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                m["buckets"][i] += 1
+        for k in CALL_KINDS:
+            m["calls"][k]["count"] += span["calls"][k]["count"]
+            m["calls"][k]["seconds"] += span["calls"][k]["seconds"]
+
+
+def get_metrics() -> Dict[str, Dict[str, Any]]:
+    """Snapshot: "<kind>|<name>" → aggregaten."""
+    with _lock:
+        return {f"{kind}|{name}": copy.deepcopy(m) for (kind, name), m in _metrics.items()}
+
+
+def reset_metrics() -> None:
+    with _lock:
+        _metrics.clear()
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def render_prometheus() -> str:
+    lines: List[str] = [
+        "# TYPE app_span_duration_seconds histogram",
+        "# TYPE app_span_errors_total counter",
+        "# TYPE app_span_calls_total counter",
+        "# TYPE app_span_call_seconds_total counter",
+    ]
+
+    with _lock:
+        items = sorted(_metrics.items())
+        for (kind, name), m in items:
+            labels = f'kind="{_label(kind)}",name="{_label(name)}"'
+            for bound, count in zip(LATENCY_BUCKETS, m["buckets"]):
+                lines.append(f'app_span_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'app_span_duration_seconds_bucket{{{labels},le="+Inf"}} {m["count"]}')
+            lines.append(f"app_span_duration_seconds_sum{{{labels}}} {m['seconds']:.6f}")
+            lines.append(f"app_span_duration_seconds_count{{{labels}}} {m['count']}")
+            lines.append(f"app_span_errors_total{{{labels}}} {m['errors']}")
+            for k in CALL_KINDS:
+                lines.append(f'app_span_calls_total{{{labels},call="{k}"}} {m["calls"][k]["count"]}')
+                lines.append(
+                    f'app_span_call_seconds_total{{{labels},call="{k}"}} {m["calls"][k]["seconds"]:.6f}'
+                )
+
+    return "\n".join(lines) + "\n"
+
+
+def server_timing(span: Dict[str, Any]) -> str:
+    """Server-Timing header (zichtbaar in browser devtools)."""
+    parts = [
+        f"{k};dur={span['calls'][k]['seconds'] * 1000:.1f}"
+        for k in CALL_KINDS
+        if span["calls"][k]["count"]
+    ]
+    parts.append(f"total;dur={(time.perf_counter() - span['_t0']) * 1000:.1f}")
+    return ", ".join(parts)
+
+
+# =========================================================
+# 💾 FILE EXPORTER (JSONL)
+# =========================================================
+def span_record(span: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "trace_id": span["trace_id"],
+        "span_id": span["span_id"],
+        "parent_id": span["parent_id"],
+        "name": span["name"],
+        "kind": span["kind"],
+        "status": span["status"],
+        "started": span["started"],
+        "duration_ms": round(span.get("duration_s", 0.0) * 1000, 2),
+        "calls": {
+            k: {"count": v["count"], "ms": round(v["seconds"] * 1000, 2)}
+            for k, v in span["calls"].items()
+        },
+        "attrs": span["attrs"],
+    }
+
+
+def _export(span: Dict[str, Any]) -> None:
+    try:
+        line = json.dumps(span_record(span), default=str)
+        with _export_lock:
+            with open(TRACE_EXPORT_PATH, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except Exception:
+        logger.warning("⚠️ Span export mislukt", exc_info=True)
+
+
+# =========================================================
+# 🌐 FASTAPI (pure ASGI middleware)
+# =========================================================
+class TracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        incoming = headers.get(TRACE_HEADER.lower().encode())
+        method = scope.get("method", "GET")
+
+        with span(
+            f"{method} unmatched",
+            "http",
+            trace_id=incoming.decode("latin-1")[:64] if incoming else None,
+        ) as current:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    current["attrs"]["status"] = message["status"]
+                    if message["status"] >= 500:
+                        current["status"] = "error"
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers") or []) + [
+                        (TRACE_HEADER.lower().encode(), current["trace_id"].encode()),
+                        (b"server-timing", server_timing(current).encode()),
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # Route-template i.p.v. ruwe path → lage cardinaliteit
+                route = scope.get("route")
+                if route is not None and getattr(route, "path", None):
+                    current["name"] = f"{method} {route.path}"
+
+
+# =========================================================
+# 🥬 CELERY (signals)
+# =========================================================
+_celery_spans: Dict[str, Tuple[Dict[str, Any], Any]] = {}
+
+
+def install_celery_tracing() -> None:
+    from celery.signals import before_task_publish, task_prerun, task_postrun
+
+    @before_task_publish.connect(weak=False)
+    def _propagate(headers=None, **kwargs):
+        trace_id = current_trace_id()
+        if trace_id and headers is not None:
+            headers.setdefault("trace_id", trace_id)
+
+    @task_prerun.connect(weak=False)
+    def _start(task_id=None, task=None, **kwargs):
+        trace_id = getattr(task.request, "trace_id", None)
+        _celery_spans[task_id] = start_span(task.name, "task", trace_id=trace_id, task_id=task_id)
+
+    @task_postrun.connect(weak=False)
+    def _finish(task_id=None, state=None, **kwargs):
+        entry = _celery_spans.pop(task_id, None)
+        if entry:
+            span_obj, token = entry
+            finish_span(span_obj, token, status="ok" if state in (None, "SUCCESS") else "error")